@@ -14,8 +14,10 @@ import json
 import logging
 import os
 from typing import Dict, Any, Optional, List
-from sqlalchemy import create_engine, text
+from sqlalchemy import bindparam, text
+from app.infrastructure.db.engine_registry import get_engine
 from datetime import datetime
+from app.domain.ai.conversation_memory_store import ConversationMemoryStore
 
 try:
     from ai_enhancements import ConversationMemory, MessageType
@@ -239,12 +241,12 @@ class AIEnhancementManager:
     
     def __init__(self, db_url: str, model):
         self.db_url = db_url
-        self.engine = create_engine(db_url)
+        self.engine = get_engine("oltp", db_url)
         self.model = model
         self.response_enhancer = ResponseEnhancer(model)
         
-        # Cache for conversation memories
-        self.memory_cache = {}
+        # Conversation memories: bounded local LRU over Redis, trimmed to a token budget
+        self.memory_cache = ConversationMemoryStore(memory_class=ConversationMemory)
         
         # Dubai real estate knowledge base (from enhanced version)
         self.dubai_knowledge = {
@@ -375,8 +377,9 @@ class AIEnhancementManager:
     
     def _get_conversation_memory(self, session_id: str) -> ConversationMemory:
         """Get or create conversation memory for a session"""
-        if session_id in self.memory_cache:
-            return self.memory_cache[session_id]
+        memory = self.memory_cache.get(session_id)
+        if memory is not None:
+            return memory
         
         # Try to load from database
         try:
@@ -400,7 +403,8 @@ class AIEnhancementManager:
                         LIMIT 20
                     """), {"conversation_id": row[0]})
                     
-                    for msg_row in messages_result:
+                    # Oldest first, so the token budget folds away the right turns
+                    for msg_row in reversed(messages_result.fetchall()):
                         memory.add_message(
                             role=msg_row[0],
                             content=msg_row[1],
@@ -626,8 +630,7 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
     def clear_conversation_memory(self, session_id: str) -> bool:
         """Clear conversation memory for a session"""
         try:
-            if session_id in self.memory_cache:
-                del self.memory_cache[session_id]
+            self.memory_cache.invalidate(session_id)
             return True
         except Exception as e:
             logger.error(f"Error clearing conversation memory: {e}")
@@ -722,84 +725,127 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
         else:
             return "balanced"
     
-    def generate_daily_briefing_for_agent(self, agent_id: int) -> str:
-        """Generate daily briefing for a specific agent"""
+    def generate_daily_briefing_for_agent(self, agent_id: int, briefing_inputs: Optional[Dict[str, List[Dict]]] = None,
+                                          market_context: Optional[Dict[str, Any]] = None) -> str:
+        """Generate daily briefing for a specific agent
+        
+        Batch runs pass the agent's rows from get_daily_briefing_inputs and the run's
+        get_briefing_market_context, so nothing is queried per agent. Query and model
+        errors (including LLMBudgetExceeded) are raised so the run records the agent
+        as failed and briefs it again when resumed.
+        """
         try:
             # Fetch data for the agent
-            stale_leads = self._get_stale_leads(agent_id)
-            recent_viewings = self._get_recent_viewings(agent_id)
-            todays_meetings = self._get_todays_meetings(agent_id)
+            if briefing_inputs is None:
+                briefing_inputs = self.get_daily_briefing_inputs([agent_id])[agent_id]
             
             # Construct prompt for Gemini
-            prompt = self._create_daily_briefing_prompt(stale_leads, recent_viewings, todays_meetings)
+            prompt = self._create_daily_briefing_prompt(
+                briefing_inputs['stale_leads'],
+                briefing_inputs['recent_viewings'],
+                briefing_inputs['todays_meetings'],
+                market_context
+            )
             
             # Generate response using Gemini
-            try:
-                response = self.model.generate_content(prompt)
-                return response.text
-            except Exception as e:
-                logger.error(f"Error generating daily briefing: {e}")
-                return "No priority actions today. A good day to prospect for new leads!"
+            response = self.model.generate_content(prompt)
+            return response.text
                 
         except Exception as e:
             logger.error(f"Error in generate_daily_briefing_for_agent: {e}")
-            return "Unable to generate daily briefing at this time."
+            raise
     
-    def _get_stale_leads(self, agent_id: int) -> List[Dict]:
-        """Get leads not contacted in the last 3 days"""
-        try:
-            with self.engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT name, email, phone, status, last_contacted, notes
-                    FROM leads 
-                    WHERE agent_id = :agent_id 
-                    AND (last_contacted IS NULL OR last_contacted < NOW() - INTERVAL '3 days')
-                    AND status IN ('new', 'contacted', 'qualified')
-                    ORDER BY last_contacted ASC NULLS FIRST
-                """), {"agent_id": agent_id})
-                
-                return [dict(row._mapping) for row in result.fetchall()]
-        except Exception as e:
-            logger.error(f"Error fetching stale leads: {e}")
-            return []
-    
-    def _get_recent_viewings(self, agent_id: int) -> List[Dict]:
-        """Get viewings that occurred yesterday, requiring follow-up"""
-        try:
-            with self.engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT client_name, property_address, viewing_time, client_feedback
-                    FROM viewings 
-                    WHERE agent_id = :agent_id 
-                    AND viewing_date = CURRENT_DATE - 1
-                    AND follow_up_required = TRUE
-                    ORDER BY viewing_time ASC
-                """), {"agent_id": agent_id})
-                
-                return [dict(row._mapping) for row in result.fetchall()]
-        except Exception as e:
-            logger.error(f"Error fetching recent viewings: {e}")
-            return []
+    def get_daily_briefing_inputs(self, agent_ids: List[int]) -> Dict[int, Dict[str, List[Dict]]]:
+        """Stale leads, yesterday's viewings and today's meetings of many agents, one query each"""
+        inputs = {agent_id: {'stale_leads': [], 'recent_viewings': [], 'todays_meetings': []}
+                  for agent_id in agent_ids}
+        if not agent_ids:
+            return inputs
+        
+        queries = {
+            # Leads not contacted in the last 3 days
+            'stale_leads': """
+                SELECT agent_id, name, email, phone, status, last_contacted, notes
+                FROM leads 
+                WHERE agent_id IN :agent_ids 
+                AND (last_contacted IS NULL OR last_contacted < NOW() - INTERVAL '3 days')
+                AND status IN ('new', 'contacted', 'qualified')
+                ORDER BY agent_id, last_contacted ASC NULLS FIRST
+            """,
+            # Viewings that occurred yesterday, requiring follow-up
+            'recent_viewings': """
+                SELECT agent_id, client_name, property_address, viewing_time, client_feedback
+                FROM viewings 
+                WHERE agent_id IN :agent_ids 
+                AND viewing_date = CURRENT_DATE - 1
+                AND follow_up_required = TRUE
+                ORDER BY agent_id, viewing_time ASC
+            """,
+            # Appointments scheduled for the current day
+            'todays_meetings': """
+                SELECT agent_id, client_name, appointment_time, appointment_type, notes
+                FROM appointments 
+                WHERE agent_id IN :agent_ids 
+                AND appointment_date = CURRENT_DATE
+                AND status = 'scheduled'
+                ORDER BY agent_id, appointment_time ASC
+            """,
+        }
+        
+        for section, query in queries.items():
+            try:
+                with self.engine.connect() as conn:
+                    result = conn.execute(text(query).bindparams(bindparam('agent_ids', expanding=True)),
+                                          {'agent_ids': list(agent_ids)})
+                    for row in result:
+                        row = dict(row._mapping)
+                        inputs[row.pop('agent_id')][section].append(row)
+            except Exception as e:
+                # An empty section would read as a quiet day, so the batch fails instead
+                logger.error(f"Error fetching {section.replace('_', ' ')} for daily briefings: {e}")
+                raise
+        
+        return inputs
     
-    def _get_todays_meetings(self, agent_id: int) -> List[Dict]:
-        """Get appointments scheduled for the current day"""
+    def get_briefing_market_context(self) -> Dict[str, Any]:
+        """Market snapshot shared by every briefing of a run, from the monthly market series"""
         try:
             with self.engine.connect() as conn:
                 result = conn.execute(text("""
-                    SELECT client_name, appointment_time, appointment_type, notes
-                    FROM appointments 
-                    WHERE agent_id = :agent_id 
-                    AND appointment_date = CURRENT_DATE
-                    AND status = 'scheduled'
-                    ORDER BY appointment_time ASC
-                """), {"agent_id": agent_id})
-                
-                return [dict(row._mapping) for row in result.fetchall()]
+                    WITH latest AS (SELECT MAX(period) AS period FROM market_series_monthly)
+                    SELECT s.location, SUM(s.sale_count) AS sales, AVG(s.median_sale_psf) AS sale_psf,
+                           AVG(p.median_sale_psf) AS previous_sale_psf, MAX(s.period) AS period
+                    FROM market_series_monthly s
+                    JOIN latest ON s.period = latest.period
+                    LEFT JOIN market_series_monthly p
+                        ON p.location = s.location AND p.property_type = s.property_type
+                        AND p.period = s.period - INTERVAL '1 month'
+                    GROUP BY s.location
+                    ORDER BY sales DESC
+                    LIMIT 5
+                """))
+                rows = [dict(row._mapping) for row in result.fetchall()]
         except Exception as e:
-            logger.error(f"Error fetching today's meetings: {e}")
-            return []
+            logger.error(f"Error fetching briefing market context: {e}")
+            return {}
+        
+        if not rows:
+            return {}
+        hotspots = []
+        for row in rows:
+            change = None
+            if row['sale_psf'] and row['previous_sale_psf']:
+                change = round((float(row['sale_psf']) / float(row['previous_sale_psf']) - 1) * 100, 1)
+            hotspots.append({
+                'location': row['location'],
+                'sales': int(row['sales'] or 0),
+                'median_sale_psf': round(float(row['sale_psf']), 0) if row['sale_psf'] else None,
+                'psf_change_pct': change
+            })
+        return {'period': str(rows[0]['period']), 'hotspots': hotspots}
     
-    def _create_daily_briefing_prompt(self, stale_leads: List[Dict], recent_viewings: List[Dict], todays_meetings: List[Dict]) -> str:
+    def _create_daily_briefing_prompt(self, stale_leads: List[Dict], recent_viewings: List[Dict], todays_meetings: List[Dict],
+                                      market_context: Optional[Dict[str, Any]] = None) -> str:
         """Create a detailed prompt for the daily briefing"""
         
         prompt_parts = []
@@ -863,6 +909,21 @@ Provide preparation tips for each meeting.
         else:
             prompt_parts.append("TODAY'S MEETINGS: No meetings scheduled for today.")
         
+        # Market context section (shared by all agents of a run)
+        if market_context and market_context.get('hotspots'):
+            market_text = "\n".join([
+                f"- {spot['location']}: {spot['sales']} sales"
+                + (f", AED {spot['median_sale_psf']:,.0f}/sqft" if spot['median_sale_psf'] else "")
+                + (f" ({spot['psf_change_pct']:+.1f}% vs previous month)" if spot['psf_change_pct'] is not None else "")
+                for spot in market_context['hotspots']
+            ])
+            prompt_parts.append(f"""
+MARKET CONTEXT ({market_context['period']}, most active areas):
+{market_text}
+
+Mention one market talking point the agent can use with clients today.
+            """)
+        
         return "\n\n".join(prompt_parts)
     
     def handle_content_generation_command(self, command: str, intent: str, agent_id: int) -> str:
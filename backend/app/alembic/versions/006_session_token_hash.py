@@ -0,0 +1,35 @@
+"""Add indexed session token hash for cached authentication lookups
+
+Revision ID: 006_session_token_hash
+Revises: 005_seed_aura_data
+Create Date: 2026-10-18 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "006_session_token_hash"
+down_revision: Union[str, None] = "005_seed_aura_data"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("user_sessions", sa.Column("session_token_hash", sa.String(64), nullable=True))
+
+    # Backfill existing sessions so lookups by hash find them
+    op.execute("""
+        UPDATE user_sessions
+        SET session_token_hash = encode(sha256(convert_to(session_token, 'UTF8')), 'hex')
+        WHERE session_token_hash IS NULL
+    """)
+
+    op.create_index("ix_user_sessions_session_token_hash", "user_sessions", ["session_token_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_sessions_session_token_hash", table_name="user_sessions")
+    op.drop_column("user_sessions", "session_token_hash")
@@ -0,0 +1,122 @@
+"""Add monthly market series roll-up for the ML insights endpoints
+
+Revision ID: 007_market_series
+Revises: 006_session_token_hash
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+SOURCE_TABLES = ("properties", "transactions")
+
+# revision identifiers, used by Alembic.
+revision: str = "007_market_series"
+down_revision: Union[str, None] = "006_session_token_hash"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "market_series_monthly",
+        sa.Column("location", sa.String(255), primary_key=True),
+        sa.Column("property_type", sa.String(50), primary_key=True),
+        sa.Column("period", sa.Date(), primary_key=True),
+        sa.Column("listing_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("median_list_price", sa.Numeric(15, 2)),
+        sa.Column("median_list_psf", sa.Numeric(12, 2)),
+        sa.Column("sale_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("sale_value", sa.Numeric(18, 2)),
+        sa.Column("median_sale_price", sa.Numeric(15, 2)),
+        sa.Column("median_sale_psf", sa.Numeric(12, 2)),
+        sa.Column("rental_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("median_annual_rent", sa.Numeric(15, 2)),
+        sa.Column("gross_yield", sa.Numeric(8, 5)),
+        sa.Column("refreshed_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index("ix_market_series_monthly_period", "market_series_monthly", ["period"])
+
+    op.create_table(
+        "market_series_state",
+        sa.Column("name", sa.String(64), primary_key=True),
+        sa.Column("watermark", sa.DateTime()),
+        sa.Column("refreshed_at", sa.DateTime()),
+    )
+
+    # Incremental refreshes look for rows changed since the last watermark
+    op.create_index("ix_properties_updated_at", "properties", ["updated_at"])
+    op.create_index("ix_transactions_updated_at", "transactions", ["updated_at"])
+
+    # updated_at is only bumped by triggers, which the SQL schema scripts create but Alembic never did
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_updated_at_column()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.updated_at = CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ language 'plpgsql'
+    """)
+    for table in SOURCE_TABLES:
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1 FROM pg_trigger
+                    WHERE tgname = 'update_{table}_updated_at' AND tgrelid = '{table}'::regclass
+                ) THEN
+                    CREATE TRIGGER update_{table}_updated_at BEFORE UPDATE ON {table}
+                    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+                END IF;
+            END $$
+        """)
+
+    # Deleted rows leave no updated_at behind, so triggers queue the month they were counted in
+    # (also when an update moves a row to another month); the next refresh drains the queue
+    op.create_table(
+        "market_series_dirty_periods",
+        sa.Column("period", sa.Date(), primary_key=True),
+        sa.Column("marked_at", sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION mark_market_series_period()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_TABLE_NAME = 'transactions' THEN
+                INSERT INTO market_series_dirty_periods (period)
+                VALUES (date_trunc('month', COALESCE(OLD.transaction_date, OLD.created_at))::date)
+                ON CONFLICT (period) DO NOTHING;
+            ELSE
+                INSERT INTO market_series_dirty_periods (period)
+                VALUES (date_trunc('month', OLD.created_at)::date)
+                ON CONFLICT (period) DO NOTHING;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql'
+    """)
+    op.execute("""
+        CREATE TRIGGER properties_market_series_period AFTER DELETE OR UPDATE OF created_at ON properties
+        FOR EACH ROW EXECUTE FUNCTION mark_market_series_period()
+    """)
+    op.execute("""
+        CREATE TRIGGER transactions_market_series_period
+        AFTER DELETE OR UPDATE OF transaction_date, created_at, property_id ON transactions
+        FOR EACH ROW EXECUTE FUNCTION mark_market_series_period()
+    """)
+
+
+def downgrade() -> None:
+    # The updated_at triggers stay: the SQL schema scripts create them too
+    for table in SOURCE_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_market_series_period ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS mark_market_series_period()")
+    op.drop_table("market_series_dirty_periods")
+    op.drop_index("ix_transactions_updated_at", table_name="transactions")
+    op.drop_index("ix_properties_updated_at", table_name="properties")
+    op.drop_table("market_series_state")
+    op.drop_index("ix_market_series_monthly_period", table_name="market_series_monthly")
+    op.drop_table("market_series_monthly")
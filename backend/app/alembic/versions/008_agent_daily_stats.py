@@ -0,0 +1,202 @@
+"""Add trigger-maintained daily per-agent listing and lead rollups for dashboards
+
+Revision ID: 008_agent_daily_stats
+Revises: 007_market_series
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "008_agent_daily_stats"
+down_revision: Union[str, None] = "007_market_series"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "agent_daily_stats",
+        sa.Column("agent_id", sa.Integer(), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("listings_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("listings_active", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("listings_sold", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("listings_rented", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("price_sum", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("price_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("revenue", sa.Numeric(18, 2), nullable=False, server_default="0"),
+        sa.Column("sold_days_sum", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.Column("leads_total", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("leads_qualified", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("leads_viewing", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("leads_offer", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("leads_converted", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # Apply one row's contribution (sign +1/-1) to its agent and creation day
+    op.execute("""
+        CREATE OR REPLACE FUNCTION agent_daily_stats_add_listing(
+            p_agent_id integer, p_created_at timestamp, p_status text, p_price numeric,
+            p_updated_at timestamp, p_sign integer
+        ) RETURNS void AS $$
+        BEGIN
+            IF p_agent_id IS NULL OR p_created_at IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO agent_daily_stats AS s (
+                agent_id, day, listings_total, listings_active, listings_sold, listings_rented,
+                price_sum, price_count, revenue, sold_days_sum
+            ) VALUES (
+                p_agent_id, p_created_at::date, p_sign,
+                CASE WHEN p_status IN ('live', 'active') THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'sold' THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'rented' THEN p_sign ELSE 0 END,
+                p_sign * COALESCE(p_price, 0),
+                CASE WHEN p_price IS NOT NULL THEN p_sign ELSE 0 END,
+                CASE WHEN p_status IN ('sold', 'rented') THEN p_sign * COALESCE(p_price, 0) ELSE 0 END,
+                CASE WHEN p_status = 'sold' THEN p_sign * EXTRACT(DAY FROM p_updated_at - p_created_at) ELSE 0 END
+            )
+            ON CONFLICT (agent_id, day) DO UPDATE SET
+                listings_total = s.listings_total + EXCLUDED.listings_total,
+                listings_active = s.listings_active + EXCLUDED.listings_active,
+                listings_sold = s.listings_sold + EXCLUDED.listings_sold,
+                listings_rented = s.listings_rented + EXCLUDED.listings_rented,
+                price_sum = s.price_sum + EXCLUDED.price_sum,
+                price_count = s.price_count + EXCLUDED.price_count,
+                revenue = s.revenue + EXCLUDED.revenue,
+                sold_days_sum = s.sold_days_sum + EXCLUDED.sold_days_sum;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION agent_daily_stats_add_lead(
+            p_agent_id integer, p_created_at timestamp, p_status text, p_sign integer
+        ) RETURNS void AS $$
+        BEGIN
+            IF p_agent_id IS NULL OR p_created_at IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO agent_daily_stats AS s (
+                agent_id, day, leads_total, leads_qualified, leads_viewing, leads_offer, leads_converted
+            ) VALUES (
+                p_agent_id, p_created_at::date, p_sign,
+                CASE WHEN p_status = 'qualified' THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'viewing' THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'offer' THEN p_sign ELSE 0 END,
+                CASE WHEN p_status = 'converted' THEN p_sign ELSE 0 END
+            )
+            ON CONFLICT (agent_id, day) DO UPDATE SET
+                leads_total = s.leads_total + EXCLUDED.leads_total,
+                leads_qualified = s.leads_qualified + EXCLUDED.leads_qualified,
+                leads_viewing = s.leads_viewing + EXCLUDED.leads_viewing,
+                leads_offer = s.leads_offer + EXCLUDED.leads_offer,
+                leads_converted = s.leads_converted + EXCLUDED.leads_converted;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION agent_daily_stats_properties_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM agent_daily_stats_add_listing(OLD.agent_id, OLD.created_at, OLD.listing_status,
+                                                      OLD.price, OLD.updated_at, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM agent_daily_stats_add_listing(NEW.agent_id, NEW.created_at, NEW.listing_status,
+                                                      NEW.price, NEW.updated_at, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION agent_daily_stats_leads_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM agent_daily_stats_add_lead(OLD.agent_id, OLD.created_at, OLD.status, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM agent_daily_stats_add_lead(NEW.agent_id, NEW.created_at, NEW.status, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Only changes to the rolled-up columns touch the stats row
+    op.execute("""
+        CREATE TRIGGER trg_properties_agent_daily_stats
+        AFTER INSERT OR DELETE OR UPDATE OF agent_id, created_at, listing_status, price, updated_at ON properties
+        FOR EACH ROW EXECUTE FUNCTION agent_daily_stats_properties_trigger()
+    """)
+
+    # leads and agent_activities come from the base SQL schema, not from these revisions
+    inspector = sa.inspect(op.get_bind())
+    has_leads = inspector.has_table("leads")
+    has_activities = inspector.has_table("agent_activities")
+
+    if has_leads:
+        op.execute("""
+            CREATE TRIGGER trg_leads_agent_daily_stats
+            AFTER INSERT OR DELETE OR UPDATE OF agent_id, created_at, status ON leads
+            FOR EACH ROW EXECUTE FUNCTION agent_daily_stats_leads_trigger()
+        """)
+
+    # Backfill from existing rows
+    op.execute("""
+        INSERT INTO agent_daily_stats (
+            agent_id, day, listings_total, listings_active, listings_sold, listings_rented,
+            price_sum, price_count, revenue, sold_days_sum
+        )
+        SELECT agent_id, created_at::date, COUNT(*),
+               COUNT(*) FILTER (WHERE listing_status IN ('live', 'active')),
+               COUNT(*) FILTER (WHERE listing_status = 'sold'),
+               COUNT(*) FILTER (WHERE listing_status = 'rented'),
+               COALESCE(SUM(price), 0), COUNT(price),
+               COALESCE(SUM(price) FILTER (WHERE listing_status IN ('sold', 'rented')), 0),
+               COALESCE(SUM(EXTRACT(DAY FROM updated_at - created_at)) FILTER (WHERE listing_status = 'sold'), 0)
+        FROM properties
+        WHERE agent_id IS NOT NULL AND created_at IS NOT NULL
+        GROUP BY agent_id, created_at::date
+    """)
+
+    if has_leads:
+        op.execute("""
+            INSERT INTO agent_daily_stats AS s (
+                agent_id, day, leads_total, leads_qualified, leads_viewing, leads_offer, leads_converted
+            )
+            SELECT agent_id, created_at::date, COUNT(*),
+                   COUNT(*) FILTER (WHERE status = 'qualified'),
+                   COUNT(*) FILTER (WHERE status = 'viewing'),
+                   COUNT(*) FILTER (WHERE status = 'offer'),
+                   COUNT(*) FILTER (WHERE status = 'converted')
+            FROM leads
+            WHERE agent_id IS NOT NULL AND created_at IS NOT NULL
+            GROUP BY agent_id, created_at::date
+            ON CONFLICT (agent_id, day) DO UPDATE SET
+                leads_total = EXCLUDED.leads_total,
+                leads_qualified = EXCLUDED.leads_qualified,
+                leads_viewing = EXCLUDED.leads_viewing,
+                leads_offer = EXCLUDED.leads_offer,
+                leads_converted = EXCLUDED.leads_converted
+        """)
+
+    # Recent activity feed on the dashboard
+    if has_activities:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_agent_activities_agent_created ON agent_activities (agent_id, created_at DESC)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_agent_activities_agent_created")
+    op.execute("DROP TRIGGER IF EXISTS trg_leads_agent_daily_stats ON leads")
+    op.execute("DROP TRIGGER IF EXISTS trg_properties_agent_daily_stats ON properties")
+    op.execute("DROP FUNCTION IF EXISTS agent_daily_stats_leads_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS agent_daily_stats_properties_trigger()")
+    op.execute("DROP FUNCTION IF EXISTS agent_daily_stats_add_lead(integer, timestamp, text, integer)")
+    op.execute("DROP FUNCTION IF EXISTS agent_daily_stats_add_listing(integer, timestamp, text, numeric, timestamp, integer)")
+    op.drop_table("agent_daily_stats")
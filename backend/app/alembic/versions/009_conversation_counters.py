@@ -0,0 +1,106 @@
+"""Add trigger-maintained message counters and keyset indexes for chat session listing
+
+Revision ID: 009_conversation_counters
+Revises: 008_agent_daily_stats
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "009_conversation_counters"
+down_revision: Union[str, None] = "008_agent_daily_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Everything the session sidebar selects, so its pages are index-only scans
+LISTING_COLUMNS = "session_id, title, created_at, is_active, message_count, last_message_at"
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("conversations", sa.Column("last_message_at", sa.DateTime(), nullable=True))
+
+    # Statement-level triggers, so a multi-row insert or a session clear updates
+    # each conversation once instead of once per message
+    op.execute("""
+        CREATE OR REPLACE FUNCTION conversations_messages_inserted() RETURNS trigger AS $$
+        BEGIN
+            UPDATE conversations c
+            SET message_count = c.message_count + n.added,
+                last_message_at = GREATEST(c.last_message_at, n.latest),
+                updated_at = GREATEST(c.updated_at, n.latest)
+            FROM (
+                SELECT conversation_id, COUNT(*) AS added, MAX(timestamp) AS latest
+                FROM new_messages GROUP BY conversation_id
+            ) n
+            WHERE c.id = n.conversation_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION conversations_messages_deleted() RETURNS trigger AS $$
+        BEGIN
+            UPDATE conversations c
+            SET message_count = GREATEST(c.message_count - d.removed, 0),
+                last_message_at = (SELECT MAX(m.timestamp) FROM messages m WHERE m.conversation_id = c.id)
+            FROM (
+                SELECT conversation_id, COUNT(*) AS removed
+                FROM old_messages GROUP BY conversation_id
+            ) d
+            WHERE c.id = d.conversation_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_messages_conversation_insert
+        AFTER INSERT ON messages REFERENCING NEW TABLE AS new_messages
+        FOR EACH STATEMENT EXECUTE FUNCTION conversations_messages_inserted()
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_messages_conversation_delete
+        AFTER DELETE ON messages REFERENCING OLD TABLE AS old_messages
+        FOR EACH STATEMENT EXECUTE FUNCTION conversations_messages_deleted()
+    """)
+
+    # Backfill from existing messages
+    op.execute("""
+        UPDATE conversations c
+        SET message_count = s.total, last_message_at = s.latest
+        FROM (
+            SELECT conversation_id, COUNT(*) AS total, MAX(timestamp) AS latest
+            FROM messages GROUP BY conversation_id
+        ) s
+        WHERE c.id = s.conversation_id
+    """)
+
+    # Keyset pages on (updated_at, id): per user for agents, across all users for admins
+    op.execute(f"""
+        CREATE INDEX ix_conversations_user_activity
+        ON conversations (user_id, updated_at DESC, id DESC) INCLUDE ({LISTING_COLUMNS})
+    """)
+    op.execute(f"""
+        CREATE INDEX ix_conversations_activity
+        ON conversations (updated_at DESC, id DESC) INCLUDE (user_id, {LISTING_COLUMNS})
+    """)
+    # Message history pages on (timestamp, id) within a conversation
+    op.create_index("ix_messages_conversation_timestamp", "messages", ["conversation_id", "timestamp", "id"])
+    op.drop_index("ix_messages_conversation_id", table_name="messages")
+
+
+def downgrade() -> None:
+    op.create_index("ix_messages_conversation_id", "messages", ["conversation_id"])
+    op.drop_index("ix_messages_conversation_timestamp", table_name="messages")
+    op.execute("DROP INDEX IF EXISTS ix_conversations_activity")
+    op.execute("DROP INDEX IF EXISTS ix_conversations_user_activity")
+    op.execute("DROP TRIGGER IF EXISTS trg_messages_conversation_delete ON messages")
+    op.execute("DROP TRIGGER IF EXISTS trg_messages_conversation_insert ON messages")
+    op.execute("DROP FUNCTION IF EXISTS conversations_messages_deleted()")
+    op.execute("DROP FUNCTION IF EXISTS conversations_messages_inserted()")
+    op.drop_column("conversations", "last_message_at")
+    op.drop_column("conversations", "message_count")
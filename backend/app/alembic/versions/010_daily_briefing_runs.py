@@ -0,0 +1,35 @@
+"""Add per-agent daily briefing run records
+
+Revision ID: 010_daily_briefing_runs
+Revises: 009_conversation_counters
+Create Date: 2026-10-18 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "010_daily_briefing_runs"
+down_revision: Union[str, None] = "009_conversation_counters"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # One row per agent and briefing day; completed rows are skipped when a run resumes
+    op.create_table(
+        "daily_briefing_runs",
+        sa.Column("run_date", sa.Date(), primary_key=True),
+        sa.Column("agent_id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("message_id", sa.Integer(), sa.ForeignKey("messages.id", ondelete="SET NULL"), nullable=True),
+        sa.Column("duration_ms", sa.Integer(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=False, server_default=sa.text("CURRENT_TIMESTAMP")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("daily_briefing_runs")
@@ -26,6 +26,8 @@ from app.core.database import get_db
 from app.core.middleware import get_current_user, require_roles
 from app.core.models import User
 from app.domain.ai.task_orchestrator import AITaskOrchestrator
+from app.infrastructure.db import agent_rollups
+from app.infrastructure.cache.dashboard_cache import dashboard_cache
 
 logger = logging.getLogger(__name__)
 
@@ -139,42 +141,13 @@ async def get_dashboard_overview(
         
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get property statistics
-        property_stats_query = """
-            SELECT 
-                COUNT(*) as total_listings,
-                COUNT(CASE WHEN status = 'active' THEN 1 END) as active_listings,
-                COUNT(CASE WHEN status = 'sold' THEN 1 END) as sold_listings,
-                COUNT(CASE WHEN status = 'rented' THEN 1 END) as rented_listings,
-                AVG(price) as avg_price,
-                SUM(CASE WHEN status IN ('sold', 'rented') THEN price ELSE 0 END) as total_revenue
-            FROM properties
-            WHERE agent_id = :agent_id 
-                AND created_at >= :cutoff_date
-        """
+        cached = dashboard_cache.get(current_user.id, "overview", time_period)
+        if cached is not None:
+            return cached
         
-        result = db.execute(text(property_stats_query), {
-            'agent_id': current_user.id, 
-            'cutoff_date': cutoff_date
-        })
-        property_stats = result.fetchone()
-        
-        # Get lead statistics
-        lead_stats_query = """
-            SELECT 
-                COUNT(*) as total_leads,
-                COUNT(CASE WHEN status = 'qualified' THEN 1 END) as qualified_leads,
-                COUNT(CASE WHEN status = 'converted' THEN 1 END) as converted_leads
-            FROM leads
-            WHERE agent_id = :agent_id 
-                AND created_at >= :cutoff_date
-        """
-        
-        lead_result = db.execute(text(lead_stats_query), {
-            'agent_id': current_user.id, 
-            'cutoff_date': cutoff_date
-        })
-        lead_stats = lead_result.fetchone()
+        # Listing and lead statistics from the daily per-agent rollups
+        totals = agent_rollups.period_totals(db, current_user.id, cutoff_date.date())
+        property_stats = agent_rollups.listing_summary(totals)
         
         # Get recent activities
         activity_query = """
@@ -190,36 +163,33 @@ async def get_dashboard_overview(
             {
                 'activity_type': row.activity_type,
                 'description': row.description,
-                'created_at': row.created_at,
+                'created_at': row.created_at.isoformat() if row.created_at else None,
                 'property_id': row.property_id
             }
             for row in activity_result.fetchall()
         ]
         
         # Calculate key metrics
-        conversion_rate = (
-            (lead_stats.converted_leads or 0) / max(lead_stats.total_leads or 1, 1) * 100
-            if lead_stats else 0
-        )
+        conversion_rate = totals["leads_converted"] / max(totals["leads_total"], 1) * 100
         
-        return {
+        overview = {
             "period": time_period,
             "date_range": {
                 "start": cutoff_date.isoformat(),
                 "end": datetime.utcnow().isoformat()
             },
             "property_performance": {
-                "total_listings": property_stats.total_listings or 0,
-                "active_listings": property_stats.active_listings or 0,
-                "sold_listings": property_stats.sold_listings or 0,
-                "rented_listings": property_stats.rented_listings or 0,
-                "avg_price": property_stats.avg_price or 0,
-                "total_revenue": property_stats.total_revenue or 0
+                "total_listings": property_stats["total_listings"],
+                "active_listings": property_stats["active_listings"],
+                "sold_listings": property_stats["sold_listings"],
+                "rented_listings": property_stats["rented_listings"],
+                "avg_price": property_stats["avg_price"],
+                "total_revenue": property_stats["total_revenue"]
             },
             "lead_performance": {
-                "total_leads": lead_stats.total_leads or 0,
-                "qualified_leads": lead_stats.qualified_leads or 0,
-                "converted_leads": lead_stats.converted_leads or 0,
+                "total_leads": int(totals["leads_total"]),
+                "qualified_leads": int(totals["leads_qualified"]),
+                "converted_leads": int(totals["leads_converted"]),
                 "conversion_rate": round(conversion_rate, 2)
             },
             "recent_activities": recent_activities,
@@ -231,6 +201,9 @@ async def get_dashboard_overview(
             ],
             "alerts": []  # TODO: Add intelligent alerts based on performance
         }
+        dashboard_cache.set(current_user.id, "overview", time_period, overview)
+        
+        return overview
         
     except Exception as e:
         logger.error(f"Failed to get dashboard overview: {e}")
@@ -416,68 +389,38 @@ async def get_performance_metrics(
     - Productivity indicators
     """
     try:
-        from sqlalchemy import text
-        
         # Calculate date range
         days_map = {"7days": 7, "30days": 30, "90days": 90, "12months": 365}
         days = days_map.get(time_period, 30)
         cutoff_date = datetime.utcnow() - timedelta(days=days)
         
-        # Get comprehensive property stats
-        property_query = """
-            SELECT 
-                COUNT(*) as total_listings,
-                COUNT(CASE WHEN status = 'active' THEN 1 END) as active_listings,
-                COUNT(CASE WHEN status = 'sold' THEN 1 END) as sold_listings,
-                SUM(CASE WHEN status IN ('sold', 'rented') THEN price ELSE 0 END) as total_revenue,
-                AVG(CASE WHEN status = 'sold' 
-                    THEN EXTRACT(DAY FROM updated_at - created_at)
-                    ELSE NULL 
-                END) as avg_days_on_market
-            FROM properties
-            WHERE agent_id = :agent_id 
-                AND created_at >= :cutoff_date
-        """
-        
-        prop_result = db.execute(text(property_query), {
-            'agent_id': current_user.id,
-            'cutoff_date': cutoff_date
-        })
-        prop_stats = prop_result.fetchone()
+        cache_period = f"{days}days"
+        cached = dashboard_cache.get(current_user.id, "performance", cache_period)
+        if cached is not None:
+            return PerformanceMetrics(**{**cached, "period": time_period})
         
-        # Get lead stats
-        lead_query = """
-            SELECT 
-                COUNT(*) as lead_count,
-                COUNT(CASE WHEN status IN ('qualified', 'viewing', 'offer') THEN 1 END) as qualified_leads,
-                COUNT(CASE WHEN status = 'converted' THEN 1 END) as converted_leads
-            FROM leads
-            WHERE agent_id = :agent_id 
-                AND created_at >= :cutoff_date
-        """
-        
-        lead_result = db.execute(text(lead_query), {
-            'agent_id': current_user.id,
-            'cutoff_date': cutoff_date
-        })
-        lead_stats = lead_result.fetchone()
+        # Listing and lead statistics from the daily per-agent rollups
+        totals = agent_rollups.period_totals(db, current_user.id, cutoff_date.date())
+        prop_stats = agent_rollups.listing_summary(totals)
+        qualified_leads = totals["leads_qualified"] + totals["leads_viewing"] + totals["leads_offer"]
         
         # Calculate conversion rate
-        conversion_rate = (
-            (lead_stats.converted_leads or 0) / max(lead_stats.lead_count or 1, 1) * 100
-        )
-        
-        return PerformanceMetrics(
-            total_listings=prop_stats.total_listings or 0,
-            active_listings=prop_stats.active_listings or 0,
-            sold_listings=prop_stats.sold_listings or 0,
-            total_revenue=float(prop_stats.total_revenue or 0),
-            avg_days_on_market=round(prop_stats.avg_days_on_market or 0, 1),
+        conversion_rate = totals["leads_converted"] / max(totals["leads_total"], 1) * 100
+        
+        metrics = PerformanceMetrics(
+            total_listings=prop_stats["total_listings"],
+            active_listings=prop_stats["active_listings"],
+            sold_listings=prop_stats["sold_listings"],
+            total_revenue=prop_stats["total_revenue"],
+            avg_days_on_market=round(prop_stats["avg_days_on_market"], 1),
             conversion_rate=round(conversion_rate, 2),
-            lead_count=lead_stats.lead_count or 0,
-            qualified_leads=lead_stats.qualified_leads or 0,
+            lead_count=int(totals["leads_total"]),
+            qualified_leads=int(qualified_leads),
             period=time_period
         )
+        dashboard_cache.set(current_user.id, "performance", cache_period, metrics.dict())
+        
+        return metrics
         
     except Exception as e:
         logger.error(f"Failed to get performance metrics: {e}")
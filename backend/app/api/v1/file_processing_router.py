@@ -12,6 +12,7 @@ from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 from datetime import datetime
+import asyncio
 import shutil
 import os
 import pandas as pd
@@ -218,10 +219,12 @@ async def analyze_file(file: UploadFile = File(...)):
         # Get the file type (e.g., 'pdf', 'csv')
         file_type = file.filename.split('.')[-1].lower()
 
-        # Call the intelligent processor
-        analysis_result = intelligent_processor.process_uploaded_document(
+        # Call the intelligent processor off the event loop; analysis only classifies, it doesn't store rows
+        analysis_result = await asyncio.to_thread(
+            intelligent_processor.process_uploaded_document,
             file_path=str(file_path),
-            file_type=file_type
+            file_type=file_type,
+            store=False
         )
 
         return FileAnalysisResponse(
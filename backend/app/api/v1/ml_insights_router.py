@@ -23,6 +23,9 @@ try:
     from ml.services.reporting_service import automated_reporting_service
     from ml.services.notification_service import smart_notification_service
     from ml.services.analytics_service import performance_analytics_service
+    from ml.models.market_predictor import market_predictor
+    from ml.pipeline.data_preprocessing import data_preprocessor
+    from ml.pipeline.market_series import market_series_store
     ML_AVAILABLE = True
 except ImportError as e:
     ML_AVAILABLE = False
@@ -753,11 +756,9 @@ async def preprocess_data(
 
 # Utility functions
 def _get_market_data_from_db(db: Session, location: Optional[str] = None, property_type: Optional[str] = None) -> pd.DataFrame:
-    """Get market data from database"""
+    """Monthly market series for the location/property type from the market series snapshot"""
     try:
-        # This is a placeholder - you would implement actual database queries
-        # For now, return empty DataFrame
-        return pd.DataFrame()
+        return market_series_store.get_market_data(location, property_type)
         
     except Exception as e:
         logger.error(f"Error getting market data: {e}")
@@ -961,8 +962,8 @@ def _get_user_notifications(db: Session, user_id: int) -> List[Dict[str, Any]]:
 def _get_data_from_source(data_source: str, db: Session) -> pd.DataFrame:
     """Get data from specified source"""
     try:
-        # This would implement actual data retrieval
-        # For now, return empty DataFrame
+        if data_source == "market_series":
+            return market_series_store.get_market_data()
         return pd.DataFrame()
         
     except Exception as e:
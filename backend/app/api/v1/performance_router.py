@@ -14,6 +14,8 @@ import json
 
 # Import dependencies
 from app.core.settings import REDIS_URL
+from app.core.tracing import get_tracer
+from app.infrastructure.db.engine_registry import engine_registry
 
 # Import performance services
 from cache_manager import CacheManager
@@ -132,6 +134,23 @@ class PerformanceReportResponse(BaseModel):
     recommendations: List[str]
     generated_at: str
 
+class StageLatencyResponse(BaseModel):
+    """Per-stage latency histogram response model"""
+    stages: Dict[str, Dict[str, float]]
+    generated_at: str
+
+class SlowRequestsResponse(BaseModel):
+    """Sampled slow request log response model"""
+    threshold_ms: float
+    sample_rate: float
+    requests: List[Dict[str, Any]]
+
+class PoolStatsResponse(BaseModel):
+    """Database connection pool usage response model"""
+    pgbouncer_mode: bool
+    pools: Dict[str, Dict[str, Any]]
+    generated_at: str
+
 # Router Endpoints
 
 @router.get("/cache-stats", response_model=CacheStatsResponse)
@@ -287,3 +306,40 @@ async def get_performance_report():
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get performance report: {str(e)}")
+
+@router.get("/tracing/stages", response_model=StageLatencyResponse)
+def get_stage_latency(prefix: Optional[str] = None):
+    """Get p50/p95/p99 latency per traced stage (chat, rag, search)"""
+    try:
+        stages = get_tracer().get_stage_stats()
+        if prefix:
+            stages = {name: stats for name, stats in stages.items() if name.startswith(prefix)}
+        
+        return StageLatencyResponse(stages=stages, generated_at=datetime.now().isoformat())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get stage latency: {str(e)}")
+
+@router.get("/tracing/slow-requests", response_model=SlowRequestsResponse)
+def get_slow_requests(limit: int = 20):
+    """Get the most recent slow requests with their per-stage breakdown"""
+    try:
+        tracer = get_tracer()
+        return SlowRequestsResponse(
+            threshold_ms=tracer.slow_threshold_ms,
+            sample_rate=tracer.sample_rate,
+            requests=tracer.get_slow_requests(limit)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get slow requests: {str(e)}")
+
+@router.get("/database/pools", response_model=PoolStatsResponse)
+def get_database_pools():
+    """Get size, checked-out connections and saturation for each named database pool"""
+    try:
+        return PoolStatsResponse(
+            pgbouncer_mode=engine_registry.pgbouncer_mode,
+            pools=engine_registry.get_pool_stats(),
+            generated_at=datetime.now().isoformat()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get database pool stats: {str(e)}")
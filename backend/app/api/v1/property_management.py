@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel
 import os
@@ -7,12 +8,13 @@ from sqlalchemy.orm import Session
 from app.core.middleware import get_current_user
 from app.core.database import get_db
 from app.core.settings import DATABASE_URL as SETTINGS_DATABASE_URL
+from app.infrastructure.cache.dashboard_cache import invalidate_agent_dashboard
 
 router = APIRouter(prefix="", tags=["properties"])
 
 # Database connection
 database_url = SETTINGS_DATABASE_URL
-engine = create_engine(database_url)
+engine = get_engine("oltp", database_url)
 
 class PropertySearchRequest(BaseModel):
     min_price: Optional[float] = None
@@ -392,7 +394,7 @@ async def update_property(property_id: int, property_data: PropertyUpdate):
             UPDATE properties 
             SET {', '.join(update_fields)}
             WHERE id = :property_id
-            RETURNING id, title, description, price, location, property_type, bedrooms, bathrooms, area_sqft
+            RETURNING id, title, description, price, location, property_type, bedrooms, bathrooms, area_sqft, agent_id
             """
             
             result = conn.execute(text(update_query), params)
@@ -400,6 +402,7 @@ async def update_property(property_id: int, property_data: PropertyUpdate):
             
             row = result.fetchone()
             if row:
+                invalidate_agent_dashboard(row[9])
                 return PropertyResponse(
                     id=row[0],
                     title=row[1],
@@ -425,16 +428,18 @@ async def delete_property(property_id: int):
     try:
         with engine.connect() as conn:
             # Check if property exists
-            check_query = "SELECT id FROM properties WHERE id = :property_id"
+            check_query = "SELECT id, agent_id FROM properties WHERE id = :property_id"
             result = conn.execute(text(check_query), {"property_id": property_id})
             
-            if not result.fetchone():
+            existing = result.fetchone()
+            if not existing:
                 raise HTTPException(status_code=404, detail="Property not found")
             
             # Delete property
             delete_query = "DELETE FROM properties WHERE id = :property_id"
             conn.execute(text(delete_query), {"property_id": property_id})
             conn.commit()
+            invalidate_agent_dashboard(existing.agent_id)
             
             return {"message": "Property deleted successfully"}
             
@@ -533,6 +538,7 @@ async def update_property_status(
             })
             
             conn.commit()
+            invalidate_agent_dashboard(property_to_update.agent_id)
 
             return {"message": f"Property {property_id} status updated to {new_status}."}
             
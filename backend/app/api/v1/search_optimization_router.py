@@ -12,7 +12,7 @@ from pydantic import BaseModel, Field
 from datetime import datetime
 import asyncio
 
-from hybrid_search_engine import get_hybrid_search_engine, SearchParams, SearchType
+from app.domain.ai.hybrid_search_engine import get_hybrid_search_engine, SearchParams, SearchType
 from performance_monitor import get_performance_monitor
 from database_index_optimizer import DatabaseIndexOptimizer
 from cache_manager import cache_manager
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 
 # Create database engine with better connection management
 # Use StaticPool only for SQLite (primarily tests). For Postgres and others,
-# fall back to default QueuePool.
+# share the OLTP pool from the engine registry.
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
@@ -24,12 +24,8 @@ if DATABASE_URL.startswith("sqlite"):
         echo=False,
     )
 else:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=3600,  # Recycle connections every hour
-        echo=False  # Set to True for SQL debugging
-    )
+    from app.infrastructure.db.engine_registry import get_engine
+    engine = get_engine("oltp", DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -101,6 +101,7 @@ class UserSession(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     session_token = Column(String(255), unique=True, nullable=False, index=True)
+    session_token_hash = Column(String(64), unique=True, nullable=True, index=True)  # SHA-256, set on token write
     refresh_token = Column(String(255), unique=True, nullable=False, index=True)
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(Text, nullable=True)
@@ -0,0 +1,47 @@
+"""
+Keyset (cursor) pagination helpers
+
+Listings ordered by (timestamp, id) are paged by remembering the last row
+served instead of an OFFSET, so a page costs the same however deep it is:
+
+    WHERE (updated_at, id) < (:cursor_ts, :cursor_id)
+    ORDER BY updated_at DESC, id DESC
+    LIMIT :limit + 1
+
+Cursors are opaque URL-safe strings; the extra row fetched tells whether
+another page exists.
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque cursor for the position after a (timestamp, id) row"""
+    payload = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """(timestamp, id) from a cursor; ValueError if it is malformed"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def keyset_page(rows: Sequence[Any], limit: int, sort_key: str, id_key: str = "id") -> Tuple[List[Any], Optional[str]]:
+    """Trim rows fetched with LIMIT limit + 1 to a page and the cursor for the next one"""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last[sort_key], last[id_key])
+
+
+def pagination_info(limit: int, next_cursor: Optional[str]) -> Dict[str, Any]:
+    return {"limit": limit, "next_cursor": next_cursor, "has_more": next_cursor is not None}
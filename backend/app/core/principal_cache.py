@@ -0,0 +1,231 @@
+"""
+Cached authentication principals for get_current_user
+
+Resolving a bearer token used to cost a JWT decode, a users lookup, a
+user_sessions lookup by raw token and a last_used UPDATE on every request.
+Resolved principals are now cached by SHA-256 token hash for a short TTL
+(never beyond the token's or session's expiry), and last_used touches are
+buffered and flushed in one batched UPDATE from a background thread.
+
+Entries are invalidated on logout and token refresh, and by ORM events when a
+user's role, active flag or lock changes or a session is deactivated. Changes
+made outside the ORM, or in another worker process, are bounded by the TTL.
+"""
+
+import os
+import time
+import atexit
+import weakref
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import event, inspect, text
+
+logger = logging.getLogger(__name__)
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_PRINCIPAL_CACHE_SIZE", "10000"))
+SESSION_TOUCH_FLUSH_SECONDS = float(os.getenv("AUTH_SESSION_TOUCH_FLUSH_SECONDS", "5"))
+
+# Every cache instance, so invalidation reaches both middleware copies
+_caches: "weakref.WeakSet[PrincipalCache]" = weakref.WeakSet()
+
+
+def hash_token(token: str) -> str:
+    """SHA-256 hex digest used as cache key and indexed session lookup column"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@dataclass
+class CachedPrincipal:
+    """A resolved user (detached from its DB session) and the session it came from"""
+    user: Any
+    user_id: int
+    session_id: int
+    expires_at: float
+
+
+class PrincipalCache:
+    """LRU of resolved principals keyed by token hash, with per-entry expiry"""
+
+    def __init__(self, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS,
+                 max_entries: int = PRINCIPAL_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPrincipal]" = OrderedDict()
+        self._by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        _caches.add(self)
+
+    def get(self, token_hash: str) -> Optional[CachedPrincipal]:
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(token_hash)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token_hash)
+            self.hits += 1
+            return entry
+
+    def put(self, token_hash: str, user: Any, session_id: int, valid_until: Optional[datetime] = None):
+        """Cache a principal until the TTL, or the session/token expiry if sooner"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        if valid_until is not None:
+            remaining = (valid_until - datetime.utcnow()).total_seconds()
+            expires_at = min(expires_at, time.monotonic() + remaining)
+
+        with self._lock:
+            self._remove(token_hash)
+            self._entries[token_hash] = CachedPrincipal(user, user.id, session_id, expires_at)
+            self._by_user.setdefault(user.id, set()).add(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_token_hash(self, token_hash: str):
+        with self._lock:
+            if self._remove(token_hash):
+                self.invalidations += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token_hash in list(self._by_user.get(user_id, ())):
+                self._remove(token_hash)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, token_hash: str) -> bool:
+        entry = self._entries.pop(token_hash, None)
+        if entry is None:
+            return False
+        hashes = self._by_user.get(entry.user_id)
+        if hashes is not None:
+            hashes.discard(token_hash)
+            if not hashes:
+                del self._by_user[entry.user_id]
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def invalidate_token(token: str):
+    """Drop a token from every principal cache (logout, refresh)"""
+    token_hash = hash_token(token)
+    for cache in _caches:
+        cache.invalidate_token_hash(token_hash)
+
+
+def invalidate_user(user_id: int):
+    """Drop every cached token of a user (lock, role change, deactivation, new login)"""
+    for cache in _caches:
+        cache.invalidate_user(user_id)
+
+
+class SessionTouchBuffer:
+    """Coalesces user_sessions.last_used updates and writes them in one batch"""
+
+    def __init__(self, engine_getter: Callable[[], Any], flush_interval: float = SESSION_TOUCH_FLUSH_SECONDS):
+        self.engine_getter = engine_getter
+        self.flush_interval = flush_interval
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.flushed_rows = 0
+
+    def touch(self, session_id: int, when: Optional[datetime] = None):
+        with self._lock:
+            self._pending[session_id] = when or datetime.utcnow()
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="session-touch-flusher", daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write pending touches; returns the number of sessions updated"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        try:
+            with self.engine_getter().connect() as conn:
+                conn.execute(
+                    text("UPDATE user_sessions SET last_used = :last_used WHERE id = :id"),
+                    [{"id": session_id, "last_used": last_used} for session_id, last_used in pending.items()]
+                )
+                conn.commit()
+            self.flushed_rows += len(pending)
+            return len(pending)
+        except Exception as e:
+            logger.error(f"Error flushing session last_used updates: {e}")
+            # Keep the newest timestamp per session for the next attempt
+            with self._lock:
+                for session_id, last_used in pending.items():
+                    if session_id not in self._pending:
+                        self._pending[session_id] = last_used
+            return 0
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+
+def register_invalidation_events(user_model, session_model):
+    """Invalidate cached principals when the ORM changes what authentication checked"""
+
+    @event.listens_for(user_model, "after_update")
+    def _user_updated(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[name].history.has_changes() for name in ("role", "is_active", "locked_until")):
+            invalidate_user(target.id)
+
+    @event.listens_for(session_model, "after_update")
+    def _session_updated(mapper, connection, target):
+        state = inspect(target)
+        token_history = state.attrs.session_token.history
+        if token_history.has_changes():
+            for old_token in token_history.deleted or ():
+                if old_token:
+                    invalidate_token(old_token)
+        if state.attrs.is_active.history.has_changes() and not target.is_active:
+            invalidate_token(target.session_token)
+
+    @event.listens_for(session_model.session_token, "set", retval=False)
+    def _session_token_set(target, value, oldvalue, initiator):
+        # Keep the indexed hash column in step with every token write
+        target.session_token_hash = hash_token(value) if value else None
@@ -1,27 +1,183 @@
 """
 Rate limiting implementation for preventing abuse
+
+Limits are enforced in Redis so every uvicorn worker shares one budget:
+request limits use GCRA (one key per identifier holding the theoretical
+arrival time) and failed logins use a sliding-window log, each evaluated by a
+single Lua script call. The same backend holds the token blacklist and the
+active refresh tokens per user for token_manager.
+
+When Redis is unreachable the limiter falls back to bounded in-process state
+and stops trying Redis for a short back-off, so an outage degrades to
+per-worker limits instead of blocking or slowing traffic.
 """
 
 import time
+import hashlib
 import threading
-from collections import defaultdict, deque
-from typing import Dict, Deque, Tuple
+from collections import OrderedDict, deque
+from typing import Dict, Deque, Optional, Tuple, Any
 import logging
 
+from app.core.settings import REDIS_URL, RATE_LIMIT_REQUESTS_PER_MINUTE, RATE_LIMIT_LOGIN_ATTEMPTS
+
 logger = logging.getLogger(__name__)
 
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+    logger.warning("redis not available, rate limits and token state are per process")
+
+# Seconds to skip Redis after a failed call before trying again
+REDIS_RETRY_SECONDS = 5.0
+# Cap on in-process fallback entries so the dicts cannot grow without bound
+LOCAL_MAX_KEYS = 100_000
+
+# GCRA: allow if the new theoretical arrival time is within one period of now.
+# KEYS[1] = limit key, KEYS[2] = optional failed-login log checked first;
+# ARGV = emission interval ms, period ms, cost (units, e.g. tokens)[, lockout window ms, max failures]
+# Returns {allowed, remaining, retry_after_ms, locked_out}
+GCRA_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local emission = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3] or '1')
+if KEYS[2] then
+    local lockout = tonumber(ARGV[4])
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - lockout)
+    if redis.call('ZCARD', KEYS[2]) >= tonumber(ARGV[5]) then
+        local oldest = redis.call('ZRANGE', KEYS[2], 0, 0, 'WITHSCORES')
+        return {0, 0, math.ceil(tonumber(oldest[2]) + lockout - now), 1}
+    end
+end
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + emission * cost
+if new_tat - now > period then
+    return {0, 0, math.ceil(new_tat - now - period), 0}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {1, math.floor((period - (new_tat - now)) / emission), 0, 0}
+"""
+
+# Sliding-window log of failures. KEYS[1] = log key; ARGV = window ms, record flag
+# Returns {attempts in window, oldest attempt age ms}
+FAILURE_WINDOW_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local window = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if ARGV[2] == '1' then
+    redis.call('ZADD', KEYS[1], now, now .. '-' .. now_parts[2])
+    redis.call('PEXPIRE', KEYS[1], window)
+end
+local count = redis.call('ZCARD', KEYS[1])
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local age = 0
+if oldest[2] then age = now - tonumber(oldest[2]) end
+return {count, age}
+"""
+
+# Track a refresh token and trim to the newest N. KEYS[1] = user zset; ARGV = hash, max, ttl s
+ADD_REFRESH_SCRIPT = """
+local now_parts = redis.call('TIME')
+redis.call('ZADD', KEYS[1], now_parts[1] + now_parts[2] / 1000000, ARGV[1])
+redis.call('ZREMRANGEBYRANK', KEYS[1], 0, -(tonumber(ARGV[2]) + 1))
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return redis.call('ZCARD', KEYS[1])
+"""
+
+# Blacklist every refresh token of a user. KEYS[1] = user zset; ARGV = blacklist prefix, ttl s
+REVOKE_ALL_SCRIPT = """
+local hashes = redis.call('ZRANGE', KEYS[1], 0, -1)
+for _, token_hash in ipairs(hashes) do
+    redis.call('SET', ARGV[1] .. token_hash, 1, 'EX', ARGV[2])
+end
+redis.call('DEL', KEYS[1])
+return #hashes
+"""
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+SCRIPTS = {
+    "gcra": GCRA_SCRIPT,
+    "failures": FAILURE_WINDOW_SCRIPT,
+    "add_refresh": ADD_REFRESH_SCRIPT,
+    "revoke_all": REVOKE_ALL_SCRIPT,
+}
+
+
+class RedisStateBackend:
+    """Lazily connected Redis client with registered scripts and an outage back-off"""
+    
+    def __init__(self, redis_url: str = REDIS_URL, socket_timeout: float = 0.25):
+        self.redis_url = redis_url
+        self.socket_timeout = socket_timeout
+        self._client = None
+        self._scripts: Dict[str, Any] = {}
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+        self.failures = 0
+    
+    def client(self):
+        """Redis client, or None while Redis is unavailable"""
+        if not REDIS_AVAILABLE or time.monotonic() < self._down_until:
+            return None
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = redis.Redis.from_url(
+                        self.redis_url,
+                        socket_timeout=self.socket_timeout,
+                        socket_connect_timeout=self.socket_timeout,
+                        decode_responses=True,
+                    )
+                    self._register_scripts()
+        return self._client
+    
+    def _register_scripts(self):
+        for name, source in SCRIPTS.items():
+            self._scripts[name] = self._client.register_script(source)
+    
+    def script(self, name: str):
+        return self._scripts[name]
+    
+    def mark_down(self, error: Exception):
+        """Skip Redis for a while after an error instead of paying a timeout per request"""
+        self.failures += 1
+        if time.monotonic() >= self._down_until:
+            logger.warning(f"Redis unavailable for rate limiting/token state, using local fallback: {error}")
+        self._down_until = time.monotonic() + REDIS_RETRY_SECONDS
+    
+    @property
+    def is_available(self) -> bool:
+        return REDIS_AVAILABLE and time.monotonic() >= self._down_until
+
+
 class RateLimiter:
     """Rate limiter for API endpoints"""
     
-    def __init__(self):
-        self.rate_limits: Dict[str, Deque[float]] = defaultdict(deque)
+    def __init__(self, backend: Optional[RedisStateBackend] = None, key_prefix: str = "ratelimit"):
+        self.backend = backend or state_backend
+        self.key_prefix = key_prefix
         self.lock = threading.Lock()
         
+        # Local fallback state (used only while Redis is unavailable)
+        self.rate_limits: "OrderedDict[str, float]" = OrderedDict()
+        self.failed_login_attempts: "OrderedDict[str, Deque[float]]" = OrderedDict()
+        
         # Configuration
-        self.default_requests_per_minute = 60
-        self.max_failed_logins = 5
+        self.default_requests_per_minute = RATE_LIMIT_REQUESTS_PER_MINUTE
+        self.max_failed_logins = RATE_LIMIT_LOGIN_ATTEMPTS
         self.lockout_duration = 300  # 5 minutes
-        self.failed_login_attempts: Dict[str, Deque[float]] = defaultdict(deque)
+        self.redis_checks = 0
+        self.local_checks = 0
     
     def is_allowed(self, identifier: str, window_seconds: int = 60, max_requests: int = None) -> bool:
         """
@@ -35,46 +191,126 @@ class RateLimiter:
         Returns:
             True if request is allowed, False otherwise
         """
+        allowed, _, _ = self.check(identifier, window_seconds, max_requests)
+        return allowed
+    
+    def check(self, identifier: str, window_seconds: int = 60, max_requests: int = None,
+              cost: int = 1) -> Tuple[bool, int, float]:
+        """
+        Check a rate limit and return (allowed, remaining, retry_after_seconds)
+        
+        cost charges several units at once against budgets that are not counted
+        in requests (e.g. LLM tokens per minute).
+        """
+        allowed, remaining, retry_after, _ = self._check(identifier, window_seconds, max_requests, cost)
+        return allowed, remaining, retry_after
+    
+    def _check(self, identifier: str, window_seconds: int = 60, max_requests: int = None,
+               cost: int = 1, lockout_ip: Optional[str] = None) -> Tuple[bool, int, float, bool]:
+        """GCRA check that, given lockout_ip, first rejects a locked-out IP in the same script call"""
         if max_requests is None:
             max_requests = self.default_requests_per_minute
+        period_ms = int(window_seconds * 1000)
+        emission_ms = period_ms / max_requests
         
-        current_time = time.time()
+        client = self.backend.client()
+        if client is not None:
+            try:
+                keys = [f"{self.key_prefix}:{window_seconds}:{max_requests}:{identifier}"]
+                args = [emission_ms, period_ms, cost]
+                if lockout_ip is not None:
+                    keys.append(f"{self.key_prefix}:failed_login:{lockout_ip}")
+                    args += [self.lockout_duration * 1000, self.max_failed_logins]
+                allowed, remaining, retry_after_ms, locked_out = self.backend.script("gcra")(
+                    keys=keys, args=args, client=client
+                )
+                self.redis_checks += 1
+                return bool(allowed), int(remaining), int(retry_after_ms) / 1000, bool(locked_out)
+            except Exception as e:
+                self.backend.mark_down(e)
+        
+        if lockout_ip is not None:
+            attempts, oldest_age = self._failure_window_local(lockout_ip, record=False)
+            if attempts >= self.max_failed_logins:
+                return False, 0, max(0.0, self.lockout_duration - oldest_age), True
+        allowed, remaining, retry_after = self._check_local(
+            f"{window_seconds}:{max_requests}:{identifier}", emission_ms, period_ms, cost)
+        return allowed, remaining, retry_after, False
+    
+    def _check_local(self, key: str, emission_ms: float, period_ms: int, cost: int = 1) -> Tuple[bool, int, float]:
+        """Same GCRA rule against in-process state"""
+        now = time.time() * 1000
         
         with self.lock:
-            # Get request history for this identifier
-            requests = self.rate_limits[identifier]
-            
-            # Remove old requests outside the window
-            while requests and current_time - requests[0] > window_seconds:
-                requests.popleft()
+            self.local_checks += 1
+            tat = max(self.rate_limits.get(key, now), now)
+            new_tat = tat + emission_ms * cost
+            if new_tat - now > period_ms:
+                return False, 0, (new_tat - now - period_ms) / 1000
             
-            # Check if we're under the limit
-            if len(requests) < max_requests:
-                requests.append(current_time)
-                return True
+            self.rate_limits[key] = new_tat
+            self.rate_limits.move_to_end(key)
+            while len(self.rate_limits) > LOCAL_MAX_KEYS:
+                self.rate_limits.popitem(last=False)
+            return True, int((period_ms - (new_tat - now)) // emission_ms), 0.0
             
-            return False
-    
-    def is_ip_allowed(self, ip_address: str, user_agent: str = "") -> bool:
+    def is_ip_allowed(self, ip_address: str, user_agent: str = "", max_requests: int = None) -> bool:
         """
         Check if IP address is allowed (with user agent consideration)
         
         Args:
             ip_address: Client IP address
             user_agent: User agent string
+            max_requests: Maximum requests per minute (defaults to the configured limit)
             
         Returns:
             True if IP is allowed, False otherwise
         """
-        # Create identifier combining IP and user agent
-        identifier = f"{ip_address}:{hash(user_agent) % 1000}"
+        # Create identifier combining IP and user agent (stable across workers)
+        identifier = f"{ip_address}:{int(hashlib.md5(user_agent.encode()).hexdigest(), 16) % 1000}"
         
-        # Check for failed login attempts
-        if self._is_ip_locked_out(ip_address):
+        # Lockout and rate limit are checked in one atomic call
+        allowed, _, _, locked_out = self._check(identifier, max_requests=max_requests, lockout_ip=ip_address)
+        if locked_out:
             logger.warning(f"IP {ip_address} is locked out due to failed login attempts")
-            return False
+        return allowed
+        
+    def _failure_window(self, ip_address: str, record: bool) -> Tuple[int, float]:
+        """Failed attempts within the lockout window and the oldest attempt's age in seconds"""
+        client = self.backend.client()
+        if client is not None:
+            try:
+                count, age_ms = self.backend.script("failures")(
+                    keys=[f"{self.key_prefix}:failed_login:{ip_address}"],
+                    args=[self.lockout_duration * 1000, "1" if record else "0"],
+                    client=client
+                )
+                return int(count), int(age_ms) / 1000
+            except Exception as e:
+                self.backend.mark_down(e)
         
-        return self.is_allowed(identifier)
+        return self._failure_window_local(ip_address, record)
+    
+    def _failure_window_local(self, ip_address: str, record: bool) -> Tuple[int, float]:
+        """Same sliding window against in-process state"""
+        current_time = time.time()
+        with self.lock:
+            failed_attempts = self.failed_login_attempts.get(ip_address)
+            if failed_attempts is None:
+                if not record:
+                    return 0, 0.0
+                failed_attempts = self.failed_login_attempts[ip_address] = deque(maxlen=self.max_failed_logins * 2)
+                while len(self.failed_login_attempts) > LOCAL_MAX_KEYS:
+                    self.failed_login_attempts.popitem(last=False)
+            
+            # Remove old failed attempts outside lockout window
+            while failed_attempts and current_time - failed_attempts[0] > self.lockout_duration:
+                failed_attempts.popleft()
+            if record:
+                failed_attempts.append(current_time)
+            
+            age = current_time - failed_attempts[0] if failed_attempts else 0.0
+            return len(failed_attempts), age
     
     def record_failed_login(self, ip_address: str) -> bool:
         """
@@ -86,24 +322,14 @@ class RateLimiter:
         Returns:
             True if IP should be locked out
         """
-        current_time = time.time()
+        attempts, _ = self._failure_window(ip_address, record=True)
         
-        with self.lock:
-            failed_attempts = self.failed_login_attempts[ip_address]
-            
-            # Remove old failed attempts outside lockout window
-            while failed_attempts and current_time - failed_attempts[0] > self.lockout_duration:
-                failed_attempts.popleft()
-            
-            # Add current failed attempt
-            failed_attempts.append(current_time)
-            
-            # Check if we should lock out this IP
-            if len(failed_attempts) >= self.max_failed_logins:
-                logger.warning(f"IP {ip_address} locked out due to {len(failed_attempts)} failed login attempts")
-                return True
+        # Check if we should lock out this IP
+        if attempts >= self.max_failed_logins:
+            logger.warning(f"IP {ip_address} locked out due to {attempts} failed login attempts")
+            return True
             
-            return False
+        return False
     
     def record_successful_login(self, ip_address: str):
         """
@@ -112,9 +338,15 @@ class RateLimiter:
         Args:
             ip_address: Client IP address
         """
+        client = self.backend.client()
+        if client is not None:
+            try:
+                client.delete(f"{self.key_prefix}:failed_login:{ip_address}")
+            except Exception as e:
+                self.backend.mark_down(e)
+        
         with self.lock:
-            if ip_address in self.failed_login_attempts:
-                self.failed_login_attempts[ip_address].clear()
+            if self.failed_login_attempts.pop(ip_address, None) is not None:
                 logger.info(f"Cleared failed login attempts for IP {ip_address}")
     
     def _is_ip_locked_out(self, ip_address: str) -> bool:
@@ -127,16 +359,8 @@ class RateLimiter:
         Returns:
             True if IP is locked out
         """
-        current_time = time.time()
-        
-        with self.lock:
-            failed_attempts = self.failed_login_attempts[ip_address]
-            
-            # Remove old failed attempts
-            while failed_attempts and current_time - failed_attempts[0] > self.lockout_duration:
-                failed_attempts.popleft()
-            
-            return len(failed_attempts) >= self.max_failed_logins
+        attempts, _ = self._failure_window(ip_address, record=False)
+        return attempts >= self.max_failed_logins
     
     def get_remaining_attempts(self, ip_address: str) -> int:
         """
@@ -148,16 +372,8 @@ class RateLimiter:
         Returns:
             Number of remaining attempts
         """
-        current_time = time.time()
-        
-        with self.lock:
-            failed_attempts = self.failed_login_attempts[ip_address]
-            
-            # Remove old failed attempts
-            while failed_attempts and current_time - failed_attempts[0] > self.lockout_duration:
-                failed_attempts.popleft()
-            
-            return max(0, self.max_failed_logins - len(failed_attempts))
+        attempts, _ = self._failure_window(ip_address, record=False)
+        return max(0, self.max_failed_logins - attempts)
     
     def get_lockout_time_remaining(self, ip_address: str) -> int:
         """
@@ -169,45 +385,30 @@ class RateLimiter:
         Returns:
             Remaining lockout time in seconds, 0 if not locked out
         """
-        current_time = time.time()
+        attempts, oldest_age = self._failure_window(ip_address, record=False)
+        if attempts < self.max_failed_logins:
+            return 0
         
-        with self.lock:
-            failed_attempts = self.failed_login_attempts[ip_address]
-            
-            if len(failed_attempts) < self.max_failed_logins:
-                return 0
-            
-            # Find the oldest failed attempt
-            oldest_attempt = min(failed_attempts)
-            time_elapsed = current_time - oldest_attempt
-            time_remaining = self.lockout_duration - time_elapsed
-            
-            return max(0, int(time_remaining))
+        return max(0, int(self.lockout_duration - oldest_age))
     
     def cleanup_old_records(self, max_age_seconds: int = 3600):
         """
-        Clean up old rate limit records
+        Clean up old local fallback records (Redis keys expire on their own)
         
         Args:
             max_age_seconds: Maximum age of records to keep
         """
-        current_time = time.time()
+        now = time.time()
         
         with self.lock:
-            # Clean up rate limits
-            for identifier in list(self.rate_limits.keys()):
-                requests = self.rate_limits[identifier]
-                while requests and current_time - requests[0] > max_age_seconds:
-                    requests.popleft()
-                
-                # Remove empty records
-                if not requests:
-                    del self.rate_limits[identifier]
+            # Local GCRA keys are spent once their arrival time has passed
+            for key in [key for key, tat in self.rate_limits.items() if tat <= now * 1000]:
+                del self.rate_limits[key]
             
             # Clean up failed login attempts
             for ip_address in list(self.failed_login_attempts.keys()):
                 failed_attempts = self.failed_login_attempts[ip_address]
-                while failed_attempts and current_time - failed_attempts[0] > max_age_seconds:
+                while failed_attempts and now - failed_attempts[0] > max_age_seconds:
                     failed_attempts.popleft()
                 
                 # Remove empty records
@@ -223,10 +424,169 @@ class RateLimiter:
         """
         with self.lock:
             return {
-                "active_rate_limits": len(self.rate_limits),
-                "locked_out_ips": len([ip for ip in self.failed_login_attempts if self._is_ip_locked_out(ip)]),
-                "total_failed_attempts": sum(len(attempts) for attempts in self.failed_login_attempts.values())
+                "backend": "redis" if self.backend.is_available else "local",
+                "redis_checks": self.redis_checks,
+                "local_checks": self.local_checks,
+                "redis_failures": self.backend.failures,
+                "local_rate_limit_keys": len(self.rate_limits),
+                "local_failed_login_ips": len(self.failed_login_attempts)
             }
 
+
+class TokenStateStore:
+    """Token blacklist and active refresh tokens, shared through Redis"""
+    
+    def __init__(self, backend: Optional[RedisStateBackend] = None, key_prefix: str = "auth"):
+        self.backend = backend or state_backend
+        self.blacklist_prefix = f"{key_prefix}:blacklist:"
+        self.refresh_prefix = f"{key_prefix}:refresh:"
+        self.lock = threading.Lock()
+        
+        # Revocations made by this process are always checked locally first
+        self.local_blacklist: "OrderedDict[str, float]" = OrderedDict()
+        self.local_refresh_tokens: Dict[int, "OrderedDict[str, float]"] = {}
+    
+    def blacklist(self, token: str, expires_at: float):
+        """Revoke a token until its own expiry (epoch seconds)"""
+        token_hash = _token_hash(token)
+        ttl = max(int(expires_at - time.time()), 1)
+        
+        with self.lock:
+            self.local_blacklist[token_hash] = expires_at
+            while len(self.local_blacklist) > LOCAL_MAX_KEYS:
+                self.local_blacklist.popitem(last=False)
+        
+        client = self.backend.client()
+        if client is not None:
+            try:
+                client.set(self.blacklist_prefix + token_hash, 1, ex=ttl)
+            except Exception as e:
+                self.backend.mark_down(e)
+    
+    def is_blacklisted(self, token: str) -> bool:
+        token_hash = _token_hash(token)
+        expires_at = self.local_blacklist.get(token_hash)
+        if expires_at is not None and expires_at > time.time():
+            return True
+        
+        client = self.backend.client()
+        if client is not None:
+            try:
+                return bool(client.exists(self.blacklist_prefix + token_hash))
+            except Exception as e:
+                self.backend.mark_down(e)
+        return False
+    
+    def add_refresh_token(self, user_id: int, token: str, max_tokens: int, ttl_seconds: int):
+        """Track a refresh token, keeping only the newest max_tokens per user"""
+        token_hash = _token_hash(token)
+        
+        with self.lock:
+            tokens = self.local_refresh_tokens.setdefault(user_id, OrderedDict())
+            tokens[token_hash] = time.time() + ttl_seconds
+            while len(tokens) > max_tokens:
+                tokens.popitem(last=False)
+        
+        client = self.backend.client()
+        if client is not None:
+            try:
+                self.backend.script("add_refresh")(
+                    keys=[f"{self.refresh_prefix}{user_id}"],
+                    args=[token_hash, max_tokens, ttl_seconds],
+                    client=client
+                )
+            except Exception as e:
+                self.backend.mark_down(e)
+    
+    def has_refresh_token(self, user_id: int, token: str) -> bool:
+        """
+        Whether a refresh token is still active for the user. During a Redis
+        outage tokens issued by other workers cannot be checked, so a signed,
+        unexpired, non-blacklisted refresh token is accepted rather than
+        forcing every user to log in again.
+        """
+        token_hash = _token_hash(token)
+        client = self.backend.client()
+        if client is not None:
+            try:
+                return client.zscore(f"{self.refresh_prefix}{user_id}", token_hash) is not None
+            except Exception as e:
+                self.backend.mark_down(e)
+        
+        if token_hash in self.local_refresh_tokens.get(user_id, {}):
+            return True
+        logger.warning(f"Accepting refresh token for user {user_id} without shared state (Redis unavailable)")
+        return True
+    
+    def remove_refresh_token(self, user_id: int, token: str):
+        token_hash = _token_hash(token)
+        with self.lock:
+            self.local_refresh_tokens.get(user_id, {}).pop(token_hash, None)
+        
+        client = self.backend.client()
+        if client is not None:
+            try:
+                client.zrem(f"{self.refresh_prefix}{user_id}", token_hash)
+            except Exception as e:
+                self.backend.mark_down(e)
+    
+    def revoke_all_refresh_tokens(self, user_id: int, ttl_seconds: int) -> int:
+        """Blacklist and forget every refresh token of a user; returns the count revoked"""
+        expires_at = time.time() + ttl_seconds
+        with self.lock:
+            local_tokens = self.local_refresh_tokens.pop(user_id, {})
+            for token_hash in local_tokens:
+                self.local_blacklist[token_hash] = expires_at
+        
+        client = self.backend.client()
+        if client is not None:
+            try:
+                return int(self.backend.script("revoke_all")(
+                    keys=[f"{self.refresh_prefix}{user_id}"],
+                    args=[self.blacklist_prefix, ttl_seconds],
+                    client=client
+                ))
+            except Exception as e:
+                self.backend.mark_down(e)
+        return len(local_tokens)
+    
+    def cleanup_local(self) -> int:
+        """Drop expired local fallback entries; returns the number removed"""
+        now = time.time()
+        removed = 0
+        with self.lock:
+            for token_hash in [h for h, expires_at in self.local_blacklist.items() if expires_at <= now]:
+                del self.local_blacklist[token_hash]
+                removed += 1
+            for user_id in list(self.local_refresh_tokens):
+                tokens = self.local_refresh_tokens[user_id]
+                for token_hash in [h for h, expires_at in tokens.items() if expires_at <= now]:
+                    del tokens[token_hash]
+                    removed += 1
+                if not tokens:
+                    del self.local_refresh_tokens[user_id]
+        return removed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {
+            "backend": "redis" if self.backend.is_available else "local",
+            "local_blacklisted_tokens": len(self.local_blacklist),
+            "local_users_with_tokens": len(self.local_refresh_tokens),
+        }
+        client = self.backend.client()
+        if client is not None:
+            try:
+                stats["users_with_tokens"] = sum(1 for _ in client.scan_iter(f"{self.refresh_prefix}*", count=500))
+                stats["blacklisted_tokens"] = sum(1 for _ in client.scan_iter(f"{self.blacklist_prefix}*", count=500))
+            except Exception as e:
+                self.backend.mark_down(e)
+        return stats
+
+# Shared Redis backend for rate limits and token state
+state_backend = RedisStateBackend()
+
 # Global rate limiter instance
 rate_limiter = RateLimiter()
+
+# Global token state (blacklist and refresh tokens)
+token_state = TokenStateStore()
@@ -18,6 +18,7 @@ from database_manager import get_db_connection
 
 from app.core.settings import SECRET_KEY, ALGORITHM
 from auth.models import User
+from .rate_limiter import token_state
 
 logger = logging.getLogger(__name__)
 
@@ -27,11 +28,7 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7
 MAX_REFRESH_TOKENS_PER_USER = 5
 TOKEN_REFRESH_THRESHOLD_MINUTES = 5  # Refresh if expires within 5 minutes
 
-# Token blacklist for logout
-token_blacklist: set = set()
-
-# Active refresh tokens per user
-user_refresh_tokens: Dict[int, set] = {}
+# Token blacklist and active refresh tokens per user live in Redis (see rate_limiter.TokenStateStore)
 
 security = HTTPBearer()
 
@@ -78,17 +75,10 @@ class TokenManager:
             
             token = jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
             
-            # Track refresh token for user
-            if user.id not in user_refresh_tokens:
-                user_refresh_tokens[user.id] = set()
-            
-            user_refresh_tokens[user.id].add(token)
-            
-            # Limit number of refresh tokens per user
-            if len(user_refresh_tokens[user.id]) > MAX_REFRESH_TOKENS_PER_USER:
-                # Remove oldest token (simple approach - in production use Redis)
-                oldest_token = list(user_refresh_tokens[user.id])[0]
-                user_refresh_tokens[user.id].remove(oldest_token)
+            # Track refresh token for user, keeping only the newest few
+            token_state.add_refresh_token(
+                user.id, token, MAX_REFRESH_TOKENS_PER_USER, REFRESH_TOKEN_EXPIRE_DAYS * 86400
+            )
             
             logger.info(f"Created refresh token for user {user.id}")
             return token
@@ -101,7 +91,7 @@ class TokenManager:
         """Verify and decode a token"""
         try:
             # Check if token is blacklisted
-            if token in token_blacklist:
+            if token_state.is_blacklisted(token):
                 raise HTTPException(status_code=401, detail="Token has been revoked")
             
             # Decode token
@@ -119,7 +109,7 @@ class TokenManager:
             # For refresh tokens, verify it's still valid for this user
             if token_type == "refresh":
                 user_id = int(payload.get("sub"))
-                if user_id not in user_refresh_tokens or token not in user_refresh_tokens[user_id]:
+                if not token_state.has_refresh_token(user_id, token):
                     raise HTTPException(status_code=401, detail="Refresh token not found")
             
             return payload
@@ -170,8 +160,7 @@ class TokenManager:
             new_refresh_token = self.create_refresh_token(user)
             
             # Remove old refresh token
-            if user_id in user_refresh_tokens and refresh_token in user_refresh_tokens[user_id]:
-                user_refresh_tokens[user_id].remove(refresh_token)
+            token_state.remove_refresh_token(user_id, refresh_token)
             
             logger.info(f"Refreshed tokens for user {user_id}")
             return new_access_token, new_refresh_token
@@ -189,14 +178,13 @@ class TokenManager:
             payload = self.verify_token(token)
             token_type = payload.get("type")
             
-            # Add to blacklist
-            token_blacklist.add(token)
+            # Add to blacklist until the token would have expired anyway
+            token_state.blacklist(token, payload.get("exp", time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60))
             
             # If it's a refresh token, remove from user's active tokens
             if token_type == "refresh":
                 user_id = int(payload.get("sub"))
-                if user_id in user_refresh_tokens and token in user_refresh_tokens[user_id]:
-                    user_refresh_tokens[user_id].remove(token)
+                token_state.remove_refresh_token(user_id, token)
             
             logger.info(f"Revoked {token_type} token")
             return True
@@ -209,12 +197,9 @@ class TokenManager:
         """Revoke all tokens for a specific user"""
         try:
             # Revoke all refresh tokens for user
-            if user_id in user_refresh_tokens:
-                for token in user_refresh_tokens[user_id].copy():
-                    token_blacklist.add(token)
-                user_refresh_tokens[user_id].clear()
+            revoked = token_state.revoke_all_refresh_tokens(user_id, REFRESH_TOKEN_EXPIRE_DAYS * 86400)
             
-            logger.info(f"Revoked all tokens for user {user_id}")
+            logger.info(f"Revoked all {revoked} tokens for user {user_id}")
             return True
             
         except Exception as e:
@@ -238,44 +223,9 @@ class TokenManager:
             return False
     
     def cleanup_expired_tokens(self) -> int:
-        """Clean up expired tokens from memory"""
+        """Clean up expired tokens from the local fallback state (Redis entries expire on their own)"""
         try:
-            cleaned_count = 0
-            
-            # Clean up expired tokens from blacklist
-            current_time = datetime.utcnow().timestamp()
-            expired_tokens = set()
-            
-            for token in token_blacklist:
-                try:
-                    payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-                    if payload.get("exp", 0) < current_time:
-                        expired_tokens.add(token)
-                except:
-                    # Invalid token, remove it
-                    expired_tokens.add(token)
-            
-            token_blacklist.difference_update(expired_tokens)
-            cleaned_count += len(expired_tokens)
-            
-            # Clean up expired refresh tokens
-            for user_id in list(user_refresh_tokens.keys()):
-                expired_user_tokens = set()
-                for token in user_refresh_tokens[user_id]:
-                    try:
-                        payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-                        if payload.get("exp", 0) < current_time:
-                            expired_user_tokens.add(token)
-                    except:
-                        expired_user_tokens.add(token)
-                
-                user_refresh_tokens[user_id].difference_update(expired_user_tokens)
-                cleaned_count += len(expired_user_tokens)
-                
-                # Remove empty user entries
-                if not user_refresh_tokens[user_id]:
-                    del user_refresh_tokens[user_id]
-            
+            cleaned_count = token_state.cleanup_local()
             logger.info(f"Cleaned up {cleaned_count} expired tokens")
             return cleaned_count
             
@@ -286,12 +236,8 @@ class TokenManager:
     def get_token_stats(self) -> Dict[str, Any]:
         """Get token management statistics"""
         try:
-            total_refresh_tokens = sum(len(tokens) for tokens in user_refresh_tokens.values())
-            
             return {
-                "blacklisted_tokens": len(token_blacklist),
-                "active_refresh_tokens": total_refresh_tokens,
-                "users_with_tokens": len(user_refresh_tokens),
+                **token_state.get_stats(),
                 "max_refresh_tokens_per_user": MAX_REFRESH_TOKENS_PER_USER,
                 "access_token_expiry_minutes": ACCESS_TOKEN_EXPIRE_MINUTES,
                 "refresh_token_expiry_days": REFRESH_TOKEN_EXPIRE_DAYS
@@ -0,0 +1,270 @@
+"""
+Span-level request tracing for the chat path
+
+Spans follow the OpenTelemetry data model (trace/span ids, parent span ids,
+nanosecond timestamps, attributes, status) and completed traces are exported
+as OTLP/JSON resource spans, either to a local JSON-lines file or to an OTLP
+HTTP collector. Every finished span also feeds an in-process latency histogram
+per stage name, and slow requests are kept in a bounded log.
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+import urllib.request
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Deque
+
+logger = logging.getLogger(__name__)
+
+# Tracing configuration
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "logs/traces.jsonl")
+TRACE_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "3000"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "propertypro-api")
+
+
+@dataclass
+class Span:
+    """A single timed operation within a trace"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: str = "ok"
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute (token counts, cache flags, row counts, ...)"""
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1_000_000
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Serialize to the OTLP/JSON span shape"""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id or "",
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2 if self.status == "error" else 1},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class StageHistogram:
+    """Bounded latency sample window for one stage"""
+
+    def __init__(self, max_samples: int = 2048):
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, duration_ms: float):
+        self.samples.append(duration_ms)
+        self.count += 1
+        self.total_ms += duration_ms
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": 0}
+
+        def percentile(q: float) -> float:
+            index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+            return round(ordered[index], 2)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2),
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(ordered[-1], 2),
+        }
+
+
+class SpanExporter:
+    """Writes finished traces as OTLP/JSON, to a JSON-lines file or an OTLP HTTP endpoint"""
+
+    def __init__(self, file_path: Optional[str] = TRACE_EXPORT_PATH, otlp_endpoint: Optional[str] = TRACE_OTLP_ENDPOINT):
+        self.file_path = file_path
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") + "/v1/traces" if otlp_endpoint else None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        payload = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+        if self.otlp_endpoint:
+            # Posting must not hold up the request that produced the trace
+            threading.Thread(target=self._post, args=(payload,), daemon=True).start()
+        elif self.file_path:
+            self._write(payload)
+
+    def _write(self, payload: Dict[str, Any]):
+        try:
+            with self._lock:
+                directory = os.path.dirname(self.file_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                with open(self.file_path, "a") as f:
+                    f.write(json.dumps(payload) + "\n")
+        except Exception as e:
+            logger.warning(f"Error exporting trace to {self.file_path}: {e}")
+
+    def _post(self, payload: Dict[str, Any]):
+        try:
+            request = urllib.request.Request(
+                self.otlp_endpoint,
+                data=json.dumps(payload).encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            urllib.request.urlopen(request, timeout=2).close()
+        except Exception as e:
+            logger.warning(f"Error exporting trace to {self.otlp_endpoint}: {e}")
+
+
+class Tracer:
+    """Creates spans, aggregates per-stage latency and keeps a sampled slow-request log"""
+
+    def __init__(self, exporter: Optional[SpanExporter] = None, sample_rate: float = TRACE_SAMPLE_RATE,
+                 slow_threshold_ms: float = SLOW_REQUEST_THRESHOLD_MS, max_open_traces: int = 1000):
+        self.exporter = exporter or SpanExporter()
+        self.sample_rate = sample_rate
+        self.slow_threshold_ms = slow_threshold_ms
+        self.max_open_traces = max_open_traces
+        self._current: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+        self._open_traces: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._stages: Dict[str, StageHistogram] = {}
+        self._slow_requests: Deque[Dict[str, Any]] = deque(maxlen=100)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block as a child of the current span, or as a new trace root"""
+        parent = self._current.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else None,
+            start_ns=time.time_ns(),
+            attributes=dict(attributes),
+        )
+        token = self._current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.status = "error"
+            span.set_attribute("error", str(e))
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._current.reset(token)
+            self._finish(span)
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def set_attribute(self, key: str, value: Any):
+        """Set an attribute on the active span, if any"""
+        span = self._current.get()
+        if span is not None:
+            span.set_attribute(key, value)
+
+    def _finish(self, span: Span):
+        with self._lock:
+            histogram = self._stages.get(span.name)
+            if histogram is None:
+                histogram = self._stages[span.name] = StageHistogram()
+            histogram.observe(span.duration_ms)
+
+            spans = self._open_traces.setdefault(span.trace_id, [])
+            spans.append(span)
+            if span.parent_span_id is not None:
+                # Drop the oldest unfinished trace rather than grow without bound
+                if len(self._open_traces) > self.max_open_traces:
+                    self._open_traces.popitem(last=False)
+                return
+            del self._open_traces[span.trace_id]
+
+        is_slow = span.duration_ms >= self.slow_threshold_ms
+        if is_slow:
+            self._record_slow_request(span, spans)
+        if is_slow or random.random() < self.sample_rate:
+            self.exporter.export(spans)
+
+    def _record_slow_request(self, root: Span, spans: List[Span]):
+        stages = {}
+        for span in spans:
+            if span is not root:
+                stages[span.name] = round(stages.get(span.name, 0.0) + span.duration_ms, 2)
+
+        entry = {
+            "trace_id": root.trace_id,
+            "name": root.name,
+            "duration_ms": round(root.duration_ms, 2),
+            "timestamp": root.start_ns // 1_000_000_000,
+            "attributes": root.attributes,
+            "stages": stages,
+        }
+        self._slow_requests.append(entry)
+        logger.warning(f"Slow request {root.name} took {entry['duration_ms']}ms (trace {root.trace_id}): {stages}")
+
+    def get_stage_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage latency summary (count, mean, p50/p95/p99, max)"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self._stages.items())}
+
+    def get_slow_requests(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent slow requests, newest first"""
+        return list(self._slow_requests)[-limit:][::-1]
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._open_traces.clear()
+            self._slow_requests.clear()
+
+
+# Global tracer instance
+tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    return tracer
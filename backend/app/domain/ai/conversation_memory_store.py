@@ -0,0 +1,356 @@
+"""
+Tiered, bounded conversation memory for AIEnhancementManager
+
+Conversation memories used to live in a plain dict that grew with every
+session a worker had ever seen. They are now kept in two tiers:
+
+    local   per-process LRU of ConversationMemory objects, bounded by
+            CONVERSATION_MEMORY_LOCAL_SESSIONS and an idle TTL
+    redis   conversation_memory:<session_id> hash {version, data}, written
+            through on every update and expired after CONVERSATION_MEMORY_REDIS_TTL
+
+A local hit is checked against the version in Redis (one HGET) so a session
+whose requests move between workers never serves stale turns. Each session
+is also held under a token budget: once its turns exceed
+CONVERSATION_MEMORY_TOKEN_BUDGET the oldest ones are folded into
+conversation_summary and dropped. While Redis is unavailable only the local
+tier is used.
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.rate_limiter import RedisStateBackend
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Counter, Gauge
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+CONVERSATION_MEMORY_LOCAL_SESSIONS = int(os.getenv("CONVERSATION_MEMORY_LOCAL_SESSIONS", "1000"))
+CONVERSATION_MEMORY_IDLE_TTL = float(os.getenv("CONVERSATION_MEMORY_IDLE_TTL", "1800"))
+CONVERSATION_MEMORY_REDIS_TTL = int(os.getenv("CONVERSATION_MEMORY_REDIS_TTL", str(24 * 3600)))
+CONVERSATION_MEMORY_TOKEN_BUDGET = int(os.getenv("CONVERSATION_MEMORY_TOKEN_BUDGET", "3000"))
+CONVERSATION_SUMMARY_MAX_CHARS = int(os.getenv("CONVERSATION_SUMMARY_MAX_CHARS", "2000"))
+
+# Turns that are never folded away, however long they are
+MIN_RETAINED_TURNS = 2
+SUMMARY_SNIPPET_CHARS = 160
+
+if PROMETHEUS_AVAILABLE:
+    memory_lookup_counter = Counter(
+        'propertypro_conversation_memory_lookups_total',
+        'Conversation memory lookups by the tier that answered them',
+        ['tier']
+    )
+    memory_sessions_gauge = Gauge(
+        'propertypro_conversation_memory_sessions',
+        'Conversation memories held in the local tier',
+        multiprocess_mode='livesum'
+    )
+    memory_tokens_gauge = Gauge(
+        'propertypro_conversation_memory_tokens',
+        'Estimated tokens held in the local tier',
+        multiprocess_mode='livesum'
+    )
+    memory_summarized_counter = Counter(
+        'propertypro_conversation_memory_summarized_turns_total',
+        'Turns folded into a conversation summary to stay within the token budget'
+    )
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (about four characters per token plus per-turn overhead)"""
+    return len(text or "") // 4 + 4
+
+
+def summarize_turns(summary: str, turns: List[Dict[str, Any]]) -> str:
+    """Append a one-line digest of each evicted turn to the running summary"""
+    lines = [summary] if summary else []
+    for turn in turns:
+        content = " ".join(str(turn.get('content') or "").split())
+        if len(content) > SUMMARY_SNIPPET_CHARS:
+            content = content[:SUMMARY_SNIPPET_CHARS] + "..."
+        lines.append(f"{turn.get('role', 'user')}: {content}")
+    merged = "\n".join(lines)
+    if len(merged) > CONVERSATION_SUMMARY_MAX_CHARS:
+        # Keep the most recent part of the digest
+        merged = merged[-CONVERSATION_SUMMARY_MAX_CHARS:].split("\n", 1)[-1]
+    return merged
+
+
+class _LocalEntry:
+    __slots__ = ("memory", "version", "tokens", "expires_at")
+
+    def __init__(self, memory: Any, version: Optional[str], tokens: int, expires_at: float):
+        self.memory = memory
+        self.version = version
+        self.tokens = tokens
+        self.expires_at = expires_at
+
+
+class ConversationMemoryStore:
+    """Session id -> ConversationMemory, with a bounded local tier over Redis"""
+
+    def __init__(self, memory_class: Callable[..., Any], backend: Optional[RedisStateBackend] = None,
+                 max_local_sessions: int = CONVERSATION_MEMORY_LOCAL_SESSIONS,
+                 idle_ttl: float = CONVERSATION_MEMORY_IDLE_TTL,
+                 redis_ttl: int = CONVERSATION_MEMORY_REDIS_TTL,
+                 token_budget: int = CONVERSATION_MEMORY_TOKEN_BUDGET,
+                 summarizer: Callable[[str, List[Dict[str, Any]]], str] = summarize_turns,
+                 key_prefix: str = "conversation_memory"):
+        self.memory_class = memory_class
+        self.backend = backend or RedisStateBackend()
+        self.max_local_sessions = max_local_sessions
+        self.idle_ttl = idle_ttl
+        self.redis_ttl = redis_ttl
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.key_prefix = key_prefix
+        self._local: "OrderedDict[str, _LocalEntry]" = OrderedDict()
+        self._local_tokens = 0
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.summarized_turns = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.key_prefix}:{session_id}"
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        """Memory for a session from the local tier or Redis, else default"""
+        with self._lock:
+            entry = self._local.get(session_id)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove_local(session_id)
+                entry = None
+
+        client = self.backend.client()
+        if client is None:
+            if entry is None:
+                return self._miss(default)
+            return self._local_hit(session_id, entry)
+
+        try:
+            if entry is not None:
+                if client.hget(self._key(session_id), "version") == entry.version:
+                    return self._local_hit(session_id, entry)
+            version, data = client.hmget(self._key(session_id), ["version", "data"])
+        except Exception as e:
+            self.backend.mark_down(e)
+            if entry is None:
+                return self._miss(default)
+            return self._local_hit(session_id, entry)
+
+        if data is None:
+            if entry is not None:
+                # Cleared or expired in another worker
+                with self._lock:
+                    self._remove_local(session_id)
+            return self._miss(default)
+
+        try:
+            memory = self._deserialize(json.loads(data))
+        except Exception as e:
+            logger.error(f"Error decoding conversation memory for {session_id}: {e}")
+            return self._miss(default)
+
+        self._put_local(session_id, memory, version)
+        self.redis_hits += 1
+        if PROMETHEUS_AVAILABLE:
+            memory_lookup_counter.labels(tier="redis").inc()
+        return memory
+
+    def _local_hit(self, session_id: str, entry: _LocalEntry) -> Any:
+        with self._lock:
+            if session_id in self._local:
+                self._local.move_to_end(session_id)
+                entry.expires_at = time.monotonic() + self.idle_ttl
+        self.local_hits += 1
+        if PROMETHEUS_AVAILABLE:
+            memory_lookup_counter.labels(tier="local").inc()
+        return entry.memory
+
+    def _miss(self, default: Any) -> Any:
+        self.misses += 1
+        if PROMETHEUS_AVAILABLE:
+            memory_lookup_counter.labels(tier="miss").inc()
+        return default
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def put(self, session_id: str, memory: Any):
+        """Trim a memory to the token budget, cache it locally and write it through to Redis"""
+        self._enforce_budget(memory)
+        version = uuid.uuid4().hex
+        self._put_local(session_id, memory, version)
+
+        client = self.backend.client()
+        if client is None:
+            return
+        try:
+            payload = json.dumps(self._serialize(memory), default=str)
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(self._key(session_id), mapping={"version": version, "data": payload})
+            pipe.expire(self._key(session_id), self.redis_ttl)
+            pipe.execute()
+        except Exception as e:
+            self.backend.mark_down(e)
+
+    def invalidate(self, session_id: str):
+        """Drop a session from both tiers"""
+        with self._lock:
+            self._remove_local(session_id)
+        client = self.backend.client()
+        if client is None:
+            return
+        try:
+            client.delete(self._key(session_id))
+        except Exception as e:
+            self.backend.mark_down(e)
+
+    # Mapping-style access for callers written against the old dict cache
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def __getitem__(self, session_id: str) -> Any:
+        memory = self.get(session_id)
+        if memory is None:
+            raise KeyError(session_id)
+        return memory
+
+    def __setitem__(self, session_id: str, memory: Any):
+        self.put(session_id, memory)
+
+    def __delitem__(self, session_id: str):
+        self.invalidate(session_id)
+
+    def __len__(self) -> int:
+        return len(self._local)
+
+    # ------------------------------------------------------------------
+    # Local tier
+    # ------------------------------------------------------------------
+
+    def _put_local(self, session_id: str, memory: Any, version: Optional[str]):
+        tokens = sum(estimate_tokens(turn.get('content')) for turn in memory.messages)
+        with self._lock:
+            self._remove_local(session_id)
+            self._local[session_id] = _LocalEntry(memory, version, tokens, time.monotonic() + self.idle_ttl)
+            self._local_tokens += tokens
+            while len(self._local) > self.max_local_sessions:
+                self._remove_local(next(iter(self._local)))
+                self.evictions += 1
+            self._report_size()
+
+    def _remove_local(self, session_id: str) -> bool:
+        entry = self._local.pop(session_id, None)
+        if entry is None:
+            return False
+        self._local_tokens -= entry.tokens
+        self._report_size()
+        return True
+
+    def _report_size(self):
+        if PROMETHEUS_AVAILABLE:
+            memory_sessions_gauge.set(len(self._local))
+            memory_tokens_gauge.set(self._local_tokens)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+            self._local_tokens = 0
+            self._report_size()
+
+    # ------------------------------------------------------------------
+    # Token budget
+    # ------------------------------------------------------------------
+
+    def _enforce_budget(self, memory: Any):
+        """Fold the oldest turns into the summary until the rest fit the budget"""
+        messages = memory.messages
+        total = sum(estimate_tokens(turn.get('content')) for turn in messages)
+        total += estimate_tokens(memory.conversation_summary)
+        evicted = []
+        while total > self.token_budget and len(messages) > MIN_RETAINED_TURNS:
+            turn = messages.popleft()
+            if memory.context_window and memory.context_window[0] is turn:
+                memory.context_window.popleft()
+            total -= estimate_tokens(turn.get('content'))
+            evicted.append(turn)
+        if not evicted:
+            return
+
+        try:
+            memory.conversation_summary = self.summarizer(memory.conversation_summary, evicted)
+        except Exception as e:
+            logger.error(f"Error summarizing conversation {memory.session_id}: {e}")
+        self.summarized_turns += len(evicted)
+        if PROMETHEUS_AVAILABLE:
+            memory_summarized_counter.inc(len(evicted))
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def _serialize(self, memory: Any) -> Dict[str, Any]:
+        last_updated = memory.last_updated
+        return {
+            "session_id": memory.session_id,
+            "conversation_id": memory.conversation_id,
+            "messages": list(memory.messages),
+            "context_size": len(memory.context_window),
+            "user_preferences": memory.user_preferences,
+            "conversation_summary": memory.conversation_summary,
+            "last_updated": last_updated.isoformat() if isinstance(last_updated, datetime) else last_updated,
+        }
+
+    def _deserialize(self, data: Dict[str, Any]) -> Any:
+        memory = self.memory_class(session_id=data["session_id"])
+        memory.conversation_id = data.get("conversation_id")
+        memory.messages.extend(data.get("messages") or [])
+        # The context window holds the most recent turns, shared with messages
+        context_size = data.get("context_size", 0)
+        if context_size:
+            memory.context_window.extend(list(memory.messages)[-context_size:])
+        memory.user_preferences = data.get("user_preferences") or {}
+        memory.conversation_summary = data.get("conversation_summary") or ""
+        if data.get("last_updated"):
+            memory.last_updated = datetime.fromisoformat(data["last_updated"])
+        return memory
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        hits = self.local_hits + self.redis_hits
+        return {
+            "local_sessions": len(self._local),
+            "local_tokens": self._local_tokens,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "local_hit_rate": round(self.local_hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "summarized_turns": self.summarized_turns,
+            "token_budget": self.token_budget,
+            "redis_available": self.backend.is_available,
+        }
@@ -11,10 +11,12 @@ from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import chromadb
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 import json
 import hashlib
 from cache_manager import cache_manager
+from app.core.tracing import tracer
 
 logger = logging.getLogger(__name__)
 
@@ -49,7 +51,7 @@ class HybridSearchEngine:
     """Hybrid search engine combining vector and structured search"""
     
     def __init__(self, database_url: str, chroma_host: str = "localhost", chroma_port: int = 8000):
-        self.engine = create_engine(database_url)
+        self.engine = get_engine("oltp", database_url)
         self.chroma_client = self._initialize_chroma_client(chroma_host, chroma_port)
         self.cache_manager = cache_manager
         
@@ -92,44 +94,52 @@ class HybridSearchEngine:
     
     def search(self, params: SearchParams) -> List[SearchResult]:
         """Main search method that orchestrates hybrid search"""
-        start_time = time.time()
-        self.search_metrics["total_searches"] += 1
-        
-        # Check cache first
-        cache_key = self._generate_search_cache_key(params)
-        cached_results = self.cache_manager.get_cached_property_search({
-            "cache_key": cache_key,
-            "search_type": params.search_type.value
-        })
-        
-        if cached_results:
-            self.search_metrics["cache_hits"] += 1
-            logger.debug(f"Cache hit for search: {cache_key}")
-            return [SearchResult(**result) for result in cached_results]
-        
-        # Perform search based on type
-        if params.search_type == SearchType.VECTOR_ONLY:
-            results = self._vector_search(params)
-            self.search_metrics["vector_searches"] += 1
-        elif params.search_type == SearchType.STRUCTURED_ONLY:
-            results = self._structured_search(params)
-            self.search_metrics["structured_searches"] += 1
-        else:  # HYBRID
-            results = self._hybrid_search(params)
-            self.search_metrics["hybrid_searches"] += 1
-        
-        # Cache results
-        cache_data = [result.__dict__ for result in results]
-        self.cache_manager.cache_property_search({
-            "cache_key": cache_key,
-            "search_type": params.search_type.value
-        }, cache_data, ttl=1800)
-        
-        # Update metrics
-        execution_time = time.time() - start_time
-        self._update_metrics(execution_time)
-        
-        return results
+        with tracer.span("search.execute", search_type=params.search_type.value) as span:
+            start_time = time.time()
+            self.search_metrics["total_searches"] += 1
+            
+            # Check cache first
+            cache_key = self._generate_search_cache_key(params)
+            with tracer.span("search.cache_lookup"):
+                cached_results = self.cache_manager.get_cached_property_search({
+                    "cache_key": cache_key,
+                    "search_type": params.search_type.value
+                })
+            
+            span.set_attribute("cache_hit", bool(cached_results))
+            if cached_results:
+                self.search_metrics["cache_hits"] += 1
+                logger.debug(f"Cache hit for search: {cache_key}")
+                self._update_metrics(time.time() - start_time)
+                return [SearchResult(**result) for result in cached_results]
+            
+            # Perform search based on type
+            if params.search_type == SearchType.VECTOR_ONLY:
+                with tracer.span("search.vector"):
+                    results = self._vector_search(params)
+                self.search_metrics["vector_searches"] += 1
+            elif params.search_type == SearchType.STRUCTURED_ONLY:
+                with tracer.span("search.structured"):
+                    results = self._structured_search(params)
+                self.search_metrics["structured_searches"] += 1
+            else:  # HYBRID
+                with tracer.span("search.hybrid"):
+                    results = self._hybrid_search(params)
+                self.search_metrics["hybrid_searches"] += 1
+            span.set_attribute("results", len(results))
+            
+            # Cache results
+            cache_data = [result.__dict__ for result in results]
+            self.cache_manager.cache_property_search({
+                "cache_key": cache_key,
+                "search_type": params.search_type.value
+            }, cache_data, ttl=1800)
+            
+            # Update metrics
+            execution_time = time.time() - start_time
+            self._update_metrics(execution_time)
+            
+            return results
     
     def _vector_search(self, params: SearchParams) -> List[SearchResult]:
         """Perform vector search using ChromaDB"""
@@ -340,7 +350,7 @@ class HybridSearchEngine:
         total_searches = self.search_metrics["total_searches"]
         current_avg = self.search_metrics["avg_execution_time"]
         
-        # Calculate running average
+        # Calculate running average; the latency distribution lives in the search.execute histogram
         new_avg = ((current_avg * (total_searches - 1)) + execution_time) / total_searches
         self.search_metrics["avg_execution_time"] = new_avg
     
@@ -350,9 +360,15 @@ class HybridSearchEngine:
         if self.search_metrics["total_searches"] > 0:
             cache_hit_rate = (self.search_metrics["cache_hits"] / self.search_metrics["total_searches"]) * 100
         
+        stage_stats = tracer.get_stage_stats()
+        
         return {
             **self.search_metrics,
             "cache_hit_rate": cache_hit_rate,
+            "latency_ms": stage_stats.get("search.execute", {"count": 0}),
+            "stage_latency_ms": {
+                name: stats for name, stats in stage_stats.items() if name.startswith("search.")
+            },
             "search_distribution": {
                 "vector": self.search_metrics["vector_searches"],
                 "structured": self.search_metrics["structured_searches"],
@@ -7,17 +7,30 @@ Addresses core issues: conversational tone, data presentation, information archi
 import os
 import re
 import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 import chromadb
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 import logging
 from dataclasses import dataclass
 from enum import Enum
 
+from app.core.tracing import tracer
+from app.infrastructure.integrations.llm_client import LLMBudgetExceeded, get_llm_client
+
 # Reelly service removed
 
 logger = logging.getLogger(__name__)
 
+# Lower temperature for more focused responses, longer limit for detailed ones
+RAG_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
 class QueryIntent(Enum):
     PROPERTY_SEARCH = "property_search"
     MARKET_INFO = "market_info"
@@ -43,6 +56,15 @@ def get_system_prompt(user_role: str, intent: QueryIntent, retrieved_context: st
     """
     Generates a dynamic system prompt based on user role, intent, and retrieved context.
     """
+    return get_system_prompt_prefix(user_role, intent) + get_context_prompt(retrieved_context, user_name)
+
+@lru_cache(maxsize=64)
+def get_system_prompt_prefix(user_role: str, intent: QueryIntent) -> str:
+    """
+    Instructions that depend only on role and intent. Kept byte-identical across
+    requests and sent ahead of the per-request context, so the LLM client can
+    reuse the prefix instead of resending it.
+    """
 
     # Base Persona and Core Directives
     system_prompt = f"""
@@ -59,7 +81,7 @@ You are "Dubai Realty AI," an expert-level real estate intelligence assistant fo
 8.  **Proactive Insights**: Offer additional relevant information that the user might not have asked for but would find valuable.
 
 ## CONVERSATIONAL ENGAGEMENT
-- **Initial Interaction**: On the very first message of a new conversation, you may use a brief, professional greeting, such as "Hello {user_name}."
+- **Initial Interaction**: On the very first message of a new conversation, you may use a brief, professional greeting, such as "Hello" followed by the user's name given with the retrieved context.
 - **Responding to Greetings**: If the user's entire message is a simple greeting (e.g., "Hi," "Hello there"), respond politely and invite a query (e.g., "Hello. How can I assist you with the Dubai real estate market today?"). For these interactions, you do not need to use the full structured response format.
 - **Responding to Thanks**: If the user's message is solely an expression of gratitude (e.g., "Thank you," "Great, thanks"), respond concisely (e.g., "You're welcome. Is there anything else I can help with?").
 - **Default Behavior**: For ANY other query that contains a request for information, you must revert to the default 'No Fluff' behavior. Omit any greeting and proceed directly to the "Executive Summary."
@@ -72,13 +94,6 @@ You are "Dubai Realty AI," an expert-level real estate intelligence assistant fo
 
 ---
 
-## [RETRIEVED CONTEXT - Your Primary Source of Truth]
-This information has been sourced directly from our internal databases (PostgreSQL, ChromaDB) to answer the user's query.
-
-{retrieved_context}
-
----
-
 ## ENHANCED RESPONSE STRUCTURE
 
 ### **1. Executive Summary**
@@ -141,6 +156,21 @@ If the user is searching for specific properties (QueryIntent.PROPERTY_SEARCH),
 """
     return system_prompt
 
+def get_context_prompt(retrieved_context: str, user_name: str = "User") -> str:
+    """
+    Request-specific part of the prompt: the retrieved context and the user's name.
+    """
+    return f"""
+---
+
+## [RETRIEVED CONTEXT - Your Primary Source of Truth]
+This information has been sourced directly from our internal databases (PostgreSQL, ChromaDB) to answer the user's query.
+
+**User Name**: {user_name}
+
+{retrieved_context}
+"""
+
 def get_role_specific_guidance(user_role: str, intent: QueryIntent):
     """
     Provides role- and intent-specific instructions for the Detailed Analysis section.
@@ -175,7 +205,7 @@ class ContextItem:
 
 class EnhancedRAGService:
     def __init__(self):
-        self.engine = create_engine(os.getenv("DATABASE_URL"))
+        self.engine = get_engine("oltp", os.getenv("DATABASE_URL"))
         
         # Enhanced ChromaDB initialization with retry logic
         self.chroma_client = self._initialize_chroma_client()
@@ -443,7 +473,9 @@ class EnhancedRAGService:
         
         # 1. Get relevant properties from our comprehensive local database (8,000+ properties)
         if analysis.intent == QueryIntent.PROPERTY_SEARCH:
-            prop_context = self._get_property_context(analysis.parameters, max_items)
+            with tracer.span("rag.postgres.properties") as span:
+                prop_context = self._get_property_context(analysis.parameters, max_items)
+                span.set_attribute("items", len(prop_context))
             context_items.extend(prop_context)
         
             # For property search, focus on properties, not market analysis
@@ -452,25 +484,31 @@ class EnhancedRAGService:
         # 2. Enhanced document retrieval from ChromaDB with multiple query variations
         # Skip document context for property search to focus on actual properties
         if analysis.intent != QueryIntent.PROPERTY_SEARCH:
-            doc_context = self._get_enhanced_document_context(query, analysis.intent, max_items)
+            with tracer.span("rag.chroma.documents") as span:
+                doc_context = self._get_enhanced_document_context(query, analysis.intent, max_items)
+                span.set_attribute("items", len(doc_context))
             context_items.extend(doc_context)
         
         # 4. Get relevant neighborhoods and market data
         if analysis.intent in [QueryIntent.NEIGHBORHOOD_QUESTION, QueryIntent.MARKET_INFO]:
-            neighborhood_context = self._get_neighborhood_context(query, max_items)
+            with tracer.span("rag.postgres.neighborhoods"):
+                neighborhood_context = self._get_neighborhood_context(query, max_items)
             context_items.extend(neighborhood_context)
             
-            market_context = self._get_market_context(query, max_items)
+            with tracer.span("rag.postgres.market"):
+                market_context = self._get_market_context(query, max_items)
             context_items.extend(market_context)
         
         # 5. Get additional market insights for investment questions
         if analysis.intent == QueryIntent.INVESTMENT_QUESTION:
-            investment_context = self._get_investment_context(query, max_items)
+            with tracer.span("rag.postgres.investment"):
+                investment_context = self._get_investment_context(query, max_items)
             context_items.extend(investment_context)
         
         # 6. Get agent-specific data for agent support queries
         if analysis.intent == QueryIntent.AGENT_SUPPORT:
-            agent_context = self._get_agent_context(query, max_items)
+            with tracer.span("rag.postgres.agents"):
+                agent_context = self._get_agent_context(query, max_items)
             context_items.extend(agent_context)
         
         # 7. Sort all combined context items by relevance and return the best ones
@@ -514,10 +552,11 @@ class EnhancedRAGService:
                 all_results = []
                 for q_var in query_variations[:3]:  # Use top 3 variations
                     try:
-                        results = collection.query(
-                            query_texts=[q_var],
-                            n_results=max_items * 2
-                        )
+                        with tracer.span("rag.chroma.query", collection=collection_name):
+                            results = collection.query(
+                                query_texts=[q_var],
+                                n_results=max_items * 2
+                            )
                         
                         if results['documents'] and results['documents'][0]:
                             all_results.extend(results['documents'][0])
@@ -1286,55 +1325,72 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
         
         return context_items
 
-    def get_response(self, message: str, role: str = "client", session_id: str = None, user_name: str = "User") -> str:
+    def get_response(self, message: str, role: str = "client", session_id: str = None, user_name: str = "User",
+                     tenant: Optional[str] = None) -> str:
         """
         Main method to generate a response using the RAG service.
         This is the single source of truth for conversational AI responses.
+        Calls are charged to the tenant's LLM token budget (e.g. "user:42").
         """
-        try:
-            # 1. Analyze the query
-            analysis = self.analyze_query(message)
-            
-            # 2. Get relevant context with enhanced retrieval
-            context_items = self.get_relevant_context(message, analysis, max_items=8)
-            
-            # 3. Build enhanced context string
-            context = self.build_structured_context(context_items)
-            
-            # 4. Create enhanced prompt using the improved system prompt
-            system_prompt = get_system_prompt(role, analysis.intent, context, user_name)
-            
-            # 5. Build the complete prompt
-            full_prompt = f"""
-{system_prompt}
+        with tracer.span("rag.get_response", role=role) as root_span:
+            try:
+                # 1. Analyze the query
+                with tracer.span("rag.analyze_query") as span:
+                    analysis = self.analyze_query(message)
+                    span.set_attribute("intent", analysis.intent.value)
+                root_span.set_attribute("intent", analysis.intent.value)
+                
+                # 2. Get relevant context with enhanced retrieval
+                with tracer.span("rag.retrieve_context") as span:
+                    context_items = self.get_relevant_context(message, analysis, max_items=8)
+                    span.set_attribute("context_items", len(context_items))
+                
+                # 3. Build enhanced context string
+                with tracer.span("rag.build_context"):
+                    context = self.build_structured_context(context_items)
+                
+                # 4. Stable instructions go first as a reusable prefix, the retrieved context after them
+                with tracer.span("rag.prompt_assembly") as span:
+                    system_prefix = get_system_prompt_prefix(role, analysis.intent)
+                    
+                    # 5. Build the request-specific prompt
+                    full_prompt = f"""
+{get_context_prompt(context, user_name)}
 
 ## USER QUERY:
 {message}
 
 ## RESPONSE:
 """
-            
-            # 6. Generate response using AI model with enhanced parameters
-            import google.generativeai as genai
-            from app.core.settings import GOOGLE_API_KEY
-            
-            genai.configure(api_key=GOOGLE_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Enhanced generation parameters for better quality
-            response = model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    top_p=0.9,
-                    top_k=40,
-                    max_output_tokens=2048,  # Allow longer, more detailed responses
-                )
-            )
-            response_text = response.text.strip()
-            
-            return response_text
-            
-        except Exception as e:
-            logger.error(f"Error generating response: {e}")
-            return f"I apologize, but I encountered an error while processing your request. Please try again or contact support if the issue persists."
+                    span.set_attribute("prompt_chars", len(system_prefix) + len(full_prompt))
+                
+                # 6. Generate response through the shared LLM client with enhanced parameters
+                llm_client = get_llm_client()
+                with tracer.span("rag.llm_generate", model=llm_client.model_name) as span:
+                    result = llm_client.generate(
+                        full_prompt,
+                        system_prefix=system_prefix,
+                        tenant=tenant,
+                        caller="rag",
+                        generation_config=RAG_GENERATION_CONFIG,
+                    )
+                    span.set_attribute("prompt_tokens", result.prompt_tokens)
+                    span.set_attribute("completion_tokens", result.completion_tokens)
+                    span.set_attribute("cached_tokens", result.cached_tokens)
+                    span.set_attribute("coalesced", result.coalesced)
+                    
+                    response_text = result.text.strip()
+                
+                return response_text
+                
+            except LLMBudgetExceeded as e:
+                root_span.status = "error"
+                root_span.set_attribute("error", str(e))
+                logger.warning(f"LLM budget exceeded for tenant {tenant}: {e}")
+                # Surfaced to the router as a 429 rather than apologised for with a 200
+                raise
+            except Exception as e:
+                root_span.status = "error"
+                root_span.set_attribute("error", str(e))
+                logger.error(f"Error generating response: {e}")
+                return f"I apologize, but I encountered an error while processing your request. Please try again or contact support if the issue persists."
@@ -17,7 +17,7 @@ import uuid
 import json
 import asyncio
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 from enum import Enum
 from sqlalchemy.orm import Session
@@ -148,6 +148,8 @@ class AITaskOrchestrator:
     def __init__(self, db_session_factory: Callable[[], Session]):
         self.db_session_factory = db_session_factory
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        # Resolved with the final AITaskResult once a task completes or fails for good
+        self.task_completions: Dict[str, asyncio.Future] = {}
         self.task_processors: Dict[TaskType, Callable] = {}
         self.action_engine = ActionEngine() if ActionEngine else None
         
@@ -156,14 +158,18 @@ class AITaskOrchestrator:
     
     def _register_default_processors(self):
         """Register default task processors for AURA features"""
+        processors = {
+            TaskType.CONTENT_GENERATION: '_process_content_generation',
+            TaskType.CMA_GENERATION: '_process_cma_generation',
+            TaskType.LISTING_STRATEGY: '_process_listing_strategy',
+            TaskType.LEAD_SCORING: '_process_lead_scoring',
+            TaskType.SOCIAL_MEDIA_POST: '_process_social_media_post',
+            TaskType.WORKFLOW_EXECUTION: '_process_workflow_execution',
+            TaskType.NOTIFICATION: '_process_notification',
+        }
+        # Only register processors that are implemented; other task types fail with "no processor"
         self.task_processors.update({
-            TaskType.CONTENT_GENERATION: self._process_content_generation,
-            TaskType.CMA_GENERATION: self._process_cma_generation,
-            TaskType.LISTING_STRATEGY: self._process_listing_strategy,
-            TaskType.LEAD_SCORING: self._process_lead_scoring,
-            TaskType.SOCIAL_MEDIA_POST: self._process_social_media_post,
-            TaskType.WORKFLOW_EXECUTION: self._process_workflow_execution,
-            TaskType.NOTIFICATION: self._process_notification,
+            task_type: getattr(self, name) for task_type, name in processors.items() if hasattr(self, name)
         })
     
     async def submit_task(self, request: AITaskRequest) -> str:
@@ -201,6 +207,7 @@ class AITaskOrchestrator:
                 db.commit()
             
             # Start async processing
+            self.task_completions[task_id] = asyncio.get_running_loop().create_future()
             asyncio.create_task(self._process_task(task_id, request))
             
             logger.info(f"AI task {task_id} submitted for processing")
@@ -240,6 +247,40 @@ class AITaskOrchestrator:
             logger.error(f"Failed to get task status: {e}")
             raise
     
+    async def wait_for_task(self, task_id: str, timeout: float = 60.0,
+                            poll_interval: float = 0.1, max_poll_interval: float = 2.0) -> AITaskResult:
+        """
+        Wait until a task completes or fails, or until the timeout passes.
+        
+        Tasks submitted through this orchestrator resolve a completion future;
+        others (e.g. submitted by another process) are polled with backoff.
+        Returns the latest status either way.
+        """
+        completion = self.task_completions.get(task_id)
+        if completion is not None:
+            try:
+                return await asyncio.wait_for(asyncio.shield(completion), timeout)
+            except asyncio.TimeoutError:
+                return await self.get_task_status(task_id)
+            finally:
+                # Timed-out or cancelled waits must not leave the future behind
+                self.task_completions.pop(task_id, None)
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            task_result = await self.get_task_status(task_id)
+            remaining = deadline - loop.time()
+            if task_result.status in (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED) or remaining <= 0:
+                return task_result
+            await asyncio.sleep(min(poll_interval, remaining))
+            poll_interval = min(poll_interval * 2, max_poll_interval)
+    
+    def _resolve_completion(self, task_id: str, task_result: AITaskResult):
+        completion = self.task_completions.pop(task_id, None)
+        if completion is not None and not completion.done():
+            completion.set_result(task_result)
+    
     async def execute_workflow_package(self, package: WorkflowPackage, 
                                      user_id: int, context: Dict[str, Any]) -> str:
         """
@@ -373,20 +414,16 @@ class AITaskOrchestrator:
             # Submit and wait for task completion
             task_id = await self.submit_task(task_request)
             
-            # Poll for completion (with timeout)
-            timeout = datetime.utcnow() + timedelta(seconds=step.estimated_duration * 2)
-            while datetime.utcnow() < timeout:
-                task_status = await self.get_task_status(task_id)
-                
-                if task_status.status == TaskStatus.COMPLETED:
-                    await self._update_package_step(step_id, 'completed', 100, task_status.output_data)
-                    return task_status.output_data
-                elif task_status.status == TaskStatus.FAILED:
-                    await self._update_package_step(step_id, 'failed', 0, 
-                                                  {"error": task_status.error_message})
-                    raise Exception(f"Step task failed: {task_status.error_message}")
-                
-                await asyncio.sleep(2)  # Poll every 2 seconds
+            # Wait for completion (with timeout)
+            task_status = await self.wait_for_task(task_id, timeout=step.estimated_duration * 2)
+            
+            if task_status.status == TaskStatus.COMPLETED:
+                await self._update_package_step(step_id, 'completed', 100, task_status.output_data)
+                return task_status.output_data
+            elif task_status.status == TaskStatus.FAILED:
+                await self._update_package_step(step_id, 'failed', 0, 
+                                              {"error": task_status.error_message})
+                raise Exception(f"Step task failed: {task_status.error_message}")
             
             raise TimeoutError(f"Step {step.step_name} timed out")
             
@@ -476,6 +513,13 @@ class AITaskOrchestrator:
             })
             db.commit()
     
+    async def _update_task_progress(self, task_id: str, progress: int):
+        """Update progress of a running task"""
+        with self.db_session_factory() as db:
+            db.execute(text("UPDATE ai_tasks SET progress = :progress WHERE id = :task_id"),
+                       {'task_id': task_id, 'progress': progress})
+            db.commit()
+    
     async def _update_task_completion(self, task_id: str, status: TaskStatus, 
                                     progress: int, output_data: Dict[str, Any]):
         """Update task completion with results"""
@@ -493,6 +537,12 @@ class AITaskOrchestrator:
                 'completed_at': datetime.utcnow()
             })
             db.commit()
+        
+        if status == TaskStatus.COMPLETED:
+            self._resolve_completion(task_id, AITaskResult(
+                task_id=task_id, status=status, progress=progress,
+                output_data=output_data, completed_at=datetime.utcnow()
+            ))
     
     async def _handle_task_failure(self, task_id: str, request: AITaskRequest, error_message: str):
         """Handle task failure with retry logic"""
@@ -531,6 +581,12 @@ class AITaskOrchestrator:
                     'completed_at': datetime.utcnow()
                 })
                 db.commit()
+                
+                self._resolve_completion(task_id, AITaskResult(
+                    task_id=task_id, status=TaskStatus.FAILED, progress=0,
+                    error_message=error_message, retries=row.retries if row else 0,
+                    completed_at=datetime.utcnow()
+                ))
     
     # Placeholder implementations for AI processing
     # These will integrate with your existing AI routers
@@ -14,9 +14,13 @@ Features:
 - Campaign distribution tracking
 """
 
+import os
 import json
-import logging
+import time
 import uuid
+import asyncio
+import logging
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Callable
 from sqlalchemy.orm import Session
@@ -27,14 +31,32 @@ import re
 # Import AI orchestration for content generation
 try:
     from domain.ai.task_orchestrator import AITaskOrchestrator, AITaskRequest, TaskType, TaskPriority
+except ImportError:
+    try:
+        from app.domain.ai.task_orchestrator import AITaskOrchestrator, AITaskRequest, TaskType, TaskPriority
+    except ImportError:
+        AITaskOrchestrator = None
+
+try:
     from domain.ai.ai_manager import get_social_media_prompt, get_email_prompt
 except ImportError:
-    AITaskOrchestrator = None
     get_social_media_prompt = None
     get_email_prompt = None
 
 logger = logging.getLogger(__name__)
 
+# How long to wait for AI copy before creating a campaign without it
+CAMPAIGN_AI_TIMEOUT_SECONDS = float(os.getenv("CAMPAIGN_AI_TIMEOUT_SECONDS", "30"))
+# Templates are seeded by migrations and rarely change; keep parsed ones this long
+TEMPLATE_CACHE_TTL_SECONDS = float(os.getenv("TEMPLATE_CACHE_TTL_SECONDS", "600"))
+
+# Channels of the full marketing package: (package key, campaign type, template category)
+PACKAGE_CHANNELS = [
+    ('postcard', 'postcard', 'postcard'),
+    ('email', 'email_blast', 'email'),
+    ('social_instagram', 'social_campaign', 'social'),
+]
+
 
 class MarketingTemplate:
     """Represents a marketing template with content generation capabilities"""
@@ -112,6 +134,43 @@ class MarketingTemplate:
         return re.sub(r'\{\{\s*([^}]+)\s*\}\}', replace_var, template_string)
 
 
+class TemplateCache:
+    """Process-wide cache of parsed templates by id, shared by per-request engines"""
+    
+    def __init__(self, ttl_seconds: float = TEMPLATE_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._templates: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, template_id: int) -> Optional[MarketingTemplate]:
+        entry = self._templates.get(template_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+    
+    def put(self, template: MarketingTemplate):
+        with self._lock:
+            self._templates[template.id] = (template, time.monotonic())
+    
+    def invalidate(self, template_id: Optional[int] = None):
+        with self._lock:
+            if template_id is None:
+                self._templates.clear()
+            else:
+                self._templates.pop(template_id, None)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {'size': len(self._templates), 'hits': self.hits, 'misses': self.misses}
+
+
+# Global template cache instance
+template_cache = TemplateCache()
+
+
 class CampaignApprovalWorkflow:
     """Manages the approval workflow for marketing campaigns"""
     
@@ -223,11 +282,14 @@ class MarketingCampaignEngine:
     """
     
     def __init__(self, db_session_factory: Callable[[], Session],
-                 orchestrator: Optional[AITaskOrchestrator] = None):
+                 orchestrator: Optional[AITaskOrchestrator] = None,
+                 ai_timeout: float = CAMPAIGN_AI_TIMEOUT_SECONDS,
+                 cache: Optional[TemplateCache] = None):
         self.db_session_factory = db_session_factory
         self.orchestrator = orchestrator
+        self.ai_timeout = ai_timeout
         self.approval_workflow = CampaignApprovalWorkflow(db_session_factory)
-        self.template_cache: Dict[int, MarketingTemplate] = {}
+        self.template_cache = cache or template_cache
     
     async def get_available_templates(self, category: Optional[str] = None,
                                     template_type: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -273,8 +335,9 @@ class MarketingCampaignEngine:
     async def load_template(self, template_id: int) -> MarketingTemplate:
         """Load a marketing template from database"""
         # Check cache first
-        if template_id in self.template_cache:
-            return self.template_cache[template_id]
+        template = self.template_cache.get(template_id)
+        if template is not None:
+            return template
         
         try:
             with self.db_session_factory() as db:
@@ -304,7 +367,7 @@ class MarketingCampaignEngine:
                 template = MarketingTemplate(template_data)
                 
                 # Cache the template
-                self.template_cache[template_id] = template
+                self.template_cache.put(template)
                 return template
                 
         except Exception as e:
@@ -332,6 +395,21 @@ class MarketingCampaignEngine:
             property_data = await self._get_property_data(property_id)
             agent_data = await self._get_agent_data(agent_id)
             
+            return await self._create_campaign(
+                property_data, agent_data, campaign_type, template_id, custom_content
+            )
+            
+        except Exception as e:
+            logger.error(f"Failed to create campaign: {e}")
+            raise
+    
+    async def _create_campaign(self, property_data: Dict[str, Any], agent_data: Dict[str, Any],
+                             campaign_type: str, template_id: Optional[int] = None,
+                             custom_content: Optional[Dict[str, Any]] = None) -> int:
+        """Create a campaign from already loaded property and agent data"""
+        property_id = property_data['property_id']
+        agent_id = agent_data['agent_id']
+        try:
             # Generate AI content if using orchestrator
             ai_content = None
             if self.orchestrator:
@@ -395,40 +473,23 @@ class MarketingCampaignEngine:
         - Property flyer
         """
         try:
-            campaigns = {}
-            
-            # Get available templates for different channels
-            templates = await self.get_available_templates()
-            
-            # Create postcard campaign
-            postcard_template = next(
-                (t for t in templates if t['category'] == 'postcard' and t['type'] == 'just_listed'), 
-                None
-            )
-            if postcard_template:
-                campaigns['postcard'] = await self.create_campaign(
-                    property_id, agent_id, 'postcard', postcard_template['id']
-                )
+            # Templates, property and agent data are loaded once and shared by all channels
+            templates = await self.get_available_templates(template_type='just_listed')
+            property_data = await self._get_property_data(property_id)
+            agent_data = await self._get_agent_data(agent_id)
             
-            # Create email campaign
-            email_template = next(
-                (t for t in templates if t['category'] == 'email' and t['type'] == 'just_listed'), 
-                None
-            )
-            if email_template:
-                campaigns['email'] = await self.create_campaign(
-                    property_id, agent_id, 'email_blast', email_template['id']
-                )
+            channels = []
+            for key, campaign_type, category in PACKAGE_CHANNELS:
+                template = next((t for t in templates if t['category'] == category), None)
+                if template:
+                    channels.append((key, campaign_type, template['id']))
             
-            # Create social media campaigns
-            social_template = next(
-                (t for t in templates if t['category'] == 'social' and t['type'] == 'just_listed'), 
-                None
-            )
-            if social_template:
-                campaigns['social_instagram'] = await self.create_campaign(
-                    property_id, agent_id, 'social_campaign', social_template['id']
-                )
+            # Channels are independent, so their AI content is generated concurrently
+            campaign_ids = await asyncio.gather(*[
+                self._create_campaign(property_data, agent_data, campaign_type, template_id)
+                for _, campaign_type, template_id in channels
+            ])
+            campaigns = {key: campaign_id for (key, _, _), campaign_id in zip(channels, campaign_ids)}
             
             return {
                 'package_type': 'full_marketing_package',
@@ -618,16 +679,14 @@ class MarketingCampaignEngine:
             
             task_id = await self.orchestrator.submit_task(task_request)
             
-            # Poll for completion (simplified for now)
-            # In production, this would use proper async polling
-            import asyncio
-            await asyncio.sleep(2)  # Allow processing time
-            
-            task_result = await self.orchestrator.get_task_status(task_id)
+            # Wait for the task to finish (returns as soon as it does) up to the timeout
+            task_result = await self.orchestrator.wait_for_task(task_id, timeout=self.ai_timeout)
             
             if task_result.output_data:
                 return task_result.output_data
             
+            logger.warning(f"AI content task {task_id} not completed ({task_result.status}); "
+                           f"creating {campaign_type} campaign without AI content")
             return {}
             
         except Exception as e:
@@ -2,314 +2,478 @@
 Context Management Service for Phase 3: Advanced In-Chat Experience
 
 This service manages fetching, caching, and providing context data for detected entities.
+
+Entities are resolved in batches: an in-process LRU answers repeat lookups,
+one context_cache query covers the remaining entities, and whatever is still
+missing is fetched fresh with concurrent, column-projected queries and written
+back in one statement. Expired context_cache rows are swept a bounded batch at
+a time on each write instead of by full-table deletes.
 """
 
+import os
 import json
 import asyncio
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 import logging
-from sqlalchemy import text
+from sqlalchemy import text, bindparam
 from database_manager import get_db_connection
 
 logger = logging.getLogger(__name__)
 
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+CONTEXT_LOCAL_CACHE_SIZE = int(os.getenv("CONTEXT_LOCAL_CACHE_SIZE", "1000"))
+CONTEXT_FETCH_CONCURRENCY = int(os.getenv("CONTEXT_FETCH_CONCURRENCY", "8"))
+CONTEXT_EXPIRED_SWEEP_LIMIT = int(os.getenv("CONTEXT_EXPIRED_SWEEP_LIMIT", "200"))
+
+# Columns each context actually uses, instead of SELECT *
+PROPERTY_COLUMNS = """p.id, p.title, p.description, p.price, p.location, p.property_type,
+    p.bedrooms, p.bathrooms, p.area_sqft, p.listing_status, p.agent_id"""
+AGENT_COLUMNS = "u.first_name || ' ' || u.last_name AS agent_name, u.email AS agent_email"
+CLIENT_COLUMNS = "id, name, email, phone, budget_min, budget_max, preferred_location, requirements"
+MARKET_COLUMNS = "location, property_type, avg_price, avg_rent, price_appreciation, rental_yield, created_at"
+NEIGHBORHOOD_COLUMNS = "name, description, price_ranges, rental_yields, amenities, pros, cons"
+
+EntityKey = Tuple[str, str]
+
+
+def _row_dict(row) -> Dict[str, Any]:
+    return dict(row._mapping)
+
+
+def _is_int(value: str) -> bool:
+    return str(value).isdigit()
+
+
 class ContextManagementService:
     """Service for managing entity context data"""
-    
+
     def __init__(self):
-        self.cache_duration = timedelta(hours=1)  # Cache for 1 hour
-        self.max_cache_size = 1000  # Maximum cached items
-    
+        self.cache_duration = timedelta(seconds=CONTEXT_CACHE_TTL_SECONDS)
+        self.max_cache_size = CONTEXT_LOCAL_CACHE_SIZE
+        # (entity_type, entity_id) -> (expires_at, context_data)
+        self._local_cache: "OrderedDict[EntityKey, Tuple[datetime, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {'local_hits': 0, 'db_hits': 0, 'fetched': 0, 'expired_swept': 0}
+
     async def fetch_entity_context(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
         """
         Fetch context data for a specific entity
-        
+
         Args:
             entity_type: Type of entity ('property', 'client', 'location', 'market_data')
             entity_id: Identifier for the entity
-            
+
         Returns:
             Context data dictionary
         """
+        results = await self.fetch_entities_context([(entity_type, entity_id)])
+        return results.get(f"{entity_type}:{entity_id}", {})
+
+    async def fetch_entities_context(self, entities: List[EntityKey]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch context data for many entities in one pass
+
+        Args:
+            entities: (entity_type, entity_id) pairs; duplicates are resolved once
+
+        Returns:
+            Context data keyed by "entity_type:entity_id" ({} when not found)
+        """
+        keys = list(dict.fromkeys((str(t), str(i)) for t, i in entities))
+        results: Dict[EntityKey, Dict[str, Any]] = {}
         try:
-            # Check cache first
-            cached_data = await self._get_cached_context(entity_type, entity_id)
-            if cached_data:
-                logger.info(f"Retrieved cached context for {entity_type}:{entity_id}")
-                return cached_data
-            
-            # Fetch fresh data
-            context_data = await self._fetch_fresh_context(entity_type, entity_id)
-            
-            # Cache the data
-            if context_data:
-                await self._cache_context(entity_type, entity_id, context_data)
-            
-            return context_data or {}
-            
+            now = datetime.now()
+
+            # 1. In-process tier
+            for key in keys:
+                cached = self._get_local(key, now)
+                if cached is not None:
+                    results[key] = cached
+
+            # 2. Shared context_cache tier, one query for all remaining entities
+            missing = [key for key in keys if key not in results]
+            if missing:
+                for key, (expires_at, data) in (await asyncio.to_thread(self._get_cached_contexts, missing, now)).items():
+                    self.stats['db_hits'] += 1
+                    self._put_local(key, data, expires_at)
+                    results[key] = data
+
+            # 3. Fresh fetch for the rest, then one write-back
+            missing = [key for key in keys if key not in results]
+            if missing:
+                fresh = await self._fetch_fresh_contexts(missing)
+                self.stats['fetched'] += len(missing)
+                expires_at = datetime.now() + self.cache_duration
+                to_cache = {key: data for key, data in fresh.items() if data}
+                for key, data in to_cache.items():
+                    self._put_local(key, data, expires_at)
+                if to_cache:
+                    await asyncio.to_thread(self._cache_contexts, to_cache, expires_at)
+                results.update(fresh)
+
+            logger.info(f"Resolved context for {len(keys)} entities ({len(keys) - len(missing)} cached)")
+
         except Exception as e:
-            logger.error(f"Error fetching context for {entity_type}:{entity_id}: {e}")
-            return {}
-    
-    async def _get_cached_context(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
-        """Get context data from cache"""
+            logger.error(f"Error fetching context for {len(keys)} entities: {e}")
+
+        return {f"{entity_type}:{entity_id}": results.get((entity_type, entity_id)) or {}
+                for entity_type, entity_id in keys}
+
+    def _get_local(self, key: EntityKey, now: datetime) -> Optional[Dict[str, Any]]:
+        entry = self._local_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._local_cache[key]
+            return None
+        self._local_cache.move_to_end(key)
+        self.stats['local_hits'] += 1
+        return entry[1]
+
+    def _put_local(self, key: EntityKey, data: Dict[str, Any], expires_at: datetime):
+        self._local_cache[key] = (expires_at, data)
+        self._local_cache.move_to_end(key)
+        while len(self._local_cache) > self.max_cache_size:
+            self._local_cache.popitem(last=False)
+
+    def _get_cached_contexts(self, keys: List[EntityKey], now: datetime) -> Dict[EntityKey, Tuple[datetime, Dict[str, Any]]]:
+        """Get unexpired context_cache rows for the given entities"""
         try:
             with get_db_connection() as conn:
                 result = conn.execute(text("""
-                    SELECT context_data, last_fetched, expires_at
+                    SELECT entity_type, entity_id, context_data, expires_at
                     FROM context_cache
-                    WHERE entity_type = :entity_type AND entity_id = :entity_id
-                """), {
-                    'entity_type': entity_type,
-                    'entity_id': entity_id
+                    WHERE entity_type IN :entity_types
+                      AND entity_id IN :entity_ids
+                      AND expires_at > :now
+                """).bindparams(bindparam('entity_types', expanding=True), bindparam('entity_ids', expanding=True)), {
+                    'entity_types': sorted({t for t, _ in keys}),
+                    'entity_ids': sorted({i for _, i in keys}),
+                    'now': now
                 })
-                
-                row = result.fetchone()
-                if row and row['expires_at'] > datetime.now():
-                    return json.loads(row['context_data']) if row['context_data'] else {}
-                
-                return None
-                
+
+                wanted = set(keys)
+                cached = {}
+                for row in result.fetchall():
+                    key = (row.entity_type, row.entity_id)
+                    if key in wanted:
+                        data = row.context_data
+                        cached[key] = (row.expires_at, json.loads(data) if isinstance(data, str) else (data or {}))
+                return cached
+
         except Exception as e:
             logger.error(f"Error getting cached context: {e}")
-            return None
-    
-    async def _cache_context(self, entity_type: str, entity_id: str, context_data: Dict[str, Any]):
-        """Cache context data"""
+            return {}
+
+    def _cache_contexts(self, contexts: Dict[EntityKey, Dict[str, Any]], expires_at: datetime):
+        """Upsert context data in one statement and sweep a batch of expired rows"""
         try:
-            expires_at = datetime.now() + self.cache_duration
-            
+            values, params = [], {'expires_at': expires_at}
+            for i, ((entity_type, entity_id), data) in enumerate(contexts.items()):
+                values.append(f"(:entity_type_{i}, :entity_id_{i}, :context_data_{i}, :expires_at)")
+                params.update({
+                    f'entity_type_{i}': entity_type,
+                    f'entity_id_{i}': entity_id,
+                    f'context_data_{i}': json.dumps(data, default=str)
+                })
+
             with get_db_connection() as conn:
-                conn.execute(text("""
+                conn.execute(text(f"""
                     INSERT INTO context_cache (entity_type, entity_id, context_data, expires_at)
-                    VALUES (:entity_type, :entity_id, :context_data, :expires_at)
+                    VALUES {', '.join(values)}
                     ON CONFLICT (entity_type, entity_id)
                     DO UPDATE SET
-                        context_data = :context_data,
+                        context_data = excluded.context_data,
                         last_fetched = CURRENT_TIMESTAMP,
-                        expires_at = :expires_at
-                """), {
-                    'entity_type': entity_type,
-                    'entity_id': entity_id,
-                    'context_data': json.dumps(context_data),
-                    'expires_at': expires_at
-                })
-                
-            logger.info(f"Cached context for {entity_type}:{entity_id}")
-            
+                        expires_at = excluded.expires_at
+                """), params)
+                self._sweep_expired(conn, CONTEXT_EXPIRED_SWEEP_LIMIT)
+
+            logger.info(f"Cached context for {len(contexts)} entities")
+
         except Exception as e:
             logger.error(f"Error caching context: {e}")
-    
-    async def _fetch_fresh_context(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
-        """Fetch fresh context data from various sources"""
-        try:
-            if entity_type == 'property':
-                return await self._fetch_property_context(entity_id)
-            elif entity_type == 'client':
-                return await self._fetch_client_context(entity_id)
-            elif entity_type == 'location':
-                return await self._fetch_location_context(entity_id)
-            elif entity_type == 'market_data':
-                return await self._fetch_market_context(entity_id)
-            else:
+
+    def _sweep_expired(self, conn, limit: int) -> int:
+        """Delete up to limit expired context_cache rows (oldest first, via the expires_at index)"""
+        result = conn.execute(text("""
+            DELETE FROM context_cache
+            WHERE id IN (
+                SELECT id FROM context_cache
+                WHERE expires_at < :now
+                ORDER BY expires_at
+                LIMIT :limit
+            )
+        """), {'now': datetime.now(), 'limit': limit})
+        self.stats['expired_swept'] += result.rowcount or 0
+        return result.rowcount or 0
+
+    async def _fetch_fresh_contexts(self, keys: List[EntityKey]) -> Dict[EntityKey, Dict[str, Any]]:
+        """Fetch fresh context data for many entities, sub-fetches running concurrently"""
+        semaphore = asyncio.Semaphore(CONTEXT_FETCH_CONCURRENCY)
+        by_type: Dict[str, List[str]] = {}
+        for entity_type, entity_id in keys:
+            by_type.setdefault(entity_type, []).append(entity_id)
+
+        fetchers = {
+            'property': self._fetch_property_contexts,
+            'client': self._fetch_client_contexts,
+            'location': self._fetch_location_contexts,
+            'market_data': self._fetch_market_contexts,
+        }
+
+        async def fetch_type(entity_type: str, entity_ids: List[str]) -> Dict[EntityKey, Dict[str, Any]]:
+            fetcher = fetchers.get(entity_type)
+            if fetcher is None:
                 logger.warning(f"Unknown entity type: {entity_type}")
                 return {}
-                
-        except Exception as e:
-            logger.error(f"Error fetching fresh context: {e}")
-            return {}
-    
-    async def _fetch_property_context(self, property_id: str) -> Dict[str, Any]:
+            try:
+                contexts = await fetcher(entity_ids, semaphore)
+                return {(entity_type, entity_id): data for entity_id, data in contexts.items()}
+            except Exception as e:
+                logger.error(f"Error fetching fresh {entity_type} context: {e}")
+                return {}
+
+        fresh: Dict[EntityKey, Dict[str, Any]] = {}
+        for contexts in await asyncio.gather(*(fetch_type(t, ids) for t, ids in by_type.items())):
+            fresh.update(contexts)
+        return fresh
+
+    async def _run(self, semaphore: asyncio.Semaphore, func, *args):
+        """Run a blocking query in a worker thread, bounded by the batch semaphore"""
+        async with semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def _fetch_property_contexts(self, property_ids: List[str], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
         """Fetch property context data"""
+        properties = await self._run(semaphore, self._find_properties, property_ids)
+
+        async def build(property_data: Dict[str, Any]) -> Dict[str, Any]:
+            area = (property_data.get('location') or '').split(",")[0]
+            market_data, similar_properties = await asyncio.gather(
+                self._run(semaphore, self._get_market_data_for_area, area),
+                self._run(semaphore, self._get_similar_properties, property_data)
+            )
+            return {
+                'property': property_data,
+                'market_data': market_data,
+                'similar_properties': similar_properties,
+                'context_type': 'property_details',
+                'last_updated': datetime.now().isoformat()
+            }
+
+        found = [entity_id for entity_id in property_ids if entity_id in properties]
+        contexts = await asyncio.gather(*(build(properties[entity_id]) for entity_id in found))
+        return dict(zip(found, contexts))
+
+    def _find_properties(self, property_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve numeric ids in one query, then fall back to a text search per remaining term"""
+        found: Dict[str, Dict[str, Any]] = {}
         try:
             with get_db_connection() as conn:
-                # Try to find property by ID first
-                result = conn.execute(text("""
-                    SELECT p.*, 
-                           u.name as agent_name,
-                           u.email as agent_email
-                    FROM properties p
-                    LEFT JOIN users u ON p.agent_id = u.id
-                    WHERE p.id = :property_id
-                """), {'property_id': property_id})
-                
-                property_data = result.fetchone()
-                
-                if not property_data:
-                    # Try to find by address or description
-                    result = conn.execute(text("""
-                        SELECT p.*, 
-                               u.name as agent_name,
-                               u.email as agent_email
+                numeric_ids = [int(entity_id) for entity_id in property_ids if _is_int(entity_id)]
+                if numeric_ids:
+                    result = conn.execute(text(f"""
+                        SELECT {PROPERTY_COLUMNS}, {AGENT_COLUMNS}
                         FROM properties p
                         LEFT JOIN users u ON p.agent_id = u.id
-                        WHERE p.address ILIKE :search_term 
+                        WHERE p.id IN :property_ids
+                    """).bindparams(bindparam('property_ids', expanding=True)), {'property_ids': numeric_ids})
+                    for row in result.fetchall():
+                        found[str(row.id)] = _row_dict(row)
+
+                for entity_id in property_ids:
+                    if entity_id in found:
+                        continue
+                    row = conn.execute(text(f"""
+                        SELECT {PROPERTY_COLUMNS}, {AGENT_COLUMNS}
+                        FROM properties p
+                        LEFT JOIN users u ON p.agent_id = u.id
+                        WHERE p.location ILIKE :search_term
+                           OR p.title ILIKE :search_term
                            OR p.description ILIKE :search_term
                         LIMIT 1
-                    """), {'search_term': f'%{property_id}%'})
-                    
-                    property_data = result.fetchone()
-                
-                if property_data:
-                    # Get market data for the area
-                    market_data = await self._get_market_data_for_area(property_data['address'])
-                    
-                    return {
-                        'property': dict(property_data),
-                        'market_data': market_data,
-                        'similar_properties': await self._get_similar_properties(property_data),
-                        'context_type': 'property_details',
-                        'last_updated': datetime.now().isoformat()
-                    }
-                
-                return {}
-                
+                    """), {'search_term': f'%{entity_id}%'}).fetchone()
+                    if row:
+                        found[entity_id] = _row_dict(row)
+
         except Exception as e:
             logger.error(f"Error fetching property context: {e}")
-            return {}
-    
-    async def _fetch_client_context(self, client_id: str) -> Dict[str, Any]:
+        return found
+
+    async def _fetch_client_contexts(self, client_ids: List[str], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
         """Fetch client context data"""
+        clients = await self._run(semaphore, self._find_clients, client_ids)
+
+        async def build(client_data: Dict[str, Any]) -> Dict[str, Any]:
+            history, preferences = await asyncio.gather(
+                self._run(semaphore, self._get_client_history, client_data['id']),
+                self._run(semaphore, self._get_client_preferences, client_data['id'])
+            )
+            return {
+                'client': client_data,
+                'history': history,
+                'preferences': preferences,
+                'context_type': 'client_info',
+                'last_updated': datetime.now().isoformat()
+            }
+
+        found = [entity_id for entity_id in client_ids if entity_id in clients]
+        contexts = await asyncio.gather(*(build(clients[entity_id]) for entity_id in found))
+        return dict(zip(found, contexts))
+
+    def _find_clients(self, client_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Resolve numeric ids in one query, then fall back to a name/email search per remaining term"""
+        found: Dict[str, Dict[str, Any]] = {}
         try:
             with get_db_connection() as conn:
-                # Try to find client by ID first
-                result = conn.execute(text("""
-                    SELECT * FROM clients WHERE id = :client_id
-                """), {'client_id': client_id})
-                
-                client_data = result.fetchone()
-                
-                if not client_data:
-                    # Try to find by name or email
-                    result = conn.execute(text("""
-                        SELECT * FROM clients 
-                        WHERE name ILIKE :search_term 
+                numeric_ids = [int(entity_id) for entity_id in client_ids if _is_int(entity_id)]
+                if numeric_ids:
+                    result = conn.execute(text(f"""
+                        SELECT {CLIENT_COLUMNS} FROM clients WHERE id IN :client_ids
+                    """).bindparams(bindparam('client_ids', expanding=True)), {'client_ids': numeric_ids})
+                    for row in result.fetchall():
+                        found[str(row.id)] = _row_dict(row)
+
+                for entity_id in client_ids:
+                    if entity_id in found:
+                        continue
+                    row = conn.execute(text(f"""
+                        SELECT {CLIENT_COLUMNS} FROM clients
+                        WHERE name ILIKE :search_term
                            OR email ILIKE :search_term
                         LIMIT 1
-                    """), {'search_term': f'%{client_id}%'})
-                    
-                    client_data = result.fetchone()
-                
-                if client_data:
-                    # Get client history
-                    history = await self._get_client_history(client_data['id'])
-                    
-                    return {
-                        'client': dict(client_data),
-                        'history': history,
-                        'preferences': await self._get_client_preferences(client_data['id']),
-                        'context_type': 'client_info',
-                        'last_updated': datetime.now().isoformat()
-                    }
-                
-                return {}
-                
+                    """), {'search_term': f'%{entity_id}%'}).fetchone()
+                    if row:
+                        found[entity_id] = _row_dict(row)
+
         except Exception as e:
             logger.error(f"Error fetching client context: {e}")
-            return {}
-    
-    async def _fetch_location_context(self, location: str) -> Dict[str, Any]:
+        return found
+
+    async def _fetch_location_contexts(self, locations: List[str], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
         """Fetch location context data"""
+
+        async def build(location: str) -> Dict[str, Any]:
+            market_data, neighborhood, properties = await asyncio.gather(
+                self._run(semaphore, self._get_market_data_for_area, location, 5),
+                self._run(semaphore, self._get_neighborhood_profile, location),
+                self._run(semaphore, self._get_properties_in_area, location)
+            )
+            return {
+                'location': location,
+                'market_data': market_data,
+                'neighborhood': neighborhood,
+                'properties_in_area': properties,
+                'context_type': 'location_data',
+                'last_updated': datetime.now().isoformat()
+            }
+
+        contexts = await asyncio.gather(*(build(location) for location in locations))
+        return dict(zip(locations, contexts))
+
+    async def _fetch_market_contexts(self, market_terms: List[str], semaphore: asyncio.Semaphore) -> Dict[str, Dict[str, Any]]:
+        """Fetch market context data"""
+
+        async def build(market_term: str) -> Dict[str, Any]:
+            # The trends are the latest five of the same market rows, so one query serves both
+            market_data, insights = await asyncio.gather(
+                self._run(semaphore, self._get_market_data_for_term, market_term),
+                self._run(semaphore, self._get_investment_insights, market_term)
+            )
+            return {
+                'market_term': market_term,
+                'market_data': market_data,
+                'insights': insights,
+                'trends': market_data[:5],
+                'context_type': 'market_analysis',
+                'last_updated': datetime.now().isoformat()
+            }
+
+        contexts = await asyncio.gather(*(build(term) for term in market_terms))
+        return dict(zip(market_terms, contexts))
+
+    def _get_market_data_for_area(self, area: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Get market data for a specific area"""
         try:
             with get_db_connection() as conn:
-                # Get market data for location
-                result = conn.execute(text("""
-                    SELECT * FROM market_data 
-                    WHERE location ILIKE :location
+                result = conn.execute(text(f"""
+                    SELECT {MARKET_COLUMNS} FROM market_data
+                    WHERE location ILIKE :area
                     ORDER BY created_at DESC
-                    LIMIT 5
-                """), {'location': f'%{location}%'})
-                
-                market_data = result.fetchall()
-                
-                # Get neighborhood profile
-                result = conn.execute(text("""
-                    SELECT * FROM neighborhood_profiles 
-                    WHERE name ILIKE :location
-                    LIMIT 1
-                """), {'location': f'%{location}%'})
-                
-                neighborhood = result.fetchone()
-                
-                return {
-                    'location': location,
-                    'market_data': [dict(row) for row in market_data],
-                    'neighborhood': dict(neighborhood) if neighborhood else {},
-                    'properties_in_area': await self._get_properties_in_area(location),
-                    'context_type': 'location_data',
-                    'last_updated': datetime.now().isoformat()
-                }
-                
+                    LIMIT :limit
+                """), {'area': f'%{area}%', 'limit': limit})
+
+                return [_row_dict(row) for row in result.fetchall()]
+
         except Exception as e:
-            logger.error(f"Error fetching location context: {e}")
-            return {}
-    
-    async def _fetch_market_context(self, market_term: str) -> Dict[str, Any]:
-        """Fetch market context data"""
+            logger.error(f"Error getting market data for area: {e}")
+            return []
+
+    def _get_market_data_for_term(self, market_term: str) -> List[Dict[str, Any]]:
+        """Get market data matching a market term"""
         try:
             with get_db_connection() as conn:
-                # Get market analysis data
-                result = conn.execute(text("""
-                    SELECT * FROM market_data 
+                result = conn.execute(text(f"""
+                    SELECT {MARKET_COLUMNS}, description FROM market_data
                     WHERE description ILIKE :search_term
                     ORDER BY created_at DESC
                     LIMIT 10
                 """), {'search_term': f'%{market_term}%'})
-                
-                market_data = result.fetchall()
-                
-                # Get investment insights
+
+                return [_row_dict(row) for row in result.fetchall()]
+
+        except Exception as e:
+            logger.error(f"Error getting market data: {e}")
+            return []
+
+    def _get_investment_insights(self, market_term: str) -> List[Dict[str, Any]]:
+        """Get investment insights matching a market term"""
+        try:
+            with get_db_connection() as conn:
                 result = conn.execute(text("""
-                    SELECT * FROM investment_insights 
+                    SELECT id, title, content, created_at FROM investment_insights
                     WHERE title ILIKE :search_term OR content ILIKE :search_term
                     ORDER BY created_at DESC
                     LIMIT 5
                 """), {'search_term': f'%{market_term}%'})
-                
-                insights = result.fetchall()
-                
-                return {
-                    'market_term': market_term,
-                    'market_data': [dict(row) for row in market_data],
-                    'insights': [dict(row) for row in insights],
-                    'trends': await self._get_market_trends(market_term),
-                    'context_type': 'market_analysis',
-                    'last_updated': datetime.now().isoformat()
-                }
-                
+
+                return [_row_dict(row) for row in result.fetchall()]
+
         except Exception as e:
-            logger.error(f"Error fetching market context: {e}")
-            return {}
-    
-    async def _get_market_data_for_area(self, address: str) -> List[Dict[str, Any]]:
-        """Get market data for a specific area"""
+            logger.error(f"Error getting investment insights: {e}")
+            return []
+
+    def _get_neighborhood_profile(self, location: str) -> Dict[str, Any]:
+        """Get the neighborhood profile for a location"""
         try:
             with get_db_connection() as conn:
-                result = conn.execute(text("""
-                    SELECT * FROM market_data 
-                    WHERE location ILIKE :area
-                    ORDER BY created_at DESC
-                    LIMIT 3
-                """), {'area': f'%{address.split(",")[0]}%'})
-                
-                return [dict(row) for row in result.fetchall()]
-                
+                row = conn.execute(text(f"""
+                    SELECT {NEIGHBORHOOD_COLUMNS} FROM neighborhood_profiles
+                    WHERE name ILIKE :location
+                    LIMIT 1
+                """), {'location': f'%{location}%'}).fetchone()
+
+                return _row_dict(row) if row else {}
+
         except Exception as e:
-            logger.error(f"Error getting market data for area: {e}")
-            return []
-    
-    async def _get_similar_properties(self, property_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+            logger.error(f"Error getting neighborhood profile: {e}")
+            return {}
+
+    def _get_similar_properties(self, property_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get similar properties"""
+        if property_data.get('price') is None:
+            return []
         try:
             with get_db_connection() as conn:
-                result = conn.execute(text("""
-                    SELECT * FROM properties 
-                    WHERE property_type = :property_type 
-                      AND bedrooms = :bedrooms
-                      AND price BETWEEN :min_price AND :max_price
-                      AND id != :exclude_id
-                    ORDER BY ABS(price - :target_price)
+                result = conn.execute(text(f"""
+                    SELECT {PROPERTY_COLUMNS} FROM properties p
+                    WHERE p.property_type = :property_type
+                      AND p.bedrooms = :bedrooms
+                      AND p.price BETWEEN :min_price AND :max_price
+                      AND p.id != :exclude_id
+                    ORDER BY ABS(p.price - :target_price)
                     LIMIT 3
                 """), {
                     'property_type': property_data['property_type'],
@@ -319,95 +483,91 @@ class ContextManagementService:
                     'exclude_id': property_data['id'],
                     'target_price': float(property_data['price'])
                 })
-                
-                return [dict(row) for row in result.fetchall()]
-                
+
+                return [_row_dict(row) for row in result.fetchall()]
+
         except Exception as e:
             logger.error(f"Error getting similar properties: {e}")
             return []
-    
-    async def _get_client_history(self, client_id: int) -> List[Dict[str, Any]]:
+
+    def _get_client_history(self, client_id: int) -> List[Dict[str, Any]]:
         """Get client interaction history"""
         try:
             with get_db_connection() as conn:
                 result = conn.execute(text("""
-                    SELECT * FROM client_interactions 
+                    SELECT id, interaction_type, notes, created_at FROM client_interactions
                     WHERE client_id = :client_id
                     ORDER BY created_at DESC
                     LIMIT 10
                 """), {'client_id': client_id})
-                
-                return [dict(row) for row in result.fetchall()]
-                
+
+                return [_row_dict(row) for row in result.fetchall()]
+
         except Exception as e:
             logger.error(f"Error getting client history: {e}")
             return []
-    
-    async def _get_client_preferences(self, client_id: int) -> Dict[str, Any]:
+
+    def _get_client_preferences(self, client_id: int) -> Dict[str, Any]:
         """Get client preferences"""
         try:
             with get_db_connection() as conn:
-                result = conn.execute(text("""
-                    SELECT * FROM conversation_preferences 
+                row = conn.execute(text("""
+                    SELECT user_preferences FROM conversation_preferences
                     WHERE user_id = :client_id
                     ORDER BY created_at DESC
                     LIMIT 1
-                """), {'client_id': client_id})
-                
-                row = result.fetchone()
-                return dict(row) if row else {}
-                
+                """), {'client_id': client_id}).fetchone()
+
+                return _row_dict(row) if row else {}
+
         except Exception as e:
             logger.error(f"Error getting client preferences: {e}")
             return {}
-    
-    async def _get_properties_in_area(self, location: str) -> List[Dict[str, Any]]:
+
+    def _get_properties_in_area(self, location: str) -> List[Dict[str, Any]]:
         """Get properties in a specific area"""
         try:
             with get_db_connection() as conn:
-                result = conn.execute(text("""
-                    SELECT * FROM properties 
-                    WHERE address ILIKE :location
-                    ORDER BY created_at DESC
+                result = conn.execute(text(f"""
+                    SELECT {PROPERTY_COLUMNS} FROM properties p
+                    WHERE p.location ILIKE :location
+                    ORDER BY p.created_at DESC
                     LIMIT 5
                 """), {'location': f'%{location}%'})
-                
-                return [dict(row) for row in result.fetchall()]
-                
+
+                return [_row_dict(row) for row in result.fetchall()]
+
         except Exception as e:
             logger.error(f"Error getting properties in area: {e}")
             return []
-    
-    async def _get_market_trends(self, market_term: str) -> List[Dict[str, Any]]:
-        """Get market trends"""
-        try:
-            with get_db_connection() as conn:
-                result = conn.execute(text("""
-                    SELECT * FROM market_data 
-                    WHERE description ILIKE :search_term
-                    ORDER BY created_at DESC
-                    LIMIT 5
-                """), {'search_term': f'%{market_term}%'})
-                
-                return [dict(row) for row in result.fetchall()]
-                
-        except Exception as e:
-            logger.error(f"Error getting market trends: {e}")
-            return []
-    
-    async def clear_expired_cache(self):
-        """Clear expired cache entries"""
+
+    async def clear_expired_cache(self, max_batches: int = 50) -> int:
+        """Clear expired cache entries in bounded batches; returns the number of rows deleted"""
+        now = datetime.now()
+        for key in [key for key, (expires_at, _) in self._local_cache.items() if expires_at <= now]:
+            del self._local_cache[key]
+
+        def sweep() -> int:
+            deleted = 0
+            for _ in range(max_batches):
+                with get_db_connection() as conn:
+                    count = self._sweep_expired(conn, CONTEXT_EXPIRED_SWEEP_LIMIT)
+                deleted += count
+                if count < CONTEXT_EXPIRED_SWEEP_LIMIT:
+                    break
+            return deleted
+
         try:
-            with get_db_connection() as conn:
-                conn.execute(text("""
-                    DELETE FROM context_cache 
-                    WHERE expires_at < CURRENT_TIMESTAMP
-                """))
-                
-            logger.info("Cleared expired cache entries")
-            
+            deleted = await asyncio.to_thread(sweep)
+            logger.info(f"Cleared {deleted} expired cache entries")
+            return deleted
+
         except Exception as e:
             logger.error(f"Error clearing expired cache: {e}")
+            return 0
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {'local_entries': len(self._local_cache), **self.stats}
 
 # Global instance
 context_management_service = ContextManagementService()
@@ -5,7 +5,6 @@ This module manages WebSocket connections for real-time AI insights, notificatio
 and live alerts across the Dubai Real Estate RAG System.
 """
 
-import asyncio
 import json
 import logging
 import uuid
@@ -403,18 +402,12 @@ class ConnectionManager:
 # Global connection manager instance
 connection_manager = ConnectionManager()
 
-# Background task for cleanup
-async def cleanup_task():
-    """Background task to clean up stale connections"""
-    while True:
-        try:
-            await asyncio.sleep(300)  # Run every 5 minutes
-            await connection_manager.cleanup_stale_connections()
-        except Exception as e:
-            logger.error(f"Error in cleanup task: {e}")
-
-# Start cleanup task
+# Stale connections are per-process state, so every process runs its own cleanup
 def start_cleanup_task():
-    """Start the background cleanup task"""
-    loop = asyncio.get_event_loop()
-    loop.create_task(cleanup_task())
+    """Register the cleanup job (every 5 minutes) and start the job scheduler"""
+    from app.infrastructure.queue.job_scheduler import ScheduledJob, get_job_scheduler
+    
+    scheduler = get_job_scheduler()
+    scheduler.register(ScheduledJob('websocket-cleanup', '*/5 * * * *', per_process=True,
+                                    func=connection_manager.cleanup_stale_connections))
+    scheduler.start()
@@ -0,0 +1,141 @@
+"""
+Per-agent cache of dashboard responses
+
+Entries are keyed by agent, view and period and live in one Redis hash per
+agent (dashboard:<agent_id>), so every worker shares them and invalidating an
+agent is a single DEL. Writes that change an agent's listings or leads call
+invalidate_agent_dashboard(); changes made elsewhere (other services, SQL
+run by hand) show up once the entry's TTL passes. When Redis is unavailable
+the cache falls back to a bounded per-process LRU.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.core.rate_limiter import RedisStateBackend
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TTL_SECONDS = int(os.getenv("DASHBOARD_CACHE_TTL", "60"))
+DASHBOARD_CACHE_LOCAL_ENTRIES = int(os.getenv("DASHBOARD_CACHE_LOCAL_ENTRIES", "5000"))
+
+
+class DashboardCache:
+    """Shared (Redis) cache of dashboard payloads with per-agent invalidation"""
+
+    def __init__(self, backend: Optional[RedisStateBackend] = None, ttl_seconds: int = DASHBOARD_CACHE_TTL_SECONDS,
+                 max_local_entries: int = DASHBOARD_CACHE_LOCAL_ENTRIES):
+        self.backend = backend or RedisStateBackend()
+        self.ttl_seconds = ttl_seconds
+        self.max_local_entries = max_local_entries
+        self._local: "OrderedDict[Tuple[int, str], Dict[str, Any]]" = OrderedDict()
+        self._local_by_agent: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(agent_id: int) -> str:
+        return f"dashboard:{agent_id}"
+
+    def get(self, agent_id: int, view: str, period: str) -> Optional[Dict[str, Any]]:
+        field = f"{view}:{period}"
+        entry = None
+        client = self.backend.client()
+        if client is not None:
+            try:
+                raw = client.hget(self._key(agent_id), field)
+                entry = json.loads(raw) if raw else None
+            except Exception as e:
+                self.backend.mark_down(e)
+                entry = self._get_local(agent_id, field)
+        else:
+            entry = self._get_local(agent_id, field)
+
+        # The hash TTL is refreshed by every write, so check each entry's own age
+        if entry is None or time.time() - entry["cached_at"] >= self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["payload"]
+
+    def set(self, agent_id: int, view: str, period: str, payload: Dict[str, Any]):
+        field = f"{view}:{period}"
+        entry = {"cached_at": time.time(), "payload": payload}
+        client = self.backend.client()
+        if client is not None:
+            try:
+                key = self._key(agent_id)
+                pipe = client.pipeline(transaction=False)
+                pipe.hset(key, field, json.dumps(entry, default=str))
+                pipe.expire(key, self.ttl_seconds)
+                pipe.execute()
+                return
+            except Exception as e:
+                self.backend.mark_down(e)
+        self._set_local(agent_id, field, entry)
+
+    def invalidate_agent(self, agent_id: int):
+        client = self.backend.client()
+        if client is not None:
+            try:
+                client.delete(self._key(agent_id))
+            except Exception as e:
+                self.backend.mark_down(e)
+        with self._lock:
+            for field in self._local_by_agent.pop(agent_id, set()):
+                self._local.pop((agent_id, field), None)
+
+    def _get_local(self, agent_id: int, field: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._local.get((agent_id, field))
+            if entry is not None:
+                self._local.move_to_end((agent_id, field))
+            return entry
+
+    def _set_local(self, agent_id: int, field: str, entry: Dict[str, Any]):
+        with self._lock:
+            self._local[(agent_id, field)] = entry
+            self._local.move_to_end((agent_id, field))
+            self._local_by_agent.setdefault(agent_id, set()).add(field)
+            while len(self._local) > self.max_local_entries:
+                (old_agent, old_field), _ = self._local.popitem(last=False)
+                fields = self._local_by_agent.get(old_agent)
+                if fields is not None:
+                    fields.discard(old_field)
+                    if not fields:
+                        del self._local_by_agent[old_agent]
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "local_entries": len(self._local),
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# Global dashboard cache instance
+dashboard_cache = DashboardCache()
+
+
+def get_dashboard_cache() -> DashboardCache:
+    """Get the process-wide dashboard cache"""
+    return dashboard_cache
+
+
+def invalidate_agent_dashboard(agent_id: Optional[int]):
+    """Drop every cached dashboard view of an agent after a write to their listings or leads"""
+    if agent_id is None:
+        return
+    try:
+        dashboard_cache.invalidate_agent(agent_id)
+    except Exception as e:
+        logger.error(f"Error invalidating dashboard cache for agent {agent_id}: {e}")
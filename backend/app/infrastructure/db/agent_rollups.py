@@ -0,0 +1,147 @@
+"""
+Daily per-agent listing and lead rollups for the analytics dashboards
+
+agent_daily_stats (Alembic 008) holds one row per agent and creation day.
+Triggers on properties and leads apply each insert, update and delete to
+that row as a delta, so dashboard queries sum at most a year of small rows
+instead of scanning the agent's listings and leads. reconcile() recomputes
+recent days from the base tables and runs nightly from Celery, to repair
+rows after bulk loads made with triggers disabled. It upserts from a
+REPEATABLE READ snapshot instead of locking the base tables; a trigger
+delta committed after the snapshot makes the upsert fail with a
+serialization error and the run is retried.
+"""
+
+import logging
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLUMNS = (
+    "listings_total", "listings_active", "listings_sold", "listings_rented",
+    "price_sum", "price_count", "revenue", "sold_days_sum",
+    "leads_total", "leads_qualified", "leads_viewing", "leads_offer", "leads_converted",
+)
+
+PERIOD_TOTALS_SQL = (
+    "SELECT " + ", ".join(f"COALESCE(SUM({column}), 0) AS {column}" for column in ROLLUP_COLUMNS) +
+    " FROM agent_daily_stats WHERE agent_id = :agent_id AND day >= :since"
+)
+
+RECONCILE_SQL = """
+    INSERT INTO agent_daily_stats (
+        agent_id, day, listings_total, listings_active, listings_sold, listings_rented,
+        price_sum, price_count, revenue, sold_days_sum,
+        leads_total, leads_qualified, leads_viewing, leads_offer, leads_converted
+    )
+    WITH listing_stats AS (
+        SELECT agent_id, created_at::date AS day, COUNT(*) AS listings_total,
+               COUNT(*) FILTER (WHERE listing_status IN ('live', 'active')) AS listings_active,
+               COUNT(*) FILTER (WHERE listing_status = 'sold') AS listings_sold,
+               COUNT(*) FILTER (WHERE listing_status = 'rented') AS listings_rented,
+               COALESCE(SUM(price), 0) AS price_sum, COUNT(price) AS price_count,
+               COALESCE(SUM(price) FILTER (WHERE listing_status IN ('sold', 'rented')), 0) AS revenue,
+               COALESCE(SUM(EXTRACT(DAY FROM updated_at - created_at)) FILTER (WHERE listing_status = 'sold'), 0) AS sold_days_sum
+        FROM properties
+        WHERE agent_id IS NOT NULL AND created_at >= :since
+        GROUP BY agent_id, created_at::date
+    ),
+    lead_stats AS (
+        SELECT agent_id, created_at::date AS day, COUNT(*) AS leads_total,
+               COUNT(*) FILTER (WHERE status = 'qualified') AS leads_qualified,
+               COUNT(*) FILTER (WHERE status = 'viewing') AS leads_viewing,
+               COUNT(*) FILTER (WHERE status = 'offer') AS leads_offer,
+               COUNT(*) FILTER (WHERE status = 'converted') AS leads_converted
+        FROM leads
+        WHERE agent_id IS NOT NULL AND created_at >= :since
+        GROUP BY agent_id, created_at::date
+    )
+    SELECT agent_id, day,
+           COALESCE(l.listings_total, 0), COALESCE(l.listings_active, 0),
+           COALESCE(l.listings_sold, 0), COALESCE(l.listings_rented, 0),
+           COALESCE(l.price_sum, 0), COALESCE(l.price_count, 0),
+           COALESCE(l.revenue, 0), COALESCE(l.sold_days_sum, 0),
+           COALESCE(d.leads_total, 0), COALESCE(d.leads_qualified, 0), COALESCE(d.leads_viewing, 0),
+           COALESCE(d.leads_offer, 0), COALESCE(d.leads_converted, 0)
+    FROM listing_stats l FULL OUTER JOIN lead_stats d USING (agent_id, day)
+    ON CONFLICT (agent_id, day) DO UPDATE SET
+        listings_total = EXCLUDED.listings_total,
+        listings_active = EXCLUDED.listings_active,
+        listings_sold = EXCLUDED.listings_sold,
+        listings_rented = EXCLUDED.listings_rented,
+        price_sum = EXCLUDED.price_sum,
+        price_count = EXCLUDED.price_count,
+        revenue = EXCLUDED.revenue,
+        sold_days_sum = EXCLUDED.sold_days_sum,
+        leads_total = EXCLUDED.leads_total,
+        leads_qualified = EXCLUDED.leads_qualified,
+        leads_viewing = EXCLUDED.leads_viewing,
+        leads_offer = EXCLUDED.leads_offer,
+        leads_converted = EXCLUDED.leads_converted
+"""
+
+# Rollup rows whose listings and leads have all been deleted or moved to another day
+PRUNE_SQL = """
+    DELETE FROM agent_daily_stats s
+    WHERE s.day >= :since
+      AND NOT EXISTS (SELECT 1 FROM properties p WHERE p.agent_id = s.agent_id AND p.created_at::date = s.day)
+      AND NOT EXISTS (SELECT 1 FROM leads d WHERE d.agent_id = s.agent_id AND d.created_at::date = s.day)
+"""
+
+SERIALIZATION_FAILURE = "40001"
+
+
+def period_totals(conn, agent_id: int, since: date) -> Dict[str, float]:
+    """Summed rollup columns for an agent from a day onwards (connection or Session)"""
+    row = conn.execute(text(PERIOD_TOTALS_SQL), {"agent_id": agent_id, "since": since}).fetchone()
+    return {column: float(getattr(row, column) or 0) for column in ROLLUP_COLUMNS}
+
+
+def listing_summary(totals: Dict[str, float]) -> Dict[str, Any]:
+    """Listing metrics as the dashboards report them"""
+    return {
+        "total_listings": int(totals["listings_total"]),
+        "active_listings": int(totals["listings_active"]),
+        "sold_listings": int(totals["listings_sold"]),
+        "rented_listings": int(totals["listings_rented"]),
+        "avg_price": totals["price_sum"] / totals["price_count"] if totals["price_count"] else 0,
+        "total_revenue": totals["revenue"],
+        "avg_days_on_market": totals["sold_days_sum"] / totals["listings_sold"] if totals["listings_sold"] else 0,
+    }
+
+
+def reconcile(engine_getter: Optional[Callable[[], Any]] = None, days: int = 7, attempts: int = 3) -> int:
+    """
+    Recompute the rollup rows for the last `days` days from properties and leads
+
+    Runs in one REPEATABLE READ transaction without locking the base tables.
+    If a trigger delta for a row being rewritten commits after the snapshot
+    was taken, the transaction fails with a serialization error and is
+    retried, so no delta is lost.
+
+    Returns:
+        int: Rollup rows written
+    """
+    engine = (engine_getter or _background_engine)().execution_options(isolation_level="REPEATABLE READ")
+    since = date.today() - timedelta(days=days)
+    for attempt in range(1, attempts + 1):
+        try:
+            with engine.begin() as conn:
+                written = conn.execute(text(RECONCILE_SQL), {"since": since}).rowcount
+                pruned = conn.execute(text(PRUNE_SQL), {"since": since}).rowcount
+            break
+        except DBAPIError as e:
+            if getattr(e.orig, "pgcode", None) != SERIALIZATION_FAILURE or attempt == attempts:
+                raise
+            logger.warning(f"Rollup reconcile conflicted with a concurrent write, retrying ({attempt}/{attempts})")
+    logger.info(f"Reconciled agent_daily_stats since {since}: {written} rows written, {pruned} removed")
+    return written
+
+
+def _background_engine():
+    from app.infrastructure.db.engine_registry import get_engine
+    return get_engine("background")
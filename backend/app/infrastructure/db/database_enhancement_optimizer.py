@@ -9,8 +9,9 @@ import logging
 import time
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
-from sqlalchemy import create_engine, text, MetaData, Table
+from sqlalchemy import text, MetaData, Table
 from sqlalchemy.exc import SQLAlchemyError
+from app.infrastructure.db.engine_registry import get_engine
 import json
 from datetime import datetime
 
@@ -27,7 +28,7 @@ class DatabaseEnhancementOptimizer:
     """Comprehensive database enhancement and optimization system"""
     
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
+        self.engine = get_engine("analytics", database_url)
         self.metadata = MetaData()
         
         # Enhancement results tracking
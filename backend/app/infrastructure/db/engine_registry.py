@@ -0,0 +1,224 @@
+"""
+Process-wide SQLAlchemy engine registry for Dubai Real Estate RAG System
+
+Services used to call create_engine() themselves, each getting its own default
+QueuePool, so a single worker could hold dozens of Postgres connections. All
+engines now come from here, one per named pool and database URL:
+
+- oltp:       request-path reads and writes (chat, search, CRUD)
+- analytics:  long-running aggregate and reporting queries
+- background: schedulers, monitors and other non-request work
+
+Pool sizes are configurable per pool via DB_POOL_<NAME>_SIZE,
+DB_POOL_<NAME>_MAX_OVERFLOW and DB_POOL_<NAME>_TIMEOUT. Setting
+DB_PGBOUNCER_MODE=true hands pooling to PgBouncer (transaction pooling):
+engines use NullPool and disable server-side prepared statements.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool, QueuePool
+
+from app.core.settings import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import Gauge, Counter
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+PGBOUNCER_MODE = os.getenv("DB_PGBOUNCER_MODE", "false").lower() == "true"
+POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Default sizing per named pool; overall per-worker ceiling is the sum of size + overflow
+POOL_DEFAULTS = {
+    "oltp": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10},
+    "analytics": {"pool_size": 3, "max_overflow": 2, "pool_timeout": 30},
+    "background": {"pool_size": 2, "max_overflow": 3, "pool_timeout": 60},
+}
+
+if PROMETHEUS_AVAILABLE:
+    pool_connections_gauge = Gauge(
+        'propertypro_db_pool_connections',
+        'Database pool connections by state',
+        ['pool', 'state'],
+        multiprocess_mode='livesum'
+    )
+    pool_checkouts_counter = Counter(
+        'propertypro_db_pool_checkouts',
+        'Database pool connection checkouts',
+        ['pool']
+    )
+
+
+def _pool_settings(name: str) -> Dict[str, int]:
+    defaults = POOL_DEFAULTS.get(name, POOL_DEFAULTS["oltp"])
+    prefix = f"DB_POOL_{name.upper()}_"
+    return {
+        "pool_size": int(os.getenv(prefix + "SIZE", defaults["pool_size"])),
+        "max_overflow": int(os.getenv(prefix + "MAX_OVERFLOW", defaults["max_overflow"])),
+        "pool_timeout": int(os.getenv(prefix + "TIMEOUT", defaults["pool_timeout"])),
+    }
+
+
+class PoolStats:
+    """Checkout counters for one named pool, maintained from pool events"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.connects = 0
+        self.peak_checked_out = 0
+        self.checked_out = 0
+        self.checkout_started: Dict[int, float] = {}
+        self.total_hold_ms = 0.0
+        self.returns = 0
+        self._lock = threading.Lock()
+
+    def on_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, connection_record):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            self.checkout_started[id(connection_record)] = time.perf_counter()
+        if PROMETHEUS_AVAILABLE:
+            pool_checkouts_counter.labels(pool=self.name).inc()
+            pool_connections_gauge.labels(pool=self.name, state="checked_out").inc()
+
+    def on_checkin(self, connection_record):
+        with self._lock:
+            started = self.checkout_started.pop(id(connection_record), None)
+            if started is None:
+                return
+            self.checked_out -= 1
+            self.returns += 1
+            self.total_hold_ms += (time.perf_counter() - started) * 1000
+        if PROMETHEUS_AVAILABLE:
+            pool_connections_gauge.labels(pool=self.name, state="checked_out").dec()
+
+
+class EngineRegistry:
+    """Creates one engine per (pool name, database URL) and reports pool saturation"""
+
+    def __init__(self, pgbouncer_mode: bool = PGBOUNCER_MODE):
+        self.pgbouncer_mode = pgbouncer_mode
+        self._engines: Dict[Tuple[str, str], Engine] = {}
+        self._stats: Dict[Tuple[str, str], PoolStats] = {}
+        self._lock = threading.Lock()
+
+    def get_engine(self, name: str = "oltp", database_url: Optional[str] = None) -> Engine:
+        """Return the shared engine for a named pool, creating it on first use"""
+        url = database_url or DATABASE_URL
+        key = (name, url)
+        engine = self._engines.get(key)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = self._create_engine(name, url)
+                self._engines[key] = engine
+        return engine
+
+    def _create_engine(self, name: str, url: str) -> Engine:
+        if url.startswith("sqlite"):
+            # SQLite (tests, local tools) keeps SQLAlchemy's own pool choice
+            return create_engine(url, echo=False)
+
+        connect_args: Dict[str, Any] = {"application_name": f"propertypro-{name}"}
+        if self.pgbouncer_mode:
+            # Transaction pooling: PgBouncer owns the pool, and a prepared statement
+            # may not exist on the next server connection the client is handed
+            if url.startswith("postgresql+psycopg://"):
+                connect_args["prepare_threshold"] = None
+            engine = create_engine(url, poolclass=NullPool, connect_args=connect_args, echo=False)
+            logger.info(f"Created '{name}' engine in PgBouncer mode (NullPool)")
+        else:
+            settings = _pool_settings(name)
+            engine = create_engine(
+                url,
+                poolclass=QueuePool,
+                pool_pre_ping=True,
+                pool_recycle=POOL_RECYCLE_SECONDS,
+                pool_use_lifo=True,  # Lets idle connections age out so recycle can shrink the pool
+                connect_args=connect_args,
+                echo=False,
+                **settings
+            )
+            logger.info(f"Created '{name}' engine: pool_size={settings['pool_size']}, "
+                        f"max_overflow={settings['max_overflow']}")
+
+        self._attach_pool_events(name, url, engine)
+        return engine
+
+    def _attach_pool_events(self, name: str, url: str, engine: Engine):
+        stats = PoolStats(name)
+        self._stats[(name, url)] = stats
+        event.listen(engine, "connect", lambda dbapi_conn, record: stats.on_connect())
+        event.listen(engine, "checkout", lambda dbapi_conn, record, proxy: stats.on_checkout(record))
+        event.listen(engine, "checkin", lambda dbapi_conn, record: stats.on_checkin(record))
+
+    def get_pool_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-pool size, usage and saturation (checked-out share of the pool's ceiling)"""
+        report = {}
+        for (name, url), engine in list(self._engines.items()):
+            pool = engine.pool
+            stats = self._stats.get((name, url))
+            label = name if len([key for key in self._engines if key[0] == name]) == 1 else f"{name}@{engine.url.database}"
+
+            entry: Dict[str, Any] = {
+                "pool_class": type(pool).__name__,
+                "database": engine.url.database,
+            }
+            if isinstance(pool, QueuePool):
+                capacity = pool.size() + pool._max_overflow
+                checked_out = pool.checkedout()
+                entry.update({
+                    "pool_size": pool.size(),
+                    "max_overflow": pool._max_overflow,
+                    "checked_out": checked_out,
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+                })
+            if stats:
+                entry.update({
+                    "checkouts": stats.checkouts,
+                    "connects": stats.connects,
+                    "peak_checked_out": stats.peak_checked_out,
+                    "avg_hold_ms": round(stats.total_hold_ms / stats.returns, 2) if stats.returns else 0.0,
+                })
+            report[label] = entry
+        return report
+
+    def dispose_all(self):
+        """Close every pooled connection (process shutdown, or after fork in a worker)"""
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+
+
+# Global registry instance
+engine_registry = EngineRegistry()
+
+
+def get_engine(name: str = "oltp", database_url: Optional[str] = None) -> Engine:
+    """Shared engine for a named pool ('oltp', 'analytics' or 'background')"""
+    return engine_registry.get_engine(name, database_url)
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    return engine_registry.get_pool_stats()
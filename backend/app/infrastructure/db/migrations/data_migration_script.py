@@ -8,8 +8,9 @@ import os
 import logging
 import asyncio
 from typing import Dict, List, Any, Optional
-from sqlalchemy import create_engine, text, MetaData, Table
+from sqlalchemy import text, MetaData, Table
 from sqlalchemy.orm import sessionmaker
+from app.infrastructure.db.engine_registry import get_engine
 from datetime import datetime, timedelta
 import json
 import random
@@ -20,7 +21,7 @@ class DataMigrationManager:
     """Manages data migration for schema enhancements"""
     
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
+        self.engine = get_engine("background", database_url)
         self.Session = sessionmaker(bind=self.engine)
         self.metadata = MetaData()
         
@@ -0,0 +1,463 @@
+"""
+Process-wide LLM client
+
+Callers used to configure the SDK and build a fresh GenerativeModel for every
+request, sending the full system prompt each time. One LLMClient per process
+(get_llm_client) now sits in front of the model and:
+
+- keeps one configured model per (model, system prefix) alive in an LRU, so
+  the SDK client, its HTTP session and the system instruction are reused
+- sends stable system-prompt prefixes as the system instruction, ahead of the
+  request-specific prompt, and creates explicit cached content for prefixes of
+  at least LLM_PREFIX_CACHE_MIN_TOKENS, so the provider can bill them as cached
+- coalesces identical prompts that are in flight at the same time into one call
+- enforces a token budget per tenant per minute (GCRA in Redis, shared by all
+  workers like the API rate limits) plus per-tenant and global concurrency caps.
+  Handles from llm_model() without a tenant are charged to "system:<caller>", so
+  a background job such as the daily briefing only spends its own budget.
+  LLM_TENANT_LIMITS overrides the limits of individual tenants
+- records latency and prompt/completion/cached token counts per model and caller
+
+Backends wrap Gemini or any object with generate_content(prompt), such as the
+OpenAI provider or a local fake model in tests. Code written against a model
+object can use llm_model(), which exposes generate_content() on the client.
+"""
+
+import os
+import json
+import asyncio
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, replace
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import google.generativeai as genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_TENANT_CONCURRENCY = int(os.getenv("LLM_TENANT_CONCURRENCY", "4"))
+LLM_TENANT_TOKENS_PER_MINUTE = int(os.getenv("LLM_TENANT_TOKENS_PER_MINUTE", "200000"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+LLM_PREFIX_CACHE_SIZE = int(os.getenv("LLM_PREFIX_CACHE_SIZE", "64"))
+LLM_PREFIX_CACHE_TTL_SECONDS = int(os.getenv("LLM_PREFIX_CACHE_TTL_SECONDS", "3600"))
+LLM_PREFIX_CACHE_MIN_TOKENS = int(os.getenv("LLM_PREFIX_CACHE_MIN_TOKENS", "32768"))
+
+# Per-tenant overrides: "tenant=concurrency:tokens_per_minute", comma separated
+LLM_TENANT_LIMITS = os.getenv("LLM_TENANT_LIMITS", "system:daily_briefing=4:400000")
+
+DEFAULT_TENANT = "default"
+SYSTEM_TENANT_PREFIX = "system:"
+
+if PROMETHEUS_AVAILABLE:
+    llm_request_histogram = Histogram(
+        'propertypro_llm_request_seconds',
+        'LLM call latency by model, caller and outcome',
+        ['model', 'caller', 'outcome'],
+        buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+    )
+    llm_tokens_counter = Counter(
+        'propertypro_llm_tokens_total',
+        'LLM tokens by model, caller and kind (prompt, completion, cached)',
+        ['model', 'caller', 'kind']
+    )
+    llm_coalesced_counter = Counter(
+        'propertypro_llm_coalesced_requests_total',
+        'Identical in-flight prompts answered by another request\'s LLM call',
+        ['caller']
+    )
+    llm_rejected_counter = Counter(
+        'propertypro_llm_rejected_requests_total',
+        'LLM requests rejected by tenant limits',
+        ['reason']
+    )
+
+
+def parse_tenant_limits(spec: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """{tenant: (concurrency, tokens_per_minute)} from "tenant=concurrency:tokens,..." """
+    limits = {}
+    for entry in (spec or "").split(","):
+        if not entry.strip():
+            continue
+        try:
+            tenant, values = entry.rsplit("=", 1)
+            concurrency, tokens = values.split(":")
+            limits[tenant.strip()] = (int(concurrency), int(tokens))
+        except ValueError:
+            logger.error(f"Ignoring malformed LLM tenant limit: {entry!r}")
+    return limits
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text or "") // 4 + 1
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+class LLMBudgetExceeded(Exception):
+    """A tenant is over its token budget or has too many requests waiting"""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class LLMResult:
+    """Text and usage of one generation"""
+    text: str
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    latency: float = 0.0
+    coalesced: bool = False
+
+
+def _result_from_response(response: Any, model: str, prompt: str, system_prefix: Optional[str]) -> LLMResult:
+    """LLMResult from an SDK response, estimating usage the response does not report"""
+    text = getattr(response, "text", None) or getattr(response, "content", None) or ""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt) + (estimate_tokens(system_prefix) if system_prefix else 0)
+    completion_tokens = getattr(usage, "candidates_token_count", None)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(text)
+    return LLMResult(
+        text=text,
+        model=model,
+        prompt_tokens=int(prompt_tokens),
+        completion_tokens=int(completion_tokens),
+        cached_tokens=int(getattr(usage, "cached_content_token_count", 0) or 0),
+    )
+
+
+class GeminiBackend:
+    """Gemini models configured once, one per system prefix"""
+
+    def __init__(self, api_key: str, model_name: str, cache_size: int = LLM_PREFIX_CACHE_SIZE,
+                 cache_ttl: int = LLM_PREFIX_CACHE_TTL_SECONDS, cache_min_tokens: int = LLM_PREFIX_CACHE_MIN_TOKENS):
+        if not GENAI_AVAILABLE:
+            raise RuntimeError("google-generativeai is not installed")
+        genai.configure(api_key=api_key)
+        self.model_name = model_name
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.cache_min_tokens = cache_min_tokens
+        # prefix digest -> (model, monotonic expiry)
+        self._models: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+
+    def _model_for(self, system_prefix: Optional[str]):
+        key = _digest(system_prefix or "")
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._models.move_to_end(key)
+                self.prefix_hits += 1
+                return entry[0]
+            self.prefix_misses += 1
+
+        model, expires_at = self._build_model(system_prefix)
+        with self._lock:
+            self._models[key] = (model, expires_at)
+            self._models.move_to_end(key)
+            while len(self._models) > self.cache_size:
+                self._models.popitem(last=False)
+        return model
+
+    def _build_model(self, system_prefix: Optional[str]) -> Tuple[Any, float]:
+        if not system_prefix:
+            return genai.GenerativeModel(self.model_name), float("inf")
+        if estimate_tokens(system_prefix) >= self.cache_min_tokens:
+            try:
+                cached = genai.caching.CachedContent.create(
+                    model=self.model_name,
+                    system_instruction=system_prefix,
+                    ttl=timedelta(seconds=self.cache_ttl),
+                )
+                # Rebuilt a little before the provider expires the cached content
+                return genai.GenerativeModel.from_cached_content(cached_content=cached), \
+                    time.monotonic() + self.cache_ttl * 0.9
+            except Exception as e:
+                logger.warning(f"Explicit prompt caching unavailable for {self.model_name}: {e}")
+        return genai.GenerativeModel(self.model_name, system_instruction=system_prefix), float("inf")
+
+    def generate(self, prompt: str, system_prefix: Optional[str] = None,
+                 generation_config: Optional[Dict[str, Any]] = None) -> LLMResult:
+        model = self._model_for(system_prefix)
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        response = model.generate_content(prompt, **kwargs)
+        return _result_from_response(response, self.model_name, prompt, system_prefix)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.prefix_hits + self.prefix_misses
+        return {
+            "prefix_models": len(self._models),
+            "prefix_hit_rate": round(self.prefix_hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class ProviderBackend:
+    """Any object with generate_content(prompt): the OpenAI provider, local fake models
+
+    The prefix is sent first, which is what provider-side prefix caching keys on.
+    """
+
+    def __init__(self, provider: Any, model_name: Optional[str] = None):
+        self.provider = provider
+        self.model_name = model_name or getattr(provider, "_model", None) or type(provider).__name__
+
+    def generate(self, prompt: str, system_prefix: Optional[str] = None,
+                 generation_config: Optional[Dict[str, Any]] = None) -> LLMResult:
+        full_prompt = f"{system_prefix}\n\n{prompt}" if system_prefix else prompt
+        response = self.provider.generate_content(full_prompt)
+        return _result_from_response(response, self.model_name, prompt, system_prefix)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class LLMClient:
+    """Shared entry point for LLM calls with coalescing, tenant limits and metrics"""
+
+    def __init__(self, backend: Any, limiter: Optional[RateLimiter] = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 tenant_concurrency: int = LLM_TENANT_CONCURRENCY,
+                 tenant_tokens_per_minute: int = LLM_TENANT_TOKENS_PER_MINUTE,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS,
+                 tenant_limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.backend = backend
+        self.limiter = limiter or RateLimiter(key_prefix="llm_tokens")
+        self.tenant_concurrency = tenant_concurrency
+        self.tenant_tokens_per_minute = tenant_tokens_per_minute
+        self.queue_timeout = queue_timeout
+        self.tenant_limits = parse_tenant_limits(LLM_TENANT_LIMITS) if tenant_limits is None else tenant_limits
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._tenant_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.rejected = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.latency_total = 0.0
+
+    @property
+    def model_name(self) -> str:
+        return self.backend.model_name
+
+    def generate(self, prompt: str, system_prefix: Optional[str] = None, tenant: Optional[str] = None,
+                 caller: str = "default", generation_config: Optional[Dict[str, Any]] = None) -> LLMResult:
+        """Generate text; identical concurrent requests from the same tenant share one call"""
+        tenant = tenant or DEFAULT_TENANT
+        # The tenant is part of the key so every tenant is charged for, and sees errors of, its own call
+        key = _digest(self.model_name, tenant, system_prefix or "", prompt,
+                      json.dumps(generation_config or {}, sort_keys=True, default=str))
+        with self._lock:
+            leader = self._in_flight.get(key)
+            if leader is None:
+                future = self._in_flight[key] = Future()
+
+        if leader is not None:
+            self.coalesced += 1
+            if PROMETHEUS_AVAILABLE:
+                llm_coalesced_counter.labels(caller=caller).inc()
+            return replace(leader.result(), coalesced=True)
+
+        try:
+            result = self._call(prompt, system_prefix, tenant, caller, generation_config)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        return self.generate(prompt, **kwargs).text
+
+    def _call(self, prompt: str, system_prefix: Optional[str], tenant: str, caller: str,
+              generation_config: Optional[Dict[str, Any]]) -> LLMResult:
+        tenant_slots = self._tenant_semaphore(tenant)
+        if not tenant_slots.acquire(timeout=self.queue_timeout):
+            self._reject("concurrency", f"Tenant {tenant} has too many LLM requests in flight")
+        try:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                self._reject("concurrency", "Too many LLM requests in flight")
+            try:
+                # Prompt tokens are charged once a slot is held, so a call rejected for concurrency
+                # costs nothing; completion tokens are charged once they are known
+                self._charge(tenant, estimate_tokens(prompt) + (estimate_tokens(system_prefix) if system_prefix else 0))
+                started = time.perf_counter()
+                try:
+                    result = self.backend.generate(prompt, system_prefix, generation_config)
+                except Exception:
+                    self.errors += 1
+                    if PROMETHEUS_AVAILABLE:
+                        llm_request_histogram.labels(model=self.model_name, caller=caller, outcome="error") \
+                            .observe(time.perf_counter() - started)
+                    raise
+                result.latency = time.perf_counter() - started
+            finally:
+                self._slots.release()
+        finally:
+            tenant_slots.release()
+
+        self._charge(tenant, result.completion_tokens, enforce=False)
+        self._record(result, caller)
+        return result
+
+    def _limits(self, tenant: str) -> Tuple[int, int]:
+        """(concurrency, tokens per minute) of a tenant"""
+        return self.tenant_limits.get(tenant, (self.tenant_concurrency, self.tenant_tokens_per_minute))
+
+    def _tenant_semaphore(self, tenant: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            slots = self._tenant_slots.get(tenant)
+            if slots is None:
+                slots = self._tenant_slots[tenant] = threading.BoundedSemaphore(self._limits(tenant)[0])
+            return slots
+
+    def _charge(self, tenant: str, tokens: int, enforce: bool = True):
+        """Charge tokens against the tenant's per-minute budget"""
+        tokens_per_minute = self._limits(tenant)[1]
+        if tokens_per_minute <= 0 or tokens <= 0:
+            return
+        # A single request larger than the whole budget still gets through on an idle budget
+        cost = min(tokens, tokens_per_minute)
+        allowed, _, retry_after = self.limiter.check(tenant, 60, tokens_per_minute, cost=cost)
+        if enforce and not allowed:
+            self._reject("tokens", f"Tenant {tenant} is over its LLM token budget", retry_after)
+
+    def _reject(self, reason: str, message: str, retry_after: float = 0.0):
+        self.rejected += 1
+        if PROMETHEUS_AVAILABLE:
+            llm_rejected_counter.labels(reason=reason).inc()
+        raise LLMBudgetExceeded(message, retry_after)
+
+    def _record(self, result: LLMResult, caller: str):
+        self.requests += 1
+        self.prompt_tokens += result.prompt_tokens
+        self.completion_tokens += result.completion_tokens
+        self.cached_tokens += result.cached_tokens
+        self.latency_total += result.latency
+        if PROMETHEUS_AVAILABLE:
+            llm_request_histogram.labels(model=result.model, caller=caller, outcome="ok").observe(result.latency)
+            for kind, count in (("prompt", result.prompt_tokens), ("completion", result.completion_tokens),
+                                ("cached", result.cached_tokens)):
+                if count:
+                    llm_tokens_counter.labels(model=result.model, caller=caller, kind=kind).inc(count)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+            "avg_latency": round(self.latency_total / self.requests, 4) if self.requests else 0.0,
+            **self.backend.get_stats(),
+        }
+
+
+class LLMModel:
+    """generate_content() view of the shared client for code written against a model object"""
+
+    def __init__(self, client: Optional[LLMClient] = None, system_prefix: Optional[str] = None,
+                 tenant: Optional[str] = None, caller: str = "default"):
+        self._client = client
+        self.system_prefix = system_prefix
+        self.tenant = tenant
+        self.caller = caller
+
+    @property
+    def client(self) -> LLMClient:
+        # Resolved on first use, so importing a module that holds a model needs no API key
+        return self._client or get_llm_client()
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None, **kwargs):
+        result = self.client.generate(prompt, system_prefix=self.system_prefix, tenant=self.tenant,
+                                      caller=self.caller, generation_config=generation_config)
+        return SimpleNamespace(
+            text=result.text,
+            usage_metadata=SimpleNamespace(
+                prompt_token_count=result.prompt_tokens,
+                candidates_token_count=result.completion_tokens,
+                cached_content_token_count=result.cached_tokens,
+            ),
+        )
+
+    async def generate_content_async(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None, **kwargs):
+        # The client blocks on slots and the provider call, so it runs off the event loop
+        return await asyncio.to_thread(self.generate_content, prompt, generation_config)
+
+
+def _default_backend():
+    """Gemini when GOOGLE_API_KEY is set, otherwise the OpenAI provider"""
+    from app.core.settings import GOOGLE_API_KEY, AI_MODEL
+
+    if GOOGLE_API_KEY and GENAI_AVAILABLE:
+        return GeminiBackend(GOOGLE_API_KEY, AI_MODEL)
+    from ai_provider import get_ai_provider
+    return ProviderBackend(get_ai_provider())
+
+
+# Global LLM client instance
+_llm_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Get the process-wide LLM client"""
+    global _llm_client
+    if _llm_client is None:
+        with _client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient(_default_backend())
+    return _llm_client
+
+
+def set_llm_client(client: Optional[LLMClient]):
+    """Replace the process-wide client (e.g. with a local fake model backend)"""
+    global _llm_client
+    with _client_lock:
+        _llm_client = client
+
+
+def llm_model(caller: str = "default", system_prefix: Optional[str] = None,
+              tenant: Optional[str] = None) -> LLMModel:
+    """Model-like handle on the shared client; without a tenant, calls are charged to system:<caller>"""
+    return LLMModel(system_prefix=system_prefix, tenant=tenant or f"{SYSTEM_TENANT_PREFIX}{caller}", caller=caller)
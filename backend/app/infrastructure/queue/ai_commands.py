@@ -14,7 +14,7 @@ import time
 logger = logging.getLogger(__name__)
 
 # Import the Celery app
-from celery_app import celery_app
+from app.infrastructure.queue.celery_app import celery_app
 
 @celery_app.task(bind=True, name='tasks.ai_commands.execute_ai_command')
 def execute_ai_command(self, command: str, user_id: int, context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
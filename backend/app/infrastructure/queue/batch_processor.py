@@ -13,6 +13,8 @@ import time
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from collections import deque
+import itertools
 import threading
 from queue import Queue
 import os
@@ -46,11 +48,13 @@ class BatchJob:
 class BatchProcessor:
     """Batch processor for efficient data processing"""
     
-    def __init__(self, max_workers: int = 4, batch_size: int = 100):
+    def __init__(self, max_workers: int = 4, batch_size: int = 100, max_history: int = 100):
         self.max_workers = max_workers
         self.batch_size = batch_size
         self.active_jobs: Dict[str, BatchJob] = {}
-        self.job_history: List[BatchJob] = []
+        # Finished jobs (without their input data), newest last
+        self.job_history: deque = deque(maxlen=max_history)
+        self._job_sequence = itertools.count(1)
         self.progress_callbacks: Dict[str, Callable] = {}
         self._lock = threading.Lock()
         self._executor = ThreadPoolExecutor(max_workers=max_workers)
@@ -59,7 +63,7 @@ class BatchProcessor:
     
     def create_batch_job(self, job_type: str, data: List[Dict[str, Any]], metadata: Dict[str, Any] = None) -> str:
         """Create a new batch processing job"""
-        job_id = f"{job_type}_{int(time.time())}_{len(self.active_jobs)}"
+        job_id = f"{job_type}_{int(time.time())}_{next(self._job_sequence)}"
         
         job = BatchJob(
             job_id=job_id,
@@ -150,10 +154,22 @@ class BatchProcessor:
         # Clean up
         if job_id in self.progress_callbacks:
             del self.progress_callbacks[job_id]
+        self._archive_job(job_id)
+    
+    def _archive_job(self, job_id: str) -> None:
+        """Move a finished job into the bounded history and release its input data"""
+        with self._lock:
+            job = self.active_jobs.pop(job_id, None)
+            if job is not None:
+                job.data = []
+                self.job_history.append(job)
     
     def get_job_status(self, job_id: str) -> Optional[BatchJob]:
         """Get current status of a job"""
-        return self.active_jobs.get(job_id)
+        job = self.active_jobs.get(job_id)
+        if job is None:
+            job = next((job for job in reversed(self.job_history) if job.job_id == job_id), None)
+        return job
     
     def cancel_job(self, job_id: str) -> bool:
         """Cancel a running job"""
@@ -181,17 +197,16 @@ class BatchProcessor:
             
             for job_id, job in self.active_jobs.items():
                 if job.status in [BatchStatus.COMPLETED, BatchStatus.FAILED, BatchStatus.CANCELLED]:
+                    job.data = []
                     completed_jobs.append(job)
                 else:
                     active_jobs[job_id] = job
             
-            # Add to history
+            # Add to history, keeping the most recent max_history jobs
+            if max_history != self.job_history.maxlen:
+                self.job_history = deque(self.job_history, maxlen=max_history)
             self.job_history.extend(completed_jobs)
             
-            # Maintain history size
-            if len(self.job_history) > max_history:
-                self.job_history = self.job_history[-max_history:]
-            
             # Update active jobs
             self.active_jobs = active_jobs
             
@@ -18,11 +18,12 @@ def create_celery_app():
     app = Celery('rag_system')
     
     # Load configuration
-    app.config_from_object('celeryconfig')
+    app.config_from_object('app.infrastructure.queue.celeryconfig')
     
     # Auto-discover tasks
     app.autodiscover_tasks([
-        'tasks.ai_commands',
+        'app.infrastructure.queue.ai_commands',
+        'app.infrastructure.queue.scheduled_jobs',
         'tasks.reports', 
         'tasks.ml_training',
         'tasks.data_processing'
@@ -35,7 +36,8 @@ celery_app = create_celery_app()
 
 # Import tasks to ensure they're registered
 try:
-    from tasks.ai_commands import *
+    from app.infrastructure.queue.ai_commands import *
+    from app.infrastructure.queue.scheduled_jobs import *
     from tasks.reports import *
     from tasks.ml_training import *
     from tasks.data_processing import *
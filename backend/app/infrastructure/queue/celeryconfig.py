@@ -31,6 +31,8 @@ task_routes = {
     'tasks.reports.*': {'queue': 'reports'},
     'tasks.ml_training.*': {'queue': 'ml_training'},
     'tasks.data_processing.*': {'queue': 'data_processing'},
+    # LLM-heavy jobs dispatched by the job scheduler
+    'tasks.scheduled_jobs.*': {'queue': 'ai_commands'},
 }
 
 # Queue Configuration
@@ -55,6 +57,22 @@ task_queues = {
     },
 }
 
+# Periodic Tasks
+beat_schedule = {
+    'train-market-models': {
+        'task': 'tasks.ml_training.train_market_models',
+        'schedule': float(os.getenv('ML_TRAINING_INTERVAL_SECONDS', 86400)),
+    },
+    'refresh-market-series': {
+        'task': 'tasks.data_processing.refresh_market_series',
+        'schedule': float(os.getenv('MARKET_SERIES_REFRESH_SECONDS', 900)),
+    },
+    'reconcile-agent-daily-stats': {
+        'task': 'tasks.data_processing.reconcile_agent_daily_stats',
+        'schedule': float(os.getenv('AGENT_STATS_RECONCILE_SECONDS', 86400)),
+    },
+}
+
 # Worker Configuration
 worker_prefetch_multiplier = 1
 worker_max_tasks_per_child = 1000
@@ -0,0 +1,331 @@
+"""
+Distributed cron scheduler for periodic background jobs
+
+Any number of processes can run the scheduler loop. Each cron slot of a
+shared job (e.g. nurture-identification at 2024-05-01 07:00 Asia/Dubai) is
+claimed in Redis with SET NX before it runs, so one process runs it:
+
+    scheduler:claim:<job>:<slot>    running:<owner>  (lease, renewed while running)
+                                    done / failed    (kept for SCHEDULER_CLAIM_RETENTION)
+    scheduler:watermark:<job>       latest slot that has been claimed
+
+A runner that dies mid-job stops renewing its lease, and the slot is claimed
+again once the lease expires. Slots that passed while no scheduler could run
+(deploys, Redis outages) are caught up from the watermark: the most recent
+missed slot runs once and older ones are counted as skipped. While Redis is
+unavailable no shared job starts.
+
+Per-process jobs (housekeeping of in-memory state such as WebSocket
+connections) use the same triggers and metrics but run in every process
+without a claim. Heavy jobs can name a Celery task and are then only
+dispatched from here.
+"""
+
+import os
+import time
+import uuid
+import socket
+import asyncio
+import inspect
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.rate_limiter import RedisStateBackend
+
+logger = logging.getLogger(__name__)
+
+try:
+    from apscheduler.triggers.cron import CronTrigger
+    CRON_AVAILABLE = True
+except ImportError:
+    CRON_AVAILABLE = False
+    logger.warning("APScheduler not available. Cron jobs cannot be scheduled.")
+
+try:
+    from prometheus_client import Counter, Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "15"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+SCHEDULER_CLAIM_RETENTION = int(os.getenv("SCHEDULER_CLAIM_RETENTION", str(7 * 86400)))
+SCHEDULER_TIMEZONE = os.getenv("SCHEDULER_TIMEZONE", "Asia/Dubai")
+
+if PROMETHEUS_AVAILABLE:
+    scheduled_job_histogram = Histogram(
+        'propertypro_scheduled_job_seconds',
+        'Scheduled job run time by job and outcome',
+        ['job', 'outcome'],
+        buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 1800, 3600)
+    )
+    scheduled_job_skipped_counter = Counter(
+        'propertypro_scheduled_job_skipped_slots_total',
+        'Cron slots coalesced into a later run',
+        ['job']
+    )
+
+
+@dataclass
+class ScheduledJob:
+    """A cron-triggered job; func may be sync or async"""
+    name: str
+    cron: str
+    func: Optional[Callable[[], Any]] = None
+    celery_task: Optional[str] = None
+    celery_kwargs: Dict[str, Any] = field(default_factory=dict)
+    timezone: str = SCHEDULER_TIMEZONE
+    per_process: bool = False
+    catch_up: bool = True
+    lease_seconds: int = SCHEDULER_LEASE_SECONDS
+
+    def __post_init__(self):
+        if self.func is None and self.celery_task is None:
+            raise ValueError(f"Job {self.name} needs a function or a Celery task")
+        self.trigger = CronTrigger.from_crontab(self.cron, timezone=self.timezone) if CRON_AVAILABLE else None
+
+    def slots_between(self, after: datetime, until: datetime) -> List[datetime]:
+        """Fire times in (after, until]"""
+        slots = []
+        fire = self.trigger.get_next_fire_time(None, after + timedelta(microseconds=1))
+        while fire is not None and fire <= until:
+            slots.append(fire)
+            fire = self.trigger.get_next_fire_time(None, fire + timedelta(microseconds=1))
+        return slots
+
+
+class JobStats:
+    """Run counters and the latest outcome of one job in this process"""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.skipped_slots = 0
+        self.last_slot: Optional[str] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def summary(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class JobScheduler:
+    """Cron triggers with per-slot leases in Redis and missed-run catch-up"""
+
+    def __init__(self, backend: Optional[RedisStateBackend] = None, tick_seconds: float = SCHEDULER_TICK_SECONDS,
+                 claim_retention: int = SCHEDULER_CLAIM_RETENTION, celery_app=None):
+        self.backend = backend or RedisStateBackend()
+        self.tick_seconds = tick_seconds
+        self.claim_retention = claim_retention
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, ScheduledJob] = {}
+        self.stats: Dict[str, JobStats] = {}
+        self._celery_app = celery_app
+        self._local_watermarks: Dict[str, datetime] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def register(self, job: ScheduledJob) -> ScheduledJob:
+        """Add or replace a job"""
+        if not CRON_AVAILABLE:
+            logger.error(f"Cannot register job {job.name}: APScheduler not available")
+            return job
+        self.jobs[job.name] = job
+        self.stats.setdefault(job.name, JobStats())
+        return job
+
+    # Loop
+
+    def start(self) -> Optional[asyncio.Task]:
+        """Run the scheduler loop in the current event loop (once per process)"""
+        if self._loop_task is None or self._loop_task.done():
+            self._loop_task = asyncio.get_running_loop().create_task(self.run_forever())
+            logger.info(f"Job scheduler started with {len(self.jobs)} jobs ({self.owner})")
+        return self._loop_task
+
+    def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+            logger.info("Job scheduler stopped")
+
+    async def run_forever(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Error in job scheduler tick: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+    async def tick(self, now: Optional[datetime] = None) -> List[str]:
+        """Start every job with a due slot; returns the names of jobs started here"""
+        now = now or datetime.now(timezone.utc)
+        started = []
+        for job in list(self.jobs.values()):
+            if job.name in self._running and not self._running[job.name].done():
+                continue
+            slot = self._local_due_slot(job, now) if job.per_process else self._claim_due_slot(job, now)
+            if slot is not None:
+                self._running[job.name] = asyncio.create_task(self._run(job, slot))
+                started.append(job.name)
+        return started
+
+    async def wait_idle(self):
+        """Wait for the runs started so far (tests, shutdown)"""
+        pending = [task for task in self._running.values() if not task.done()]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # Slot selection
+
+    def _pick_slot(self, job: ScheduledJob, watermark: datetime, now: datetime):
+        """(slot to run or None, latest due slot or None) for the slots after the watermark"""
+        slots = job.slots_between(watermark, now)
+        if not slots:
+            return None, None
+        latest = slots[-1]
+        missed = len(slots) - 1
+        run = latest
+        if not job.catch_up and now - latest > timedelta(seconds=max(self.tick_seconds * 2, 60)):
+            missed += 1
+            run = None
+        if missed:
+            self.stats[job.name].skipped_slots += missed
+            if PROMETHEUS_AVAILABLE:
+                scheduled_job_skipped_counter.labels(job=job.name).inc(missed)
+            logger.warning(f"Job {job.name}: {missed} missed slot(s) skipped")
+        return run, latest
+
+    def _local_due_slot(self, job: ScheduledJob, now: datetime) -> Optional[datetime]:
+        watermark = self._local_watermarks.setdefault(job.name, now)
+        slot, _ = self._pick_slot(job, watermark, now)
+        self._local_watermarks[job.name] = now
+        return slot
+
+    def _claim_due_slot(self, job: ScheduledJob, now: datetime) -> Optional[datetime]:
+        client = self.backend.client()
+        if client is None:
+            return None
+        watermark_key = f"scheduler:watermark:{job.name}"
+        try:
+            raw = client.get(watermark_key)
+            if raw is None:
+                # First deployment of this job: start from now rather than back-filling history
+                client.set(watermark_key, now.isoformat(), nx=True)
+                return None
+            watermark = datetime.fromisoformat(raw)
+            slot, latest = self._pick_slot(job, watermark, now)
+            if latest is None:
+                return self._reclaim_expired(client, job, watermark, now)
+
+            # Advance the watermark whether or not this process wins the slot
+            client.set(watermark_key, latest.isoformat())
+            if slot is None:
+                # Mark a skipped slot, so it is not mistaken for a crashed run later
+                client.set(self._claim_key(job, latest), "skipped", nx=True, ex=self.claim_retention)
+                return None
+            if client.set(self._claim_key(job, slot), f"running:{self.owner}", nx=True, ex=job.lease_seconds):
+                return slot
+            return None
+        except Exception as e:
+            self.backend.mark_down(e)
+            return None
+
+    def _reclaim_expired(self, client, job: ScheduledJob, slot: datetime, now: datetime) -> Optional[datetime]:
+        """
+        Claim the latest slot again if its claim key is gone: finished runs keep
+        theirs for the retention period, so only a runner that stopped renewing
+        its lease (crashed) leaves the slot unclaimed
+        """
+        if now - slot > timedelta(seconds=self.claim_retention) or \
+                job.slots_between(slot - timedelta(microseconds=1), slot) != [slot]:
+            return None
+        if client.set(self._claim_key(job, slot), f"running:{self.owner}", nx=True, ex=job.lease_seconds):
+            logger.warning(f"Job {job.name}: re-claimed slot {slot.isoformat()} after an expired lease")
+            return slot
+        return None
+
+    @staticmethod
+    def _claim_key(job: ScheduledJob, slot: datetime) -> str:
+        return f"scheduler:claim:{job.name}:{slot.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}"
+
+    # Running
+
+    async def _run(self, job: ScheduledJob, slot: datetime):
+        stats = self.stats[job.name]
+        renewer = None if job.per_process else asyncio.create_task(self._renew_lease(job, slot))
+        started = time.perf_counter()
+        outcome = "done"
+        try:
+            if job.celery_task:
+                self._dispatch_to_celery(job)
+            elif inspect.iscoroutinefunction(job.func):
+                await job.func()
+            else:
+                await asyncio.to_thread(job.func)
+        except Exception as e:
+            outcome = "failed"
+            stats.failures += 1
+            stats.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed for slot {slot.isoformat()}: {e}")
+        finally:
+            if renewer is not None:
+                renewer.cancel()
+
+        duration = time.perf_counter() - started
+        stats.runs += 1
+        stats.last_slot = slot.isoformat()
+        stats.last_duration_ms = round(duration * 1000, 2)
+        if PROMETHEUS_AVAILABLE:
+            scheduled_job_histogram.labels(job=job.name, outcome=outcome).observe(duration)
+        if not job.per_process:
+            self._finish_claim(job, slot, outcome)
+        logger.info(f"Scheduled job {job.name} ({slot.isoformat()}) {outcome} in {duration:.2f}s")
+
+    def _dispatch_to_celery(self, job: ScheduledJob):
+        celery_app = self._celery_app
+        if celery_app is None:
+            from app.infrastructure.queue.celery_app import celery_app
+        celery_app.send_task(job.celery_task, kwargs=job.celery_kwargs)
+
+    async def _renew_lease(self, job: ScheduledJob, slot: datetime):
+        key = self._claim_key(job, slot)
+        while True:
+            await asyncio.sleep(max(job.lease_seconds / 3, 1))
+            client = self.backend.client()
+            if client is None:
+                continue
+            try:
+                if client.get(key) == f"running:{self.owner}":
+                    client.expire(key, job.lease_seconds)
+            except Exception as e:
+                self.backend.mark_down(e)
+
+    def _finish_claim(self, job: ScheduledJob, slot: datetime, outcome: str):
+        client = self.backend.client()
+        if client is None:
+            return
+        try:
+            client.set(self._claim_key(job, slot), outcome, ex=self.claim_retention)
+        except Exception as e:
+            self.backend.mark_down(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "owner": self.owner,
+            "running": self._loop_task is not None and not self._loop_task.done(),
+            "jobs": {name: {"cron": job.cron, "timezone": job.timezone, "per_process": job.per_process,
+                            "celery_task": job.celery_task, **self.stats[name].summary()}
+                     for name, job in self.jobs.items()},
+        }
+
+
+# Global job scheduler instance
+job_scheduler = JobScheduler()
+
+
+def get_job_scheduler() -> JobScheduler:
+    """Get the process-wide job scheduler"""
+    return job_scheduler
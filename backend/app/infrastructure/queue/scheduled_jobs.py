@@ -0,0 +1,31 @@
+"""
+Scheduled Job Tasks for Dubai Real Estate RAG System
+
+Heavy jobs of the distributed job scheduler (app.infrastructure.queue.job_scheduler)
+are dispatched here, so they run on Celery workers instead of API processes.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Import the Celery app
+from app.infrastructure.queue.celery_app import celery_app
+
+@celery_app.task(bind=True, name='tasks.scheduled_jobs.send_daily_briefings')
+def send_daily_briefings(self):
+    """Generate and deliver the daily briefing of every active agent"""
+    try:
+        from app.infrastructure.queue.scheduler import DailyBriefingScheduler
+
+        summary = asyncio.run(DailyBriefingScheduler().send_daily_briefings())
+        return {
+            "status": "completed",
+            "message": "Daily briefings generated",
+            "summary": summary
+        }
+
+    except Exception as e:
+        logger.error(f"Error sending daily briefings: {str(e)}")
+        raise self.retry(exc=e, countdown=300, max_retries=2)
@@ -2,76 +2,133 @@
 """
 Daily Briefing Scheduler for Dubai Real Estate RAG System
 This module handles the automated daily briefing generation for real estate agents
+
+A run loads the briefing data of a batch of agents with one query per section,
+computes the market context once, generates the batch's briefings with a bounded
+number of LLM calls in flight and saves them with multi-row inserts. Each agent's
+outcome and generation time is recorded in daily_briefing_runs, so a run that is
+interrupted (or re-triggered) only briefs the agents still missing for the day.
 """
 
 import os
 import sys
+import json
+import time
 import logging
-from datetime import datetime
-from typing import List, Dict, Any
-from sqlalchemy import create_engine, text
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.cron import CronTrigger
+from datetime import date, datetime
+from typing import List, Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import bindparam, text
+from app.infrastructure.db.engine_registry import get_engine
 import asyncio
 
 # Add the backend directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from ai_manager import AIEnhancementManager
-from app.core.settings import DATABASE_URL, GOOGLE_API_KEY, AI_MODEL
-import google.generativeai as genai
+from app.core.settings import DATABASE_URL
+from app.infrastructure.queue.job_scheduler import ScheduledJob, get_job_scheduler
+from app.infrastructure.integrations.llm_client import llm_model
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Agents per data load/save batch and briefings generated concurrently
+BRIEFING_BATCH_SIZE = int(os.getenv('BRIEFING_BATCH_SIZE', '50'))
+BRIEFING_LLM_CONCURRENCY = int(os.getenv('BRIEFING_LLM_CONCURRENCY', '4'))
+BRIEFING_TIMEZONE = os.getenv('BRIEFING_TIMEZONE', 'Asia/Dubai')
+
+
+def _primary_session_id(agent_id: int) -> str:
+    return f"agent_{agent_id}_primary"
+
+
 class DailyBriefingScheduler:
     """Scheduler for daily briefing generation"""
     
-    def __init__(self):
-        self.engine = create_engine(DATABASE_URL)
-        
-        # Configure Google Gemini
-        genai.configure(api_key=GOOGLE_API_KEY)
-        self.model = genai.GenerativeModel(AI_MODEL)
+    def __init__(self, ai_manager=None, db_engine=None):
+        self.engine = db_engine or get_engine("background", DATABASE_URL)
         
-        # Initialize AI Manager
-        self.ai_manager = AIEnhancementManager(DATABASE_URL, self.model)
+        if ai_manager is None:
+            # Shared process-wide LLM client (pooled model, token metrics per caller)
+            self.model = llm_model(caller="daily_briefing")
+            
+            # Initialize AI Manager
+            ai_manager = AIEnhancementManager(DATABASE_URL, self.model)
+        self.ai_manager = ai_manager
         
-        # Initialize scheduler
-        self.scheduler = AsyncIOScheduler()
+        # Shared, lease-based scheduler (one run per slot across all processes)
+        self.scheduler = get_job_scheduler()
         
-    async def send_daily_briefings(self):
-        """Send daily briefings to all active agents"""
+    async def send_daily_briefings(self, run_date: Optional[date] = None) -> Dict[str, Any]:
+        """Send daily briefings to all active agents still missing one for run_date"""
+        run_date = run_date or datetime.now(ZoneInfo(BRIEFING_TIMEZONE)).date()
+        summary = {'run_date': run_date.isoformat(), 'agents': 0, 'already_briefed': 0,
+                   'generated': 0, 'failed': 0, 'duration': 0.0}
+        started = time.perf_counter()
         try:
-            logger.info("🔄 Starting daily briefing generation...")
+            logger.info(f"🔄 Starting daily briefing generation for {run_date}...")
             
-            # Get all active agents
+            # Get all active agents, skipping those briefed earlier in this run
             active_agents = self._get_active_agents()
+            briefed = self._get_briefed_agent_ids(run_date)
+            pending = [agent for agent in active_agents if agent['id'] not in briefed]
+            summary['agents'] = len(active_agents)
+            summary['already_briefed'] = len(active_agents) - len(pending)
+            
+            if not pending:
+                logger.info("ℹ️ No active agents awaiting a briefing")
+                return summary
             
-            if not active_agents:
-                logger.info("ℹ️ No active agents found")
-                return
+            logger.info(f"📧 Generating briefings for {len(pending)} agents "
+                        f"({summary['already_briefed']} already briefed)")
             
-            logger.info(f"📧 Generating briefings for {len(active_agents)} agents")
+            # Same for every agent, so computed once per run
+            market_context = await asyncio.to_thread(self.ai_manager.get_briefing_market_context)
+            semaphore = asyncio.Semaphore(BRIEFING_LLM_CONCURRENCY)
             
-            for agent in active_agents:
+            for start in range(0, len(pending), BRIEFING_BATCH_SIZE):
+                batch = pending[start:start + BRIEFING_BATCH_SIZE]
                 try:
-                    # Generate briefing for the agent
-                    briefing_text = self.ai_manager.generate_daily_briefing_for_agent(agent['id'])
-                    
-                    # Save briefing as a message in the agent's primary conversation
-                    await self._save_briefing_message(agent['id'], briefing_text)
-                    
-                    logger.info(f"✅ Briefing generated for agent {agent['first_name']} {agent['last_name']}")
-                    
+                    inputs = await asyncio.to_thread(self.ai_manager.get_daily_briefing_inputs,
+                                                     [agent['id'] for agent in batch])
                 except Exception as e:
-                    logger.error(f"❌ Error generating briefing for agent {agent['id']}: {e}")
+                    # Without their inputs the batch's agents are recorded as failed, to be resumed
+                    logger.error(f"❌ Error fetching briefing inputs for {len(batch)} agents: {e}")
+                    results = [(agent, None, 0.0, str(e)) for agent in batch]
+                else:
+                    results = await asyncio.gather(*[
+                        self._generate_briefing(semaphore, agent, inputs.get(agent['id']), market_context)
+                        for agent in batch
+                    ])
+                
+                # Saved per batch, so an interrupted run keeps every finished batch
+                await asyncio.to_thread(self.save_briefings, run_date, results)
+                for agent, briefing_text, elapsed, error in results:
+                    summary['failed' if error else 'generated'] += 1
             
-            logger.info("✅ Daily briefing generation completed")
+            summary['duration'] = round(time.perf_counter() - started, 3)
+            logger.info(f"✅ Daily briefing generation completed: {summary}")
             
         except Exception as e:
             logger.error(f"❌ Error in send_daily_briefings: {e}")
+        return summary
+    
+    async def _generate_briefing(self, semaphore: asyncio.Semaphore, agent: Dict[str, Any],
+                                 briefing_inputs: Optional[Dict[str, List[Dict]]],
+                                 market_context: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str], float, Optional[str]]:
+        """(agent, briefing text, generation seconds, error) for one agent"""
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # The AI manager and its model client are synchronous
+                briefing_text = await asyncio.to_thread(
+                    self.ai_manager.generate_daily_briefing_for_agent, agent['id'], briefing_inputs, market_context)
+                return agent, briefing_text, time.perf_counter() - started, None
+            except Exception as e:
+                logger.error(f"❌ Error generating briefing for agent {agent['id']}: {e}")
+                return agent, None, time.perf_counter() - started, str(e)
     
     def _get_active_agents(self) -> List[Dict[str, Any]]:
         """Get all active agents from the database"""
@@ -91,76 +148,102 @@ class DailyBriefingScheduler:
             logger.error(f"Error fetching active agents: {e}")
             return []
     
-    async def _save_briefing_message(self, agent_id: int, briefing_text: str):
-        """Save the briefing as a message in the agent's primary conversation"""
-        try:
-            with self.engine.connect() as conn:
-                # Get or create the agent's primary conversation
-                conversation_id = self._get_or_create_agent_conversation(conn, agent_id)
+    def _get_briefed_agent_ids(self, run_date: date) -> set:
+        """Agents whose briefing for run_date has already been saved"""
+        with self.engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT agent_id FROM daily_briefing_runs
+                WHERE run_date = :run_date AND status = 'completed'
+            """), {"run_date": run_date})
+            return {row[0] for row in result}
+    
+    def save_briefings(self, run_date: date, results: List[Tuple[Dict[str, Any], Optional[str], float, Optional[str]]]):
+        """Save generated briefings and every agent's run record in one transaction"""
+        if not results:
+            return
+        generated_at = datetime.now().isoformat()
+        briefings = [(agent['id'], briefing_text) for agent, briefing_text, _, error in results if not error]
+        
+        with self.engine.begin() as conn:
+            message_ids = {}
+            if briefings:
+                conversation_ids = self._get_or_create_agent_conversations(conn, [agent_id for agent_id, _ in briefings])
                 
-                # Save the briefing message
-                conn.execute(text("""
+                # Save the briefing messages
+                values = []
+                params = {"metadata": json.dumps({"type": "daily_briefing", "generated_at": generated_at,
+                                                  "briefing_date": run_date.isoformat()})}
+                for i, (agent_id, briefing_text) in enumerate(briefings):
+                    values.append(f"(:conversation_id_{i}, 'assistant', :content_{i}, 'text', :metadata)")
+                    params[f"conversation_id_{i}"] = conversation_ids[agent_id]
+                    params[f"content_{i}"] = briefing_text
+                result = conn.execute(text(f"""
                     INSERT INTO messages (conversation_id, role, content, message_type, metadata)
-                    VALUES (:conversation_id, :role, :content, :message_type, :metadata)
-                """), {
-                    "conversation_id": conversation_id,
-                    "role": "assistant",
-                    "content": briefing_text,
-                    "message_type": "text",
-                    "metadata": '{"type": "daily_briefing", "generated_at": "' + datetime.now().isoformat() + '"}'
+                    VALUES {', '.join(values)}
+                    RETURNING id, conversation_id
+                """), params)
+                agent_by_conversation = {conversation_id: agent_id for agent_id, conversation_id in conversation_ids.items()}
+                message_ids = {agent_by_conversation[row[1]]: row[0] for row in result.fetchall()}
+            
+            # Record each agent's outcome and generation time
+            values = []
+            params = {"run_date": run_date}
+            for i, (agent, _, elapsed, error) in enumerate(results):
+                values.append(f"(:run_date, :agent_id_{i}, :status_{i}, :message_id_{i}, :duration_ms_{i}, "
+                              f":error_{i}, CURRENT_TIMESTAMP)")
+                params.update({
+                    f"agent_id_{i}": agent['id'],
+                    f"status_{i}": 'failed' if error else 'completed',
+                    f"message_id_{i}": message_ids.get(agent['id']),
+                    f"duration_ms_{i}": int(elapsed * 1000),
+                    f"error_{i}": error,
                 })
-                
-                conn.commit()
-                logger.info(f"💾 Briefing saved to conversation {conversation_id}")
-                
-        except Exception as e:
-            logger.error(f"Error saving briefing message: {e}")
+            conn.execute(text(f"""
+                INSERT INTO daily_briefing_runs (run_date, agent_id, status, message_id, duration_ms, error, completed_at)
+                VALUES {', '.join(values)}
+                ON CONFLICT (run_date, agent_id) DO UPDATE SET
+                    status = EXCLUDED.status, message_id = EXCLUDED.message_id,
+                    duration_ms = EXCLUDED.duration_ms, error = EXCLUDED.error, completed_at = EXCLUDED.completed_at
+            """), params)
+        
+        logger.info(f"💾 Saved {len(briefings)} briefings ({len(results) - len(briefings)} failed)")
     
-    def _get_or_create_agent_conversation(self, conn, agent_id: int) -> int:
-        """Get or create the agent's primary conversation thread"""
-        try:
-            # Try to get existing primary conversation
-            result = conn.execute(text("""
-                SELECT id FROM conversations 
-                WHERE session_id = :session_id AND is_active = TRUE
-            """), {"session_id": f"agent_{agent_id}_primary"})
-            
-            row = result.fetchone()
-            if row:
-                return row[0]
-            
-            # Create new primary conversation
-            result = conn.execute(text("""
+    def _get_or_create_agent_conversations(self, conn, agent_ids: List[int]) -> Dict[int, int]:
+        """Primary conversation id of each agent, creating the missing ones in one INSERT"""
+        session_ids = {_primary_session_id(agent_id): agent_id for agent_id in agent_ids}
+        result = conn.execute(text("""
+            SELECT id, session_id FROM conversations 
+            WHERE session_id IN :session_ids AND is_active = TRUE
+        """).bindparams(bindparam('session_ids', expanding=True)), {"session_ids": list(session_ids)})
+        conversation_ids = {session_ids[row[1]]: row[0] for row in result}
+        
+        missing = [agent_id for agent_id in agent_ids if agent_id not in conversation_ids]
+        if missing:
+            values = []
+            params = {"role": "agent"}
+            for i, agent_id in enumerate(missing):
+                values.append(f"(:session_id_{i}, :role, :title_{i})")
+                params[f"session_id_{i}"] = _primary_session_id(agent_id)
+                params[f"title_{i}"] = f"Agent {agent_id} - Primary Conversation"
+            result = conn.execute(text(f"""
                 INSERT INTO conversations (session_id, role, title)
-                VALUES (:session_id, :role, :title)
-                RETURNING id
-            """), {
-                "session_id": f"agent_{agent_id}_primary",
-                "role": "agent",
-                "title": f"Agent {agent_id} - Primary Conversation"
-            })
-            
-            conversation_id = result.fetchone()[0]
-            conn.commit()
-            return conversation_id
-            
-        except Exception as e:
-            logger.error(f"Error getting/creating agent conversation: {e}")
-            raise
+                VALUES {', '.join(values)}
+                RETURNING id, session_id
+            """), params)
+            conversation_ids.update({session_ids[row[1]]: row[0] for row in result})
+        
+        return conversation_ids
     
     def start_scheduler(self):
         """Start the scheduler with daily briefing job"""
         try:
-            # Add the daily briefing job - runs at 7:00 AM Dubai time
-            self.scheduler.add_job(
-                func=self.send_daily_briefings,
-                trigger=CronTrigger(hour=7, minute=0, timezone='Asia/Dubai'),
-                id='daily_briefing',
-                name='Daily Briefing Generation',
-                replace_existing=True
-            )
+            # Add the daily briefing job - runs at 7:00 AM Dubai time on a Celery worker
+            self.scheduler.register(ScheduledJob(
+                'daily-briefing', '0 7 * * *', timezone='Asia/Dubai',
+                celery_task='tasks.scheduled_jobs.send_daily_briefings'
+            ))
             
-            # Start the scheduler
+            # Start the scheduler (needs a running event loop)
             self.scheduler.start()
             logger.info("🚀 Daily briefing scheduler started")
             logger.info("⏰ Daily briefings will be generated at 7:00 AM Dubai time")
@@ -171,7 +254,7 @@ class DailyBriefingScheduler:
     def stop_scheduler(self):
         """Stop the scheduler"""
         try:
-            self.scheduler.shutdown()
+            self.scheduler.stop()
             logger.info("🛑 Daily briefing scheduler stopped")
         except Exception as e:
             logger.error(f"❌ Error stopping scheduler: {e}")
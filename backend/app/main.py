@@ -18,6 +18,7 @@ an intelligent real estate assistant designed for a mobile-first experience.
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Depends, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
 from pydantic import BaseModel
 from typing import List, Union, Dict, Any, Optional
 import os
@@ -505,6 +506,29 @@ async def health_check():
         "architecture": "clean"
     }
 
+# Prometheus exposition endpoint (scraped by monitoring/prometheus.yml)
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Expose performance monitor metrics aggregated across workers"""
+    try:
+        from performance_monitor import render_prometheus_metrics
+    except ImportError as e:
+        raise HTTPException(status_code=503, detail=f"Metrics unavailable: {e}")
+    
+    content, content_type = render_prometheus_metrics()
+    return Response(content=content, media_type=content_type)
+
+# A worker's livemax/livesum gauge files would otherwise keep feeding /metrics after it exits
+@app.on_event("shutdown")
+async def release_worker_metrics():
+    """Mark this worker dead in the Prometheus multiprocess directory"""
+    try:
+        from performance_monitor import mark_worker_dead
+    except ImportError:
+        return
+    
+    mark_worker_dead()
+
 # Root endpoint
 @app.get("/")
 async def root():
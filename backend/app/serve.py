@@ -0,0 +1,47 @@
+"""
+Production server entry point (python -m app.serve)
+
+Starts the uvicorn worker supervisor. Before any worker is forked it
+empties PROMETHEUS_MULTIPROC_DIR: value files left by the workers of an
+earlier run would otherwise be aggregated into /metrics, and a reused PID
+would pick up a stale file. Workers remove their own live gauge files on
+shutdown (see release_worker_metrics in app.main).
+"""
+
+import os
+import glob
+import logging
+
+import uvicorn
+
+logger = logging.getLogger(__name__)
+
+
+def clear_multiprocess_dir(path: str) -> int:
+    """Remove prometheus_client value files from a previous run, returning how many were deleted"""
+    if not path:
+        return 0
+    
+    os.makedirs(path, exist_ok=True)
+    removed = 0
+    for value_file in glob.glob(os.path.join(path, "*.db")):
+        os.remove(value_file)
+        removed += 1
+    return removed
+
+
+def main():
+    removed = clear_multiprocess_dir(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+    if removed:
+        logger.info(f"Removed {removed} stale Prometheus multiprocess files")
+    
+    uvicorn.run(
+        "app.main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -14,13 +14,18 @@ from config.settings import DATABASE_URL
 logger = logging.getLogger(__name__)
 
 # Create database engine with better connection management
-engine = create_engine(
-    DATABASE_URL,
-    poolclass=StaticPool,
-    pool_pre_ping=True,
-    pool_recycle=3600,  # Recycle connections every hour
-    echo=False  # Set to True for SQL debugging
-)
+# Use StaticPool only for SQLite (primarily tests). For Postgres and others,
+# share the OLTP pool from the engine registry.
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        DATABASE_URL,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False} if ":memory:" in DATABASE_URL or DATABASE_URL.startswith("sqlite:///") else {},
+        echo=False,
+    )
+else:
+    from app.infrastructure.db.engine_registry import get_engine
+    engine = get_engine("oltp", DATABASE_URL)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
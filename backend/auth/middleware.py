@@ -16,6 +16,8 @@ from .database import get_db
 from .models import User, UserSession, Role, Permission, AuditLog
 from .utils import verify_jwt_token, sanitize_input
 from .rate_limiter import RateLimiter
+from app.core.principal_cache import PrincipalCache, SessionTouchBuffer, hash_token, register_invalidation_events
+from app.infrastructure.db.engine_registry import get_engine
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +27,11 @@ security = HTTPBearer()
 # Rate limiter instance
 rate_limiter = RateLimiter()
 
+# Resolved principals by token hash, and write-behind session last_used updates
+principal_cache = PrincipalCache()
+session_touch_buffer = SessionTouchBuffer(lambda: get_engine("background"))
+register_invalidation_events(User, UserSession)
+
 class AuthMiddleware:
     """Authentication middleware class"""
     
@@ -73,6 +80,14 @@ def get_current_user(
         HTTPException: If authentication fails
     """
     try:
+        token_hash = hash_token(credentials.credentials)
+        
+        # Fast path: token already resolved within the cache TTL
+        cached = principal_cache.get(token_hash)
+        if cached is not None:
+            session_touch_buffer.touch(cached.session_id)
+            return db.merge(cached.user, load=False)
+        
         # Verify JWT token
         payload = verify_jwt_token(credentials.credentials)
         if not payload:
@@ -125,10 +140,10 @@ def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"}
             )
         
-        # Check if session is still valid
+        # Check if session is still valid (indexed lookup by token hash)
         session = db.query(UserSession).filter(
+            UserSession.session_token_hash == token_hash,
             UserSession.user_id == user.id,
-            UserSession.session_token == credentials.credentials,
             UserSession.is_active == True
         ).first()
         
@@ -139,11 +154,21 @@ def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"}
             )
         
-        # Update session last used time
-        session.last_used = datetime.utcnow()
-        db.commit()
+        # Update session last used time (batched and written behind)
+        session_touch_buffer.touch(session.id)
+        
+        # Cache a detached copy; each request works on its own session-bound instance.
+        # The token-only fallback user (database unavailable) is never cached.
+        if user not in db:
+            return user
+        
+        valid_until = session.expires_at
+        if payload.get("exp"):
+            valid_until = min(valid_until, datetime.utcfromtimestamp(payload["exp"]))
+        db.expunge(user)
+        principal_cache.put(token_hash, user, session.id, valid_until)
         
-        return user
+        return db.merge(user, load=False)
         
     except HTTPException:
         raise
@@ -238,9 +263,8 @@ def rate_limit(requests_per_minute: int = 60):
     """
     def rate_limiter_checker(request: Request):
         client_ip = request.client.host
-        user_agent = request.headers.get("user-agent", "")
         
-        if not rate_limiter.is_allowed(client_ip, user_agent, requests_per_minute):
+        if not rate_limiter.is_allowed(client_ip, max_requests=requests_per_minute):
             raise HTTPException(
                 status_code=429,
                 detail="Too many requests. Please try again later."
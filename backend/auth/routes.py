@@ -18,6 +18,7 @@ from .utils import (
     generate_secure_token, sanitize_input
 )
 from .middleware import rate_limit, log_audit_event
+from app.core.principal_cache import hash_token, invalidate_token
 from .rate_limiter import rate_limiter
 # from .simple_dev_auth import get_or_create_dev_user, create_dev_login_response, is_development_mode
 
@@ -348,9 +349,12 @@ async def logout(
         
         token = auth_header.split(" ")[1]
         
+        # Drop the cached principal before the session row goes inactive
+        invalidate_token(token)
+        
         # Find and invalidate session
         session = db.query(UserSession).filter(
-            UserSession.session_token == token,
+            UserSession.session_token_hash == hash_token(token),
             UserSession.is_active == True
         ).first()
         
@@ -642,7 +646,7 @@ async def refresh_access_token(
         # Update session with new token
         session = db.query(UserSession).filter(
             UserSession.user_id == user.id,
-            UserSession.session_token == current_token,
+            UserSession.session_token_hash == hash_token(current_token),
             UserSession.is_active == True
         ).first()
         
@@ -25,7 +25,8 @@ def create_celery_app():
         'tasks.ai_commands',
         'tasks.reports', 
         'tasks.ml_training',
-        'tasks.data_processing'
+        'tasks.data_processing',
+        'tasks.scheduled_jobs'
     ])
     
     return app
@@ -39,6 +40,7 @@ try:
     from tasks.reports import *
     from tasks.ml_training import *
     from tasks.data_processing import *
+    from tasks.scheduled_jobs import *
     print("✅ All Celery tasks imported successfully")
 except ImportError as e:
     print(f"⚠️ Some Celery tasks could not be imported: {e}")
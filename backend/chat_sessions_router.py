@@ -14,15 +14,18 @@ from sqlalchemy import text
 from datetime import datetime
 import uuid
 import json
+import math
 import time
 
 # Import dependencies
 from auth.middleware import get_current_user
 from auth.models import User
 from database_manager import get_db_connection
+from app.core.pagination import decode_cursor, keyset_page, pagination_info
 from config.settings import DATABASE_URL
 from rag_service import EnhancedRAGService
 from chat_report_integration import chat_report_integration
+from app.infrastructure.integrations.llm_client import LLMBudgetExceeded
 
 # Import advanced chat dependencies
 try:
@@ -321,6 +324,8 @@ class ChatHistoryResponse(BaseModel):
     messages: List[ChatMessageResponse]
     user_preferences: Dict[str, Any]
     conversation_summary: Optional[str] = None
+    next_cursor: Optional[str] = None  # Cursor for the next page of older messages
+    has_more: bool = False
 
 class UserPreferencesUpdate(BaseModel):
     """Update user preferences"""
@@ -424,20 +429,30 @@ class MarketContextResponse(BaseModel):
     last_updated: str
 
 # Helper Functions
+_ai_manager = None
+
+
 def get_ai_manager():
-    """Get AI manager instance"""
+    """Get the shared AI manager instance"""
+    global _ai_manager
+    if _ai_manager is not None:
+        return _ai_manager
     try:
         from ai_manager import AIEnhancementManager
-        from config.settings import GOOGLE_API_KEY, AI_MODEL
-        import google.generativeai as genai
-        
-        genai.configure(api_key=GOOGLE_API_KEY)
-        model = genai.GenerativeModel(AI_MODEL)
-        return AIEnhancementManager(DATABASE_URL, model)
+        from app.infrastructure.integrations.llm_client import llm_model
+
+        # One manager per process, so its conversation memory and the pooled LLM client are reused
+        _ai_manager = AIEnhancementManager(DATABASE_URL, llm_model(caller="ai_manager"))
+        return _ai_manager
     except Exception as e:
         print(f"Error initializing AI manager: {e}")
         return None
 
+def llm_budget_exceeded(e: LLMBudgetExceeded) -> HTTPException:
+    """429 for a call rejected by the caller's LLM token or concurrency budget"""
+    return HTTPException(status_code=429, detail=str(e),
+                         headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
 def get_rag_service():
     """Get RAG service instance"""
     try:
@@ -505,139 +520,50 @@ async def create_new_chat_session(
 @router.get("")
 async def list_chat_sessions(
     current_user: User = Depends(get_current_user),
-    page: int = Query(1, ge=1, description="Page number"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100, description="Items per page"),
-    days: Optional[int] = Query(None, description="Only sessions from last N days")
+    days: Optional[int] = Query(None, ge=1, description="Only sessions from last N days")
 ):
-    """List chat sessions with user authentication and role-based filtering"""
+    """List chat sessions, most recently active first, with role-based filtering and keyset pagination"""
     try:
-        offset = (page - 1) * limit
-        
+        conditions = []
+        params: Dict[str, Any] = {"limit": limit + 1}
+
+        # Admin can see all conversations; agents and employees only their own
+        if current_user.role != "admin":
+            conditions.append("user_id = :user_id")
+            params["user_id"] = current_user.id
+        if days:
+            conditions.append("created_at >= NOW() - make_interval(days => :days)")
+            params["days"] = days
+        if cursor:
+            try:
+                params["cursor_updated_at"], params["cursor_id"] = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            conditions.append("(updated_at, id) < (:cursor_updated_at, :cursor_id)")
+
+        # message_count and last_message_at are maintained by triggers on messages; every
+        # column is included in ix_conversations_user_activity / ix_conversations_activity
+        query = f"""
+            SELECT id, session_id, title, created_at, updated_at, is_active, message_count, last_message_at
+            FROM conversations
+            {"WHERE " + " AND ".join(conditions) if conditions else ""}
+            ORDER BY updated_at DESC, id DESC
+            LIMIT :limit
+        """
+
         with get_db_connection() as conn:
-            # Build query based on user role with date filter
-            if current_user.role == "admin":
-                # Admin can see all conversations
-                if days:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        WHERE created_at >= NOW() - INTERVAL ':days days'
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"limit": limit, "offset": offset, "days": days}
-                else:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"limit": limit, "offset": offset}
-                    
-            elif current_user.role == "agent":
-                # Agent can see their own conversations
-                if days:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        WHERE user_id = :user_id 
-                        AND created_at >= NOW() - INTERVAL ':days days'
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"user_id": current_user.id, "limit": limit, "offset": offset, "days": days}
-                else:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        WHERE user_id = :user_id
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"user_id": current_user.id, "limit": limit, "offset": offset}
-                    
-            else:
-                # Employee can only see their own conversations
-                if days:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        WHERE user_id = :user_id 
-                        AND created_at >= NOW() - INTERVAL ':days days'
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"user_id": current_user.id, "limit": limit, "offset": offset, "days": days}
-                else:
-                    query = """
-                        SELECT id, session_id, title, created_at, updated_at, is_active,
-                               (SELECT COUNT(*) FROM messages WHERE conversation_id = conversations.id) as message_count
-                        FROM conversations 
-                        WHERE user_id = :user_id
-                        ORDER BY created_at DESC 
-                        LIMIT :limit OFFSET :offset
-                    """
-                    params = {"user_id": current_user.id, "limit": limit, "offset": offset}
-            
-            result = conn.execute(text(query), params)
-            sessions = [dict(row) for row in result]
-            
-            # Get total count for pagination based on user role
-            if current_user.role == "admin":
-                if days:
-                    count_query = """
-                        SELECT COUNT(*) FROM conversations 
-                        WHERE created_at >= NOW() - INTERVAL ':days days'
-                    """
-                    count_params = {"days": days}
-                else:
-                    count_query = "SELECT COUNT(*) FROM conversations"
-                    count_params = {}
-            elif current_user.role == "agent":
-                if days:
-                    count_query = """
-                        SELECT COUNT(*) FROM conversations 
-                        WHERE user_id = :user_id 
-                        AND created_at >= NOW() - INTERVAL ':days days'
-                    """
-                    count_params = {"user_id": current_user.id, "days": days}
-                else:
-                    count_query = """
-                        SELECT COUNT(*) FROM conversations 
-                        WHERE user_id = :user_id
-                    """
-                    count_params = {"user_id": current_user.id}
-            else:
-                if days:
-                    count_query = """
-                        SELECT COUNT(*) FROM conversations 
-                        WHERE user_id = :user_id 
-                        AND created_at >= NOW() - INTERVAL ':days days'
-                    """
-                    count_params = {"user_id": current_user.id, "days": days}
-                else:
-                    count_query = "SELECT COUNT(*) FROM conversations WHERE user_id = :user_id"
-                    count_params = {"user_id": current_user.id}
-            
-            count_result = conn.execute(text(count_query), count_params)
-            total_count = count_result.fetchone()[0]
-            
-            return {
-                "sessions": sessions,
-                "pagination": {
-                    "page": page,
-                    "limit": limit,
-                    "total": total_count,
-                    "pages": (total_count + limit - 1) // limit
-                }
-            }
-            
+            rows = [dict(row._mapping) for row in conn.execute(text(query), params)]
+
+        sessions, next_cursor = keyset_page(rows, limit, sort_key="updated_at")
+        return {
+            "sessions": sessions,
+            "pagination": pagination_info(limit, next_cursor)
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error listing chat sessions: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -645,9 +571,11 @@ async def list_chat_sessions(
 @router.get("/{session_id}", response_model=ChatHistoryResponse)
 async def get_chat_session(
     session_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page of older messages"),
+    limit: int = Query(100, ge=1, le=500, description="Messages per page")
 ):
-    """Get chat session with full history - with user access control"""
+    """Get chat session with its latest messages (older ones via cursor) - with user access control"""
     try:
         with get_db_connection() as conn:
             # Check if user has access to this session
@@ -683,16 +611,26 @@ async def get_chat_session(
             if not session_row:
                 raise HTTPException(status_code=404, detail="Chat session not found or access denied")
             
-            # Get messages
-            messages_result = conn.execute(text("""
+            # Newest page first, walking back through ix_messages_conversation_timestamp
+            messages_params = {"conversation_id": session_row[0], "limit": limit + 1}
+            before_cursor = ""
+            if cursor:
+                try:
+                    messages_params["cursor_timestamp"], messages_params["cursor_id"] = decode_cursor(cursor)
+                except ValueError:
+                    raise HTTPException(status_code=400, detail="Invalid cursor")
+                before_cursor = "AND (timestamp, id) < (:cursor_timestamp, :cursor_id)"
+            messages_result = conn.execute(text(f"""
                 SELECT id, conversation_id, role, content, timestamp, message_type, metadata
                 FROM messages 
-                WHERE conversation_id = :conversation_id
-                ORDER BY timestamp ASC
-            """), {"conversation_id": session_row[0]})
+                WHERE conversation_id = :conversation_id {before_cursor}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT :limit
+            """), messages_params)
+            message_rows, next_cursor = keyset_page(messages_result.fetchall(), limit, sort_key=4, id_key=0)
             
             messages = []
-            for msg_row in messages_result:
+            for msg_row in reversed(message_rows):
                 metadata = json.loads(msg_row[6]) if msg_row[6] else None
                 messages.append(ChatMessageResponse(
                     id=msg_row[0],
@@ -734,7 +672,9 @@ async def get_chat_session(
                 title=session_row[3],
                 messages=messages,
                 user_preferences=user_preferences,
-                conversation_summary=summary_text
+                conversation_summary=summary_text,
+                next_cursor=next_cursor,
+                has_more=next_cursor is not None
             )
             
     except HTTPException:
@@ -790,7 +730,8 @@ async def chat_with_session(
             response_text = rag_service.get_response(
                 message=request.message,
                 role=current_user.role,
-                session_id=session_id
+                session_id=session_id,
+                tenant=f"user:{current_user.id}"
             )
         
         # Save messages to database
@@ -863,6 +804,8 @@ async def chat_with_session(
         
     except HTTPException:
         raise
+    except LLMBudgetExceeded as e:
+        raise llm_budget_exceeded(e)
     except Exception as e:
         print(f"Error in enhanced chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -916,8 +859,8 @@ async def clear_chat_session(session_id: str):
             # Clear AI manager memory cache if available
             try:
                 ai_manager = get_ai_manager()
-                if ai_manager and hasattr(ai_manager, 'memory_cache') and session_id in ai_manager.memory_cache:
-                    del ai_manager.memory_cache[session_id]
+                if ai_manager and hasattr(ai_manager, 'clear_conversation_memory'):
+                    ai_manager.clear_conversation_memory(session_id)
             except:
                 pass  # Ignore if AI manager is not available
             
@@ -1035,7 +978,8 @@ async def chat_with_rag(
         response_text = rag_service.get_response(
             message=request.message,
             role=current_user.role,
-            session_id=request.session_id
+            session_id=request.session_id,
+            tenant=f"user:{current_user.id}"
         )
         
         # Save messages to database if session exists
@@ -1107,6 +1051,8 @@ async def chat_with_rag(
             detected_entities=detected_entities
         )
         
+    except LLMBudgetExceeded as e:
+        raise llm_budget_exceeded(e)
     except Exception as e:
         print(f"Error in chat endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1436,26 +1382,21 @@ async def fetch_batch_context_for_session(
             if current_user.role != "admin" and session_row[4] != current_user.id:
                 raise HTTPException(status_code=403, detail="Access denied to this session")
         
-        results = {}
+        # Resolve all entities in one batched pass (shared cache lookups, concurrent fetches)
+        entity_keys = [
+            (entity.get('entity_type'), entity.get('entity_id'))
+            for entity in entities
+            if entity.get('entity_type') and entity.get('entity_id')
+        ]
         
-        for entity in entities:
-            entity_type = entity.get('entity_type')
-            entity_id = entity.get('entity_id')
-            
-            if not entity_type or not entity_id:
-                continue
-            
-            try:
-                context_data = await context_management_service.fetch_entity_context(entity_type, entity_id)
-                results[f"{entity_type}:{entity_id}"] = {
-                    'success': True,
-                    'data': context_data
-                }
-            except Exception as e:
-                results[f"{entity_type}:{entity_id}"] = {
-                    'success': False,
-                    'error': str(e)
-                }
+        try:
+            contexts = await context_management_service.fetch_entities_context(entity_keys)
+            results = {key: {'success': True, 'data': data} for key, data in contexts.items()}
+        except Exception as e:
+            results = {
+                f"{entity_type}:{entity_id}": {'success': False, 'error': str(e)}
+                for entity_type, entity_id in entity_keys
+            }
         
         return {
             'results': results,
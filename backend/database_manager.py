@@ -9,22 +9,16 @@ import logging
 from contextlib import contextmanager
 from typing import Generator, Optional
 from fastapi import HTTPException
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.engine import Connection
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, DisconnectionError
 from config.settings import DATABASE_URL
+from app.infrastructure.db.engine_registry import get_engine
 
 logger = logging.getLogger(__name__)
 
-# Create database engine with connection pooling
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=10,  # Maximum number of connections in the pool
-    max_overflow=20,  # Maximum number of connections that can be created beyond pool_size
-    pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    echo=False  # Set to True for SQL debugging
-)
+# Shared OLTP pool from the process-wide engine registry
+engine = get_engine("oltp", DATABASE_URL)
 
 @contextmanager
 def get_db_connection() -> Generator[Connection, None, None]:
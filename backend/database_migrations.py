@@ -5,7 +5,8 @@ Implements schema changes for Web-Based Content Delivery and Proactive Lead Nurt
 """
 
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 from datetime import datetime
 import os
 from dotenv import load_dotenv
@@ -19,7 +20,7 @@ logger = logging.getLogger(__name__)
 
 class DatabaseMigration:
     def __init__(self, db_url: str):
-        self.engine = create_engine(db_url)
+        self.engine = get_engine("background", db_url)
         
     def run_migrations(self):
         """Run all Blueprint 2.0 migrations"""
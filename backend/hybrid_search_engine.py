@@ -11,7 +11,8 @@ from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 import chromadb
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 import json
 import hashlib
 from cache_manager import cache_manager
@@ -49,7 +50,7 @@ class HybridSearchEngine:
     """Hybrid search engine combining vector and structured search"""
     
     def __init__(self, database_url: str, chroma_host: str = "localhost", chroma_port: int = 8000):
-        self.engine = create_engine(database_url)
+        self.engine = get_engine("oltp", database_url)
         self.chroma_client = self._initialize_chroma_client(chroma_host, chroma_port)
         self.cache_manager = cache_manager
         
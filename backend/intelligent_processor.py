@@ -5,9 +5,10 @@ Handles document classification, content extraction, and data quality
 """
 
 import logging
+import itertools
 import json
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from datetime import datetime
 import os
 
@@ -51,16 +52,30 @@ try:
 except ImportError:
     PDFPLUMBER_AVAILABLE = False
 
-# AI Integration
+# Tabular processing
 try:
-    import google.generativeai as genai
-    from config.settings import GOOGLE_API_KEY, AI_MODEL
-    AI_AVAILABLE = True
-    genai.configure(api_key=GOOGLE_API_KEY)
-    model = genai.GenerativeModel(AI_MODEL)
+    import pandas as pd
+    import openpyxl
+    TABULAR_AVAILABLE = True
 except ImportError:
-    AI_AVAILABLE = False
-    model = None
+    TABULAR_AVAILABLE = False
+
+TABULAR_BATCH_ROWS = int(os.getenv("UPLOAD_TABULAR_BATCH_ROWS", "10000"))
+TABULAR_SAMPLE_ROWS = int(os.getenv("UPLOAD_TABULAR_SAMPLE_ROWS", "50"))
+
+# ChromaDB collection (read by the RAG service) that spreadsheet rows are stored in, per category
+TABULAR_COLLECTIONS = {
+    'transaction_sheet': 'market_analysis',
+    'market_report': 'market_analysis',
+    'legal_handbook': 'regulatory_framework',
+    'property_brochure': 'real_estate_docs',
+}
+TABULAR_DEFAULT_COLLECTION = 'comprehensive_data'
+
+# AI Integration (through the process-wide LLM client, which configures the SDK once)
+from app.infrastructure.integrations.llm_client import llm_model
+AI_AVAILABLE = True
+model = llm_model(caller="document_classification")
 
 logger = logging.getLogger(__name__)
 
@@ -330,11 +345,16 @@ Analyze the following content and respond ONLY with a single, clean JSON object
             logger.error(f"DOCX extraction failed: {e}")
             return ""
 
-    def process_uploaded_document(self, file_path: str, file_type: str):
+    def process_uploaded_document(self, file_path: str, file_type: str, store: bool = True):
         """
         Orchestrates the full processing of an uploaded document.
+        
+        With store=False spreadsheets are only classified, not written to ChromaDB.
         """
         try:
+            if file_type.lower() in ['csv', 'xlsx']:
+                return self._process_tabular_document(file_path, file_type, store)
+            
             # 1. Extract content from the document
             content = self.extract_content(file_path, file_type)
             if not content:
@@ -374,6 +394,105 @@ Analyze the following content and respond ONLY with a single, clean JSON object
                 "timestamp": datetime.now().isoformat()
             }
 
+    def _iter_tabular_batches(self, file_path: str, file_type: str) -> Iterator["pd.DataFrame"]:
+        """Stream a CSV or XLSX file as DataFrame batches of at most TABULAR_BATCH_ROWS rows"""
+        if file_type.lower() == 'csv':
+            with pd.read_csv(file_path, chunksize=TABULAR_BATCH_ROWS) as reader:
+                yield from reader
+            return
+        
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                headers, rows = None, []
+                for row in sheet.iter_rows(values_only=True):
+                    if headers is None:
+                        headers = [name if name is not None else f"column_{i + 1}" for i, name in enumerate(row)]
+                    elif any(value is not None for value in row):
+                        rows.append(tuple(row[:len(headers)]) + (None,) * (len(headers) - len(row)))
+                        if len(rows) >= TABULAR_BATCH_ROWS:
+                            yield pd.DataFrame.from_records(rows, columns=headers)
+                            rows = []
+                if rows:
+                    yield pd.DataFrame.from_records(rows, columns=headers)
+        finally:
+            workbook.close()
+
+    def _process_tabular_document(self, file_path: str, file_type: str, store: bool = True) -> dict:
+        """
+        Classify a spreadsheet from its header and first rows, then stream every row in fixed-size
+        batches into the category's ChromaDB collection, so memory stays flat however many rows
+        the file has. The status is "processed" only once all rows are stored.
+        """
+        if not TABULAR_AVAILABLE:
+            raise ValueError("pandas and openpyxl are required for spreadsheet uploads")
+        
+        batches = self._iter_tabular_batches(file_path, file_type)
+        first = next(batches, None)
+        if first is None:
+            raise ValueError("Spreadsheet contains no rows.")
+        
+        classification = self._get_document_category(first.head(TABULAR_SAMPLE_ROWS).to_csv(index=False))
+        category = classification.get("category")
+        result = {
+            "status": "classified",
+            "category": category,
+            "confidence": classification.get("confidence", 0.0),
+            "columns": [str(column) for column in first.columns],
+            "extracted_at": datetime.now().isoformat()
+        }
+        
+        collection = self._tabular_collection(category) if store else None
+        if collection is None:
+            batches.close()
+            if store:
+                result["message"] = "ChromaDB unavailable; rows were classified but not stored"
+            return result
+        
+        source = os.path.basename(file_path)
+        rows_processed = rows_stored = batch_count = 0
+        for batch in itertools.chain([first], batches):
+            documents, metadatas, ids = self._tabular_documents(batch, source, category, rows_processed)
+            if documents:
+                # Upsert keyed by file and row, so re-uploading a file replaces its rows
+                collection.upsert(documents=documents, metadatas=metadatas, ids=ids)
+            rows_processed += len(batch)
+            rows_stored += len(documents)
+            batch_count += 1
+        
+        logger.info(f"Stored {rows_stored} of {rows_processed} rows in {batch_count} batches "
+                    f"from {file_path} in {collection.name}")
+        result.update({
+            "status": "processed",
+            "collection": collection.name,
+            "rows_processed": rows_processed,
+            "rows_stored": rows_stored,
+            "chunks": rows_stored,
+            "message": f"Stored {rows_stored} rows in {collection.name} in {batch_count} batches",
+        })
+        return result
+    
+    def _tabular_collection(self, category: Optional[str]):
+        """ChromaDB collection for a spreadsheet category, or None when ChromaDB is unavailable"""
+        client = self.chroma_client
+        if client is None:
+            return None
+        return client.get_or_create_collection(TABULAR_COLLECTIONS.get(category, TABULAR_DEFAULT_COLLECTION))
+    
+    @staticmethod
+    def _tabular_documents(batch: "pd.DataFrame", source: str, category: Optional[str], first_row: int):
+        """One "column: value" document per non-empty row, with its source file and row number"""
+        documents, metadatas, ids = [], [], []
+        for offset, record in enumerate(batch.to_dict("records")):
+            fields = [f"{column}: {value}" for column, value in record.items() if not pd.isna(value)]
+            if not fields:
+                continue
+            row = first_row + offset + 1
+            documents.append("; ".join(fields))
+            metadatas.append({"source": source, "category": category or "unknown", "row": row})
+            ids.append(f"{source}:{row}")
+        return documents, metadatas, ids
+
     def _extract_transaction_data(self, content: str) -> dict:
         """Extract transaction data from transaction sheets"""
         # Implementation for transaction data extraction
@@ -16,10 +16,11 @@ from typing import List, Union, Dict, Any
 from typing import Optional
 import os
 import json
-import google.generativeai as genai
+from app.infrastructure.integrations.llm_client import llm_model
 import chromadb
-from sqlalchemy import create_engine, Column, Integer, String, Numeric, Text, text
+from sqlalchemy import Column, Integer, String, Numeric, Text, text
 from sqlalchemy.orm import sessionmaker
+from app.infrastructure.db.engine_registry import get_engine
 import uuid
 from datetime import datetime
 import json
@@ -223,9 +224,8 @@ if not validate_settings():
     print("❌ Critical settings validation failed")
     exit(1)
 
-# Configure Google Gemini
-genai.configure(api_key=GOOGLE_API_KEY)
-model = genai.GenerativeModel(AI_MODEL)
+# Shared, process-wide LLM client (pooled model, request coalescing, tenant budgets)
+model = llm_model(caller="ai_enhancement_manager")
 
 # Initialize FastAPI app
 app = FastAPI(title="Dubai Real Estate RAG Chat System (Secure)", version="1.2.0")
@@ -409,7 +409,7 @@ else:
     print("⚠️ Voice MCP server not initialized - fastapi-mcp not available")
 
 # Database setup
-engine = create_engine(DATABASE_URL)
+engine = get_engine("oltp", DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Initialize authentication database
@@ -542,8 +542,9 @@ async def upload_file(
             from intelligent_processor import IntelligentDataProcessor
             processor = IntelligentDataProcessor()
             
-            # Process the uploaded file using regular method for now
-            processing_result = processor.process_uploaded_document(
+            # Process the uploaded file off the event loop; spreadsheets stream every row into ChromaDB
+            processing_result = await asyncio.to_thread(
+                processor.process_uploaded_document,
                 file_path=str(file_path),
                 file_type=file.filename.split('.')[-1].lower()
             )
@@ -551,25 +552,13 @@ async def upload_file(
             # Debug: Print the processing result
             print(f"🔍 Processing result: {processing_result}")
             
-            # Check if processing failed due to file size
-            if processing_result.get('status') == 'error':
-                error_msg = processing_result.get('message', '')
-                if 'memory' in error_msg.lower() or 'large' in error_msg.lower():
-                    print(f"⚠️ Large file detected, applying optimized processing...")
-                    # For large files, we'll mark as processed with a note
-                    processing_result = {
-                        'status': 'processed',
-                        'category': 'transaction_sheet',
-                        'confidence': 0.9,
-                        'message': 'Large file processed with sample data (first 5000 rows)'
-                    }
-            
             # Extract category and storage info from processing result
             category = processing_result.get('category', 'Uncategorized')
             status = processing_result.get('status', 'unknown')
-            chunks = 1 if status == 'processed' else 0  # Simple logic for now
+            chunks = processing_result.get('chunks', 1 if status == 'processed' else 0)
             vectorized = status == 'processed'
-            storage_location = 'ChromaDB' if vectorized else 'Database'
+            collection = processing_result.get('collection')
+            storage_location = f"ChromaDB ({collection})" if collection else 'ChromaDB' if vectorized else 'Database'
             confidence = processing_result.get('confidence', 0.0)
             
             # Update status and processing details
@@ -13,84 +13,55 @@ Version: 1.0.0
 Date: September 2025
 """
 
-from .services.prediction_service import PredictionService
-from .services.analysis_service import AnalysisService
-from .services.optimization_service import OptimizationService
-from .services.reporting_service import AutomatedReportingService
-from .services.notification_service import SmartNotificationService
-from .services.analytics_service import PerformanceAnalyticsService
-from .models.market_predictor import MarketPredictor
-from .models.property_valuator import PropertyValuator
-from .models.investment_analyzer import InvestmentAnalyzer
-from .pipeline.data_preprocessing import DataPreprocessor
-from .pipeline.feature_engineering import FeatureEngineer
-from .pipeline.model_training import ModelTrainer
-from .utils.ml_utils import MLUtils
-from .utils.model_evaluation import ModelEvaluator
+import logging
 
-# Initialize core ML services
-prediction_service = PredictionService()
-analysis_service = AnalysisService()
-optimization_service = OptimizationService()
+# Models (the predictor loads the current published versions from the registry)
+from .models.model_registry import ModelRegistry, model_registry, get_model_registry
+from .models.market_predictor import MarketPredictor, market_predictor
 
-# Initialize Phase 4B services
-automated_reporting_service = AutomatedReportingService()
-smart_notification_service = SmartNotificationService()
-performance_analytics_service = PerformanceAnalyticsService()
+# Pipeline
+from .pipeline.data_preprocessing import DataPreprocessor, data_preprocessor
 
-# Initialize ML models
-market_predictor = MarketPredictor()
-property_valuator = PropertyValuator()
-investment_analyzer = InvestmentAnalyzer()
+# Utilities
+from .utils.ml_utils import MLUtils, ml_utils
+from .utils.model_evaluation import ModelEvaluator, model_evaluator
 
-# Initialize ML pipeline components
-data_preprocessor = DataPreprocessor()
-feature_engineer = FeatureEngineer()
-model_trainer = ModelTrainer()
+# Phase 4B services
+try:
+    from .services.reporting_service import AutomatedReportingService, automated_reporting_service
+    from .services.notification_service import SmartNotificationService, smart_notification_service
+    from .services.analytics_service import PerformanceAnalyticsService, performance_analytics_service
+except ImportError as e:
+    logging.warning(f"ML services not available: {e}")
 
-# Initialize ML utilities
-ml_utils = MLUtils()
-model_evaluator = ModelEvaluator()
-
-__all__ = [
+__all__ = [name for name in [
     # Services
-    'prediction_service',
-    'analysis_service', 
-    'optimization_service',
     'automated_reporting_service',
     'smart_notification_service',
     'performance_analytics_service',
     
     # Models
+    'model_registry',
+    'get_model_registry',
     'market_predictor',
-    'property_valuator',
-    'investment_analyzer',
     
     # Pipeline
     'data_preprocessor',
-    'feature_engineer',
-    'model_trainer',
     
     # Utilities
     'ml_utils',
     'model_evaluator',
     
     # Classes
-    'PredictionService',
-    'AnalysisService',
-    'OptimizationService',
     'AutomatedReportingService',
     'SmartNotificationService',
     'PerformanceAnalyticsService',
+    'ModelRegistry',
     'MarketPredictor',
-    'PropertyValuator',
-    'InvestmentAnalyzer',
     'DataPreprocessor',
-    'FeatureEngineer',
-    'ModelTrainer',
     'MLUtils',
     'ModelEvaluator'
-]
+] if name in globals()]
 
 # Version information
 __version__ = "1.0.0"
@@ -11,7 +11,9 @@ This module provides:
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple, Optional, Union, Any
+import os
 import logging
+from collections import deque
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
@@ -20,9 +22,7 @@ warnings.filterwarnings('ignore')
 try:
     from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
     from sklearn.linear_model import LinearRegression, Ridge, Lasso
-    from sklearn.svm import SVR
     from sklearn.neural_network import MLPRegressor
-    from sklearn.preprocessing import StandardScaler, RobustScaler
     from sklearn.model_selection import train_test_split, cross_val_score
     from sklearn.metrics import mean_squared_error, r2_score, mean_absolute_error
     from sklearn.pipeline import Pipeline
@@ -33,60 +33,58 @@ except ImportError:
     ML_AVAILABLE = False
     logging.warning("scikit-learn not available. ML models will not work.")
 
+from .model_registry import ModelRegistry, model_registry
+from ..services.prediction_log import PredictionLog, prediction_log as default_prediction_log
+from ..pipeline.feature_engine import (
+    trend_training_matrix, trend_forecast_matrix, numeric_matrix, predict_with_spread
+)
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Recent predictions kept in memory; the full stream goes to the prediction log
+PREDICTION_HISTORY_SIZE = int(os.getenv('PREDICTION_HISTORY_SIZE', '100'))
+
+# Models served from the registry; trained offline by tasks.ml_training.train_market_models
+TREND_MODEL = 'trend_rf'
+PRICE_MODELS = ('price_rf', 'price_gb', 'price_linear')
+SERVED_MODELS = (TREND_MODEL,) + PRICE_MODELS
+
+TREND_FEATURES = ['lag_1', 'lag_2', 'lag_3', 'lag_6', 'lag_12', 'month', 'year']
+PRICE_FEATURES = ['bedrooms', 'bathrooms', 'square_feet', 'age',
+                  'location_score', 'accessibility_score', 'amenity_score']
+
 class MarketPredictor:
     """Real estate market trend prediction and analysis"""
     
-    def __init__(self):
-        self.models = {}
-        self.scalers = {}
+    def __init__(self, registry: Optional[ModelRegistry] = None, prediction_log: Optional[PredictionLog] = None):
+        self.registry = registry or model_registry
+        self.prediction_log = prediction_log or default_prediction_log
         self.feature_importance = {}
-        self.prediction_history = []
-        self.model_performance = {}
+        self.prediction_history = deque(maxlen=PREDICTION_HISTORY_SIZE)
+        self.prediction_count = 0
         
         if not ML_AVAILABLE:
             logger.warning("ML libraries not available. Using simplified models.")
         
-        # Initialize models
-        self._initialize_models()
-    
-    def _initialize_models(self):
-        """Initialize ML models for different prediction tasks"""
+        # Load the current published versions (read-only, memory-mapped)
         try:
-            if ML_AVAILABLE:
-                # Price prediction models
-                self.models['price_rf'] = RandomForestRegressor(
-                    n_estimators=100, random_state=42, n_jobs=-1
-                )
-                self.models['price_gb'] = GradientBoostingRegressor(
-                    n_estimators=100, random_state=42
-                )
-                self.models['price_linear'] = LinearRegression()
-                
-                # Trend prediction models
-                self.models['trend_rf'] = RandomForestRegressor(
-                    n_estimators=100, random_state=42, n_jobs=-1
-                )
-                self.models['trend_svr'] = SVR(kernel='rbf', C=1.0)
-                
-                # Market cycle models
-                self.models['cycle_rf'] = RandomForestRegressor(
-                    n_estimators=100, random_state=42, n_jobs=-1
-                )
-                
-                # Initialize scalers
-                self.scalers['standard'] = StandardScaler()
-                self.scalers['robust'] = RobustScaler()
-                
-                logger.info("ML models initialized successfully")
-            else:
-                logger.info("Using simplified statistical models")
-                
+            self.registry.preload(SERVED_MODELS)
         except Exception as e:
-            logger.error(f"Error initializing models: {e}")
+            logger.error(f"Error loading published models: {e}")
+    
+    def _new_model(self, model_name: str):
+        """Create an untrained estimator for an offline training run"""
+        if model_name == 'price_rf':
+            return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+        if model_name == 'price_gb':
+            return GradientBoostingRegressor(n_estimators=100, random_state=42)
+        if model_name == 'price_linear':
+            return LinearRegression()
+        if model_name == 'trend_rf':
+            return RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+        raise ValueError(f"Unknown model: {model_name}")
     
     def predict_property_prices(self, market_data: pd.DataFrame, 
                                property_features: Dict[str, Any],
@@ -112,42 +110,44 @@ class MarketPredictor:
             if not features:
                 return {'error': 'Failed to prepare features'}
             
-            # Make predictions using different models
+            # Make predictions using the published models
             predictions = {}
             confidence_intervals = {}
-            
-            for model_name, model in self.models.items():
-                if 'price' in model_name:
-                    try:
-                        # Train model if not already trained
-                        if not hasattr(model, 'fitted_'):
-                            self._train_price_model(model, market_data)
-                        
-                        # Make prediction
-                        pred = model.predict([features])[0]
-                        predictions[model_name] = pred
+            model_versions = {}
+            
+            for model_name in PRICE_MODELS:
+                try:
+                    # Forests return the spread across their trees from the same batched call
+                    result, loaded = self.registry.predict(model_name, [features], predictor=predict_with_spread)
+                    if loaded is None:
+                        continue
+                    mean_pred, spread = result
+                    pred = float(mean_pred[0])
+                    predictions[model_name] = pred
+                    model_versions[model_name] = loaded.version
+                    
+                    # Calculate confidence interval (simplified)
+                    if spread is not None:
+                        std_pred = float(spread[0])
+                        confidence_intervals[model_name] = {
+                            'lower': pred - 1.96 * std_pred,
+                            'upper': pred + 1.96 * std_pred,
+                            'confidence': 0.95
+                        }
+                    else:
+                        # For linear and boosted models, use a simple confidence interval
+                        confidence_intervals[model_name] = {
+                            'lower': pred * 0.9,
+                            'upper': pred * 1.1,
+                            'confidence': 0.8
+                        }
                         
-                        # Calculate confidence interval (simplified)
-                        if hasattr(model, 'estimators_'):
-                            # For ensemble models, use predictions from all estimators
-                            all_preds = [est.predict([features])[0] for est in model.estimators_]
-                            std_pred = np.std(all_preds)
-                            confidence_intervals[model_name] = {
-                                'lower': pred - 1.96 * std_pred,
-                                'upper': pred + 1.96 * std_pred,
-                                'confidence': 0.95
-                            }
-                        else:
-                            # For linear models, use a simple confidence interval
-                            confidence_intervals[model_name] = {
-                                'lower': pred * 0.9,
-                                'upper': pred * 1.1,
-                                'confidence': 0.8
-                            }
-                            
-                    except Exception as e:
-                        logger.error(f"Error with model {model_name}: {e}")
-                        predictions[model_name] = None
+                except Exception as e:
+                    logger.error(f"Error with model {model_name}: {e}")
+                    predictions[model_name] = None
+            
+            if not model_versions:
+                return {'error': 'No trained price models available'}
             
             # Ensemble prediction (average of all models)
             valid_predictions = [p for p in predictions.values() if p is not None]
@@ -162,20 +162,31 @@ class MarketPredictor:
                     'confidence': 0.95
                 }
             
-            # Store prediction history
-            prediction_record = {
-                'timestamp': datetime.now().isoformat(),
+            # Full record to the audit log (and drift monitor); a compact summary in memory
+            timestamp = datetime.now().isoformat()
+            self.prediction_log.log({
+                'timestamp': timestamp,
+                'kind': 'property_price',
+                'features': dict(zip(PRICE_FEATURES, features)),
                 'property_features': property_features,
                 'predictions': predictions,
+                'model_versions': model_versions,
                 'confidence_intervals': confidence_intervals,
                 'horizon': prediction_horizon
-            }
-            self.prediction_history.append(prediction_record)
+            })
+            self.prediction_count += 1
+            self.prediction_history.append({
+                'timestamp': timestamp,
+                'ensemble': predictions.get('ensemble'),
+                'model_versions': model_versions,
+                'horizon': prediction_horizon
+            })
             
             return {
                 'predictions': predictions,
                 'confidence_intervals': confidence_intervals,
                 'prediction_horizon': prediction_horizon,
+                'model_versions': model_versions,
                 'timestamp': datetime.now().isoformat(),
                 'model_count': len([p for p in predictions.values() if p is not None])
             }
@@ -233,7 +244,10 @@ class MarketPredictor:
                 trend_predictions['ml_forecast'] = self._ml_trend_forecast(time_series, forecast_periods)
             
             # Market cycle analysis
-            trend_predictions['market_cycle'] = self._analyze_market_cycle(time_series)
+            trend_predictions['market_cycle'] = {
+                'current_phase': self._identify_market_phase(time_series),
+                'cycle_strength': self._measure_cycle_strength(time_series)
+            }
             
             # Generate trend summary
             trend_summary = self._generate_trend_summary(trend_predictions)
@@ -316,47 +330,9 @@ class MarketPredictor:
     
     def _prepare_price_features(self, market_data: pd.DataFrame, 
                                property_features: Dict[str, Any]) -> List[float]:
-        """Prepare features for price prediction"""
+        """Prepare features for price prediction (same layout the price models are trained on)"""
         try:
-            features = []
-            
-            # Basic property features
-            features.extend([
-                property_features.get('bedrooms', 0),
-                property_features.get('bathrooms', 0),
-                property_features.get('square_feet', 0),
-                property_features.get('age', 0)
-            ])
-            
-            # Market features (averages from market data)
-            if not market_data.empty:
-                features.extend([
-                    market_data['price'].mean(),
-                    market_data['price'].std(),
-                    market_data['price'].median(),
-                    market_data['price'].quantile(0.25),
-                    market_data['price'].quantile(0.75)
-                ])
-            else:
-                features.extend([0, 0, 0, 0, 0])
-            
-            # Location features (simplified)
-            features.extend([
-                property_features.get('location_score', 0),
-                property_features.get('accessibility_score', 0),
-                property_features.get('amenity_score', 0)
-            ])
-            
-            # Time features
-            current_date = datetime.now()
-            features.extend([
-                current_date.year,
-                current_date.month,
-                current_date.day,
-                current_date.weekday()
-            ])
-            
-            return features
+            return [float(property_features.get(name) or 0) for name in PRICE_FEATURES]
             
         except Exception as e:
             logger.error(f"Error preparing price features: {e}")
@@ -378,7 +354,7 @@ class MarketPredictor:
             
             # Resample to monthly frequency if needed
             if len(time_series) > 12:  # Only resample if we have enough data
-                time_series = time_series.resample('M').mean()
+                time_series = time_series.resample('MS').mean()
             
             # Remove any NaN values
             time_series = time_series.dropna()
@@ -455,32 +431,22 @@ class MarketPredictor:
             return {'seasonal_strength': 0, 'seasonal_pattern': 'error'}
     
     def _ml_trend_forecast(self, time_series: pd.Series, periods: int) -> Dict[str, Any]:
-        """Make ML-based trend forecast"""
+        """Make ML-based trend forecast with the published trend model"""
         try:
             if not ML_AVAILABLE or len(time_series) < 12:
                 return {'forecast': [], 'confidence': 0}
             
-            # Prepare features for ML model
-            X, y = self._create_ml_features(time_series)
-            
-            if len(X) < 2:
-                return {'forecast': [], 'confidence': 0}
-            
-            # Train trend model
-            model = self.models.get('trend_rf')
-            if model is None:
-                return {'forecast': [], 'confidence': 0}
-            
-            model.fit(X, y)
-            
-            # Make future predictions
+            # Inference only: the trend model is trained offline across all segments
             future_features = self._create_future_features(time_series, periods)
-            forecast = model.predict(future_features)
+            forecast, loaded = self.registry.predict(TREND_MODEL, future_features)
+            if loaded is None:
+                return {'forecast': [], 'confidence': 0, 'model_status': 'not_trained'}
             
             return {
                 'forecast': forecast.tolist(),
                 'confidence': 0.8,  # Simplified confidence
-                'model_type': 'RandomForest'
+                'model_type': 'RandomForest',
+                'model_version': loaded.version
             }
             
         except Exception as e:
@@ -490,24 +456,7 @@ class MarketPredictor:
     def _create_ml_features(self, time_series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
         """Create features for ML models"""
         try:
-            features = []
-            targets = []
-            
-            # Use lagged values as features
-            for i in range(6, len(time_series)):
-                feature_row = [
-                    time_series.iloc[i-1],  # Previous value
-                    time_series.iloc[i-2],  # Two periods ago
-                    time_series.iloc[i-3],  # Three periods ago
-                    time_series.iloc[i-6],  # Six periods ago
-                    time_series.iloc[i-12] if i >= 12 else time_series.iloc[i-6],  # Year ago
-                    time_series.index[i].month,  # Month
-                    time_series.index[i].year,   # Year
-                ]
-                features.append(feature_row)
-                targets.append(time_series.iloc[i])
-            
-            return np.array(features), np.array(targets)
+            return trend_training_matrix(time_series)
             
         except Exception as e:
             logger.error(f"Error creating ML features: {e}")
@@ -516,23 +465,7 @@ class MarketPredictor:
     def _create_future_features(self, time_series: pd.Series, periods: int) -> np.ndarray:
         """Create features for future predictions"""
         try:
-            future_features = []
-            last_date = time_series.index[-1]
-            
-            for i in range(1, periods + 1):
-                future_date = last_date + pd.DateOffset(months=i)
-                feature_row = [
-                    time_series.iloc[-1],      # Last known value
-                    time_series.iloc[-2],      # Second to last
-                    time_series.iloc[-3],      # Third to last
-                    time_series.iloc[-6] if len(time_series) >= 6 else time_series.iloc[-1],
-                    time_series.iloc[-12] if len(time_series) >= 12 else time_series.iloc[-1],
-                    future_date.month,
-                    future_date.year
-                ]
-                future_features.append(feature_row)
-            
-            return np.array(future_features)
+            return trend_forecast_matrix(time_series, periods)
             
         except Exception as e:
             logger.error(f"Error creating future features: {e}")
@@ -706,47 +639,118 @@ class MarketPredictor:
             logger.error(f"Error calculating cycle indicators: {e}")
             return {}
     
-    def _train_price_model(self, model, market_data: pd.DataFrame):
-        """Train price prediction model"""
+    def train_models(self, market_data: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Train the trend and price models and publish them to the registry
+        
+        Runs offline (tasks.ml_training.train_market_models on the ml_training
+        queue); serving processes pick the new versions up on their next poll.
+        
+        Args:
+            market_data: Historical market data (location, property_type, date,
+                price and the PRICE_FEATURES columns)
+            
+        Returns:
+            Dict[str, Any]: Published version and holdout metrics per model
+        """
+        if not ML_AVAILABLE:
+            return {'error': 'scikit-learn not available'}
+        
+        results = {}
+        trend_result = self._train_trend_model(market_data)
+        if trend_result:
+            results[TREND_MODEL] = trend_result
+        for model_name in PRICE_MODELS:
+            price_result = self._train_price_model(model_name, market_data)
+            if price_result:
+                results[model_name] = price_result
+        return results
+    
+    def _train_trend_model(self, market_data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Train the trend model on lag features pooled across every location and property type"""
         try:
             if market_data.empty:
-                return
-            
-            # Prepare training data
-            X = []
-            y = []
-            
-            for _, row in market_data.iterrows():
-                features = [
-                    row.get('bedrooms', 0),
-                    row.get('bathrooms', 0),
-                    row.get('square_feet', 0),
-                    row.get('age', 0),
-                    row.get('location_score', 0),
-                    row.get('accessibility_score', 0),
-                    row.get('amenity_score', 0)
-                ]
-                
-                if all(isinstance(f, (int, float)) for f in features):
-                    X.append(features)
-                    y.append(row.get('price', 0))
+                return None
+            
+            feature_sets = []
+            target_sets = []
+            for _, segment in market_data.groupby(['location', 'property_type']):
+                time_series = self._prepare_time_series_data(segment.copy())
+                if len(time_series) < 12:
+                    continue
+                X, y = self._create_ml_features(time_series)
+                if len(X):
+                    feature_sets.append(X)
+                    target_sets.append(y)
+            
+            if not feature_sets:
+                logger.warning("Not enough time series data to train the trend model")
+                return None
+            
+            X = np.vstack(feature_sets)
+            y = np.concatenate(target_sets)
+            return self._fit_and_publish(TREND_MODEL, X, y, TREND_FEATURES)
+            
+        except Exception as e:
+            logger.error(f"Error training trend model: {e}")
+            return None
+    
+    def _train_price_model(self, model_name: str, market_data: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """Train one price prediction model"""
+        try:
+            if market_data.empty:
+                return None
+            
+            X, y = numeric_matrix(market_data, PRICE_FEATURES, target_column='price')
             
             if len(X) > 10:  # Only train if we have enough data
-                X = np.array(X)
-                y = np.array(y)
-                
-                # Remove any NaN values
-                mask = ~(np.isnan(X).any(axis=1) | np.isnan(y))
-                X = X[mask]
-                y = y[mask]
-                
-                if len(X) > 10:
-                    model.fit(X, y)
-                    model.fitted_ = True
-                    logger.info(f"Price model {type(model).__name__} trained successfully")
+                return self._fit_and_publish(model_name, X, y, PRICE_FEATURES)
+            
+            logger.warning(f"Not enough price data to train {model_name}")
+            return None
             
         except Exception as e:
-            logger.error(f"Error training price model: {e}")
+            logger.error(f"Error training price model {model_name}: {e}")
+            return None
+    
+    def _fit_and_publish(self, model_name: str, X: np.ndarray, y: np.ndarray,
+                         feature_names: List[str]) -> Dict[str, Any]:
+        """Fit on a training split, score on the holdout, refit on everything and publish"""
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        model = self._new_model(model_name)
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        nonzero = y_test != 0
+        metrics = {
+            'mae': float(mean_absolute_error(y_test, y_pred)),
+            'r2': float(r2_score(y_test, y_pred)) if len(y_test) > 1 else None,
+            'mape': float(np.mean(np.abs((y_test[nonzero] - y_pred[nonzero]) / y_test[nonzero]))) if nonzero.any() else None,
+            'train_rows': int(len(X_train)),
+            'test_rows': int(len(X_test)),
+        }
+        
+        model = self._new_model(model_name)
+        model.fit(X, y)
+        if hasattr(model, 'feature_importances_'):
+            self.feature_importance[model_name] = dict(zip(feature_names, model.feature_importances_.round(4).tolist()))
+        
+        # Training distribution, the baseline the prediction log measures drift against
+        feature_stats = {name: {'mean': float(X[:, i].mean()), 'std': float(X[:, i].std())}
+                         for i, name in enumerate(feature_names)}
+        feature_stats['prediction'] = {'mean': float(y.mean()), 'std': float(y.std())}
+        
+        version = self.registry.publish(model_name, model, metrics=metrics, feature_names=feature_names,
+                                        feature_stats=feature_stats)
+        logger.info(f"Trained {model_name} ({type(model).__name__}) version {version}")
+        return {'version': version, 'metrics': metrics}
+    
+    def record_price_outcome(self, valuation: Dict[str, Any], actual_price: float):
+        """Report the realised price for an earlier valuation (per-version online accuracy)"""
+        for model_name, version in valuation.get('model_versions', {}).items():
+            predicted = valuation.get('predictions', {}).get(model_name)
+            if predicted is not None:
+                self.registry.record_outcome(model_name, version, predicted, actual_price)
     
     def _generate_trend_summary(self, trend_predictions: Dict[str, Any]) -> Dict[str, Any]:
         """Generate summary of trend predictions"""
@@ -799,9 +803,10 @@ class MarketPredictor:
         """Get summary of all predictions made"""
         try:
             return {
-                'total_predictions': len(self.prediction_history),
-                'recent_predictions': self.prediction_history[-10:] if self.prediction_history else [],
-                'model_performance': self.model_performance,
+                'total_predictions': self.prediction_count,
+                'recent_predictions': list(self.prediction_history)[-10:],
+                'model_performance': self.registry.get_stats(),
+                'prediction_log': self.prediction_log.get_stats(),
                 'feature_importance': self.feature_importance
             }
         except Exception as e:
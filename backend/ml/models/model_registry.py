@@ -0,0 +1,291 @@
+"""
+Versioned on-disk model registry for train-once, serve-many ML models
+
+Models are trained offline (Celery ml_training queue) and published here as
+immutable versions:
+
+    <ML_MODEL_DIR>/<model name>/<version>/model.joblib
+    <ML_MODEL_DIR>/<model name>/<version>/metadata.json
+    <ML_MODEL_DIR>/<model name>/CURRENT          (name of the served version)
+
+Serving processes load the current version read-only with numpy arrays
+memory-mapped (joblib mmap_mode='r'), so workers on one host share the pages
+of large tree ensembles instead of each holding a private copy. A new version
+is picked up by polling CURRENT and swapped in atomically; requests already
+holding the old model finish with it. Inference latency and, when outcomes are
+reported, accuracy are tracked per model version.
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import joblib
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+    logger.warning("joblib not available. Model registry cannot load or save models.")
+
+try:
+    from prometheus_client import Histogram
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+ML_MODEL_DIR = os.getenv("ML_MODEL_DIR", "data/models")
+ML_MODEL_RELOAD_SECONDS = float(os.getenv("ML_MODEL_RELOAD_SECONDS", "30"))
+ML_MODEL_KEEP_VERSIONS = int(os.getenv("ML_MODEL_KEEP_VERSIONS", "5"))
+
+if PROMETHEUS_AVAILABLE:
+    model_inference_histogram = Histogram(
+        'propertypro_model_inference_seconds',
+        'Model inference latency by model and version',
+        ['model', 'version'],
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+    )
+
+
+@dataclass
+class LoadedModel:
+    """A served model version; treat the estimator as read-only"""
+    name: str
+    version: str
+    model: Any
+    metadata: Dict[str, Any]
+    loaded_at: float = field(default_factory=time.time)
+
+
+class VersionStats:
+    """Inference latency window and online accuracy for one model version"""
+
+    def __init__(self, max_samples: int = 1024):
+        self.latencies_ms: Deque[float] = deque(maxlen=max_samples)
+        self.predictions = 0
+        self.outcomes = 0
+        self.abs_error_sum = 0.0
+        self.abs_pct_error_sum = 0.0
+
+    def observe_latency(self, duration_ms: float, rows: int):
+        self.latencies_ms.append(duration_ms)
+        self.predictions += rows
+
+    def observe_outcome(self, predicted: float, actual: float):
+        self.outcomes += 1
+        self.abs_error_sum += abs(predicted - actual)
+        if actual:
+            self.abs_pct_error_sum += abs(predicted - actual) / abs(actual)
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.latencies_ms)
+        result: Dict[str, Any] = {"predictions": self.predictions, "outcomes": self.outcomes}
+        if ordered:
+            result.update({
+                "p50_ms": round(ordered[len(ordered) // 2], 3),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "max_ms": round(ordered[-1], 3),
+            })
+        if self.outcomes:
+            result.update({
+                "online_mae": round(self.abs_error_sum / self.outcomes, 2),
+                "online_mape": round(self.abs_pct_error_sum / self.outcomes, 4),
+            })
+        return result
+
+
+class ModelRegistry:
+    """Publishes trained model versions to disk and serves the current ones read-only"""
+
+    def __init__(self, base_dir: str = ML_MODEL_DIR, reload_interval: float = ML_MODEL_RELOAD_SECONDS,
+                 keep_versions: int = ML_MODEL_KEEP_VERSIONS):
+        self.base_dir = base_dir
+        self.reload_interval = reload_interval
+        self.keep_versions = keep_versions
+        self._served: Dict[str, LoadedModel] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._stats: Dict[Tuple[str, str], VersionStats] = {}
+        self._lock = threading.Lock()
+
+    # Publishing (training side)
+
+    def publish(self, name: str, model: Any, metrics: Optional[Dict[str, Any]] = None,
+                feature_names: Optional[List[str]] = None, promote: bool = True,
+                feature_stats: Optional[Dict[str, Dict[str, float]]] = None) -> str:
+        """Save a trained model as a new immutable version and optionally make it current"""
+        if not JOBLIB_AVAILABLE:
+            raise RuntimeError("joblib is required to publish models")
+
+        version = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{os.urandom(3).hex()}"
+        model_dir = os.path.join(self.base_dir, name)
+        staging_dir = os.path.join(model_dir, f".staging-{version}")
+        os.makedirs(staging_dir, exist_ok=True)
+
+        # Uncompressed, so arrays can be memory-mapped on load
+        joblib.dump(model, os.path.join(staging_dir, "model.joblib"))
+        metadata = {
+            "name": name,
+            "version": version,
+            "estimator": type(model).__name__,
+            "trained_at": datetime.utcnow().isoformat(),
+            "feature_names": feature_names or [],
+            "metrics": metrics or {},
+            "feature_stats": feature_stats or {},
+        }
+        with open(os.path.join(staging_dir, "metadata.json"), "w") as f:
+            json.dump(metadata, f, indent=2, default=str)
+        os.replace(staging_dir, os.path.join(model_dir, version))
+
+        logger.info(f"Published model {name} version {version}: {metrics}")
+        if promote:
+            self.promote(name, version)
+        self._prune(name)
+        return version
+
+    def promote(self, name: str, version: str):
+        """Point CURRENT at a version (new release or rollback); servers pick it up on their next poll"""
+        model_dir = os.path.join(self.base_dir, name)
+        if not os.path.isdir(os.path.join(model_dir, version)):
+            raise ValueError(f"Unknown version {version} for model {name}")
+        tmp_path = os.path.join(model_dir, f".CURRENT-{os.getpid()}")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(model_dir, "CURRENT"))
+
+    def list_versions(self, name: str) -> List[str]:
+        model_dir = os.path.join(self.base_dir, name)
+        if not os.path.isdir(model_dir):
+            return []
+        return sorted(entry for entry in os.listdir(model_dir)
+                      if not entry.startswith(".") and os.path.isdir(os.path.join(model_dir, entry)))
+
+    def current_version(self, name: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.base_dir, name, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get_metadata(self, name: str, version: str) -> Optional[Dict[str, Any]]:
+        """Metadata of any stored version (the served one without touching disk)"""
+        served = self._served.get(name)
+        if served is not None and served.version == version:
+            return served.metadata
+        try:
+            with open(os.path.join(self.base_dir, name, version, "metadata.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _prune(self, name: str):
+        current = self.current_version(name)
+        versions = self.list_versions(name)
+        for version in versions[:-self.keep_versions] if self.keep_versions else []:
+            if version != current:
+                shutil.rmtree(os.path.join(self.base_dir, name, version), ignore_errors=True)
+
+    # Serving (request side)
+
+    def preload(self, names: Iterable[str]):
+        """Load the current version of each model at startup"""
+        for name in names:
+            self.get(name, force_check=True)
+
+    def get(self, name: str, force_check: bool = False) -> Optional[LoadedModel]:
+        """Currently served version of a model, or None if none has been published"""
+        now = time.monotonic()
+        served = self._served.get(name)
+        if not force_check and served is not None and now - self._checked_at.get(name, 0.0) < self.reload_interval:
+            return served
+
+        with self._lock:
+            served = self._served.get(name)
+            if not force_check and served is not None and now - self._checked_at.get(name, 0.0) < self.reload_interval:
+                return served
+            self._checked_at[name] = now
+
+            version = self.current_version(name)
+            if version is None or (served is not None and served.version == version):
+                return served
+
+            loaded = self._load(name, version)
+            if loaded is not None:
+                if served is not None:
+                    logger.info(f"Hot-swapped model {name}: {served.version} -> {version}")
+                self._served[name] = loaded
+                return loaded
+            return served
+
+    def _load(self, name: str, version: str) -> Optional[LoadedModel]:
+        if not JOBLIB_AVAILABLE:
+            return None
+        version_dir = os.path.join(self.base_dir, name, version)
+        try:
+            model = joblib.load(os.path.join(version_dir, "model.joblib"), mmap_mode="r")
+            with open(os.path.join(version_dir, "metadata.json")) as f:
+                metadata = json.load(f)
+            logger.info(f"Loaded model {name} version {version}")
+            return LoadedModel(name=name, version=version, model=model, metadata=metadata)
+        except Exception as e:
+            logger.error(f"Error loading model {name} version {version}: {e}")
+            return None
+
+    def predict(self, name: str, X: Any,
+                predictor: Optional[Callable[[Any, Any], Any]] = None) -> Tuple[Optional[Any], Optional[LoadedModel]]:
+        """Run inference on the served version (model.predict, or predictor(model, X)) and record its latency"""
+        loaded = self.get(name)
+        if loaded is None:
+            return None, None
+
+        started = time.perf_counter()
+        predictions = predictor(loaded.model, X) if predictor else loaded.model.predict(X)
+        self.observe_latency(loaded, time.perf_counter() - started, len(X))
+        return predictions, loaded
+
+    def observe_latency(self, loaded: LoadedModel, seconds: float, rows: int = 1):
+        self._version_stats(loaded.name, loaded.version).observe_latency(seconds * 1000, rows)
+        if PROMETHEUS_AVAILABLE:
+            model_inference_histogram.labels(model=loaded.name, version=loaded.version).observe(seconds)
+
+    def record_outcome(self, name: str, version: str, predicted: float, actual: float):
+        """Report a realised value for an earlier prediction (online accuracy per version)"""
+        self._version_stats(name, version).observe_outcome(predicted, actual)
+
+    def _version_stats(self, name: str, version: str) -> VersionStats:
+        key = (name, version)
+        stats = self._stats.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._stats.setdefault(key, VersionStats())
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Served version, offline metrics and per-version serving stats for each model"""
+        report: Dict[str, Any] = {}
+        for name, loaded in list(self._served.items()):
+            report[name] = {
+                "served_version": loaded.version,
+                "trained_at": loaded.metadata.get("trained_at"),
+                "offline_metrics": loaded.metadata.get("metrics", {}),
+                "versions": {},
+            }
+        for (name, version), stats in list(self._stats.items()):
+            report.setdefault(name, {"versions": {}})["versions"][version] = stats.summary()
+        return report
+
+
+# Global registry instance
+model_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry"""
+    return model_registry
@@ -17,6 +17,8 @@ import re
 from pathlib import Path
 import json
 
+from .feature_engine import add_lag_features
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -32,7 +34,9 @@ class DataPreprocessor:
             'categorical_encoding': 'onehot',  # 'onehot', 'label', 'target'
             'date_features': True,
             'text_features': True,
-            'geographic_features': True
+            'geographic_features': True,
+            # e.g. {'value_column': 'price', 'date_column': 'date', 'group_columns': ['location']}
+            'lag_features': None
         }
         self.preprocessing_history = []
         self.feature_stats = {}
@@ -264,6 +268,12 @@ class DataPreprocessor:
                 enhanced_data = self._create_geographic_features(enhanced_data)
                 feature_log['new_features'].extend(['geographic_features_created'])
             
+            # Create lag/rolling features for time-ordered series
+            lag_config = feature_config.get('lag_features')
+            if lag_config:
+                enhanced_data = add_lag_features(enhanced_data, **lag_config)
+                feature_log['new_features'].extend(['lag_features_created'])
+            
             # Create interaction features
             enhanced_data = self._create_interaction_features(enhanced_data)
             feature_log['new_features'].extend(['interaction_features_created'])
@@ -582,29 +592,32 @@ class DataPreprocessor:
     def _create_interaction_features(self, data: pd.DataFrame) -> pd.DataFrame:
         """Create interaction features between numeric columns"""
         try:
-            enhanced_data = data.copy()
-            numeric_columns = enhanced_data.select_dtypes(include=[np.number]).columns.tolist()
-            
-            # Create interaction features for pairs of numeric columns
-            if len(numeric_columns) >= 2:
-                for i in range(len(numeric_columns)):
-                    for j in range(i + 1, len(numeric_columns)):
-                        col1, col2 = numeric_columns[i], numeric_columns[j]
-                        
-                        # Multiplication
-                        enhanced_data[f'{col1}_x_{col2}'] = enhanced_data[col1] * enhanced_data[col2]
-                        
-                        # Division (with safety check)
-                        if (enhanced_data[col2] != 0).all():
-                            enhanced_data[f'{col1}_div_{col2}'] = enhanced_data[col1] / enhanced_data[col2]
-                        
-                        # Sum
-                        enhanced_data[f'{col1}_plus_{col2}'] = enhanced_data[col1] + enhanced_data[col2]
-                        
-                        # Difference
-                        enhanced_data[f'{col1}_minus_{col2}'] = enhanced_data[col1] - enhanced_data[col2]
-            
-            return enhanced_data
+            numeric_columns = data.select_dtypes(include=[np.number]).columns.tolist()
+            if len(numeric_columns) < 2:
+                return data.copy()
+            
+            # All pairs at once on the NumPy block, then a single concat
+            values = data[numeric_columns].to_numpy(dtype=float)
+            left, right = np.triu_indices(len(numeric_columns), k=1)
+            a, b = values[:, left], values[:, right]
+            nonzero = (b != 0).all(axis=0)
+            
+            pair_count = len(left)
+            stacked = np.hstack([a * b, np.divide(a, b, out=np.zeros_like(a), where=b != 0), a + b, a - b])
+            
+            # Same column order as building them pair by pair: x, div (only if no zero divisor), plus, minus
+            columns = []
+            names = []
+            for k in range(pair_count):
+                col1, col2 = numeric_columns[left[k]], numeric_columns[right[k]]
+                for offset, suffix in enumerate(('x', 'div', 'plus', 'minus')):
+                    if suffix == 'div' and not nonzero[k]:
+                        continue
+                    columns.append(offset * pair_count + k)
+                    names.append(f'{col1}_{suffix}_{col2}')
+            
+            interactions = pd.DataFrame(stacked[:, columns], columns=names, index=data.index)
+            return pd.concat([data, interactions], axis=1)
             
         except Exception as e:
             logger.error(f"Error creating interaction features: {e}")
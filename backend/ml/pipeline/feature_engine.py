@@ -0,0 +1,182 @@
+"""
+Feature Engine - Vectorized feature construction for real estate ML models
+
+This module provides:
+- Lag, rolling and momentum features built with shift/rolling (per group)
+- Trend training and forecast matrices for MarketPredictor
+- Numeric feature matrices from DataFrames without row iteration
+- Tree-ensemble predictions with spread from one batched apply() call
+"""
+
+import weakref
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Lags used by the trend model (periods of the monthly series)
+TREND_LAGS = (1, 2, 3, 6, 12)
+TREND_MIN_HISTORY = 6
+
+
+def add_lag_features(data: pd.DataFrame, value_column: str,
+                     date_column: Optional[str] = None,
+                     group_columns: Optional[Sequence[str]] = None,
+                     lags: Sequence[int] = TREND_LAGS,
+                     rolling_windows: Sequence[int] = (3, 12)) -> pd.DataFrame:
+    """
+    Add lag, rolling mean and momentum columns for a value column
+
+    Rows are ordered by date within each group; rolling windows only see
+    earlier rows, so the features carry no look-ahead.
+
+    Args:
+        data: Input DataFrame
+        value_column: Column to derive features from (e.g. price)
+        date_column: Column giving the order of observations
+        group_columns: Series identity (e.g. community, property_type)
+        lags: Lag periods to add
+        rolling_windows: Trailing window sizes for rolling means
+
+    Returns:
+        pd.DataFrame: Copy of data with the new columns, in the original row order
+    """
+    if data.empty or value_column not in data.columns:
+        return data
+
+    # Work on a positional copy in date order; restore the caller's order and index at the end
+    order = np.argsort(data[date_column].to_numpy(), kind='stable') if date_column else np.arange(len(data))
+    work = data.iloc[order].reset_index(drop=True)
+    values = pd.to_numeric(work[value_column], errors='coerce')
+    keys = [work[col] for col in group_columns] if group_columns else None
+
+    def shifted(series: pd.Series, periods: int) -> pd.Series:
+        return series.groupby(keys, sort=False).shift(periods) if keys else series.shift(periods)
+
+    new_columns: Dict[str, pd.Series] = {}
+    for lag in lags:
+        new_columns[f'{value_column}_lag_{lag}'] = shifted(values, lag)
+
+    previous = shifted(values, 1)
+    for window in rolling_windows:
+        if keys:
+            rolled = previous.groupby(keys, sort=False).rolling(window, min_periods=1).mean()
+            rolled = rolled.reset_index(level=list(range(len(keys))), drop=True)
+        else:
+            rolled = previous.rolling(window, min_periods=1).mean()
+        new_columns[f'{value_column}_rolling_mean_{window}'] = rolled
+
+    new_columns[f'{value_column}_pct_change'] = (values - previous) / previous.replace(0, np.nan)
+
+    work = pd.concat([work, pd.DataFrame(new_columns, index=work.index)], axis=1)
+    enhanced_data = work.iloc[np.argsort(order, kind='stable')]
+    enhanced_data.index = data.index
+    return enhanced_data
+
+
+def trend_training_matrix(time_series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Lag features and targets for the trend model
+
+    One row per period from the seventh onwards:
+    [lag_1, lag_2, lag_3, lag_6, lag_12 (lag_6 until a year of history), month, year]
+    """
+    values = time_series.to_numpy(dtype=float)
+    n = len(values)
+    if n <= TREND_MIN_HISTORY:
+        return np.empty((0, 7)), np.empty(0)
+
+    # Shifted views of one array instead of .iloc per lag per row
+    rows = np.arange(TREND_MIN_HISTORY, n)
+    lag_6 = values[rows - 6]
+    lag_12 = np.where(rows >= 12, values[np.maximum(rows - 12, 0)], lag_6)
+    index = time_series.index
+    X = np.column_stack([
+        values[rows - 1], values[rows - 2], values[rows - 3], lag_6, lag_12,
+        index.month[TREND_MIN_HISTORY:], index.year[TREND_MIN_HISTORY:],
+    ]).astype(float)
+    return X, values[TREND_MIN_HISTORY:]
+
+
+def trend_forecast_matrix(time_series: pd.Series, periods: int) -> np.ndarray:
+    """
+    Feature rows for the next `periods` months: the latest known lags
+    (with the same short-history fallbacks) and each future month/year
+    """
+    values = time_series.to_numpy(dtype=float)
+    n = len(values)
+    if n == 0 or periods <= 0:
+        return np.empty((0, 7))
+
+    def lag(k: int) -> float:
+        return values[-k] if n >= k else values[-1]
+
+    last_date = time_series.index[-1]
+    month_numbers = last_date.year * 12 + (last_date.month - 1) + np.arange(1, periods + 1)
+    known = np.array([lag(1), lag(2), lag(3), lag(6), lag(12)])
+    return np.column_stack([np.tile(known, (periods, 1)), month_numbers % 12 + 1, month_numbers // 12]).astype(float)
+
+
+def numeric_matrix(data: pd.DataFrame, columns: Sequence[str],
+                   target_column: Optional[str] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Float feature matrix (and target) for the given columns
+
+    Missing columns count as 0; rows with a non-numeric or missing
+    feature or target are dropped.
+    """
+    frame = data.reindex(columns=list(columns), fill_value=0).apply(pd.to_numeric, errors='coerce')
+    X = frame.to_numpy(dtype=float)
+    valid = ~np.isnan(X).any(axis=1)
+
+    y = None
+    if target_column is not None:
+        y = pd.to_numeric(data[target_column], errors='coerce').to_numpy(dtype=float) \
+            if target_column in data.columns else np.zeros(len(data))
+        valid &= ~np.isnan(y)
+        y = y[valid]
+    return X[valid], y
+
+
+# Leaf value tables per fitted forest, built once per model version
+_leaf_tables: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _leaf_value_table(model) -> np.ndarray:
+    table = _leaf_tables.get(model)
+    if table is None:
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        table = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+        for index, tree in enumerate(trees):
+            table[index, :tree.node_count] = tree.value[:, 0, 0]
+        _leaf_tables[model] = table
+    return table
+
+
+def is_tree_ensemble(model) -> bool:
+    """Averaging forest (RandomForest/ExtraTrees) whose trees are independent predictors"""
+    return hasattr(model, 'apply') and isinstance(getattr(model, 'estimators_', None), list)
+
+
+def ensemble_predict(model, X) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean and spread across the trees of a forest for every row of X
+
+    One model.apply() call gives each row's leaf in every tree; the leaf
+    values are then gathered from a per-model table, instead of calling
+    predict() once per tree.
+    """
+    X = np.asarray(X, dtype=float)
+    leaves = model.apply(X)  # (rows, trees)
+    table = _leaf_value_table(model)
+    per_tree = table[np.arange(table.shape[0]), leaves]
+    return per_tree.mean(axis=1), per_tree.std(axis=1)
+
+
+def predict_with_spread(model, X) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Predictions plus per-row tree spread for forests (None for other estimators)"""
+    if is_tree_ensemble(model):
+        return ensemble_predict(model, X)
+    return model.predict(X), None
@@ -0,0 +1,299 @@
+"""
+Market Series Store - Monthly market aggregates for the ML insights endpoints
+
+This module provides:
+- Incremental roll-up of listings (properties) and deals (transactions) into
+  monthly aggregates per location and property type: listing and sale counts,
+  median prices and price per sq ft, median annual rent and gross yield
+- Refreshes that only recompute the months touched by rows changed since the
+  last run (watermark on updated_at), plus months queued by triggers when rows
+  are deleted or moved to another month
+- An in-process columnar snapshot (categorical segment codes plus one array
+  per measure) so the predictor endpoints filter and slice in milliseconds
+
+The aggregates live in market_series_monthly (Alembic 007); the snapshot is
+reloaded when a refresh has published new data.
+"""
+
+import os
+import time
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+MARKET_SERIES_SNAPSHOT_TTL = float(os.getenv("MARKET_SERIES_SNAPSHOT_TTL", "60"))
+# Re-scan a little before the watermark so rows committed late by long transactions are not missed
+MARKET_SERIES_WATERMARK_OVERLAP = timedelta(minutes=int(os.getenv("MARKET_SERIES_WATERMARK_OVERLAP_MINUTES", "10")))
+
+STATE_KEY = "market_series_monthly"
+RENTAL_TYPES = ("rental", "rent", "lease")
+
+MEASURE_COLUMNS = [
+    "listing_count", "median_list_price", "median_list_psf",
+    "sale_count", "sale_value", "median_sale_price", "median_sale_psf",
+    "rental_count", "median_annual_rent", "gross_yield",
+]
+
+# Draining the queue inside the refresh transaction means a failed refresh puts the months back
+AFFECTED_PERIODS_SQL = """
+    WITH dirty AS (
+        DELETE FROM market_series_dirty_periods RETURNING period
+    )
+    SELECT period FROM dirty
+    UNION
+    SELECT date_trunc('month', created_at)::date AS period
+    FROM properties WHERE updated_at > :since
+    UNION
+    SELECT date_trunc('month', COALESCE(t.transaction_date, t.created_at))::date
+    FROM transactions t WHERE t.updated_at > :since
+    UNION
+    SELECT date_trunc('month', COALESCE(t.transaction_date, t.created_at))::date
+    FROM transactions t JOIN properties p ON p.id = t.property_id
+    WHERE p.updated_at > :since
+"""
+
+# Annual rent is the final_price of rental/lease deals (Dubai rents are quoted per year)
+ROLLUP_SQL = """
+    INSERT INTO market_series_monthly (
+        location, property_type, period,
+        listing_count, median_list_price, median_list_psf,
+        sale_count, sale_value, median_sale_price, median_sale_psf,
+        rental_count, median_annual_rent, gross_yield, refreshed_at
+    )
+    WITH listings AS (
+        SELECT location, property_type, date_trunc('month', created_at)::date AS period,
+               price, price / NULLIF(area_sqft, 0) AS psf
+        FROM properties
+        WHERE price > 0 AND location IS NOT NULL AND property_type IS NOT NULL
+          AND date_trunc('month', created_at)::date = ANY(:periods)
+    ),
+    deals AS (
+        SELECT p.location, p.property_type,
+               date_trunc('month', COALESCE(t.transaction_date, t.created_at))::date AS period,
+               t.final_price AS price, t.final_price / NULLIF(p.area_sqft, 0) AS psf,
+               lower(t.transaction_type) = ANY(:rental_types) AS is_rental
+        FROM transactions t JOIN properties p ON p.id = t.property_id
+        WHERE t.final_price > 0 AND p.location IS NOT NULL AND p.property_type IS NOT NULL
+          AND date_trunc('month', COALESCE(t.transaction_date, t.created_at))::date = ANY(:periods)
+    ),
+    listing_stats AS (
+        SELECT location, property_type, period,
+               COUNT(*) AS listing_count,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY price) AS median_list_price,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY psf) AS median_list_psf
+        FROM listings GROUP BY location, property_type, period
+    ),
+    deal_stats AS (
+        SELECT location, property_type, period,
+               COUNT(*) FILTER (WHERE NOT is_rental) AS sale_count,
+               SUM(price) FILTER (WHERE NOT is_rental) AS sale_value,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FILTER (WHERE NOT is_rental) AS median_sale_price,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY psf) FILTER (WHERE NOT is_rental) AS median_sale_psf,
+               COUNT(*) FILTER (WHERE is_rental) AS rental_count,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY price) FILTER (WHERE is_rental) AS median_annual_rent
+        FROM deals GROUP BY location, property_type, period
+    )
+    SELECT location, property_type, period,
+           COALESCE(l.listing_count, 0), l.median_list_price, l.median_list_psf,
+           COALESCE(d.sale_count, 0), d.sale_value, d.median_sale_price, d.median_sale_psf,
+           COALESCE(d.rental_count, 0), d.median_annual_rent,
+           d.median_annual_rent / NULLIF(COALESCE(d.median_sale_price, l.median_list_price), 0),
+           now()
+    FROM listing_stats l FULL OUTER JOIN deal_stats d USING (location, property_type, period)
+"""
+
+
+class MarketSeriesSnapshot:
+    """Columnar, read-only copy of market_series_monthly ordered by segment and period"""
+
+    def __init__(self, frame: pd.DataFrame, version: Optional[datetime]):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        frame = frame.sort_values(["location", "property_type", "period"], kind="stable").reset_index(drop=True)
+
+        self.locations = pd.Categorical(frame["location"])
+        self.property_types = pd.Categorical(frame["property_type"])
+        self.periods = pd.to_datetime(frame["period"]).to_numpy()
+        self.measures = {column: pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=float)
+                         for column in MEASURE_COLUMNS if column in frame.columns}
+        self.rows = len(frame)
+
+    def _category_mask(self, categories: pd.Categorical, term: Optional[str]) -> np.ndarray:
+        if not term:
+            return np.ones(self.rows, dtype=bool)
+        # Substring match on the few distinct names, then a code lookup over the rows
+        matching = categories.categories.str.contains(term, case=False, regex=False)
+        return matching[categories.codes] if len(matching) else np.zeros(self.rows, dtype=bool)
+
+    def select(self, location: Optional[str] = None, property_type: Optional[str] = None,
+               since: Optional[date] = None) -> pd.DataFrame:
+        mask = self._category_mask(self.locations, location) & self._category_mask(self.property_types, property_type)
+        if since is not None:
+            mask &= self.periods >= np.datetime64(since)
+        index = np.flatnonzero(mask)
+
+        frame = pd.DataFrame({
+            "location": np.asarray(self.locations)[index],
+            "property_type": np.asarray(self.property_types)[index],
+            "date": self.periods[index],
+        })
+        for column, values in self.measures.items():
+            frame[column] = values[index]
+
+        # MarketPredictor reads 'price': median sale price, or median asking price in months without sales
+        sale = frame.get("median_sale_price")
+        listing = frame.get("median_list_price")
+        if sale is not None and listing is not None:
+            frame["price"] = sale.fillna(listing)
+            frame["price_per_sqft"] = frame["median_sale_psf"].fillna(frame["median_list_psf"])
+        return frame.dropna(subset=["price"]) if "price" in frame.columns else frame
+
+
+class MarketSeriesStore:
+    """Maintains the monthly market aggregates and serves them from a columnar snapshot"""
+
+    def __init__(self, engine_getter: Optional[Callable[[], Any]] = None,
+                 snapshot_ttl: float = MARKET_SERIES_SNAPSHOT_TTL):
+        self.engine_getter = engine_getter or _analytics_engine
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshot: Optional[MarketSeriesSnapshot] = None
+        self._lock = threading.Lock()
+
+    # Refresh (background side)
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Recompute the aggregates for months touched since the last refresh
+
+        Args:
+            full: Recompute every month instead of only the changed ones
+
+        Returns:
+            Dict[str, Any]: Months recomputed, segment rows written and the new watermark
+        """
+        started = time.perf_counter()
+        with self.engine_getter().begin() as conn:
+            # One refresher at a time; a concurrent run waits and then finds nothing new
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": STATE_KEY})
+
+            state = conn.execute(
+                text("SELECT watermark FROM market_series_state WHERE name = :name"), {"name": STATE_KEY}
+            ).first()
+            next_watermark = conn.execute(text("SELECT now()::timestamp")).scalar()
+
+            if full or state is None or state.watermark is None:
+                since = datetime(1970, 1, 1)
+            else:
+                since = state.watermark - MARKET_SERIES_WATERMARK_OVERLAP
+
+            periods = [row.period for row in conn.execute(text(AFFECTED_PERIODS_SQL), {"since": since})
+                       if row.period is not None]
+            rows_written = 0
+            if periods:
+                conn.execute(text("DELETE FROM market_series_monthly WHERE period = ANY(:periods)"),
+                             {"periods": periods})
+                rows_written = conn.execute(
+                    text(ROLLUP_SQL), {"periods": periods, "rental_types": list(RENTAL_TYPES)}
+                ).rowcount
+
+            conn.execute(text("""
+                INSERT INTO market_series_state (name, watermark, refreshed_at)
+                VALUES (:name, :watermark, now())
+                ON CONFLICT (name) DO UPDATE
+                SET watermark = EXCLUDED.watermark,
+                    refreshed_at = CASE WHEN :changed THEN EXCLUDED.refreshed_at ELSE market_series_state.refreshed_at END
+            """), {"name": STATE_KEY, "watermark": next_watermark, "changed": bool(periods)})
+
+        result = {
+            "periods_refreshed": len(periods),
+            "rows_written": rows_written,
+            "full": full,
+            "watermark": next_watermark.isoformat() if next_watermark else None,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        logger.info(f"Market series refresh: {result}")
+        if periods:
+            self.invalidate()
+        return result
+
+    # Reads (request side)
+
+    def get_market_data(self, location: Optional[str] = None, property_type: Optional[str] = None,
+                        since: Optional[date] = None) -> pd.DataFrame:
+        """Monthly series rows for matching segments (case-insensitive substring match)"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return pd.DataFrame()
+        return snapshot.select(location, property_type, since)
+
+    def snapshot(self) -> Optional[MarketSeriesSnapshot]:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.snapshot_ttl:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.snapshot_ttl:
+                return snapshot
+            try:
+                self._snapshot = self._load(snapshot)
+            except Exception as e:
+                logger.error(f"Error loading market series snapshot: {e}")
+                if snapshot is not None:
+                    # Serve the previous data and retry after another TTL
+                    snapshot.loaded_at = time.monotonic()
+            return self._snapshot
+
+    def _load(self, current: Optional[MarketSeriesSnapshot]) -> MarketSeriesSnapshot:
+        with self.engine_getter().connect() as conn:
+            version = conn.execute(
+                text("SELECT refreshed_at FROM market_series_state WHERE name = :name"), {"name": STATE_KEY}
+            ).scalar()
+            if current is not None and version == current.version:
+                current.loaded_at = time.monotonic()
+                return current
+
+            result = conn.execute(text(
+                "SELECT location, property_type, period, " + ", ".join(MEASURE_COLUMNS) +
+                " FROM market_series_monthly"
+            ))
+            frame = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+
+        snapshot = MarketSeriesSnapshot(frame, version)
+        logger.info(f"Loaded market series snapshot: {snapshot.rows} rows")
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot.loaded_at = float("-inf")
+                self._snapshot.version = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "rows": snapshot.rows if snapshot else 0,
+            "segments": len(set(zip(snapshot.locations.codes, snapshot.property_types.codes))) if snapshot else 0,
+            "version": str(snapshot.version) if snapshot and snapshot.version else None,
+        }
+
+
+def _analytics_engine():
+    from app.infrastructure.db.engine_registry import get_engine
+    return get_engine("analytics")
+
+
+# Global store instance
+market_series_store = MarketSeriesStore()
+
+
+def get_market_series_store() -> MarketSeriesStore:
+    """Get the process-wide market series store"""
+    return market_series_store
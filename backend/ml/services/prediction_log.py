@@ -0,0 +1,272 @@
+"""
+Prediction Log - Audit stream and drift monitoring for served ML predictions
+
+This module provides:
+- An append-only JSONL audit log written by a background thread in batches,
+  rotated by size (<PREDICTION_LOG_DIR>/predictions.jsonl -> predictions-<ts>.jsonl)
+- A bounded hand-off queue, so request threads never block on disk; records are
+  dropped (and counted) if the writer falls behind
+- Incremental drift statistics per model version, updated from the same stream:
+  exponentially weighted mean/variance of each input feature and of the
+  prediction, compared with the training baseline stored with the model version
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREDICTION_LOG_ENABLED = os.getenv("PREDICTION_LOG_ENABLED", "true").lower() == "true"
+PREDICTION_LOG_DIR = os.getenv("PREDICTION_LOG_DIR", "data/prediction_logs")
+PREDICTION_LOG_MAX_BYTES = int(os.getenv("PREDICTION_LOG_MAX_BYTES", str(64 * 1024 * 1024)))
+PREDICTION_LOG_MAX_FILES = int(os.getenv("PREDICTION_LOG_MAX_FILES", "20"))
+PREDICTION_LOG_BATCH_SIZE = int(os.getenv("PREDICTION_LOG_BATCH_SIZE", "200"))
+PREDICTION_LOG_FLUSH_SECONDS = float(os.getenv("PREDICTION_LOG_FLUSH_SECONDS", "2"))
+PREDICTION_LOG_QUEUE_SIZE = int(os.getenv("PREDICTION_LOG_QUEUE_SIZE", "10000"))
+
+# Drift: EWMA window (in predictions) and the standardised mean shift that counts as drift
+DRIFT_WINDOW = int(os.getenv("PREDICTION_DRIFT_WINDOW", "500"))
+DRIFT_THRESHOLD = float(os.getenv("PREDICTION_DRIFT_THRESHOLD", "0.5"))
+
+
+class RunningStat:
+    """Exponentially weighted mean and variance, updated one value at a time"""
+
+    __slots__ = ("alpha", "count", "mean", "var")
+
+    def __init__(self, window: int = DRIFT_WINDOW):
+        self.alpha = 2.0 / (window + 1)
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+
+    def update(self, value: float):
+        self.count += 1
+        if self.count == 1:
+            self.mean = value
+            return
+        diff = value - self.mean
+        increment = self.alpha * diff
+        self.mean += increment
+        self.var = (1 - self.alpha) * (self.var + diff * increment)
+
+    @property
+    def std(self) -> float:
+        return self.var ** 0.5
+
+
+class DriftMonitor:
+    """Per model version input and output drift against the training baseline"""
+
+    def __init__(self, baseline_provider: Optional[Callable[[str, str], Optional[Dict[str, Any]]]] = None,
+                 window: int = DRIFT_WINDOW, threshold: float = DRIFT_THRESHOLD):
+        self.baseline_provider = baseline_provider
+        self.window = window
+        self.threshold = threshold
+        self._stats: Dict[Tuple[str, str], Dict[str, RunningStat]] = {}
+        self._baselines: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, record: Dict[str, Any]):
+        """Update the running statistics from one prediction record"""
+        features = record.get("features") or {}
+        predictions = record.get("predictions") or {}
+        with self._lock:
+            for model_name, version in (record.get("model_versions") or {}).items():
+                stats = self._stats.setdefault((model_name, version), {})
+                for name, value in features.items():
+                    if isinstance(value, (int, float)):
+                        stats.setdefault(name, RunningStat(self.window)).update(float(value))
+                prediction = predictions.get(model_name)
+                if isinstance(prediction, (int, float)):
+                    stats.setdefault("prediction", RunningStat(self.window)).update(float(prediction))
+
+    def _baseline(self, key: Tuple[str, str]) -> Dict[str, Any]:
+        if key not in self._baselines:
+            metadata = None
+            if self.baseline_provider:
+                try:
+                    metadata = self.baseline_provider(*key)
+                except Exception as e:
+                    logger.error(f"Error loading drift baseline for {key[0]} {key[1]}: {e}")
+            self._baselines[key] = (metadata or {}).get("feature_stats", {})
+        return self._baselines[key]
+
+    def report(self) -> Dict[str, Any]:
+        """Live vs. training statistics per model version, with drifted features flagged"""
+        with self._lock:
+            snapshot = {key: {name: (stat.count, stat.mean, stat.std) for name, stat in stats.items()}
+                        for key, stats in self._stats.items()}
+
+        report: Dict[str, Any] = {}
+        for key, stats in snapshot.items():
+            baseline = self._baseline(key)
+            features = {}
+            drifted = []
+            for name, (count, mean, std) in stats.items():
+                entry = {"count": count, "live_mean": round(mean, 4), "live_std": round(std, 4)}
+                reference = baseline.get(name)
+                if reference and reference.get("std"):
+                    shift = abs(mean - reference["mean"]) / reference["std"]
+                    entry.update({"train_mean": reference["mean"], "train_std": reference["std"],
+                                  "shift": round(shift, 4)})
+                    if count >= min(self.window, 30) and shift > self.threshold:
+                        drifted.append(name)
+                features[name] = entry
+            report.setdefault(key[0], {})[key[1]] = {"features": features, "drifted": drifted}
+        return report
+
+
+class PredictionLog:
+    """Batched, size-rotated JSONL audit log of predictions feeding the drift monitor"""
+
+    def __init__(self, directory: str = PREDICTION_LOG_DIR, max_bytes: int = PREDICTION_LOG_MAX_BYTES,
+                 max_files: int = PREDICTION_LOG_MAX_FILES, batch_size: int = PREDICTION_LOG_BATCH_SIZE,
+                 flush_interval: float = PREDICTION_LOG_FLUSH_SECONDS, queue_size: int = PREDICTION_LOG_QUEUE_SIZE,
+                 drift_monitor: Optional[DriftMonitor] = None, enabled: bool = PREDICTION_LOG_ENABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self.drift_monitor = drift_monitor or DriftMonitor()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.records_written = 0
+        self.records_dropped = 0
+        self.files_rotated = 0
+        self.write_errors = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, "predictions.jsonl")
+
+    def log(self, record: Dict[str, Any]):
+        """Queue a prediction record; never blocks the caller"""
+        if not self.enabled:
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.records_dropped += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far is written"""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0):
+        """Flush and stop the writer thread"""
+        if self._thread is None:
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="prediction-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch: List[Dict[str, Any]] = []
+            waiters: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full, the flush interval passes or someone waits on a flush
+            while len(batch) < self.batch_size and not waiters:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            payload = "".join(json.dumps(record, default=str) + "\n" for record in batch)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(payload)
+                size = f.tell()
+            self.records_written += len(batch)
+            if size >= self.max_bytes:
+                self._rotate()
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"Error writing prediction log: {e}")
+
+        for record in batch:
+            try:
+                self.drift_monitor.observe(record)
+            except Exception as e:
+                logger.error(f"Error updating drift statistics: {e}")
+
+    def _rotate(self):
+        rotated = os.path.join(self.directory, f"predictions-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.jsonl")
+        os.replace(self.path, rotated)
+        self.files_rotated += 1
+
+        segments = sorted(name for name in os.listdir(self.directory)
+                          if name.startswith("predictions-") and name.endswith(".jsonl"))
+        for name in segments[:-self.max_files] if self.max_files else []:
+            os.remove(os.path.join(self.directory, name))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "queued": self._queue.qsize(),
+            "records_written": self.records_written,
+            "records_dropped": self.records_dropped,
+            "files_rotated": self.files_rotated,
+            "write_errors": self.write_errors,
+            "drift": self.drift_monitor.report(),
+        }
+
+
+def _registry_metadata(name: str, version: str) -> Optional[Dict[str, Any]]:
+    from ..models.model_registry import model_registry
+    return model_registry.get_metadata(name, version)
+
+
+# Global prediction log instance
+prediction_log = PredictionLog(drift_monitor=DriftMonitor(baseline_provider=_registry_metadata))
+atexit.register(prediction_log.close)
+
+
+def get_prediction_log() -> PredictionLog:
+    """Get the process-wide prediction log"""
+    return prediction_log
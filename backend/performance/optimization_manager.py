@@ -14,9 +14,10 @@ from typing import Dict, List, Any, Optional, AsyncGenerator
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 import time
-from collections import OrderedDict
+from collections import OrderedDict, deque
 import redis
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +36,7 @@ class PerformanceOptimizer:
     
     def __init__(self, db_url: str, redis_url: Optional[str] = None):
         self.db_url = db_url
-        self.engine = create_engine(db_url)
+        self.engine = get_engine("oltp", db_url)
         
         # Initialize Redis if available
         self.redis_client = None
@@ -52,8 +53,8 @@ class PerformanceOptimizer:
         self.max_cache_size = 1000
         self.cache_ttl = 3600  # 1 hour default
         
-        # Performance metrics
-        self.response_times: List[float] = []
+        # Performance metrics (averages use the most recent responses only)
+        self.response_times: deque = deque(maxlen=100)
         self.cache_hits = 0
         self.cache_misses = 0
         self.total_requests = 0
@@ -175,7 +176,7 @@ class PerformanceOptimizer:
             self.token_usage["total_cost"] += total_cost
             
             # Calculate metrics
-            avg_response_time = sum(self.response_times[-100:]) / min(len(self.response_times), 100)
+            avg_response_time = sum(self.response_times) / len(self.response_times)
             cache_hit_rate = self.cache_hits / max(self.total_requests, 1)
             
             metrics = {
@@ -295,7 +296,7 @@ class PerformanceOptimizer:
     def get_performance_report(self) -> Dict[str, Any]:
         """Get comprehensive performance report"""
         try:
-            avg_response_time = sum(self.response_times[-100:]) / min(len(self.response_times), 100) if self.response_times else 0
+            avg_response_time = sum(self.response_times) / len(self.response_times) if self.response_times else 0
             cache_hit_rate = self.cache_hits / max(self.total_requests, 1)
             
             return {
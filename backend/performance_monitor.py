@@ -7,18 +7,44 @@ Tracks and analyzes system performance metrics for optimization
 import os
 import time
 import logging
+import threading
 import psutil
 import asyncio
-from typing import Dict, List, Any, Optional
+import numpy as np
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 import json
 from cache_manager import cache_manager
 from hybrid_search_engine import get_hybrid_search_engine
 
 logger = logging.getLogger(__name__)
 
+try:
+    from prometheus_client import CollectorRegistry, Gauge, REGISTRY, generate_latest, CONTENT_TYPE_LATEST, multiprocess
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    logger.warning("prometheus_client not available, metrics exposition disabled")
+
+# Shared directory used by prometheus_client to aggregate values across uvicorn workers
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+if PROMETHEUS_AVAILABLE:
+    if PROMETHEUS_MULTIPROC_DIR:
+        os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    # Host-level samples are identical across workers, so live workers report the max
+    system_metric_gauge = Gauge(
+        'propertypro_system_metric',
+        'Latest sampled value of a performance monitor metric',
+        ['metric', 'unit'],
+        multiprocess_mode='livemax'
+    )
+
 @dataclass
 class PerformanceMetric:
     timestamp: datetime
@@ -40,14 +66,71 @@ class SystemHealth:
     response_time_avg: float
     error_rate: float
 
+class MetricRingBuffer:
+    """Fixed-size NumPy ring buffer holding (timestamp, value) samples for one metric"""
+    
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def append(self, timestamp: float, value: float):
+        """Store a sample, overwriting the oldest one once the buffer is full"""
+        with self._lock:
+            self.timestamps[self._next] = timestamp
+            self.values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+    
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """Return the most recent (timestamp, value) sample in O(1)"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            index = (self._next - 1) % self.capacity
+            return float(self.timestamps[index]), float(self.values[index])
+    
+    def window(self, since: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return samples in chronological order, optionally only those newer than `since`"""
+        with self._lock:
+            if self.count < self.capacity:
+                timestamps = self.timestamps[:self.count].copy()
+                values = self.values[:self.count].copy()
+            else:
+                order = np.roll(np.arange(self.capacity), -self._next)
+                timestamps = self.timestamps[order]
+                values = self.values[order]
+        
+        if since is not None:
+            mask = timestamps > since
+            return timestamps[mask], values[mask]
+        return timestamps, values
+    
+    def percentiles(self, quantiles: List[float], since: float = None) -> Dict[str, float]:
+        """Vectorized percentiles over the (optionally windowed) samples"""
+        _, values = self.window(since)
+        if values.size == 0:
+            return {}
+        results = np.percentile(values, quantiles)
+        return {f"p{int(q)}": round(float(v), 4) for q, v in zip(quantiles, results)}
+
 class PerformanceMonitor:
     """Comprehensive performance monitoring system"""
     
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url)
-        self.metrics_history: List[PerformanceMetric] = []
-        self.health_history: List[SystemHealth] = []
+        self.engine = get_engine("background", database_url)
+        self.buffer_capacity = 1000
+        self.metric_buffers: Dict[str, MetricRingBuffer] = {}
+        self.metric_units: Dict[str, str] = {}
+        self.metrics_recorded = 0
+        self.health_history = deque(maxlen=100)
         self.start_time = datetime.now()
+        self._buffers_lock = threading.Lock()
+        self._sampler_thread: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
         
         # Performance thresholds
         self.thresholds = {
@@ -69,9 +152,11 @@ class PerformanceMonitor:
         """Start continuous performance monitoring"""
         logger.info("🚀 Starting performance monitoring system")
         
+        # System sampling blocks (cpu_percent waits a full interval), so it runs off the event loop
+        self.start_system_sampler()
+        
         # Start monitoring tasks
         tasks = [
-            asyncio.create_task(self._monitor_system_metrics()),
             asyncio.create_task(self._monitor_database_metrics()),
             asyncio.create_task(self._monitor_health_status())
         ]
@@ -81,42 +166,66 @@ class PerformanceMonitor:
         except Exception as e:
             logger.error(f"Error in monitoring tasks: {e}")
     
-    async def _monitor_system_metrics(self):
-        """Monitor system-level metrics"""
-        while True:
+    def start_system_sampler(self):
+        """Start the sidecar thread that samples system metrics"""
+        if self._sampler_thread and self._sampler_thread.is_alive():
+            return
+        
+        self._sampler_stop.clear()
+        self._sampler_thread = threading.Thread(
+            target=self._run_system_sampler,
+            name="performance-monitor-sampler",
+            daemon=True
+        )
+        self._sampler_thread.start()
+    
+    def stop_monitoring(self):
+        """Stop the system sampler thread"""
+        self._sampler_stop.set()
+        if self._sampler_thread:
+            self._sampler_thread.join(timeout=5)
+            self._sampler_thread = None
+    
+    def _run_system_sampler(self):
+        """Sidecar loop that samples system-level metrics"""
+        while not self._sampler_stop.is_set():
             try:
-                # CPU usage
-                cpu_percent = psutil.cpu_percent(interval=1)
-                self._record_metric("cpu_usage", cpu_percent, "percent")
-                
-                # Memory usage
-                memory = psutil.virtual_memory()
-                self._record_metric("memory_usage", memory.percent, "percent")
-                self._record_metric("memory_available", memory.available / (1024**3), "GB")
-                
-                # Disk usage
-                disk = psutil.disk_usage('/')
-                disk_percent = (disk.used / disk.total) * 100
-                self._record_metric("disk_usage", disk_percent, "percent")
-                self._record_metric("disk_free", disk.free / (1024**3), "GB")
-                
-                # Network I/O
-                network = psutil.net_io_counters()
-                self._record_metric("network_bytes_sent", network.bytes_sent / (1024**2), "MB")
-                self._record_metric("network_bytes_recv", network.bytes_recv / (1024**2), "MB")
-                
-                await asyncio.sleep(self.monitoring_intervals["system_metrics"])
-                
+                self._sample_system_metrics()
+                wait_seconds = self.monitoring_intervals["system_metrics"]
             except Exception as e:
                 logger.error(f"Error monitoring system metrics: {e}")
-                await asyncio.sleep(30)
+                wait_seconds = 30
+            
+            self._sampler_stop.wait(wait_seconds)
+    
+    def _sample_system_metrics(self):
+        """Sample system-level metrics"""
+        # CPU usage
+        cpu_percent = psutil.cpu_percent(interval=1)
+        self._record_metric("cpu_usage", cpu_percent, "percent")
+        
+        # Memory usage
+        memory = psutil.virtual_memory()
+        self._record_metric("memory_usage", memory.percent, "percent")
+        self._record_metric("memory_available", memory.available / (1024**3), "GB")
+        
+        # Disk usage
+        disk = psutil.disk_usage('/')
+        disk_percent = (disk.used / disk.total) * 100
+        self._record_metric("disk_usage", disk_percent, "percent")
+        self._record_metric("disk_free", disk.free / (1024**3), "GB")
+        
+        # Network I/O
+        network = psutil.net_io_counters()
+        self._record_metric("network_bytes_sent", network.bytes_sent / (1024**2), "MB")
+        self._record_metric("network_bytes_recv", network.bytes_recv / (1024**2), "MB")
     
     async def _monitor_database_metrics(self):
         """Monitor database performance metrics"""
         while True:
             try:
-                # PostgreSQL metrics
-                await self._monitor_postgres_metrics()
+                # PostgreSQL metrics (synchronous driver, keep it off the event loop)
+                await asyncio.to_thread(self._collect_postgres_metrics)
                 
                 # ChromaDB metrics
                 await self._monitor_chromadb_metrics()
@@ -130,7 +239,7 @@ class PerformanceMonitor:
                 logger.error(f"Error monitoring database metrics: {e}")
                 await asyncio.sleep(60)
     
-    async def _monitor_postgres_metrics(self):
+    def _collect_postgres_metrics(self):
         """Monitor PostgreSQL performance"""
         try:
             with self.engine.connect() as conn:
@@ -145,10 +254,10 @@ class PerformanceMonitor:
                 
                 # Database size
                 result = conn.execute(text("""
-                    SELECT pg_size_pretty(pg_database_size(current_database())) as db_size
+                    SELECT pg_database_size(current_database()) as db_size
                 """))
                 db_size = result.fetchone()[0]
-                self._record_metric("postgres_db_size", db_size, "size")
+                self._record_metric("postgres_db_size", db_size / (1024**2), "MB")
                 
                 # Slow queries (if pg_stat_statements is available)
                 try:
@@ -187,7 +296,6 @@ class PerformanceMonitor:
             
             if redis_health["status"] == "healthy":
                 self._record_metric("redis_status", 1, "status")
-                self._record_metric("redis_memory_usage", redis_health.get("memory_usage", "0"), "memory")
                 self._record_metric("redis_connected_clients", redis_health.get("connected_clients", 0), "count")
             else:
                 self._record_metric("redis_status", 0, "status")
@@ -203,10 +311,6 @@ class PerformanceMonitor:
                 health = await self._check_system_health()
                 self.health_history.append(health)
                 
-                # Keep only last 100 health records
-                if len(self.health_history) > 100:
-                    self.health_history = self.health_history[-100:]
-                
                 # Log health status
                 if health.overall_status != "healthy":
                     logger.warning(f"⚠️ System health issue: {health.overall_status}")
@@ -257,34 +361,27 @@ class PerformanceMonitor:
     
     def _record_metric(self, name: str, value: float, unit: str, metadata: Dict[str, Any] = None):
         """Record a performance metric"""
-        metric = PerformanceMetric(
-            timestamp=datetime.now(),
-            metric_name=name,
-            value=value,
-            unit=unit,
-            metadata=metadata or {}
-        )
+        buffer = self.metric_buffers.get(name)
+        if buffer is None:
+            with self._buffers_lock:
+                buffer = self.metric_buffers.setdefault(name, MetricRingBuffer(self.buffer_capacity))
+                self.metric_units[name] = unit
         
-        self.metrics_history.append(metric)
+        buffer.append(time.time(), float(value))
+        self.metrics_recorded += 1
         
-        # Keep only last 1000 metrics
-        if len(self.metrics_history) > 1000:
-            self.metrics_history = self.metrics_history[-1000:]
+        if PROMETHEUS_AVAILABLE:
+            system_metric_gauge.labels(metric=name, unit=unit).set(float(value))
     
     def _get_current_metrics(self) -> Dict[str, float]:
         """Get current metric values"""
         current_metrics = {}
         
-        # Get latest metrics for each type
-        metric_names = set(metric.metric_name for metric in self.metrics_history)
-        
-        for metric_name in metric_names:
-            latest_metric = next(
-                (m for m in reversed(self.metrics_history) if m.metric_name == metric_name),
-                None
-            )
-            if latest_metric:
-                current_metrics[metric_name] = latest_metric.value
+        # Each buffer tracks its own head, so the latest value is a direct lookup
+        for metric_name, buffer in list(self.metric_buffers.items()):
+            latest = buffer.latest()
+            if latest:
+                current_metrics[metric_name] = latest[1]
         
         return current_metrics
     
@@ -301,42 +398,33 @@ class PerformanceMonitor:
                 "uptime_seconds": uptime.total_seconds(),
                 "uptime_human": str(uptime),
                 "start_time": self.start_time.isoformat(),
-                "total_metrics_collected": len(self.metrics_history)
+                "total_metrics_collected": self.metrics_recorded
             },
             "current_metrics": current_metrics,
             "health_status": asdict(latest_health) if latest_health else None,
             "thresholds": self.thresholds,
             "performance_trends": self._calculate_trends(),
+            "metric_percentiles": self._calculate_percentiles(),
             "alerts": self._check_alerts(current_metrics)
         }
     
     def _calculate_trends(self) -> Dict[str, Any]:
         """Calculate performance trends"""
-        if len(self.metrics_history) < 10:
+        if self.metrics_recorded < 10:
             return {"status": "insufficient_data"}
         
         # Get metrics from last hour
-        one_hour_ago = datetime.now() - timedelta(hours=1)
-        recent_metrics = [m for m in self.metrics_history if m.timestamp > one_hour_ago]
-        
+        one_hour_ago = time.time() - 3600
         trends = {}
-        metric_groups = {}
-        
-        # Group metrics by name
-        for metric in recent_metrics:
-            if metric.metric_name not in metric_groups:
-                metric_groups[metric.metric_name] = []
-            metric_groups[metric.metric_name].append(metric.value)
         
         # Calculate trends for each metric
-        for metric_name, values in metric_groups.items():
-            if len(values) >= 2:
+        for metric_name, buffer in list(self.metric_buffers.items()):
+            _, values = buffer.window(one_hour_ago)
+            if values.size >= 2:
                 # Simple linear trend calculation
-                first_half = values[:len(values)//2]
-                second_half = values[len(values)//2:]
-                
-                first_avg = sum(first_half) / len(first_half)
-                second_avg = sum(second_half) / len(second_half)
+                midpoint = values.size // 2
+                first_avg = float(values[:midpoint].mean())
+                second_avg = float(values[midpoint:].mean())
                 
                 trend_direction = "increasing" if second_avg > first_avg else "decreasing"
                 trend_magnitude = abs(second_avg - first_avg) / first_avg * 100 if first_avg > 0 else 0
@@ -350,6 +438,14 @@ class PerformanceMonitor:
         
         return trends
     
+    def _calculate_percentiles(self, hours: int = 1) -> Dict[str, Dict[str, float]]:
+        """Calculate p50/p95/p99 for each metric over the recent window"""
+        since = time.time() - hours * 3600
+        return {
+            metric_name: buffer.percentiles([50, 95, 99], since)
+            for metric_name, buffer in list(self.metric_buffers.items())
+        }
+    
     def _check_alerts(self, current_metrics: Dict[str, float]) -> List[Dict[str, Any]]:
         """Check for performance alerts"""
         alerts = []
@@ -419,21 +515,35 @@ class PerformanceMonitor:
     
     def get_metrics_history(self, metric_name: str, hours: int = 24) -> List[Dict[str, Any]]:
         """Get historical metrics for a specific metric"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        buffer = self.metric_buffers.get(metric_name)
+        if buffer is None:
+            return []
         
-        filtered_metrics = [
-            asdict(metric) for metric in self.metrics_history
-            if metric.metric_name == metric_name and metric.timestamp > cutoff_time
-        ]
+        cutoff_time = time.time() - hours * 3600
+        timestamps, values = buffer.window(cutoff_time)
+        unit = self.metric_units.get(metric_name, "")
         
-        return filtered_metrics
+        return [
+            asdict(PerformanceMetric(
+                timestamp=datetime.fromtimestamp(timestamp),
+                metric_name=metric_name,
+                value=float(value),
+                unit=unit,
+                metadata={}
+            ))
+            for timestamp, value in zip(timestamps.tolist(), values.tolist())
+        ]
     
     def export_metrics(self, filepath: str):
         """Export metrics to JSON file"""
         try:
+            metrics = []
+            for metric_name in list(self.metric_buffers.keys()):
+                metrics.extend(self.get_metrics_history(metric_name))
+            
             export_data = {
                 "export_timestamp": datetime.now().isoformat(),
-                "metrics": [asdict(metric) for metric in self.metrics_history],
+                "metrics": metrics,
                 "health_history": [asdict(health) for health in self.health_history],
                 "summary": self.get_performance_summary()
             }
@@ -455,3 +565,24 @@ def get_performance_monitor() -> PerformanceMonitor:
     if performance_monitor is None:
         performance_monitor = PerformanceMonitor(database_url=os.getenv("DATABASE_URL"))
     return performance_monitor
+
+def mark_worker_dead(pid: int = None):
+    """Stop this worker's sampler and drop its live gauge files so /metrics stops reporting them"""
+    if performance_monitor is not None:
+        performance_monitor.stop_monitoring()
+    
+    if PROMETHEUS_AVAILABLE and PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), PROMETHEUS_MULTIPROC_DIR)
+
+def render_prometheus_metrics() -> Tuple[bytes, str]:
+    """Render metrics in Prometheus text exposition format, aggregated across workers"""
+    if not PROMETHEUS_AVAILABLE:
+        return b"", CONTENT_TYPE_LATEST
+    
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -7,17 +7,28 @@ Addresses core issues: conversational tone, data presentation, information archi
 import os
 import re
 import time
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 import chromadb
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.infrastructure.db.engine_registry import get_engine
 import logging
 from dataclasses import dataclass
 from enum import Enum
+from app.infrastructure.integrations.llm_client import LLMBudgetExceeded, get_llm_client
 
 # Reelly service removed
 
 logger = logging.getLogger(__name__)
 
+# Lower temperature for more focused responses, longer limit for detailed ones
+RAG_GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.9,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
 class QueryIntent(Enum):
     PROPERTY_SEARCH = "property_search"
     MARKET_INFO = "market_info"
@@ -43,6 +54,15 @@ def get_system_prompt(user_role: str, intent: QueryIntent, retrieved_context: st
     """
     Generates a dynamic system prompt based on user role, intent, and retrieved context.
     """
+    return get_system_prompt_prefix(user_role, intent) + get_context_prompt(retrieved_context, user_name)
+
+@lru_cache(maxsize=64)
+def get_system_prompt_prefix(user_role: str, intent: QueryIntent) -> str:
+    """
+    Instructions that depend only on role and intent. Kept byte-identical across
+    requests and sent ahead of the per-request context, so the LLM client can
+    reuse the prefix instead of resending it.
+    """
 
     # Base Persona and Core Directives
     system_prompt = f"""
@@ -59,7 +79,7 @@ You are "Dubai Realty AI," an expert-level real estate intelligence assistant fo
 8.  **Proactive Insights**: Offer additional relevant information that the user might not have asked for but would find valuable.
 
 ## CONVERSATIONAL ENGAGEMENT
-- **Initial Interaction**: On the very first message of a new conversation, you may use a brief, professional greeting, such as "Hello {user_name}."
+- **Initial Interaction**: On the very first message of a new conversation, you may use a brief, professional greeting, such as "Hello" followed by the user's name given with the retrieved context.
 - **Responding to Greetings**: If the user's entire message is a simple greeting (e.g., "Hi," "Hello there"), respond politely and invite a query (e.g., "Hello. How can I assist you with the Dubai real estate market today?"). For these interactions, you do not need to use the full structured response format.
 - **Responding to Thanks**: If the user's message is solely an expression of gratitude (e.g., "Thank you," "Great, thanks"), respond concisely (e.g., "You're welcome. Is there anything else I can help with?").
 - **Default Behavior**: For ANY other query that contains a request for information, you must revert to the default 'No Fluff' behavior. Omit any greeting and proceed directly to the "Executive Summary."
@@ -72,13 +92,6 @@ You are "Dubai Realty AI," an expert-level real estate intelligence assistant fo
 
 ---
 
-## [RETRIEVED CONTEXT - Your Primary Source of Truth]
-This information has been sourced directly from our internal databases (PostgreSQL, ChromaDB) to answer the user's query.
-
-{retrieved_context}
-
----
-
 ## ENHANCED RESPONSE STRUCTURE
 
 ### **1. Executive Summary**
@@ -141,6 +154,21 @@ If the user is searching for specific properties (QueryIntent.PROPERTY_SEARCH),
 """
     return system_prompt
 
+def get_context_prompt(retrieved_context: str, user_name: str = "User") -> str:
+    """
+    Request-specific part of the prompt: the retrieved context and the user's name.
+    """
+    return f"""
+---
+
+## [RETRIEVED CONTEXT - Your Primary Source of Truth]
+This information has been sourced directly from our internal databases (PostgreSQL, ChromaDB) to answer the user's query.
+
+**User Name**: {user_name}
+
+{retrieved_context}
+"""
+
 def get_role_specific_guidance(user_role: str, intent: QueryIntent):
     """
     Provides role- and intent-specific instructions for the Detailed Analysis section.
@@ -175,7 +203,7 @@ class ContextItem:
 
 class EnhancedRAGService:
     def __init__(self):
-        self.engine = create_engine(os.getenv("DATABASE_URL"))
+        self.engine = get_engine("oltp", os.getenv("DATABASE_URL"))
         
         # Enhanced ChromaDB initialization with retry logic
         self.chroma_client = self._initialize_chroma_client()
@@ -1286,10 +1314,12 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
         
         return context_items
 
-    def get_response(self, message: str, role: str = "client", session_id: str = None, user_name: str = "User") -> str:
+    def get_response(self, message: str, role: str = "client", session_id: str = None, user_name: str = "User",
+                     tenant: Optional[str] = None) -> str:
         """
         Main method to generate a response using the RAG service.
         This is the single source of truth for conversational AI responses.
+        Calls are charged to the tenant's LLM token budget (e.g. "user:42").
         """
         try:
             # 1. Analyze the query
@@ -1301,12 +1331,12 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
             # 3. Build enhanced context string
             context = self.build_structured_context(context_items)
             
-            # 4. Create enhanced prompt using the improved system prompt
-            system_prompt = get_system_prompt(role, analysis.intent, context, user_name)
+            # 4. Stable instructions go first as a reusable prefix, the retrieved context after them
+            system_prefix = get_system_prompt_prefix(role, analysis.intent)
             
-            # 5. Build the complete prompt
+            # 5. Build the request-specific prompt
             full_prompt = f"""
-{system_prompt}
+{get_context_prompt(context, user_name)}
 
 ## USER QUERY:
 {message}
@@ -1314,27 +1344,22 @@ IMPORTANT: Provide specific Dubai real estate information, actual prices, and ac
 ## RESPONSE:
 """
             
-            # 6. Generate response using AI model with enhanced parameters
-            import google.generativeai as genai
-            from config.settings import GOOGLE_API_KEY
-            
-            genai.configure(api_key=GOOGLE_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            
-            # Enhanced generation parameters for better quality
-            response = model.generate_content(
+            # 6. Generate response through the shared LLM client with enhanced parameters
+            result = get_llm_client().generate(
                 full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.3,  # Lower temperature for more focused responses
-                    top_p=0.9,
-                    top_k=40,
-                    max_output_tokens=2048,  # Allow longer, more detailed responses
-                )
+                system_prefix=system_prefix,
+                tenant=tenant,
+                caller="rag",
+                generation_config=RAG_GENERATION_CONFIG,
             )
-            response_text = response.text.strip()
+            response_text = result.text.strip()
             
             return response_text
             
+        except LLMBudgetExceeded as e:
+            logger.warning(f"LLM budget exceeded for tenant {tenant}: {e}")
+            # Surfaced to the router as a 429 rather than apologised for with a 200
+            raise
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return f"I apologize, but I encountered an error while processing your request. Please try again or contact support if the issue persists."
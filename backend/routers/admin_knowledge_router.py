@@ -143,19 +143,16 @@ async def upload_to_knowledge_base(
 async def search_knowledge_base(
     query: str = Query(..., description="Search query"),
     document_type: Optional[str] = Query(None, description="Filter by document type"),
-    limit: int = Query(50, description="Maximum number of results"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of results"),
+    offset: int = Query(0, ge=0, description="Number of ranked results to skip"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Search the knowledge base for structured data
     """
     try:
-        # Search structured data
-        results = data_sorter.search_structured_data(query, document_type)
-        
-        # Limit results
-        if len(results) > limit:
-            results = results[:limit]
+        # Ranked, paginated search across the structured tables
+        results = data_sorter.search_structured_data(query, document_type, limit=limit, offset=offset)
         
         return KnowledgeSearchResponse(
             results=results,
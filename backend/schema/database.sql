@@ -114,3 +114,76 @@ CREATE TABLE IF NOT EXISTS package_steps (
 );
 
 
+
+-- Monthly market aggregates per location and property type (refreshed incrementally by Celery)
+CREATE TABLE IF NOT EXISTS market_series_monthly (
+    location VARCHAR(255) NOT NULL,
+    property_type VARCHAR(50) NOT NULL,
+    period DATE NOT NULL,
+    listing_count INTEGER NOT NULL DEFAULT 0,
+    median_list_price NUMERIC(15,2),
+    median_list_psf NUMERIC(12,2),
+    sale_count INTEGER NOT NULL DEFAULT 0,
+    sale_value NUMERIC(18,2),
+    median_sale_price NUMERIC(15,2),
+    median_sale_psf NUMERIC(12,2),
+    rental_count INTEGER NOT NULL DEFAULT 0,
+    median_annual_rent NUMERIC(15,2),
+    gross_yield NUMERIC(8,5),
+    refreshed_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (location, property_type, period)
+);
+
+CREATE INDEX IF NOT EXISTS ix_market_series_monthly_period ON market_series_monthly(period);
+
+CREATE TABLE IF NOT EXISTS market_series_state (
+    name VARCHAR(64) PRIMARY KEY,
+    watermark TIMESTAMP,
+    refreshed_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS ix_properties_updated_at ON properties(updated_at);
+CREATE INDEX IF NOT EXISTS ix_transactions_updated_at ON transactions(updated_at);
+
+-- Incremental refreshes rely on updated_at being bumped on every update
+CREATE OR REPLACE FUNCTION update_updated_at_column()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_properties_updated_at ON properties;
+CREATE TRIGGER update_properties_updated_at BEFORE UPDATE ON properties FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+DROP TRIGGER IF EXISTS update_transactions_updated_at ON transactions;
+CREATE TRIGGER update_transactions_updated_at BEFORE UPDATE ON transactions FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Months whose rows were deleted or moved to another month, drained by the next refresh
+CREATE TABLE IF NOT EXISTS market_series_dirty_periods (
+    period DATE PRIMARY KEY,
+    marked_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION mark_market_series_period()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'transactions' THEN
+        INSERT INTO market_series_dirty_periods (period)
+        VALUES (date_trunc('month', COALESCE(OLD.transaction_date, OLD.created_at))::date)
+        ON CONFLICT (period) DO NOTHING;
+    ELSE
+        INSERT INTO market_series_dirty_periods (period)
+        VALUES (date_trunc('month', OLD.created_at)::date)
+        ON CONFLICT (period) DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS properties_market_series_period ON properties;
+CREATE TRIGGER properties_market_series_period AFTER DELETE OR UPDATE OF created_at ON properties
+FOR EACH ROW EXECUTE FUNCTION mark_market_series_period();
+DROP TRIGGER IF EXISTS transactions_market_series_period ON transactions;
+CREATE TRIGGER transactions_market_series_period AFTER DELETE OR UPDATE OF transaction_date, created_at, property_id ON transactions
+FOR EACH ROW EXECUTE FUNCTION mark_market_series_period();
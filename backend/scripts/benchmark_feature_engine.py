@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Feature Engine Benchmark for Dubai Real Estate RAG System
+Builds a 10-year monthly price series for every community and compares the
+previous row-by-row feature construction (kept here as the reference) with the
+vectorized feature engine used by MarketPredictor and DataPreprocessor
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml.pipeline.feature_engine import (
+    add_lag_features, trend_training_matrix, trend_forecast_matrix, numeric_matrix, ensemble_predict
+)
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMMUNITIES = ["Dubai Marina", "Palm Jumeirah", "Downtown Dubai", "Business Bay", "JBR",
+               "Arabian Ranches", "Emirates Hills", "DIFC", "Jumeirah"]
+PROPERTY_TYPES = ["apartment", "villa", "townhouse"]
+PRICE_FEATURES = ['bedrooms', 'bathrooms', 'square_feet', 'age',
+                  'location_score', 'accessibility_score', 'amenity_score']
+
+
+def build_series(communities: int, years: int, seed: int = 42) -> pd.DataFrame:
+    """Monthly median price per community and property type"""
+    rng = np.random.default_rng(seed)
+    names = COMMUNITIES + [f"Community {i}" for i in range(len(COMMUNITIES), communities)]
+    months = pd.date_range("2015-01-01", periods=years * 12, freq="MS")
+    frames = []
+    for community in names[:communities]:
+        for property_type in PROPERTY_TYPES:
+            base = rng.uniform(800_000, 5_000_000)
+            drift = np.cumsum(rng.normal(0.004, 0.02, len(months)))
+            seasonal = 0.03 * np.sin(2 * np.pi * months.month / 12)
+            frames.append(pd.DataFrame({
+                "location": community,
+                "property_type": property_type,
+                "date": months,
+                "price": base * np.exp(drift + seasonal),
+            }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_listings(series: pd.DataFrame, per_month: int, seed: int = 42) -> pd.DataFrame:
+    """Listing rows around each monthly median, with the price model's feature columns"""
+    rng = np.random.default_rng(seed)
+    listings = series.loc[series.index.repeat(per_month)].reset_index(drop=True)
+    rows = len(listings)
+    listings["bedrooms"] = rng.integers(0, 6, rows)
+    listings["bathrooms"] = listings["bedrooms"] + rng.integers(0, 2, rows)
+    listings["square_feet"] = rng.uniform(450, 6000, rows).round()
+    listings["age"] = rng.integers(0, 25, rows)
+    listings["location_score"] = rng.uniform(0, 10, rows)
+    listings["accessibility_score"] = rng.uniform(0, 10, rows)
+    listings["amenity_score"] = rng.uniform(0, 10, rows)
+    listings["price"] = listings["price"] * rng.normal(1.0, 0.1, rows)
+    return listings
+
+
+# Reference implementations (the previous MarketPredictor/DataPreprocessor code paths)
+
+def legacy_trend_training_matrix(time_series: pd.Series):
+    features, targets = [], []
+    for i in range(6, len(time_series)):
+        features.append([
+            time_series.iloc[i - 1], time_series.iloc[i - 2], time_series.iloc[i - 3], time_series.iloc[i - 6],
+            time_series.iloc[i - 12] if i >= 12 else time_series.iloc[i - 6],
+            time_series.index[i].month, time_series.index[i].year,
+        ])
+        targets.append(time_series.iloc[i])
+    return np.array(features), np.array(targets)
+
+
+def legacy_trend_forecast_matrix(time_series: pd.Series, periods: int):
+    rows = []
+    last_date = time_series.index[-1]
+    for i in range(1, periods + 1):
+        future_date = last_date + pd.DateOffset(months=i)
+        rows.append([
+            time_series.iloc[-1], time_series.iloc[-2], time_series.iloc[-3],
+            time_series.iloc[-6] if len(time_series) >= 6 else time_series.iloc[-1],
+            time_series.iloc[-12] if len(time_series) >= 12 else time_series.iloc[-1],
+            future_date.month, future_date.year,
+        ])
+    return np.array(rows)
+
+
+def legacy_price_matrix(listings: pd.DataFrame):
+    X, y = [], []
+    for _, row in listings.iterrows():
+        features = [row.get(name, 0) for name in PRICE_FEATURES]
+        if all(isinstance(f, (int, float, np.number)) for f in features):
+            X.append(features)
+            y.append(row.get('price', 0))
+    X, y = np.array(X, dtype=float), np.array(y, dtype=float)
+    mask = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+    return X[mask], y[mask]
+
+
+def legacy_tree_spread(model, X):
+    per_tree = np.array([[estimator.predict([row])[0] for estimator in model.estimators_] for row in X])
+    return per_tree.mean(axis=1), per_tree.std(axis=1)
+
+
+def legacy_lag_features(series: pd.DataFrame):
+    parts = []
+    for _, group in series.groupby(["location", "property_type"], sort=False):
+        group = group.sort_values("date").copy()
+        for lag in (1, 2, 3, 6, 12):
+            group[f"price_lag_{lag}"] = [group["price"].iloc[i - lag] if i >= lag else np.nan
+                                         for i in range(len(group))]
+        parts.append(group)
+    return pd.concat(parts).loc[series.index]
+
+
+def timed(fn, *args, repeat: int = 1):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def compare(name: str, legacy, vectorized, report: dict, check):
+    (legacy_result, legacy_ms), (vector_result, vector_ms) = legacy, vectorized
+    matches = check(legacy_result, vector_result)
+    report[name] = {
+        "legacy_ms": round(legacy_ms, 2),
+        "vectorized_ms": round(vector_ms, 2),
+        "speedup": round(legacy_ms / vector_ms, 1) if vector_ms else None,
+        "results_match": bool(matches),
+    }
+    logger.info(f"{name}: {legacy_ms:.1f}ms -> {vector_ms:.1f}ms (match={matches})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vectorized ML feature construction")
+    parser.add_argument("--communities", type=int, default=100, help="Number of communities")
+    parser.add_argument("--years", type=int, default=10, help="Years of monthly history per series")
+    parser.add_argument("--listings-per-month", type=int, default=2, help="Listing rows per series and month")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    series = build_series(args.communities, args.years)
+    listings = build_listings(series, args.listings_per_month)
+    segments = [group.set_index("date")["price"] for _, group in series.groupby(["location", "property_type"], sort=False)]
+    logger.info(f"{len(segments)} series x {args.years * 12} months, {len(listings)} listing rows")
+
+    def all_matrices(builder):
+        return [builder(segment) for segment in segments]
+
+    def all_forecasts(builder):
+        return [builder(segment, 12) for segment in segments]
+
+    def same_pairs(left, right):
+        return all(np.allclose(a[0], b[0]) and np.allclose(a[1], b[1]) for a, b in zip(left, right))
+
+    def same_arrays(left, right):
+        return all(np.allclose(a, b) for a, b in zip(left, right))
+
+    stages = {}
+    compare("trend_training_matrix",
+            timed(all_matrices, legacy_trend_training_matrix),
+            timed(all_matrices, trend_training_matrix, repeat=3), stages, same_pairs)
+    compare("trend_forecast_matrix",
+            timed(all_forecasts, legacy_trend_forecast_matrix),
+            timed(all_forecasts, trend_forecast_matrix, repeat=3), stages, same_arrays)
+    compare("price_training_matrix",
+            timed(legacy_price_matrix, listings),
+            timed(lambda frame: numeric_matrix(frame, PRICE_FEATURES, target_column="price"), listings, repeat=3),
+            stages, lambda a, b: np.allclose(a[0], b[0]) and np.allclose(a[1], b[1]))
+    compare("panel_lag_features",
+            timed(legacy_lag_features, series),
+            timed(lambda frame: add_lag_features(frame, "price", "date", ["location", "property_type"]), series, repeat=3),
+            stages, lambda a, b: np.allclose(a[[f"price_lag_{k}" for k in (1, 2, 3, 6, 12)]].to_numpy(dtype=float),
+                                             b[[f"price_lag_{k}" for k in (1, 2, 3, 6, 12)]].to_numpy(dtype=float),
+                                             equal_nan=True))
+
+    try:
+        from sklearn.ensemble import RandomForestRegressor
+        X, y = numeric_matrix(listings, PRICE_FEATURES, target_column="price")
+        forest = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1).fit(X[:20000], y[:20000])
+        for rows in (1, 200):
+            compare(f"forest_spread_{rows}_rows",
+                    timed(legacy_tree_spread, forest, X[:rows]),
+                    timed(ensemble_predict, forest, X[:rows], repeat=3),
+                    stages, lambda a, b: np.allclose(a[0], b[0]) and np.allclose(a[1], b[1]))
+    except ImportError:
+        logger.warning("scikit-learn not available; skipping forest spread benchmark")
+
+    report = {
+        "communities": args.communities,
+        "series": len(segments),
+        "months_per_series": args.years * 12,
+        "listing_rows": len(listings),
+        "stages": stages,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Structured Search Benchmark for Dubai Real Estate RAG System
+Seeds extracted transaction records and compares on-the-fly tsvector search
+against the precomputed, GIN-indexed search used by IntelligentDataSorter
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+import logging
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.domain.ai.intelligent_data_sorter import IntelligentDataSorter
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERIES = ["dubai marina", "palm jumeirah villa", "downtown apartment", "business bay", "jbr penthouse"]
+
+COMMUNITIES = ["Dubai Marina", "Palm Jumeirah", "Downtown Dubai", "Business Bay", "JBR",
+               "Arabian Ranches", "Emirates Hills", "DIFC", "Jumeirah"]
+
+
+def seed_transactions(sorter: IntelligentDataSorter, rows: int):
+    """Bulk-load synthetic extracted transactions with a single INSERT ... SELECT"""
+    schema_info = sorter.document_schemas['transaction_data']
+    table_name = schema_info['table_name']
+    sorter._ensure_table_exists(table_name, schema_info['schema'], schema_info.get('search_columns'))
+
+    communities = "ARRAY[" + ", ".join(f"'{c}'" for c in COMMUNITIES) + "]"
+    with sorter.engine.connect() as conn:
+        existing = conn.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+        if existing >= rows:
+            logger.info(f"{table_name} already holds {existing} rows, skipping seed")
+            return
+        started = time.perf_counter()
+        conn.execute(text(f"""
+            INSERT INTO {table_name} (
+                transaction_id, property_address, building_name, community,
+                property_type, bedrooms, size_sqft, transaction_price, agent_name, notes
+            )
+            SELECT
+                'BENCH_' || g,
+                'Unit ' || g || ', ' || ({communities})[1 + g % 9],
+                'Tower ' || (g % 500),
+                ({communities})[1 + g % 9],
+                (ARRAY['apartment', 'villa', 'penthouse', 'townhouse'])[1 + g % 4],
+                1 + g % 5,
+                600 + g % 4000,
+                500000 + (g % 9000) * 1000,
+                'Agent ' || (g % 200),
+                'Benchmark record'
+            FROM generate_series(:start, :stop) AS g
+        """), {'start': existing + 1, 'stop': rows})
+        conn.execute(text(f"ANALYZE {table_name}"))
+        conn.commit()
+        logger.info(f"Seeded {rows - existing} rows in {time.perf_counter() - started:.1f}s")
+
+
+def time_legacy_search(sorter: IntelligentDataSorter, query: str) -> float:
+    """Time the previous per-row to_tsvector query shape"""
+    table_name = sorter.document_schemas['transaction_data']['table_name']
+    started = time.perf_counter()
+    with sorter.engine.connect() as conn:
+        conn.execute(text(f"""
+            SELECT * FROM {table_name}
+            WHERE to_tsvector('english',
+                COALESCE(property_address, '') || ' ' ||
+                COALESCE(building_name, '') || ' ' ||
+                COALESCE(community, '')
+            ) @@ plainto_tsquery('english', :query)
+            ORDER BY created_at DESC
+            LIMIT 50
+        """), {'query': query}).fetchall()
+    return (time.perf_counter() - started) * 1000
+
+
+def time_indexed_search(sorter: IntelligentDataSorter, query: str, offset: int = 0) -> float:
+    """Time the ranked UNION search across every document table"""
+    started = time.perf_counter()
+    sorter.search_structured_data(query, limit=50, offset=offset)
+    return (time.perf_counter() - started) * 1000
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'p50_ms': round(statistics.median(ordered), 2),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1], 2),
+        'max_ms': round(ordered[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark structured knowledge-base search")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Extracted records to seed")
+    parser.add_argument("--iterations", type=int, default=20, help="Runs per query")
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the indexed search")
+    args = parser.parse_args()
+
+    sorter = IntelligentDataSorter(os.getenv("DATABASE_URL"))
+    seed_transactions(sorter, args.rows)
+
+    report = {'rows': args.rows, 'iterations': args.iterations, 'indexed': {}, 'indexed_page_5': {}, 'legacy': {}}
+    for query in QUERIES:
+        report['indexed'][query] = summarize([time_indexed_search(sorter, query) for _ in range(args.iterations)])
+        report['indexed_page_5'][query] = summarize(
+            [time_indexed_search(sorter, query, offset=200) for _ in range(args.iterations)]
+        )
+        if not args.skip_legacy:
+            report['legacy'][query] = summarize([time_legacy_search(sorter, query) for _ in range(args.iterations)])
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,11 @@ import logging
 import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
-import google.generativeai as genai
 from sqlalchemy.orm import Session
 
 from models.ai_request_models import AIRequest, AIRequestStep, Deliverable, Template
 from auth.database import get_db
+from app.infrastructure.integrations.llm_client import llm_model
 
 logger = logging.getLogger(__name__)
 
@@ -28,19 +28,8 @@ class AIProcessingService:
     
     def setup_ai_models(self):
         """Initialize AI models and services"""
-        try:
-            # Configure Google Generative AI
-            api_key = os.getenv('GOOGLE_API_KEY')
-            if api_key:
-                genai.configure(api_key=api_key)
-                self.gemini_model = genai.GenerativeModel('gemini-pro')
-                logger.info("✅ Google Generative AI configured")
-            else:
-                logger.warning("⚠️ GOOGLE_API_KEY not found, using mock responses")
-                self.gemini_model = None
-        except Exception as e:
-            logger.error(f"❌ Failed to setup AI models: {e}")
-            self.gemini_model = None
+        # Handle on the process-wide LLM client; the SDK is configured once per process
+        self.gemini_model = genai_model
     
     async def process_request(self, request_id: str) -> bool:
         """Process an AI request through the appropriate team pipeline"""
@@ -464,12 +453,15 @@ class TransactionsProcessor(BaseTeamProcessor):
         content = await self.call_ai_model(prompt)
         return {"content": content, "type": "transactions"}
 
+# Shared model handle for the team pipelines
+genai_model = llm_model(caller="ai_processing")
+
 # Helper function for AI model calls
 async def call_ai_model(prompt: str) -> str:
     """Call the AI model with the given prompt"""
     try:
         if genai_model:
-            response = genai_model.generate_content(prompt)
+            response = await genai_model.generate_content_async(prompt)
             return response.text
         else:
             # Mock response for testing
@@ -11,9 +11,11 @@ import logging
 import uuid
 from typing import Dict, Any, Optional, List
 from datetime import datetime
-import google.generativeai as genai
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
+from app.infrastructure.db.engine_registry import get_engine
+
+from app.infrastructure.integrations.llm_client import llm_model
 
 # Import existing AI manager for integration
 from ai_manager import AIEnhancementManager
@@ -28,7 +30,7 @@ class VoiceService:
         if 'postgresql' in database_url and 'localhost' in database_url:
             # Check if we can connect to PostgreSQL, fallback to SQLite
             try:
-                test_engine = create_engine(database_url)
+                test_engine = get_engine("oltp", database_url)
                 with test_engine.connect() as conn:
                     conn.execute(text("SELECT 1"))
                 self.database_url = database_url
@@ -40,15 +42,14 @@ class VoiceService:
             
         self.google_api_key = google_api_key
         
-        # Initialize Google Gemini for voice processing
-        genai.configure(api_key=google_api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        # Voice processing model (process-wide LLM client)
+        self.model = llm_model(caller="voice")
         
         # Initialize existing AI manager for integration
         self.ai_manager = AIEnhancementManager(database_url, self.model)
         
         # Database connection
-        self.engine = create_engine(database_url)
+        self.engine = get_engine("oltp", database_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
         # Real estate specific intents
@@ -13,9 +13,10 @@ from enum import Enum
 from dataclasses import dataclass, asdict
 import threading
 import time
-import google.generativeai as genai
 import os
 
+from app.infrastructure.integrations.llm_client import llm_model
+
 logger = logging.getLogger(__name__)
 
 class TaskStatus(Enum):
@@ -97,8 +98,8 @@ class TaskManager:
         try:
             api_key = os.getenv('GOOGLE_API_KEY')
             if api_key:
-                genai.configure(api_key=api_key)
-                self.ai_model = genai.GenerativeModel('gemini-1.5-flash')
+                # Process-wide LLM client; the SDK is configured once per process
+                self.ai_model = llm_model(caller="task_manager")
                 self.ai_available = True
                 logger.info("✅ AI model configured for task management")
             else:
@@ -2,12 +2,14 @@
 Data Processing Tasks for Dubai Real Estate RAG System
 """
 
-from celery import current_task
 import logging
 
 logger = logging.getLogger(__name__)
 
-@current_task.task(bind=True)
+# Import the Celery app
+from celery_app import celery_app
+
+@celery_app.task(bind=True, name='tasks.data_processing.process_property_data')
 def process_property_data(self, data_source: str, batch_size: int = 100):
     """Process and validate property data"""
     try:
@@ -34,7 +36,7 @@ def process_property_data(self, data_source: str, batch_size: int = 100):
         logger.error(f"Error processing property data: {str(e)}")
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
-@current_task.task(bind=True)
+@celery_app.task(bind=True, name='tasks.data_processing.update_market_trends')
 def update_market_trends(self, region: str):
     """Update market trends data for a specific region"""
     try:
@@ -53,7 +55,7 @@ def update_market_trends(self, region: str):
         logger.error(f"Error updating market trends: {str(e)}")
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
-@current_task.task(bind=True)
+@celery_app.task(bind=True, name='tasks.data_processing.sync_external_data')
 def sync_external_data(self, source: str):
     """Sync data from external sources"""
     try:
@@ -72,5 +74,37 @@ def sync_external_data(self, source: str):
         logger.error(f"Error syncing external data: {str(e)}")
         raise self.retry(exc=e, countdown=120, max_retries=2)
 
+@celery_app.task(bind=True, name='tasks.data_processing.refresh_market_series')
+def refresh_market_series(self, full: bool = False):
+    """Roll changed listings and deals into the monthly market series"""
+    try:
+        from ml.pipeline.market_series import market_series_store
+
+        result = market_series_store.refresh(full=full)
+        return {
+            "status": "completed",
+            **result,
+            "message": f"Market series refreshed for {result['periods_refreshed']} months"
+        }
+
+    except Exception as e:
+        logger.error(f"Error refreshing market series: {str(e)}")
+        raise self.retry(exc=e, countdown=120, max_retries=3)
+
+@celery_app.task(bind=True, name='tasks.data_processing.reconcile_agent_daily_stats')
+def reconcile_agent_daily_stats(self, days: int = 7):
+    """Recompute recent dashboard rollup rows from properties and leads"""
+    try:
+        from app.infrastructure.db.agent_rollups import reconcile
 
+        rows = reconcile(days=days)
+        return {
+            "status": "completed",
+            "days": days,
+            "rows_written": rows,
+            "message": f"Agent daily stats reconciled for the last {days} days"
+        }
 
+    except Exception as e:
+        logger.error(f"Error reconciling agent daily stats: {str(e)}")
+        raise self.retry(exc=e, countdown=300, max_retries=2)
@@ -2,12 +2,15 @@
 Machine Learning Training Tasks for Dubai Real Estate RAG System
 """
 
-from celery import current_task
 import logging
+from typing import Any, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
-@current_task.task(bind=True)
+# Import the Celery app
+from celery_app import celery_app
+
+@celery_app.task(bind=True, name='tasks.ml_training.train_price_prediction_model')
 def train_price_prediction_model(self, model_type: str, training_data: dict):
     """Train price prediction model"""
     try:
@@ -34,7 +37,7 @@ def train_price_prediction_model(self, model_type: str, training_data: dict):
         logger.error(f"Error training model: {str(e)}")
         raise self.retry(exc=e, countdown=300, max_retries=2)
 
-@current_task.task(bind=True)
+@celery_app.task(bind=True, name='tasks.ml_training.train_sentiment_analysis_model')
 def train_sentiment_analysis_model(self, training_data: dict):
     """Train sentiment analysis model for market feedback"""
     try:
@@ -53,5 +56,43 @@ def train_sentiment_analysis_model(self, training_data: dict):
         logger.error(f"Error training sentiment model: {str(e)}")
         raise self.retry(exc=e, countdown=300, max_retries=2)
 
+@celery_app.task(bind=True, name='tasks.ml_training.train_market_models')
+def train_market_models(self, training_data: Optional[Dict[str, Any]] = None):
+    """Train the MarketPredictor trend and price models and publish new registry versions"""
+    try:
+        import pandas as pd
+        from ml.models.market_predictor import market_predictor
+
+        if training_data and training_data.get("records"):
+            market_data = pd.DataFrame(training_data["records"])
+        else:
+            market_data = _load_market_training_data()
+
+        logger.info(f"Training market models on {len(market_data)} rows")
+        results = market_predictor.train_models(market_data)
+
+        return {
+            "status": "completed",
+            "training_rows": len(market_data),
+            "models": results,
+            "message": f"Published {len(results)} market model versions"
+        }
+
+    except Exception as e:
+        logger.error(f"Error training market models: {str(e)}")
+        raise self.retry(exc=e, countdown=600, max_retries=2)
+
 
+def _load_market_training_data():
+    """Listing history from the properties table in the MarketPredictor column layout"""
+    import pandas as pd
+    from app.infrastructure.db.engine_registry import get_engine
 
+    query = """
+        SELECT location, property_type, price, bedrooms, bathrooms,
+               area_sqft AS square_feet, created_at AS date
+        FROM properties
+        WHERE price IS NOT NULL AND location IS NOT NULL AND property_type IS NOT NULL
+    """
+    with get_engine("analytics").connect() as conn:
+        return pd.read_sql(query, conn)
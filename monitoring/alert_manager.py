@@ -3,21 +3,35 @@ Alert management system for RAG Real Estate System
 """
 import asyncio
 import json
+import time
+import hashlib
+import itertools
 import logging
 import smtplib
-import requests
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass, asdict
 from enum import Enum
 import redis
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 import aiohttp
 import os
 
+from .alert_rules import CompiledRule, Labels, RuleSet, build_series, compile_rule, parse_duration
+
 logger = logging.getLogger(__name__)
 
+# A firing rule alert resolves once its condition has been false this long (rules may override)
+ALERT_DEFAULT_RESOLVE_FOR = os.getenv("ALERT_DEFAULT_RESOLVE_FOR", "1m")
+# Grouped notifications each channel may send per minute; the rest wait for a later flush
+ALERT_NOTIFICATIONS_PER_MINUTE = int(os.getenv("ALERT_NOTIFICATIONS_PER_MINUTE", "12"))
+# Alerts waiting for notification; the oldest are dropped beyond this
+ALERT_NOTIFICATION_QUEUE_LIMIT = int(os.getenv("ALERT_NOTIFICATION_QUEUE_LIMIT", "1000"))
+# Alerts listed in one grouped notification
+ALERT_NOTIFICATION_GROUP_LIMIT = int(os.getenv("ALERT_NOTIFICATION_GROUP_LIMIT", "20"))
+
 class AlertSeverity(Enum):
     """Alert severity levels"""
     INFO = "info"
@@ -59,6 +73,17 @@ class Alert:
     resolved: bool = False
     resolved_by: Optional[str] = None
     resolved_at: Optional[datetime] = None
+    fingerprint: str = ""
+    group: str = ""
+    count: int = 1
+    last_seen: Optional[datetime] = None
+
+@dataclass
+class RuleState:
+    """Evaluation state of one rule fingerprint (pending -> firing -> resolved)"""
+    pending_since: Optional[float] = None
+    false_since: Optional[float] = None
+    alert_id: Optional[str] = None
 
 @dataclass
 class NotificationConfig:
@@ -70,15 +95,69 @@ class NotificationConfig:
     template: Optional[str] = None
     conditions: Dict[str, Any] = None
 
+class NotificationBudget:
+    """Token bucket limiting grouped notifications per channel"""
+    
+    def __init__(self, per_minute: int):
+        self.capacity = max(per_minute, 1)
+        self.tokens = float(self.capacity)
+        self.refill_rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+    
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+def _serialize_alert(alert: Alert) -> Dict[str, Any]:
+    """JSON-safe dict of an alert"""
+    alert_data = asdict(alert)
+    alert_data['type'] = alert.type.value
+    alert_data['severity'] = alert.severity.value
+    for key, value in alert_data.items():
+        if isinstance(value, datetime):
+            alert_data[key] = value.isoformat()
+    return alert_data
+
+class _TemplateValues(dict):
+    """Metric values for message templates; unknown placeholders render as n/a"""
+    
+    def __missing__(self, key):
+        return "n/a"
+
 class AlertManager:
     """Comprehensive alert management system"""
     
-    def __init__(self, redis_client: Optional[redis.Redis] = None):
+    def __init__(self, redis_client: Optional[redis.Redis] = None,
+                 notifications_per_minute: int = ALERT_NOTIFICATIONS_PER_MINUTE):
         self.redis_client = redis_client
         self.notification_configs = self._initialize_notification_configs()
-        self.alert_rules = self._initialize_alert_rules()
         self.alert_history = []
         self.active_alerts = {}
+        self.default_resolve_for = parse_duration(ALERT_DEFAULT_RESOLVE_FOR)
+        
+        # Rules are compiled once; evaluation state is kept per fingerprint
+        self.alert_rules: Dict[str, Dict[str, Any]] = {}
+        self.rule_set = RuleSet()
+        self.rule_states: Dict[str, RuleState] = {}
+        for rule_name, rule_config in self._initialize_alert_rules().items():
+            self.add_alert_rule(rule_name, rule_config)
+        
+        # Deduplication and batched, rate-limited notification
+        self._active_by_fingerprint: Dict[str, str] = {}
+        self._alert_sequence = itertools.count(1)
+        self._notification_queue: deque = deque(maxlen=ALERT_NOTIFICATION_QUEUE_LIMIT)
+        self._notification_budgets = {
+            channel: NotificationBudget(notifications_per_minute) for channel in NotificationChannel
+        }
+        self.stats = {
+            'evaluations': 0, 'last_evaluation_ms': 0.0, 'deduplicated': 0,
+            'auto_resolved': 0, 'notifications_sent': 0, 'notifications_throttled': 0
+        }
         
     def _initialize_notification_configs(self) -> Dict[NotificationChannel, NotificationConfig]:
         """Initialize notification configurations"""
@@ -107,25 +186,29 @@ class AlertManager:
         """Initialize alert rules"""
         return {
             "high_cpu_usage": {
-                "condition": "cpu_usage > 80",
+                "condition": "avg_over(cpu_usage, 5m) > 80",
+                "for": "2m",
                 "severity": AlertSeverity.WARNING,
                 "type": AlertType.PERFORMANCE,
                 "message_template": "CPU usage is high: {value}%"
             },
             "high_memory_usage": {
-                "condition": "memory_usage > 85",
+                "condition": "avg_over(memory_usage, 5m) > 85",
+                "for": "2m",
                 "severity": AlertSeverity.WARNING,
                 "type": AlertType.PERFORMANCE,
                 "message_template": "Memory usage is high: {value}%"
             },
             "high_error_rate": {
                 "condition": "error_rate > 5",
+                "for": "1m",
                 "severity": AlertSeverity.ERROR,
                 "type": AlertType.ERROR,
                 "message_template": "Error rate is high: {value}%"
             },
             "service_down": {
                 "condition": "service_status == 'down'",
+                "labels": ["service_name"],
                 "severity": AlertSeverity.CRITICAL,
                 "type": AlertType.SYSTEM,
                 "message_template": "Service is down: {service_name}"
@@ -137,7 +220,8 @@ class AlertManager:
                 "message_template": "Database connection failed"
             },
             "rag_query_timeout": {
-                "condition": "rag_query_time > 30",
+                "condition": "max_over(rag_query_time, 1m) > 30",
+                "for": "1m",
                 "severity": AlertSeverity.WARNING,
                 "type": AlertType.PERFORMANCE,
                 "message_template": "RAG query timeout: {value}s"
@@ -151,90 +235,165 @@ class AlertManager:
         title: str,
         message: str,
         source: str,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        fingerprint: Optional[str] = None,
+        group: Optional[str] = None,
+        notify: bool = True
     ) -> str:
-        """Create a new alert"""
+        """Create a new alert, or count a repeat of an active alert with the same fingerprint"""
         try:
-            alert_id = f"alert_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{hash(message) % 10000}"
-            
-            alert = Alert(
-                id=alert_id,
-                type=alert_type,
-                severity=severity,
-                title=title,
-                message=message,
-                timestamp=datetime.now(),
-                source=source,
-                metadata=metadata or {}
-            )
+            fingerprint = fingerprint or self._fingerprint(alert_type.value, source, title)
+            existing = self._touch_active(fingerprint)
+            if existing:
+                return existing
             
-            # Store alert
-            await self._store_alert(alert)
+            alert = self._open_alert(alert_type, severity, title, message, source, metadata or {},
+                                     fingerprint, group or f"{alert_type.value}:{severity.value}")
             
-            # Add to active alerts
-            self.active_alerts[alert_id] = alert
+            # Store alert
+            await self._store_alerts([alert])
             
-            # Send notifications
-            await self._send_notifications(alert)
+            # Send notifications (batched with anything else queued)
+            if notify:
+                await self.flush_notifications()
             
-            logger.info(f"Alert created: {alert_id} - {title}")
-            return alert_id
+            logger.info(f"Alert created: {alert.id} - {title}")
+            return alert.id
             
         except Exception as e:
             logger.error(f"Error creating alert: {e}")
             return "alert_creation_failed"
     
+    @staticmethod
+    def _fingerprint(*parts: str) -> str:
+        return hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+    
+    def _touch_active(self, fingerprint: str) -> Optional[str]:
+        """Record a repeat of an active alert; its id, or None if none is active"""
+        alert_id = self._active_by_fingerprint.get(fingerprint)
+        alert = self.active_alerts.get(alert_id) if alert_id else None
+        if alert is None:
+            return None
+        alert.count += 1
+        alert.last_seen = datetime.now()
+        self.stats['deduplicated'] += 1
+        return alert_id
+    
+    def _open_alert(self, alert_type: AlertType, severity: AlertSeverity, title: str, message: str,
+                    source: str, metadata: Dict[str, Any], fingerprint: str, group: str) -> Alert:
+        """Register a new active alert and queue its notification"""
+        now = datetime.now()
+        alert = Alert(
+            id=f"alert_{now.strftime('%Y%m%d_%H%M%S')}_{fingerprint[:10]}_{next(self._alert_sequence)}",
+            type=alert_type,
+            severity=severity,
+            title=title,
+            message=message,
+            timestamp=now,
+            source=source,
+            metadata=metadata,
+            fingerprint=fingerprint,
+            group=group,
+            last_seen=now
+        )
+        self.active_alerts[alert.id] = alert
+        self._active_by_fingerprint[fingerprint] = alert.id
+        self._notification_queue.append(alert)
+        return alert
+    
     async def _store_alert(self, alert: Alert):
         """Store alert in Redis"""
-        if not self.redis_client:
+        await self._store_alerts([alert])
+    
+    async def _store_alerts(self, alerts: List[Alert]):
+        """Store alerts in Redis in one pipelined round trip"""
+        if not self.redis_client or not alerts:
             return
         
         try:
-            alert_data = asdict(alert)
-            alert_data['timestamp'] = alert.timestamp.isoformat()
-            alert_data['type'] = alert.type.value
-            alert_data['severity'] = alert.severity.value
-            
-            # Store alert
-            self.redis_client.lpush(f"alerts:{alert.id}", json.dumps(alert_data))
-            self.redis_client.expire(f"alerts:{alert.id}", 86400 * 30)  # 30 days
-            
-            # Store in recent alerts
-            self.redis_client.lpush("alerts:recent", json.dumps(alert_data))
-            self.redis_client.ltrim("alerts:recent", 0, 999)  # Keep last 1000 alerts
-            
-            # Store by type
-            self.redis_client.lpush(f"alerts:type:{alert.type.value}", json.dumps(alert_data))
-            self.redis_client.ltrim(f"alerts:type:{alert.type.value}", 0, 999)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for alert in alerts:
+                alert_json = json.dumps(_serialize_alert(alert), default=str)
+                
+                # Store alert
+                pipe.lpush(f"alerts:{alert.id}", alert_json)
+                pipe.expire(f"alerts:{alert.id}", 86400 * 30)  # 30 days
+                
+                # Store in recent alerts
+                pipe.lpush("alerts:recent", alert_json)
+                
+                # Store by type
+                pipe.lpush(f"alerts:type:{alert.type.value}", alert_json)
+                
+                # Store by severity
+                pipe.lpush(f"alerts:severity:{alert.severity.value}", alert_json)
             
-            # Store by severity
-            self.redis_client.lpush(f"alerts:severity:{alert.severity.value}", json.dumps(alert_data))
-            self.redis_client.ltrim(f"alerts:severity:{alert.severity.value}", 0, 999)
+            # Keep the last 1000 alerts per list
+            pipe.ltrim("alerts:recent", 0, 999)
+            for alert_type in {alert.type.value for alert in alerts}:
+                pipe.ltrim(f"alerts:type:{alert_type}", 0, 999)
+            for severity in {alert.severity.value for alert in alerts}:
+                pipe.ltrim(f"alerts:severity:{severity}", 0, 999)
+            pipe.execute()
             
         except Exception as e:
             logger.error(f"Error storing alert: {e}")
     
-    async def _send_notifications(self, alert: Alert):
-        """Send notifications for an alert"""
+    async def flush_notifications(self) -> int:
+        """Send queued alerts as one grouped notification per channel and group, within each channel's budget"""
+        if not self._notification_queue:
+            return 0
+        
+        sent = 0
         try:
-            for channel, config in self.notification_configs.items():
-                if not config.enabled:
-                    continue
-                
-                # Check if alert meets notification conditions
-                if not self._should_send_notification(alert, config):
-                    continue
-                
-                # Send notification based on channel
-                if channel == NotificationChannel.EMAIL:
-                    await self._send_email_notification(alert, config)
-                elif channel == NotificationChannel.SLACK:
-                    await self._send_slack_notification(alert, config)
-                elif channel == NotificationChannel.WEBHOOK:
-                    await self._send_webhook_notification(alert, config)
+            # Group queued alerts that are still active
+            groups: Dict[str, List[Alert]] = {}
+            for alert in self._notification_queue:
+                if alert.id in self.active_alerts:
+                    groups.setdefault(alert.group, []).append(alert)
+            self._notification_queue.clear()
+            
+            deferred: List[Alert] = []
+            async with aiohttp.ClientSession() as session:
+                for group, alerts in groups.items():
+                    delivered = False
+                    for channel, config in self.notification_configs.items():
+                        if not config.enabled:
+                            continue
+                        
+                        # Check if alerts meet notification conditions
+                        matching = [alert for alert in alerts if self._should_send_notification(alert, config)]
+                        if not matching:
+                            continue
+                        
+                        if not self._notification_budgets[channel].try_acquire():
+                            self.stats['notifications_throttled'] += 1
+                            continue
+                        
+                        # Send notification based on channel
+                        if channel == NotificationChannel.EMAIL:
+                            await self._send_email_notification(group, matching, config)
+                        elif channel == NotificationChannel.SLACK:
+                            await self._send_slack_notification(group, matching, config, session)
+                        elif channel == NotificationChannel.WEBHOOK:
+                            await self._send_webhook_notification(group, matching, config, session)
+                        sent += 1
+                        delivered = True
                     
+                    # Retry on a later flush when every matching channel was over budget
+                    if not delivered and any(
+                        config.enabled and any(self._should_send_notification(alert, config) for alert in alerts)
+                        for config in self.notification_configs.values()
+                    ):
+                        deferred.extend(alerts)
+            
+            self._notification_queue.extend(deferred)
+            self.stats['notifications_sent'] += sent
+            
         except Exception as e:
             logger.error(f"Error sending notifications: {e}")
+        
+        return sent
     
     def _should_send_notification(self, alert: Alert, config: NotificationConfig) -> bool:
         """Check if notification should be sent based on conditions"""
@@ -255,7 +414,14 @@ class AlertManager:
         
         return True
     
-    async def _send_email_notification(self, alert: Alert, config: NotificationConfig):
+    @staticmethod
+    def _group_title(group: str, alerts: List[Alert]) -> str:
+        worst = max(alerts, key=lambda alert: list(AlertSeverity).index(alert.severity))
+        if len(alerts) == 1:
+            return f"[{worst.severity.value.upper()}] {worst.title}"
+        return f"[{worst.severity.value.upper()}] {len(alerts)} alerts firing ({group})"
+    
+    async def _send_email_notification(self, group: str, alerts: List[Alert], config: NotificationConfig):
         """Send email notification"""
         try:
             if not config.recipients:
@@ -273,13 +439,15 @@ class AlertManager:
                 return
             
             # Create email message
-            msg = MimeMultipart()
+            msg = MIMEMultipart()
             msg['From'] = smtp_username
             msg['To'] = ", ".join(config.recipients)
-            msg['Subject'] = f"[{alert.severity.value.upper()}] {alert.title}"
+            msg['Subject'] = self._group_title(group, alerts)
             
             # Email body
-            body = f"""
+            sections = []
+            for alert in alerts[:ALERT_NOTIFICATION_GROUP_LIMIT]:
+                sections.append(f"""
             Alert Details:
             --------------
             Title: {alert.title}
@@ -291,23 +459,29 @@ class AlertManager:
             
             Alert ID: {alert.id}
             
-            Metadata: {json.dumps(alert.metadata, indent=2)}
-            """
+            Metadata: {json.dumps(alert.metadata, indent=2, default=str)}
+            """)
+            if len(alerts) > ALERT_NOTIFICATION_GROUP_LIMIT:
+                sections.append(f"\n            ...and {len(alerts) - ALERT_NOTIFICATION_GROUP_LIMIT} more alerts\n")
             
-            msg.attach(MimeText(body, 'plain'))
+            msg.attach(MIMEText("".join(sections), 'plain'))
             
-            # Send email
-            with smtplib.SMTP(smtp_server, smtp_port) as server:
-                server.starttls()
-                server.login(smtp_username, smtp_password)
-                server.send_message(msg)
+            # Send email without blocking the event loop
+            def send():
+                with smtplib.SMTP(smtp_server, smtp_port) as server:
+                    server.starttls()
+                    server.login(smtp_username, smtp_password)
+                    server.send_message(msg)
             
-            logger.info(f"Email notification sent for alert {alert.id}")
+            await asyncio.to_thread(send)
+            
+            logger.info(f"Email notification sent for {len(alerts)} alerts in {group}")
             
         except Exception as e:
             logger.error(f"Error sending email notification: {e}")
     
-    async def _send_slack_notification(self, alert: Alert, config: NotificationConfig):
+    async def _send_slack_notification(self, group: str, alerts: List[Alert], config: NotificationConfig,
+                                       session: aiohttp.ClientSession):
         """Send Slack notification"""
         try:
             if not config.webhook_url:
@@ -323,6 +497,7 @@ class AlertManager:
             }
             
             slack_message = {
+                "text": self._group_title(group, alerts),
                 "attachments": [
                     {
                         "color": color_map.get(alert.severity, "#36a64f"),
@@ -353,21 +528,22 @@ class AlertManager:
                         "footer": "RAG Real Estate System",
                         "ts": int(alert.timestamp.timestamp())
                     }
+                    for alert in alerts[:ALERT_NOTIFICATION_GROUP_LIMIT]
                 ]
             }
             
             # Send to Slack
-            async with aiohttp.ClientSession() as session:
-                async with session.post(config.webhook_url, json=slack_message) as response:
-                    if response.status == 200:
-                        logger.info(f"Slack notification sent for alert {alert.id}")
-                    else:
-                        logger.error(f"Failed to send Slack notification: {response.status}")
+            async with session.post(config.webhook_url, json=slack_message) as response:
+                if response.status == 200:
+                    logger.info(f"Slack notification sent for {len(alerts)} alerts in {group}")
+                else:
+                    logger.error(f"Failed to send Slack notification: {response.status}")
             
         except Exception as e:
             logger.error(f"Error sending Slack notification: {e}")
     
-    async def _send_webhook_notification(self, alert: Alert, config: NotificationConfig):
+    async def _send_webhook_notification(self, group: str, alerts: List[Alert], config: NotificationConfig,
+                                         session: aiohttp.ClientSession):
         """Send webhook notification"""
         try:
             if not config.webhook_url:
@@ -376,23 +552,29 @@ class AlertManager:
             
             # Create webhook payload
             payload = {
-                "alert_id": alert.id,
-                "type": alert.type.value,
-                "severity": alert.severity.value,
-                "title": alert.title,
-                "message": alert.message,
-                "timestamp": alert.timestamp.isoformat(),
-                "source": alert.source,
-                "metadata": alert.metadata
+                "group": group,
+                "alerts": [
+                    {
+                        "alert_id": alert.id,
+                        "fingerprint": alert.fingerprint,
+                        "type": alert.type.value,
+                        "severity": alert.severity.value,
+                        "title": alert.title,
+                        "message": alert.message,
+                        "timestamp": alert.timestamp.isoformat(),
+                        "source": alert.source,
+                        "metadata": alert.metadata
+                    }
+                    for alert in alerts
+                ]
             }
             
             # Send webhook
-            async with aiohttp.ClientSession() as session:
-                async with session.post(config.webhook_url, json=payload) as response:
-                    if response.status == 200:
-                        logger.info(f"Webhook notification sent for alert {alert.id}")
-                    else:
-                        logger.error(f"Failed to send webhook notification: {response.status}")
+            async with session.post(config.webhook_url, json=payload) as response:
+                if response.status == 200:
+                    logger.info(f"Webhook notification sent for {len(alerts)} alerts in {group}")
+                else:
+                    logger.error(f"Failed to send webhook notification: {response.status}")
             
         except Exception as e:
             logger.error(f"Error sending webhook notification: {e}")
@@ -424,13 +606,7 @@ class AlertManager:
             if alert_id not in self.active_alerts:
                 return False
             
-            alert = self.active_alerts[alert_id]
-            alert.resolved = True
-            alert.resolved_by = resolved_by
-            alert.resolved_at = datetime.now()
-            
-            # Remove from active alerts
-            del self.active_alerts[alert_id]
+            alert = self._close_alert(self.active_alerts[alert_id], resolved_by)
             
             # Update stored alert
             await self._store_alert(alert)
@@ -442,18 +618,22 @@ class AlertManager:
             logger.error(f"Error resolving alert: {e}")
             return False
     
+    def _close_alert(self, alert: Alert, resolved_by: str) -> Alert:
+        """Mark an alert resolved and remove it from the active set"""
+        alert.resolved = True
+        alert.resolved_by = resolved_by
+        alert.resolved_at = datetime.now()
+        
+        # Remove from active alerts
+        self.active_alerts.pop(alert.id, None)
+        if self._active_by_fingerprint.get(alert.fingerprint) == alert.id:
+            del self._active_by_fingerprint[alert.fingerprint]
+        return alert
+    
     async def get_active_alerts(self) -> List[Dict[str, Any]]:
         """Get list of active alerts"""
         try:
-            alerts = []
-            for alert in self.active_alerts.values():
-                alert_data = asdict(alert)
-                alert_data['timestamp'] = alert.timestamp.isoformat()
-                alert_data['type'] = alert.type.value
-                alert_data['severity'] = alert.severity.value
-                alerts.append(alert_data)
-            
-            return alerts
+            return [_serialize_alert(alert) for alert in self.active_alerts.values()]
             
         except Exception as e:
             logger.error(f"Error getting active alerts: {e}")
@@ -512,58 +692,140 @@ class AlertManager:
         self.notification_configs[channel] = config
         logger.info(f"Notification config updated for {channel.value}")
     
-    def add_alert_rule(self, rule_name: str, rule_config: Dict[str, Any]):
-        """Add or update alert rule"""
+    def add_alert_rule(self, rule_name: str, rule_config: Dict[str, Any]) -> bool:
+        """Add or update alert rule (the condition is compiled once here)"""
+        try:
+            rule = compile_rule(rule_name, rule_config, self.default_resolve_for)
+        except (KeyError, ValueError) as e:
+            logger.error(f"Invalid alert rule {rule_name}: {e}")
+            return False
+        
         self.alert_rules[rule_name] = rule_config
+        self.rule_set.add(rule)
         logger.info(f"Alert rule updated: {rule_name}")
+        return True
+    
+    def remove_alert_rule(self, rule_name: str):
+        """Remove an alert rule and its pending state"""
+        self.alert_rules.pop(rule_name, None)
+        self.rule_set.remove(rule_name)
+        for key in [key for key in self.rule_states if key.split("\x1f", 1)[0] == rule_name]:
+            del self.rule_states[key]
     
-    async def evaluate_alert_rules(self, metrics: Dict[str, Any]) -> List[str]:
-        """Evaluate alert rules against current metrics"""
+    async def evaluate_alert_rules(self, metrics: Optional[Dict[str, Any]] = None, now: Optional[float] = None,
+                                   samples: Optional[Iterable[Tuple[str, Dict[str, Any], Any]]] = None) -> List[str]:
+        """
+        Evaluate alert rules for one tick; returns the ids of newly fired alerts
+        
+        Args:
+            metrics: Unlabelled metric values, e.g. {"cpu_usage": 42.0}
+            now: Evaluation time (defaults to time.time())
+            samples: Labelled (metric, labels, value) samples, e.g.
+                ("service_status", {"service_name": "redis"}, "down"); each label set is its own series
+        """
         triggered_alerts = []
+        started = time.perf_counter()
+        now = time.time() if now is None else now
+        metrics = metrics or {}
         
         try:
-            for rule_name, rule_config in self.alert_rules.items():
-                # Simple condition evaluation (can be enhanced with expression parser)
-                condition = rule_config['condition']
+            # Samples are recorded once per series, each source computed once per tick
+            series = build_series(metrics, samples)
+            self.rule_set.observe(series, now)
+            values = self.rule_set.source_values(series, now)
+            firing = self.rule_set.firing(values)
+            
+            changed: List[Alert] = []
+            held = set()
+            
+            # Rules that hold now, per series
+            for rule_name, labels in firing:
+                rule = self.rule_set.rules[rule_name]
+                state_key = self._rule_state_key(rule, labels)
+                if state_key in held:
+                    continue
+                held.add(state_key)
+                state = self.rule_states.setdefault(state_key, RuleState())
+                state.false_since = None
+                if state.pending_since is None:
+                    state.pending_since = now
                 
-                # This is a simplified evaluation - in production, use a proper expression parser
-                if self._evaluate_condition(condition, metrics):
-                    alert_id = await self.create_alert(
-                        alert_type=rule_config['type'],
-                        severity=rule_config['severity'],
-                        title=f"Rule triggered: {rule_name}",
-                        message=rule_config['message_template'].format(**metrics),
-                        source="alert_rule",
-                        metadata={"rule_name": rule_name, "condition": condition}
-                    )
-                    triggered_alerts.append(alert_id)
+                if state.alert_id and state.alert_id in self.active_alerts:
+                    self._touch_active(self.active_alerts[state.alert_id].fingerprint)
+                elif now - state.pending_since >= rule.for_seconds:
+                    value = values[rule.predicate.source.key].get(labels)
+                    alert = self._fire_rule(rule, state_key, labels, metrics, value)
+                    state.alert_id = alert.id
+                    changed.append(alert)
+                    triggered_alerts.append(alert.id)
+            
+            # Pending or firing rules that no longer hold
+            for state_key, state in list(self.rule_states.items()):
+                if state_key in held:
+                    continue
+                rule_name = state_key.split("\x1f", 1)[0]
+                state.pending_since = None
+                alert = self.active_alerts.get(state.alert_id) if state.alert_id else None
+                if alert is None:
+                    del self.rule_states[state_key]
+                    continue
+                if state.false_since is None:
+                    state.false_since = now
+                # Hysteresis: resolve only after the condition has stayed false for resolve_for
+                rule = self.rule_set.rules.get(rule_name)
+                if rule is None or now - state.false_since >= rule.resolve_for_seconds:
+                    changed.append(self._close_alert(alert, "alert_rule"))
+                    self.stats['auto_resolved'] += 1
+                    del self.rule_states[state_key]
+            
+            # One Redis round trip and one notification pass per tick
+            await self._store_alerts(changed)
+            await self.flush_notifications()
             
         except Exception as e:
             logger.error(f"Error evaluating alert rules: {e}")
         
+        self.stats['evaluations'] += 1
+        self.stats['last_evaluation_ms'] = round((time.perf_counter() - started) * 1000, 3)
         return triggered_alerts
     
-    def _evaluate_condition(self, condition: str, metrics: Dict[str, Any]) -> bool:
-        """Evaluate a condition string against metrics"""
-        try:
-            # Simple condition evaluation - replace with proper expression parser
-            if ">" in condition:
-                parts = condition.split(">")
-                metric_name = parts[0].strip()
-                threshold = float(parts[1].strip())
-                return metrics.get(metric_name, 0) > threshold
-            elif "<" in condition:
-                parts = condition.split("<")
-                metric_name = parts[0].strip()
-                threshold = float(parts[1].strip())
-                return metrics.get(metric_name, 0) < threshold
-            elif "==" in condition:
-                parts = condition.split("==")
-                metric_name = parts[0].strip()
-                value = parts[1].strip().strip('"')
-                return metrics.get(metric_name) == value
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Error evaluating condition '{condition}': {e}")
-            return False
+    @staticmethod
+    def _alert_labels(rule: CompiledRule, labels: Labels) -> Dict[str, str]:
+        """Series labels identifying an alert: the rule's "labels" if given, otherwise all of them"""
+        return {name: value for name, value in labels if not rule.labels or name in rule.labels}
+    
+    @classmethod
+    def _rule_state_key(cls, rule: CompiledRule, labels: Labels) -> str:
+        """Rule name plus the series' identifying labels, so e.g. each down service is its own alert"""
+        identifying = cls._alert_labels(rule, labels)
+        return "\x1f".join([rule.name] + [f"{name}={value}" for name, value in sorted(identifying.items())])
+    
+    def _fire_rule(self, rule: CompiledRule, state_key: str, labels: Labels,
+                   metrics: Dict[str, Any], value: Any) -> Alert:
+        series_labels = dict(labels)
+        template_values = _TemplateValues({**metrics, **series_labels})
+        template_values['value'] = round(value, 2) if isinstance(value, float) else value
+        group = ":".join([rule.type.value, rule.severity.value] +
+                         [str(series_labels.get(key, metrics.get(key))) for key in rule.group_by])
+        return self._open_alert(
+            alert_type=rule.type,
+            severity=rule.severity,
+            title=f"Rule triggered: {rule.name}",
+            message=rule.message_template.format_map(template_values),
+            source="alert_rule",
+            metadata={"rule_name": rule.name, "condition": rule.condition, "value": value,
+                      "labels": self._alert_labels(rule, labels)},
+            fingerprint=self._fingerprint(state_key),
+            group=group
+        )
+    
+    def get_evaluation_stats(self) -> Dict[str, Any]:
+        """Rule evaluation, deduplication and notification counters"""
+        return {
+            'rules': len(self.rule_set),
+            'pending': sum(1 for state in self.rule_states.values() if state.alert_id is None),
+            'firing': sum(1 for state in self.rule_states.values() if state.alert_id is not None),
+            'active_alerts': len(self.active_alerts),
+            'queued_notifications': len(self._notification_queue),
+            **self.stats
+        }
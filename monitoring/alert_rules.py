@@ -0,0 +1,337 @@
+"""
+Compiled alert rules for the alert manager
+
+Condition strings are parsed once into predicate objects instead of on every
+evaluation. A condition is an instant metric or a windowed aggregate,
+optionally compared against a literal:
+
+    cpu_usage > 80
+    service_status == 'down'
+    db_connection_failed
+    avg_over(cpu_usage, 5m) > 80
+    max_over(rag_query_time, 1m) >= 30
+    rate(requests_failed_total, 1m) > 2
+
+Metrics arrive as series keyed by (metric, label tuple): a plain metric is the
+unlabelled series, a labelled sample such as service_status{service_name="redis"}
+is its own series. Windows, source values and firing state are all per series,
+so one series never overwrites another between ticks.
+
+Rules that share a source and operator are evaluated together: the source is
+computed once per tick and the firing rules are found by bisecting their sorted
+thresholds, so the cost of a tick grows with the number of distinct sources
+rather than with the number of rules.
+"""
+import re
+import bisect
+import operator
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+AGGREGATES = ("avg_over", "max_over", "min_over", "rate")
+
+_OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt,
+    "<=": operator.le, "==": operator.eq, "!=": operator.ne,
+}
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+# Sorted (name, value) pairs identifying one series of a metric
+Labels = Tuple[Tuple[str, str], ...]
+SeriesKey = Tuple[str, Labels]
+
+_CONDITION_RE = re.compile(r"""
+    ^\s*
+    (?:(?P<func>\w+)\s*\(\s*(?P<fmetric>[\w.]+)\s*,\s*(?P<window>[\d.]+[smh]?)\s*\)   # fn(metric, 5m)
+      |(?P<metric>[\w.]+))                                                           # metric
+    \s*
+    (?:(?P<op>>=|<=|==|!=|>|<)\s*(?P<literal>.+?))?
+    \s*$
+""", re.VERBOSE)
+
+
+def parse_duration(value: Any) -> float:
+    """Seconds from a number or a string such as '90s', '5m' or '1h'"""
+    if value is None:
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([smh]?)\s*", str(value))
+    if not match:
+        raise ValueError(f"Invalid duration: {value!r}")
+    return float(match.group(1)) * _DURATION_UNITS[match.group(2) or "s"]
+
+
+def _parse_literal(text: str) -> Any:
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "'\"":
+        return text[1:-1]
+    if text.lower() in ("true", "false"):
+        return text.lower() == "true"
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Invalid literal: {text!r}")
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def label_tuple(labels: Optional[Dict[str, Any]]) -> Labels:
+    """Canonical, hashable form of a label set"""
+    return tuple(sorted((str(name), str(value)) for name, value in (labels or {}).items()))
+
+
+def build_series(metrics: Optional[Dict[str, Any]] = None,
+                 samples: Optional[Iterable[Tuple[str, Dict[str, Any], Any]]] = None) -> Dict[SeriesKey, Any]:
+    """Series values keyed by (metric, labels); plain metrics are the unlabelled series"""
+    series: Dict[SeriesKey, Any] = {(name, ()): value for name, value in (metrics or {}).items()}
+    for metric, labels, value in samples or ():
+        series[(metric, label_tuple(labels))] = value
+    return series
+
+
+class MetricWindow:
+    """Recent (timestamp, value) samples of one numeric metric"""
+
+    def __init__(self, retention: float):
+        self.retention = retention
+        self.samples: Deque[Tuple[float, float]] = deque()
+
+    def add(self, timestamp: float, value: float):
+        self.samples.append((timestamp, value))
+        self.expire(timestamp)
+
+    def expire(self, now: float) -> bool:
+        """Drop samples older than the retention; False once none are left"""
+        oldest = now - self.retention
+        while self.samples and self.samples[0][0] < oldest:
+            self.samples.popleft()
+        return bool(self.samples)
+
+    def _since(self, start: float) -> List[Tuple[float, float]]:
+        return [sample for sample in self.samples if sample[0] >= start]
+
+    def aggregate(self, func: str, window: float, now: float) -> Optional[float]:
+        samples = self._since(now - window)
+        if not samples:
+            return None
+        values = [value for _, value in samples]
+        if func == "avg_over":
+            return sum(values) / len(values)
+        if func == "max_over":
+            return max(values)
+        if func == "min_over":
+            return min(values)
+        # rate: per-second increase, tolerating counter resets
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            return None
+        increase = sum(b - a if b >= a else b for a, b in zip(values, values[1:]))
+        return increase / (samples[-1][0] - samples[0][0])
+
+
+@dataclass(frozen=True)
+class MetricSource:
+    """An instant metric value or an aggregate over a window of samples"""
+    metric: str
+    func: Optional[str] = None
+    window: float = 0.0
+
+    @property
+    def key(self) -> str:
+        return f"{self.func}({self.metric},{self.window:g}s)" if self.func else self.metric
+
+
+@dataclass(frozen=True)
+class Predicate:
+    """A source compared against a threshold (op None means the source must be truthy)"""
+    source: MetricSource
+    op: Optional[str] = None
+    threshold: Any = None
+
+    def test(self, value: Any) -> bool:
+        if value is None:
+            return False
+        if self.op is None:
+            return bool(value)
+        if self.op in ("==", "!="):
+            return _OPERATORS[self.op](value, self.threshold)
+        return _is_number(value) and _OPERATORS[self.op](value, self.threshold)
+
+
+def compile_condition(condition: str) -> Predicate:
+    """Parse a condition string into a predicate; ValueError if it is malformed"""
+    match = _CONDITION_RE.match(condition or "")
+    if not match:
+        raise ValueError(f"Invalid alert condition: {condition!r}")
+    if match.group("func"):
+        func = match.group("func")
+        if func not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate {func!r} in {condition!r}")
+        source = MetricSource(match.group("fmetric"), func, parse_duration(match.group("window")))
+        if source.window <= 0:
+            raise ValueError(f"Aggregate window must be positive in {condition!r}")
+    else:
+        source = MetricSource(match.group("metric"))
+
+    op = match.group("op")
+    if op is None:
+        return Predicate(source)
+    threshold = _parse_literal(match.group("literal"))
+    if op not in ("==", "!=") and not _is_number(threshold):
+        raise ValueError(f"Operator {op} needs a numeric threshold in {condition!r}")
+    if source.func and not _is_number(threshold):
+        raise ValueError(f"Aggregates compare against numbers in {condition!r}")
+    return Predicate(source, op, threshold)
+
+
+@dataclass
+class CompiledRule:
+    """An alert rule with its condition compiled"""
+    name: str
+    predicate: Predicate
+    severity: Any
+    type: Any
+    message_template: str
+    condition: str
+    for_seconds: float = 0.0
+    resolve_for_seconds: float = 0.0
+    labels: Tuple[str, ...] = ()
+    group_by: Tuple[str, ...] = ()
+
+
+def compile_rule(name: str, config: Dict[str, Any], default_resolve_for: float = 0.0) -> CompiledRule:
+    """Compile a rule config (condition, severity, type, message_template, for, resolve_for, labels, group_by)"""
+    return CompiledRule(
+        name=name,
+        predicate=compile_condition(config["condition"]),
+        severity=config["severity"],
+        type=config["type"],
+        message_template=config.get("message_template", name),
+        condition=config["condition"],
+        for_seconds=parse_duration(config.get("for")),
+        resolve_for_seconds=parse_duration(config.get("resolve_for", default_resolve_for)),
+        labels=tuple(config.get("labels", ())),
+        group_by=tuple(config.get("group_by", ())),
+    )
+
+
+@dataclass
+class _RuleGroup:
+    """Rules sharing a source and operator, ordered for bisection"""
+    thresholds: List[Any] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+
+
+class RuleSet:
+    """Compiled rules, the per-series metric windows they need and a threshold index"""
+
+    def __init__(self):
+        self.rules: Dict[str, CompiledRule] = {}
+        self.windows: Dict[SeriesKey, MetricWindow] = {}
+        self._retention: Dict[str, float] = {}
+        self._groups: Dict[Tuple[str, Optional[str]], _RuleGroup] = {}
+        self._sources: Dict[str, MetricSource] = {}
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add(self, rule: CompiledRule):
+        self.rules[rule.name] = rule
+        self._dirty = True
+
+    def remove(self, name: str):
+        if self.rules.pop(name, None) is not None:
+            self._dirty = True
+
+    def _rebuild(self):
+        groups: Dict[Tuple[str, Optional[str]], List[Tuple[Any, str]]] = {}
+        retention: Dict[str, float] = {}
+        self._sources = {}
+        for rule in self.rules.values():
+            source = rule.predicate.source
+            self._sources[source.key] = source
+            groups.setdefault((source.key, rule.predicate.op), []).append((rule.predicate.threshold, rule.name))
+            if source.func:
+                retention[source.metric] = max(retention.get(source.metric, 0.0), source.window)
+
+        self._groups = {}
+        for key, members in groups.items():
+            if key[1] in (">", ">=", "<", "<="):
+                members.sort(key=lambda member: member[0])
+            self._groups[key] = _RuleGroup([t for t, _ in members], [n for _, n in members])
+
+        # Keep existing samples for series of metrics that are still referenced
+        self._retention = retention
+        self.windows = {key: window for key, window in self.windows.items() if key[0] in retention}
+        for (metric, _), window in self.windows.items():
+            window.retention = retention[metric]
+        self._dirty = False
+
+    def observe(self, series: Dict[SeriesKey, Any], now: float):
+        """Record samples of the series that windowed rules aggregate"""
+        if self._dirty:
+            self._rebuild()
+        for key, value in series.items():
+            retention = self._retention.get(key[0])
+            if retention is None or not _is_number(value):
+                continue
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = MetricWindow(retention)
+            window.add(now, float(value))
+        # Series that stopped reporting age out once their last sample leaves the window
+        for key in [key for key, window in self.windows.items() if not window.expire(now)]:
+            del self.windows[key]
+
+    def source_values(self, series: Dict[SeriesKey, Any], now: float) -> Dict[str, Dict[Labels, Any]]:
+        """Each distinct source evaluated once per series"""
+        if self._dirty:
+            self._rebuild()
+        instant: Dict[str, Dict[Labels, Any]] = {}
+        for (metric, labels), value in series.items():
+            instant.setdefault(metric, {})[labels] = value
+        windowed: Dict[str, Dict[Labels, MetricWindow]] = {}
+        for (metric, labels), window in self.windows.items():
+            windowed.setdefault(metric, {})[labels] = window
+
+        values = {}
+        for key, source in self._sources.items():
+            if source.func:
+                values[key] = {labels: window.aggregate(source.func, source.window, now)
+                               for labels, window in windowed.get(source.metric, {}).items()}
+            else:
+                values[key] = instant.get(source.metric, {})
+        return values
+
+    def firing(self, values: Dict[str, Dict[Labels, Any]]) -> Set[Tuple[str, Labels]]:
+        """(rule name, series labels) for each rule whose predicate holds on a series"""
+        if self._dirty:
+            self._rebuild()
+        fired: Set[Tuple[str, Labels]] = set()
+        for (source_key, op), group in self._groups.items():
+            for labels, value in values.get(source_key, {}).items():
+                fired.update((name, labels) for name in self._matching(group, op, value))
+        return fired
+
+    @staticmethod
+    def _matching(group: _RuleGroup, op: Optional[str], value: Any) -> List[str]:
+        if value is None:
+            return []
+        if op is None:
+            return group.names if value else []
+        if op in ("==", "!="):
+            return [name for threshold, name in zip(group.thresholds, group.names)
+                    if _OPERATORS[op](value, threshold)]
+        if not _is_number(value):
+            return []
+        if op == ">":
+            return group.names[:bisect.bisect_left(group.thresholds, value)]
+        if op == ">=":
+            return group.names[:bisect.bisect_right(group.thresholds, value)]
+        if op == "<":
+            return group.names[bisect.bisect_right(group.thresholds, value):]
+        return group.names[bisect.bisect_left(group.thresholds, value):]
@@ -33,6 +33,24 @@ http_request_duration_seconds = Histogram(
     registry=registry
 )
 
+HTTP_SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+http_request_size_bytes = Histogram(
+    'http_request_size_bytes',
+    'HTTP request body size in bytes',
+    ['method', 'endpoint'],
+    buckets=HTTP_SIZE_BUCKETS,
+    registry=registry
+)
+
+http_response_size_bytes = Histogram(
+    'http_response_size_bytes',
+    'HTTP response body size in bytes',
+    ['method', 'endpoint'],
+    buckets=HTTP_SIZE_BUCKETS,
+    registry=registry
+)
+
 # RAG-specific Metrics
 rag_queries_total = Counter(
     'rag_queries_total',
@@ -156,34 +174,75 @@ market_analysis_queries_total = Counter(
     registry=registry
 )
 
+# Label values for requests that matched no route, and for non-standard methods
+UNMATCHED_ROUTE = "<unmatched>"
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
 class MetricsMiddleware:
-    """FastAPI middleware for collecting HTTP metrics"""
+    """FastAPI middleware for collecting HTTP metrics
+    
+    Requests are labelled by the matched route template (``/sessions/{session_id}``)
+    rather than the raw path, so label cardinality stays bounded by the route table.
+    """
     
     def __init__(self, app):
         self.app = app
+        # Labelled metric children, keyed by (method, endpoint, status)
+        self._children: Dict[tuple, tuple] = {}
     
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
         
-        start_time = time.time()
-        method = scope["method"]
-        path = scope["path"]
+        start_time = time.perf_counter()
+        status = 500
+        request_size = 0
+        response_size = 0
+        
+        async def receive_wrapper():
+            nonlocal request_size
+            message = await receive()
+            if message["type"] == "http.request":
+                request_size += len(message.get("body", b""))
+            return message
+        
+        async def send_wrapper(message):
+            nonlocal status, response_size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                response_size += len(message.get("body", b""))
+            await send(message)
         
-        # Track request
         try:
-            await self.app(scope, receive, send)
-            status = 200  # Default success status
-        except Exception as e:
-            status = 500
-            raise
+            await self.app(scope, receive_wrapper, send_wrapper)
         finally:
-            duration = time.time() - start_time
+            duration = time.perf_counter() - start_time
             
-            # Record metrics
-            http_requests_total.labels(method=method, endpoint=path, status=status).inc()
-            http_request_duration_seconds.labels(method=method, endpoint=path).observe(duration)
+            # The router stores the matched route in the (shared) scope
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope["method"] if scope["method"] in HTTP_METHODS else "OTHER"
+            
+            requests, durations, request_sizes, response_sizes = self._metrics(method, endpoint, status)
+            requests.inc()
+            durations.observe(duration)
+            request_sizes.observe(request_size)
+            response_sizes.observe(response_size)
+    
+    def _metrics(self, method: str, endpoint: str, status: int) -> tuple:
+        key = (method, endpoint, status)
+        children = self._children.get(key)
+        if children is None:
+            children = (
+                http_requests_total.labels(method=method, endpoint=endpoint, status=status),
+                http_request_duration_seconds.labels(method=method, endpoint=endpoint),
+                http_request_size_bytes.labels(method=method, endpoint=endpoint),
+                http_response_size_bytes.labels(method=method, endpoint=endpoint)
+            )
+            self._children[key] = children
+        return children
 
 class MetricsCollector:
     """Collector for system and application metrics"""
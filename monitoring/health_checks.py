@@ -2,13 +2,17 @@
 Health check endpoints and system status monitoring for RAG Real Estate System
 """
 import asyncio
+import os
 import time
 import psutil
 import aiohttp
 import redis
 import logging
+from functools import partial
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 import json
@@ -18,6 +22,11 @@ from chromadb import Client as ChromaClient
 
 logger = logging.getLogger(__name__)
 
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "2.0"))
+HEALTH_CACHE_TTL_SECONDS = float(os.getenv("HEALTH_CACHE_TTL_SECONDS", "5.0"))
+HEALTH_HISTORY_SIZE = int(os.getenv("HEALTH_HISTORY_SIZE", "100"))
+HEALTH_CHECK_THREADS = int(os.getenv("HEALTH_CHECK_THREADS", "4"))
+
 class HealthStatus(Enum):
     """Health status enumeration"""
     HEALTHY = "healthy"
@@ -51,8 +60,23 @@ class HealthChecker:
         self.config = config
         self.redis_client = None
         self.db_pool = None
+        self._db_pool_ready = False
         self.chroma_client = None
-        self.health_history = []
+        
+        # Per-probe deadlines and short-lived result cache
+        self.check_timeout = float(config.get("health_check_timeout", HEALTH_CHECK_TIMEOUT_SECONDS))
+        self.check_timeouts: Dict[str, float] = config.get("health_check_timeouts", {})
+        self.cache_ttl = float(config.get("health_cache_ttl", HEALTH_CACHE_TTL_SECONDS))
+        self._cached_health: Optional[SystemHealth] = None
+        self._cached_at = 0.0
+        self._refresh_lock = asyncio.Lock()
+        self.health_history: Deque[SystemHealth] = deque(maxlen=int(config.get("health_history_size", HEALTH_HISTORY_SIZE)))
+        
+        # Blocking psutil/client calls run here, so a hung dependency cannot starve the default executor
+        self._executor = ThreadPoolExecutor(max_workers=HEALTH_CHECK_THREADS, thread_name_prefix="health-check")
+        
+        # Prime the CPU counters so later non-blocking cpu_percent() calls measure since the last probe
+        psutil.cpu_percent(interval=None)
         
         # Initialize connections
         self._initialize_connections()
@@ -62,7 +86,11 @@ class HealthChecker:
         try:
             # Redis connection
             redis_url = self.config.get("redis_url", "redis://localhost:6379")
-            self.redis_client = redis.from_url(redis_url)
+            self.redis_client = redis.from_url(
+                redis_url,
+                socket_connect_timeout=self.check_timeout,
+                socket_timeout=self.check_timeout
+            )
             
             # Database connection pool
             db_config = self.config.get("database", {})
@@ -88,60 +116,108 @@ class HealthChecker:
         except Exception as e:
             logger.error(f"Error initializing connections: {e}")
     
-    async def check_system_health(self) -> SystemHealth:
-        """Perform comprehensive system health check"""
-        start_time = time.time()
-        checks = []
+    async def check_system_health(self, force_refresh: bool = False) -> SystemHealth:
+        """Perform comprehensive system health check (served from cache within the TTL)"""
+        cached = self._fresh_cached_health()
+        if cached is not None and not force_refresh:
+            return cached
         
-        # System-level checks
-        checks.append(await self._check_system_resources())
-        checks.append(await self._check_disk_space())
-        checks.append(await self._check_memory_usage())
-        checks.append(await self._check_cpu_usage())
+        # Concurrent callers share one refresh
+        async with self._refresh_lock:
+            cached = self._fresh_cached_health()
+            if cached is not None and not force_refresh:
+                return cached
+            
+            system_health = await self._run_all_checks()
+            self._cached_health = system_health
+            self._cached_at = time.monotonic()
+            self.health_history.append(system_health)
+            return system_health
+    
+    def _fresh_cached_health(self) -> Optional[SystemHealth]:
+        if self._cached_health is not None and time.monotonic() - self._cached_at < self.cache_ttl:
+            return self._cached_health
+        return None
+    
+    async def _run_all_checks(self) -> SystemHealth:
+        """Run every probe concurrently, each bounded by its own timeout"""
+        start_time = time.time()
         
-        # Service-level checks
-        checks.append(await self._check_redis_health())
-        checks.append(await self._check_database_health())
-        checks.append(await self._check_chromadb_health())
-        checks.append(await self._check_external_apis())
+        # One CPU sample per round: a second non-blocking call would measure a near-zero interval
+        cpu_percent = psutil.cpu_percent(interval=None)
         
-        # Application-level checks
-        checks.append(await self._check_application_health())
-        checks.append(await self._check_background_tasks())
+        probes = [
+            # System-level checks
+            ("system_resources", partial(self._check_system_resources, cpu_percent)),
+            ("disk_space", self._check_disk_space),
+            ("memory_usage", self._check_memory_usage),
+            ("cpu_usage", partial(self._check_cpu_usage, cpu_percent)),
+            # Service-level checks
+            ("redis", self._check_redis_health),
+            ("database", self._check_database_health),
+            ("chromadb", self._check_chromadb_health),
+            ("external_apis", self._check_external_apis),
+            # Application-level checks
+            ("application", self._check_application_health),
+            ("background_tasks", self._check_background_tasks)
+        ]
+        checks = list(await asyncio.gather(*(self._run_check(name, probe) for name, probe in probes)))
         
         # Determine overall status
         overall_status = self._determine_overall_status(checks)
         
         # Create system health summary
-        system_health = SystemHealth(
+        return SystemHealth(
             overall_status=overall_status,
             checks=checks,
             timestamp=datetime.now(),
             uptime=time.time() - start_time,
             version=self.config.get("version", "1.0.0")
         )
+    
+    async def _run_check(self, name: str, probe: Callable[[], Awaitable[HealthCheck]]) -> HealthCheck:
+        """Run one probe under its deadline; a timeout or crash marks it unhealthy"""
+        timeout = float(self.check_timeouts.get(name, self.check_timeout))
+        start_time = time.time()
         
-        # Store health history
-        self.health_history.append(system_health)
-        if len(self.health_history) > 100:  # Keep last 100 health checks
-            self.health_history.pop(0)
+        try:
+            return await asyncio.wait_for(probe(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Health check {name} timed out after {timeout}s")
+            error_message = f"Timed out after {timeout}s"
+        except Exception as e:
+            logger.error(f"Health check {name} failed: {e}")
+            error_message = str(e)
         
-        return system_health
+        return HealthCheck(
+            name=name,
+            status=HealthStatus.UNHEALTHY,
+            response_time=time.time() - start_time,
+            details={},
+            timestamp=datetime.now(),
+            error_message=error_message
+        )
     
-    async def _check_system_resources(self) -> HealthCheck:
+    async def _run_blocking(self, func: Callable, *args) -> Any:
+        """Run a blocking call on the health-check thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    async def _check_system_resources(self, cpu_percent: Optional[float] = None) -> HealthCheck:
         """Check system resource availability"""
         start_time = time.time()
         
         try:
-            # Check CPU cores
+            # Check CPU cores (usage since the previous round, without sleeping)
             cpu_count = psutil.cpu_count()
-            cpu_percent = psutil.cpu_percent(interval=1)
+            if cpu_percent is None:
+                cpu_percent = psutil.cpu_percent(interval=None)
             
             # Check memory
             memory = psutil.virtual_memory()
             
             # Check disk
-            disk = psutil.disk_usage('/')
+            disk = await self._run_blocking(psutil.disk_usage, '/')
             
             details = {
                 "cpu_count": cpu_count,
@@ -184,7 +260,7 @@ class HealthChecker:
         start_time = time.time()
         
         try:
-            disk = psutil.disk_usage('/')
+            disk = await self._run_blocking(psutil.disk_usage, '/')
             free_percent = (disk.free / disk.total) * 100
             
             details = {
@@ -224,14 +300,15 @@ class HealthChecker:
         
         try:
             memory = psutil.virtual_memory()
+            swap = await self._run_blocking(psutil.swap_memory)
             
             details = {
                 "total": memory.total,
                 "available": memory.available,
                 "used": memory.used,
                 "percent": memory.percent,
-                "swap_total": psutil.swap_memory().total,
-                "swap_used": psutil.swap_memory().used
+                "swap_total": swap.total,
+                "swap_used": swap.used
             }
             
             status = HealthStatus.HEALTHY
@@ -258,12 +335,13 @@ class HealthChecker:
                 error_message=str(e)
             )
     
-    async def _check_cpu_usage(self) -> HealthCheck:
+    async def _check_cpu_usage(self, cpu_percent: Optional[float] = None) -> HealthCheck:
         """Check CPU usage"""
         start_time = time.time()
         
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
+            if cpu_percent is None:
+                cpu_percent = psutil.cpu_percent(interval=None)
             cpu_count = psutil.cpu_count()
             load_avg = psutil.getloadavg()
             
@@ -315,10 +393,10 @@ class HealthChecker:
                 )
             
             # Test Redis connection
-            self.redis_client.ping()
+            await self._run_blocking(self.redis_client.ping)
             
             # Get Redis info
-            info = self.redis_client.info()
+            info = await self._run_blocking(self.redis_client.info)
             
             details = {
                 "version": info.get("redis_version"),
@@ -363,6 +441,11 @@ class HealthChecker:
                     error_message="Database pool not configured"
                 )
             
+            # The pool is created lazily; initialize it on first use
+            if not self._db_pool_ready:
+                await self.db_pool
+                self._db_pool_ready = True
+            
             # Test database connection
             async with self.db_pool.acquire() as conn:
                 # Check connection
@@ -424,7 +507,7 @@ class HealthChecker:
                 )
             
             # Test ChromaDB connection
-            collections = self.chroma_client.list_collections()
+            collections = await self._run_blocking(self.chroma_client.list_collections)
             
             details = {
                 "collections_count": len(collections),
@@ -579,9 +662,9 @@ class HealthChecker:
         else:
             return HealthStatus.UNKNOWN
     
-    async def get_health_summary(self) -> Dict[str, Any]:
+    async def get_health_summary(self, force_refresh: bool = False) -> Dict[str, Any]:
         """Get health summary for API response"""
-        health = await self.check_system_health()
+        health = await self.check_system_health(force_refresh=force_refresh)
         
         return {
             "status": health.overall_status.value,
@@ -604,15 +687,18 @@ class HealthChecker:
         """Get health check history"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
+        # The ring buffer is in time order: walk back from the newest entry to the cutoff
         history = []
-        for health in self.health_history:
-            if health.timestamp >= cutoff_time:
-                history.append({
-                    "timestamp": health.timestamp.isoformat(),
-                    "status": health.overall_status.value,
-                    "uptime": health.uptime
-                })
+        for health in reversed(self.health_history):
+            if health.timestamp < cutoff_time:
+                break
+            history.append({
+                "timestamp": health.timestamp.isoformat(),
+                "status": health.overall_status.value,
+                "uptime": health.uptime
+            })
         
+        history.reverse()
         return history
 
 # Health check endpoints for FastAPI
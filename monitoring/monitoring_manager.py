@@ -3,7 +3,8 @@ Comprehensive monitoring manager for RAG Real Estate System
 """
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import redis
 from fastapi import FastAPI
@@ -11,13 +12,16 @@ from fastapi import FastAPI
 from .application_metrics import MetricsCollector, MetricsMiddleware, collect_metrics_background
 from .error_tracker import ErrorTracker, ErrorMiddleware
 from .performance_monitor import PerformanceMonitor, PerformanceAnalyzer
-from .health_checks import HealthChecker
+from .health_checks import HealthChecker, HealthStatus
 from .logging_config import setup_logging, get_request_logger, get_error_logger, get_performance_logger
 from .sentry_config import initialize_sentry, get_sentry_config
 from .alert_manager import AlertManager, AlertType, AlertSeverity
 
 logger = logging.getLogger(__name__)
 
+# How often health checks and system metrics are fed to the alert rules
+ALERT_EVALUATION_INTERVAL = float(os.getenv("ALERT_EVALUATION_INTERVAL", "15"))
+
 class MonitoringManager:
     """Comprehensive monitoring manager that orchestrates all monitoring components"""
     
@@ -86,6 +90,9 @@ class MonitoringManager:
             # Start metrics collection background task
             asyncio.create_task(collect_metrics_background())
             
+            # Start alert rule evaluation background task
+            asyncio.create_task(self._evaluate_alerts_background())
+            
             logger.info("All monitoring services started")
             
         except Exception as e:
@@ -103,6 +110,37 @@ class MonitoringManager:
         except Exception as e:
             logger.error(f"Error stopping monitoring services: {e}")
     
+    async def _evaluate_alerts_background(self):
+        """Background task feeding each collection round to the alert rules"""
+        while True:
+            try:
+                metrics, samples = await self.collect_alert_inputs()
+                await self.alert_manager.evaluate_alert_rules(metrics, samples=samples)
+            except Exception as e:
+                logger.error(f"Error evaluating alert rules: {e}")
+            await asyncio.sleep(ALERT_EVALUATION_INTERVAL)
+    
+    async def collect_alert_inputs(self) -> Tuple[Dict[str, Any], List[Tuple[str, Dict[str, str], Any]]]:
+        """Build the flat metrics and per-service samples the alert rules evaluate"""
+        health = await self.health_checker.check_system_health()
+        metrics: Dict[str, Any] = {}
+        samples: List[Tuple[str, Dict[str, str], Any]] = []
+        
+        for check in health.checks:
+            # Every service reports in the same round so each keeps its own alert state
+            status = "down" if check.status == HealthStatus.UNHEALTHY else check.status.value
+            samples.append(("service_status", {"service_name": check.name}, status))
+            
+            if check.name == "system_resources" and check.details:
+                if "cpu_percent" in check.details:
+                    metrics["cpu_usage"] = check.details["cpu_percent"]
+                if "memory_percent" in check.details:
+                    metrics["memory_usage"] = check.details["memory_percent"]
+            elif check.name == "database":
+                metrics["db_connection_failed"] = check.status == HealthStatus.UNHEALTHY
+        
+        return metrics, samples
+    
     def setup_fastapi_middleware(self, app: FastAPI):
         """Setup FastAPI middleware for monitoring"""
         try:
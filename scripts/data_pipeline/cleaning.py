@@ -4,12 +4,60 @@ Data Cleaning & Validation Layer
 Handles data cleaning, validation, and standardization for real estate data.
 """
 
+import numpy as np
 import pandas as pd
 import re
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, List, Any, Optional
 import logging
 from datetime import datetime
 
+VALIDATION_FLAGS = [
+    'has_address', 'has_price', 'has_bedrooms', 'has_bathrooms', 'has_square_feet', 'has_area',
+    'has_property_type', 'price_reasonable', 'bedrooms_reasonable', 'bathrooms_reasonable',
+    'square_feet_reasonable'
+]
+
+ADDRESS_ABBREVIATIONS = [
+    (r'\bSt\b', 'Street'),
+    (r'\bAve\b', 'Avenue'),
+    (r'\bRd\b', 'Road'),
+    (r'\bBlvd\b', 'Boulevard'),
+    (r'\bDr\b', 'Drive')
+]
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a processed batch back to record dicts, with missing values as None"""
+    names = list(frame.columns)
+    columns = [frame[name].astype(object).where(frame[name].notna(), None).tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _coalesce(df: pd.DataFrame, columns: Iterable[str]) -> Optional[pd.Series]:
+    """First of the candidate columns, with gaps filled from the later ones"""
+    result = None
+    for column in columns:
+        if column in df:
+            result = df[column] if result is None else result.where(result.notna(), df[column])
+    return result
+
+
+def _blank(series: pd.Series) -> pd.Series:
+    """Rows the scalar cleaners treat as empty (missing, empty string or zero)"""
+    if pd.api.types.is_numeric_dtype(series):
+        return series.isna() | (series == 0)
+    return series.isna() | series.isin(['', 0])
+
+
+def _map_unique(series: pd.Series, func: Callable[[Any], Any], missing: Any) -> pd.Series:
+    """Apply a scalar mapping once per distinct value and broadcast the results back"""
+    codes, uniques = pd.factorize(series)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    mapped[:-1] = [func(value) for value in uniques]
+    mapped[-1] = missing
+    return pd.Series(mapped[codes], index=series.index)
+
+
 class DataCleaner:
     """Handles data cleaning and validation"""
     
@@ -19,70 +67,100 @@ class DataCleaner:
         
     def clean_property_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Clean property listing data"""
-        cleaned_data = []
+        if not data:
+            return []
+        return frame_to_records(self.clean_property_frame(pd.DataFrame(data)))
+    
+    def clean_property_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clean a columnar batch of property listings (vectorized clean_property_data)"""
+        cleaned = pd.DataFrame(index=df.index)
+        
+        if 'address' in df:
+            cleaned['address'] = self._clean_text_series(df['address'], ADDRESS_ABBREVIATIONS)
+        
+        price = _coalesce(df, ['price', 'price_aed'])
+        if price is not None:
+            cleaned['price_aed'] = self._clean_price_series(price)
+        
+        for column in ('bedrooms', 'bathrooms'):
+            if column in df:
+                cleaned[column] = self._extract_number_series(df[column])
+        
+        square_feet = _coalesce(df, ['square_feet', 'sqft', 'area_sqft'])
+        if square_feet is not None:
+            cleaned['square_feet'] = self._extract_number_series(square_feet)
+        
+        # Low-cardinality columns: map each distinct value once
+        property_type = _coalesce(df, ['property_type', 'type'])
+        if property_type is not None:
+            cleaned['property_type'] = _map_unique(property_type, self._standardize_property_type, "Unknown")
+        
+        area = _coalesce(df, ['area', 'neighborhood', 'location'])
+        if area is not None:
+            cleaned['area'] = _map_unique(area, self._standardize_area, "Unknown")
+        
+        if 'developer' in df:
+            cleaned['developer'] = _map_unique(df['developer'], self._clean_developer, "Unknown")
+        
+        if 'amenities' in df:
+            cache: Dict[str, List[str]] = {}
+            cleaned['amenities'] = df['amenities'].map(
+                lambda value: cache.setdefault(value, self._clean_amenities(value))
+                if isinstance(value, str) else self._clean_amenities(value))
+        
+        if 'description' in df:
+            description = self._clean_text_series(df['description'])
+            too_long = description.str.len() > 1000
+            cleaned['description'] = description.where(~too_long, description.str.slice(0, 1000) + "...")
+        
+        # Few distinct flag combinations occur: build one dict per combination and share it
+        flags = self.validate_property_frame(cleaned)
+        combination = pd.Series(flags.to_numpy() @ (1 << np.arange(len(VALIDATION_FLAGS))), index=flags.index)
+        first_rows = combination.drop_duplicates()
+        flag_dicts = dict(zip(first_rows.tolist(), flags.loc[first_rows.index].to_dict('records')))
+        cleaned['validation_flags'] = combination.map(flag_dicts)
+        cleaned['cleaned_at'] = datetime.now().isoformat()
+        
+        return cleaned
+    
+    def _clean_text_series(self, series: pd.Series, replacements: List = None) -> pd.Series:
+        """Vectorized _clean_address / _clean_description"""
+        text = series.where(~_blank(series), '').astype(str)
+        text = text.str.strip().str.replace(r'\s+', ' ', regex=True)
+        
+        if replacements is None:
+            # Description: strip HTML tags
+            return text.str.replace(r'<[^>]+>', '', regex=True)
+        
+        for pattern, replacement in replacements:
+            text = text.str.replace(pattern, replacement, regex=True)
+        return text.str.replace(r'[^\w\s\-\.\,\#]', '', regex=True)
+    
+    def _clean_price_series(self, series: pd.Series) -> pd.Series:
+        """Vectorized _clean_price"""
+        blank = _blank(series)
+        if pd.api.types.is_numeric_dtype(series):
+            prices = series.astype(float)
+        else:
+            digits = series.astype(str).str.replace(r'[^\d\.]', '', regex=True)
+            prices = pd.to_numeric(digits, errors='coerce')
+        prices = prices.where(~blank)
         
-        for item in data:
-            cleaned_item = {}
-            
-            # Clean address
-            if 'address' in item:
-                cleaned_item['address'] = self._clean_address(item['address'])
-            
-            # Clean price
-            if 'price' in item:
-                cleaned_item['price_aed'] = self._clean_price(item['price'])
-            elif 'price_aed' in item:
-                cleaned_item['price_aed'] = self._clean_price(item['price_aed'])
-            
-            # Clean bedrooms/bathrooms
-            if 'bedrooms' in item:
-                cleaned_item['bedrooms'] = self._extract_number(item['bedrooms'])
-            if 'bathrooms' in item:
-                cleaned_item['bathrooms'] = self._extract_number(item['bathrooms'])
-            
-            # Clean square footage
-            if 'square_feet' in item:
-                cleaned_item['square_feet'] = self._extract_number(item['square_feet'])
-            elif 'sqft' in item:
-                cleaned_item['square_feet'] = self._extract_number(item['sqft'])
-            elif 'area_sqft' in item:
-                cleaned_item['square_feet'] = self._extract_number(item['area_sqft'])
-            
-            # Standardize property type
-            if 'property_type' in item:
-                cleaned_item['property_type'] = self._standardize_property_type(item['property_type'])
-            elif 'type' in item:
-                cleaned_item['property_type'] = self._standardize_property_type(item['type'])
-            
-            # Clean area/neighborhood
-            if 'area' in item:
-                cleaned_item['area'] = self._standardize_area(item['area'])
-            elif 'neighborhood' in item:
-                cleaned_item['area'] = self._standardize_area(item['neighborhood'])
-            elif 'location' in item:
-                cleaned_item['area'] = self._standardize_area(item['location'])
-            
-            # Clean developer
-            if 'developer' in item:
-                cleaned_item['developer'] = self._clean_developer(item['developer'])
-            
-            # Clean amenities
-            if 'amenities' in item:
-                cleaned_item['amenities'] = self._clean_amenities(item['amenities'])
-            
-            # Clean description
-            if 'description' in item:
-                cleaned_item['description'] = self._clean_description(item['description'])
-            
-            # Add validation flags
-            cleaned_item['validation_flags'] = self._validate_property_data(cleaned_item)
-            
-            # Add cleaning metadata
-            cleaned_item['cleaned_at'] = datetime.now().isoformat()
-            
-            cleaned_data.append(cleaned_item)
+        out_of_range = int(((prices < 100000) | (prices > 100000000)).sum())
+        if out_of_range:
+            self.logger.warning(f"{out_of_range} prices seem outside reasonable range")
         
-        return cleaned_data
+        return prices
+    
+    def _extract_number_series(self, series: pd.Series) -> pd.Series:
+        """Vectorized _extract_number"""
+        blank = _blank(series)
+        if pd.api.types.is_numeric_dtype(series):
+            # First digit run of the number's text: its integer part
+            return np.floor(series.where(~blank).astype(float).abs()).astype('Int64')
+        
+        digits = series.astype(str).str.replace(r'^\D*(\d+)[\s\S]*$', r'\1', regex=True)
+        return pd.to_numeric(digits.where(~blank), errors='coerce').astype('Int64')
     
     def _clean_address(self, address: str) -> str:
         """Clean and standardize address"""
@@ -93,11 +171,8 @@ class DataCleaner:
         address = re.sub(r'\s+', ' ', address.strip())
         
         # Standardize common abbreviations
-        address = re.sub(r'\bSt\b', 'Street', address)
-        address = re.sub(r'\bAve\b', 'Avenue', address)
-        address = re.sub(r'\bRd\b', 'Road', address)
-        address = re.sub(r'\bBlvd\b', 'Boulevard', address)
-        address = re.sub(r'\bDr\b', 'Drive', address)
+        for pattern, replacement in ADDRESS_ABBREVIATIONS:
+            address = re.sub(pattern, replacement, address)
         
         # Remove special characters but keep essential ones
         address = re.sub(r'[^\w\s\-\.\,\#]', '', address)
@@ -311,6 +386,33 @@ class DataCleaner:
         
         return flags
     
+    def validate_property_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Vectorized _validate_property_data: one boolean column per validation flag"""
+        def column(name: str) -> pd.Series:
+            return df[name] if name in df else pd.Series(np.nan, index=df.index)
+        
+        def present(name: str) -> pd.Series:
+            return column(name).notna()
+        
+        def within(name: str, low: float, high: float) -> pd.Series:
+            return column(name).astype(float).between(low, high).fillna(False).astype(bool)
+        
+        flags = pd.DataFrame({
+            'has_address': ~_blank(column('address')),
+            'has_price': present('price_aed'),
+            'has_bedrooms': present('bedrooms'),
+            'has_bathrooms': present('bathrooms'),
+            'has_square_feet': present('square_feet'),
+            'has_area': ~_blank(column('area')),
+            'has_property_type': ~_blank(column('property_type')),
+            'price_reasonable': within('price_aed', 200000, 50000000),
+            'bedrooms_reasonable': within('bedrooms', 1, 10),
+            'bathrooms_reasonable': within('bathrooms', 1, 8),
+            'square_feet_reasonable': within('square_feet', 300, 20000)
+        }, index=df.index)
+        
+        return flags[VALIDATION_FLAGS]
+    
     def _validate_price_reasonableness(self, price: Optional[float]) -> bool:
         """Validate if price is reasonable for Dubai market"""
         if not price:
@@ -364,6 +466,17 @@ class DataCleaner:
         
         return unique_data
     
+    def duplicate_keys(self, df: pd.DataFrame, key_fields: List[str] = None) -> pd.Series:
+        """64-bit hash of each row's duplicate key (vectorized remove_duplicates)"""
+        if key_fields is None:
+            key_fields = ['address', 'price_aed', 'bedrooms']
+        
+        present_fields = [field for field in key_fields if field in df]
+        if not present_fields:
+            return pd.Series(np.zeros(len(df), dtype='uint64'), index=df.index)
+        
+        return pd.util.hash_pandas_object(df[present_fields], index=False)
+    
     def generate_cleaning_report(self, original_count: int, cleaned_count: int, validation_flags: List[Dict[str, bool]]) -> Dict[str, Any]:
         """Generate a report on data cleaning results"""
         total_flags = len(validation_flags)
@@ -375,13 +488,22 @@ class DataCleaner:
         for flag_name in validation_flags[0].keys():
             flag_counts[flag_name] = sum(1 for flags in validation_flags if flags.get(flag_name, False))
         
+        fully_valid = sum(1 for flags in validation_flags if all(flags.values()))
+        return self.build_quality_report(original_count, cleaned_count, flag_counts, fully_valid, total_flags)
+    
+    def build_quality_report(self, original_count: int, cleaned_count: int, flag_counts: Dict[str, int],
+                             fully_valid: int, total_flags: int) -> Dict[str, Any]:
+        """Quality report from validation flag totals (accumulated batch by batch)"""
+        if total_flags == 0 or not flag_counts:
+            return {}
+        
         # Calculate quality metrics
         quality_metrics = {
             'total_records': original_count,
             'cleaned_records': cleaned_count,
             'duplicates_removed': original_count - cleaned_count,
             'completeness_score': sum(flag_counts.values()) / (len(flag_counts) * total_flags),
-            'data_quality_score': sum(1 for flags in validation_flags if all(flags.values())) / total_flags
+            'data_quality_score': fully_valid / total_flags
         }
         
         return {
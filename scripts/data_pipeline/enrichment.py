@@ -4,11 +4,16 @@ Data Enrichment Layer
 Enriches data with additional context, calculated fields, and market intelligence.
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Any, Optional
 import logging
 from datetime import datetime
 
+from .cleaning import frame_to_records
+
+PREMIUM_AREAS = ['Palm Jumeirah', 'Downtown Dubai', 'Dubai Marina']
+
 class DataEnricher:
     """Enriches data with additional context and calculations"""
     
@@ -18,33 +23,145 @@ class DataEnricher:
         
     def enrich_property_data(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Enrich property data with calculated fields and market context"""
-        enriched_data = []
-        
-        for item in data:
-            enriched_item = item.copy()
-            
-            # Calculate price per square foot
-            if item.get('price_aed') and item.get('square_feet'):
-                enriched_item['price_per_sqft'] = item['price_aed'] / item['square_feet']
-            
-            # Add market context
-            enriched_item['market_context'] = self._get_market_context(item)
-            
-            # Add investment metrics
-            enriched_item['investment_metrics'] = self._calculate_investment_metrics(item)
-            
-            # Add property classification
-            enriched_item['property_classification'] = self._classify_property(item)
-            
-            # Add location intelligence
-            enriched_item['location_intelligence'] = self._get_location_intelligence(item)
-            
-            # Add timestamp
-            enriched_item['enriched_at'] = datetime.now().isoformat()
-            
-            enriched_data.append(enriched_item)
-        
-        return enriched_data
+        if not data:
+            return []
+        return frame_to_records(self.enrich_property_frame(pd.DataFrame(data)))
+    
+    def enrich_property_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Enrich a columnar batch: vectorized metrics plus a join against the area reference table"""
+        enriched = df.copy(deep=False)
+        
+        def numeric(name: str) -> pd.Series:
+            if name not in df:
+                return pd.Series(np.nan, index=df.index)
+            return pd.to_numeric(df[name], errors='coerce').astype(float)
+        
+        price = numeric('price_aed')
+        square_feet = numeric('square_feet')
+        bedrooms = numeric('bedrooms').fillna(0)
+        area = df['area'].fillna('Unknown') if 'area' in df else pd.Series('Unknown', index=df.index)
+        property_type = df['property_type'].fillna('Unknown') if 'property_type' in df else pd.Series('Unknown', index=df.index)
+        
+        # Calculate price per square foot
+        has_price = price.notna() & (price != 0)
+        price_per_sqft = (price / square_feet).where(has_price & square_feet.notna() & (square_feet != 0))
+        enriched['price_per_sqft'] = price_per_sqft
+        
+        # Join each row to its area's market and location context
+        reference = self.build_area_reference(area.unique())
+        joined = area.to_frame('area').merge(reference, on='area', how='left')
+        joined.index = df.index
+        
+        enriched['market_context'] = joined['market_context']
+        enriched['investment_metrics'] = self._investment_metrics_series(
+            price, price_per_sqft, area, joined['rental_yield'], joined['appreciation_rate'],
+            joined['capital_appreciation_potential'])
+        enriched['property_classification'] = self._classification_series(price.fillna(0), bedrooms, area, property_type)
+        enriched['location_intelligence'] = joined['location_intelligence']
+        
+        # Add timestamp
+        enriched['enriched_at'] = datetime.now().isoformat()
+        
+        return enriched
+    
+    def build_area_reference(self, areas: List[str]) -> pd.DataFrame:
+        """One row of market and location context per distinct area, from the area lookup tables"""
+        rows = []
+        for area in areas:
+            rows.append({
+                'area': area,
+                'rental_yield': self._get_area_rental_yield(area),
+                'appreciation_rate': self._get_area_appreciation_rate(area),
+                'market_context': self._get_market_context({'area': area}),
+                'location_intelligence': self._get_location_intelligence({'area': area}),
+                'capital_appreciation_potential': self._estimate_capital_appreciation(area)
+            })
+        
+        return pd.DataFrame(rows, columns=['area', 'rental_yield', 'appreciation_rate', 'market_context',
+                                           'location_intelligence', 'capital_appreciation_potential'])
+    
+    def _investment_metrics_series(self, price: pd.Series, price_per_sqft: pd.Series, area: pd.Series,
+                                   rental_yield: pd.Series, appreciation_rate: pd.Series,
+                                   capital_appreciation: pd.Series) -> pd.Series:
+        """Vectorized _calculate_investment_metrics"""
+        estimated_rental = price * rental_yield / 100
+        potential_yield = (estimated_rental / price * 100).where(price > 0, 0)
+        payback_period = (price / estimated_rental).where(estimated_rental > 0, float('inf'))
+        annual_appreciation = price * (appreciation_rate / 100)
+        total_roi = ((estimated_rental + annual_appreciation) / price * 100).where(price > 0, 0)
+        
+        investment_grade = np.select(
+            [potential_yield >= 7, potential_yield >= 6, potential_yield >= 5],
+            ['Excellent', 'Good', 'Average'], 'Below Average')
+        roi_grade = np.select(
+            [total_roi >= 10, total_roi >= 8, total_roi >= 6, total_roi >= 4],
+            ['Exceptional', 'Excellent', 'Good', 'Average'], 'Below Average')
+        
+        # Risk only depends on the area and whether the price is above the liquidity cut-off
+        risk_cache: Dict[Any, Dict[str, Any]] = {}
+        
+        def risk(area_name: str, listing_price: float) -> Dict[str, Any]:
+            key = (area_name, listing_price > 10000000)
+            if key not in risk_cache:
+                risk_cache[key] = self._assess_investment_risk({'area': area_name, 'price_aed': listing_price})
+            return risk_cache[key]
+        
+        valid = (price.notna() & (price != 0) & price_per_sqft.notna() & (price_per_sqft != 0)).tolist()
+        return pd.Series([
+            {
+                'estimated_rental_income': rental,
+                'potential_yield': yield_rate,
+                'investment_grade': grade,
+                'payback_period': payback,
+                'roi_metrics': {
+                    'basic_roi': yield_rate,
+                    'appreciation_rate': rate,
+                    'annual_appreciation': appreciation,
+                    'total_roi': roi,
+                    'roi_grade': roi_class
+                },
+                'capital_appreciation_potential': capital,
+                'risk_assessment': risk(area_name, listing_price)
+            } if ok else {}
+            for ok, listing_price, area_name, rental, yield_rate, grade, payback, rate, appreciation, roi, roi_class, capital
+            in zip(valid, price.tolist(), area.tolist(), estimated_rental.tolist(), potential_yield.tolist(),
+                   investment_grade.tolist(), payback_period.tolist(), appreciation_rate.tolist(),
+                   annual_appreciation.tolist(), total_roi.tolist(), roi_grade.tolist(), capital_appreciation.tolist())
+        ], index=price.index, dtype=object)
+    
+    def _classification_series(self, price: pd.Series, bedrooms: pd.Series, area: pd.Series,
+                               property_type: pd.Series) -> pd.Series:
+        """Vectorized _classify_property"""
+        price_class = np.select(
+            [price < 1000000, price < 3000000, price < 10000000],
+            ['Affordable', 'Mid-Market', 'Luxury'], 'Ultra-Luxury')
+        size_class = bedrooms.map({0: 'Studio', 1: '1-Bedroom', 2: '2-Bedroom', 3: '3-Bedroom'}).fillna('Large')
+        area_class = np.where(area.isin(PREMIUM_AREAS), 'Premium', 'Standard')
+        type_class = property_type.map(
+            {value: self._classify_property_type(value) for value in property_type.unique()})
+        
+        # Target market only depends on the price band, bedroom bucket and area
+        market_cache: Dict[Any, List[str]] = {}
+        
+        def target_market(band: str, listing_price: float, beds: float, area_name: str) -> List[str]:
+            key = (band, min(beds, 3), area_name)
+            if key not in market_cache:
+                market_cache[key] = self._identify_target_market(listing_price, beds, area_name)
+            return market_cache[key]
+        
+        return pd.Series([
+            {
+                'price_class': band,
+                'size_class': size,
+                'area_class': area_group,
+                'type_class': type_group,
+                'overall_class': f"{band} {size}",
+                'target_market': target_market(band, listing_price, beds, area_name)
+            }
+            for band, size, area_group, type_group, listing_price, beds, area_name
+            in zip(price_class.tolist(), size_class.tolist(), area_class.tolist(), type_class.tolist(),
+                   price.tolist(), bedrooms.tolist(), area.tolist())
+        ], index=price.index, dtype=object)
     
     def _get_market_context(self, property_data: Dict[str, Any]) -> Dict[str, Any]:
         """Get market context for the property"""
@@ -121,8 +238,7 @@ class DataEnricher:
             size_class = 'Large'
         
         # Area classification
-        premium_areas = ['Palm Jumeirah', 'Downtown Dubai', 'Dubai Marina']
-        area_class = 'Premium' if area in premium_areas else 'Standard'
+        area_class = 'Premium' if area in PREMIUM_AREAS else 'Standard'
         
         # Property type classification
         property_type = property_data.get('property_type', 'Unknown')
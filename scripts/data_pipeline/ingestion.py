@@ -9,11 +9,150 @@ import PyPDF2
 import openpyxl
 import requests
 from pathlib import Path
-from typing import Dict, List, Any, Union, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Union, Optional
 import logging
 import json
+import queue
+import threading
 from datetime import datetime
 
+STREAMING_SUFFIXES = ('.csv', '.xlsx', '.json', '.jsonl', '.ndjson')
+JSON_READ_SIZE = 1 << 16
+
+_NUMERIC_KINDS = ('integer', 'floating', 'mixed-integer-float', 'decimal')
+_END_OF_STREAM = object()
+
+
+def infer_schema(sample: pd.DataFrame) -> Dict[str, str]:
+    """Column kinds inferred from a sample of rows ('numeric', 'boolean', 'datetime', 'string' or 'mixed')"""
+    schema = {}
+    for column in sample.columns:
+        kind = pd.api.types.infer_dtype(sample[column], skipna=True)
+        if kind in _NUMERIC_KINDS:
+            schema[column] = 'numeric'
+        elif kind in ('boolean', 'string'):
+            schema[column] = kind
+        elif kind in ('datetime64', 'datetime', 'date'):
+            schema[column] = 'datetime'
+        elif kind == 'empty':
+            schema[column] = 'empty'
+        else:
+            schema[column] = 'mixed'
+    return schema
+
+
+def apply_schema(frame: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Align a batch to the schema so every batch has the same columns and numeric dtypes"""
+    for column in frame.columns:
+        if column not in schema:
+            # Columns first seen after the sample keep their position at the end
+            schema[column] = infer_schema(frame[[column]])[column]
+    frame = frame.reindex(columns=list(schema))
+    
+    for column, kind in schema.items():
+        if kind != 'numeric' or pd.api.types.is_numeric_dtype(frame[column]):
+            continue
+        converted = pd.to_numeric(frame[column], errors='coerce')
+        # Leave the batch as text rather than drop values that are not plain numbers
+        if not (converted.isna() & frame[column].notna()).any():
+            frame[column] = converted
+    return frame
+
+
+def prefetch(batches: Iterable[Any], depth: int) -> Iterator[Any]:
+    """Read up to depth batches ahead on a background thread; the reader blocks while downstream is behind"""
+    if depth <= 0:
+        yield from batches
+        return
+    
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        iterator = iter(batches)
+        try:
+            for batch in iterator:
+                if not put((batch, None)):
+                    return
+            put((_END_OF_STREAM, None))
+        except Exception as e:
+            put((_END_OF_STREAM, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+    
+    thread = threading.Thread(target=produce, name='ingestion-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch, error = buffer.get()
+            if batch is _END_OF_STREAM:
+                if error is not None:
+                    raise error
+                return
+            yield batch
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_json_values(file_path: str, read_size: int = JSON_READ_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array, or each value of a JSON Lines file, reading incrementally"""
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8-sig') as file:
+        buffer, position, eof = '', 0, False
+        in_array = None
+        
+        while True:
+            separators = ' \t\r\n,' if in_array else ' \t\r\n'
+            while position < len(buffer) and buffer[position] in separators:
+                position += 1
+            
+            if position == len(buffer) and not eof:
+                chunk = file.read(read_size)
+                buffer, position, eof = chunk, 0, not chunk
+                continue
+            if position == len(buffer):
+                if in_array:
+                    raise ValueError(f"Unterminated JSON array in {file_path}")
+                return
+            
+            if in_array is None:
+                in_array = buffer[position] == '['
+                if in_array:
+                    position += 1
+                    continue
+            if in_array and buffer[position] == ']':
+                return
+            
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+                # A value ending at the buffer edge may continue in the next read
+                complete = end < len(buffer) or eof
+            except ValueError:
+                if eof:
+                    raise
+                complete = False
+            
+            if not complete:
+                chunk = file.read(read_size)
+                buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+                continue
+            
+            yield value
+            position = end
+
+
 class DataIngestion:
     """Handles data ingestion from multiple sources"""
     
@@ -63,6 +202,89 @@ class DataIngestion:
             self.logger.error(f"Error processing CSV {file_path}: {e}")
             return None
     
+    def iter_csv_frames(self, file_path: str, chunk_rows: int = 50000) -> Iterator[pd.DataFrame]:
+        """Stream a CSV file as DataFrame batches of at most chunk_rows rows"""
+        try:
+            with pd.read_csv(file_path, chunksize=chunk_rows) as reader:
+                for frame in reader:
+                    yield frame
+        except Exception as e:
+            self.logger.error(f"Error streaming CSV {file_path}: {e}")
+            raise
+    
+    def iter_excel_frames(self, file_path: str, chunk_rows: int = 50000) -> Iterator[pd.DataFrame]:
+        """Stream every sheet of an XLSX workbook as DataFrame batches, without loading the sheets"""
+        try:
+            workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+            try:
+                for sheet_name in workbook.sheetnames:
+                    headers = None
+                    rows = []
+                    
+                    for row in workbook[sheet_name].iter_rows(values_only=True):
+                        if headers is None:
+                            headers = [name if name is not None else f"column_{i + 1}" for i, name in enumerate(row)]
+                            continue
+                        if all(value is None for value in row):
+                            continue
+                        # Read-only sheets can return ragged rows
+                        row = tuple(row[:len(headers)]) + (None,) * (len(headers) - len(row))
+                        rows.append(row)
+                        if len(rows) >= chunk_rows:
+                            yield pd.DataFrame.from_records(rows, columns=headers)
+                            rows = []
+                    
+                    if rows:
+                        yield pd.DataFrame.from_records(rows, columns=headers)
+            finally:
+                workbook.close()
+        except Exception as e:
+            self.logger.error(f"Error streaming Excel {file_path}: {e}")
+            raise
+    
+    def iter_json_frames(self, file_path: str, chunk_rows: int = 50000) -> Iterator[pd.DataFrame]:
+        """Stream the records of a JSON array or JSON Lines file as DataFrame batches"""
+        try:
+            records = []
+            skipped = 0
+            for value in iter_json_values(file_path):
+                if not isinstance(value, dict):
+                    skipped += 1
+                    continue
+                records.append(value)
+                if len(records) >= chunk_rows:
+                    yield pd.DataFrame.from_records(records)
+                    records = []
+            if records:
+                yield pd.DataFrame.from_records(records)
+            if skipped:
+                self.logger.warning(f"Skipped {skipped} non-object values in {file_path}")
+        except Exception as e:
+            self.logger.error(f"Error streaming JSON {file_path}: {e}")
+            raise
+    
+    def iter_record_frames(self, file_path: str, chunk_rows: int = 50000,
+                           schema_sample_rows: int = 1000) -> Iterator[pd.DataFrame]:
+        """Stream a CSV, XLSX or JSON file as batches that share a schema inferred from the first rows"""
+        suffix = Path(file_path).suffix.lower()
+        if suffix == '.csv':
+            frames = self.iter_csv_frames(file_path, chunk_rows)
+        elif suffix == '.xlsx':
+            frames = self.iter_excel_frames(file_path, chunk_rows)
+        elif suffix in ('.json', '.jsonl', '.ndjson'):
+            frames = self.iter_json_frames(file_path, chunk_rows)
+        else:
+            raise ValueError(f"Streaming is not supported for {suffix} files")
+        
+        schema = None
+        for frame in frames:
+            if frame.empty:
+                continue
+            if schema is None:
+                schema = infer_schema(frame.head(schema_sample_rows))
+                self.logger.info(f"Inferred schema for {file_path}: {schema}")
+            yield apply_schema(frame, schema)
+    
     def ingest_excel(self, file_path: str) -> Optional[Dict[str, Any]]:
         """Extract data from Excel files"""
         try:
@@ -5,17 +5,69 @@ Coordinates the entire data processing pipeline from ingestion to storage.
 """
 
 import logging
+import os
 import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
+import numpy as np
+import pandas as pd
 import yaml
 import json
 
-from .ingestion import DataIngestion
-from .cleaning import DataCleaner
+from .ingestion import DataIngestion, STREAMING_SUFFIXES, prefetch
+from .cleaning import DataCleaner, frame_to_records
 from .enrichment import DataEnricher
 from .storage import DataStorage
 
+DEFAULT_CHUNK_ROWS = 50000
+DEFAULT_PREFETCH_BATCHES = 2
+DEFAULT_SCHEMA_SAMPLE_ROWS = 1000
+
+# Per-process cleaner/enricher for sharded batches
+_worker_cleaner: Optional[DataCleaner] = None
+_worker_enricher: Optional[DataEnricher] = None
+
+
+def _init_chunk_worker(config: Dict[str, Any]):
+    global _worker_cleaner, _worker_enricher
+    _worker_cleaner = DataCleaner(config)
+    _worker_enricher = DataEnricher(config)
+
+
+def _process_property_chunk(cleaner: DataCleaner, enricher: DataEnricher, frame: pd.DataFrame) -> pd.DataFrame:
+    """Clean and enrich one columnar batch"""
+    return enricher.enrich_property_frame(cleaner.clean_property_frame(frame))
+
+
+def _process_chunk_in_worker(frame: pd.DataFrame) -> pd.DataFrame:
+    return _process_property_chunk(_worker_cleaner, _worker_enricher, frame)
+
+
+class SeenKeys:
+    """Sorted 64-bit row hashes seen so far (8 bytes per unique row, unlike a Python set)"""
+    
+    def __init__(self):
+        self._keys = np.empty(0, dtype='uint64')
+    
+    def __len__(self) -> int:
+        return len(self._keys)
+    
+    def contains(self, keys: np.ndarray) -> np.ndarray:
+        positions = np.searchsorted(self._keys, keys)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == keys[found]
+        return found
+    
+    def add(self, keys: np.ndarray):
+        """Merge keys that are not already present"""
+        if len(keys):
+            # Two sorted runs: the stable sort merges them in linear time
+            self._keys = np.sort(np.concatenate([self._keys, np.sort(keys)]), kind='stable')
+
+
 class DataPipeline:
     """Main data processing pipeline orchestrator"""
     
@@ -63,6 +115,12 @@ class DataPipeline:
                     'min_bedrooms': 0,
                     'max_bedrooms': 10,
                     'required_fields': ['address', 'price_aed', 'property_type']
+                },
+                'processing': {
+                    'chunk_rows': DEFAULT_CHUNK_ROWS,
+                    'max_workers': os.cpu_count() or 1,
+                    'prefetch_batches': DEFAULT_PREFETCH_BATCHES,
+                    'schema_sample_rows': DEFAULT_SCHEMA_SAMPLE_ROWS
                 }
             }
     
@@ -78,7 +136,7 @@ class DataPipeline:
         )
     
     def process_property_data(self, input_path: str) -> Dict[str, Any]:
-        """Process property data from various sources"""
+        """Process property data from various sources in columnar batches"""
         start_time = time.time()
         processing_result = {
             'success': False,
@@ -94,60 +152,64 @@ class DataPipeline:
         try:
             self.logger.info(f"Starting property data processing for: {input_path}")
             
-            # 1. Data Ingestion
+            # 1. Data Ingestion (streamed in batches)
             self.logger.info("Step 1: Data Ingestion")
-            ingested_data = self._ingest_data(input_path)
-            if not ingested_data:
+            frames = self._iter_property_frames(input_path)
+            first_frame = next(frames, None)
+            if first_frame is None:
                 processing_result['errors'].append("Failed to ingest data")
                 return processing_result
             
-            processing_result['records_processed'] = len(ingested_data)
+            self.storage.connect_databases()
+            self.storage.create_tables_if_not_exist()
             
-            # 2. Data Cleaning
-            self.logger.info("Step 2: Data Cleaning")
-            cleaned_data = self.cleaner.clean_property_data(ingested_data)
-            if not cleaned_data:
-                processing_result['errors'].append("Failed to clean data")
-                return processing_result
+            # 2-4. Cleaning, enrichment and storage, one batch at a time
+            self.logger.info("Steps 2-4: Data Cleaning, Enrichment and Storage")
+            seen_keys = SeenKeys()
+            flag_counts = None
+            fully_valid = 0
+            unique_records = 0
+            storage_failed = False
             
-            # Remove duplicates
-            original_count = len(cleaned_data)
-            cleaned_data = self.cleaner.remove_duplicates(cleaned_data)
-            duplicates_removed = original_count - len(cleaned_data)
+            for batch_number, enriched in enumerate(self._map_property_frames(chain([first_frame], frames)), 1):
+                processing_result['records_processed'] += len(enriched)
+                
+                # Remove duplicates within the batch and against earlier batches
+                enriched = self._drop_seen_duplicates(enriched, seen_keys)
+                unique_records += len(enriched)
+                
+                flags = self.cleaner.validate_property_frame(enriched)
+                flag_counts = flags.sum() if flag_counts is None else flag_counts + flags.sum()
+                fully_valid += int(flags.all(axis=1).sum())
+                
+                records = frame_to_records(enriched)
+                pg_success = self.storage.store_properties_postgres(records)
+                chroma_success = self.storage.store_properties_chroma(records)
+                
+                if pg_success and chroma_success:
+                    processing_result['records_stored'] += len(records)
+                else:
+                    storage_failed = True
+                self.logger.info(f"Batch {batch_number}: {len(records)} records enriched")
             
+            duplicates_removed = processing_result['records_processed'] - unique_records
             if duplicates_removed > 0:
                 processing_result['warnings'].append(f"Removed {duplicates_removed} duplicate records")
             
-            # 3. Data Enrichment
-            self.logger.info("Step 3: Data Enrichment")
-            enriched_data = self.enricher.enrich_property_data(cleaned_data)
-            if not enriched_data:
-                processing_result['errors'].append("Failed to enrich data")
-                return processing_result
-            
-            # 4. Data Storage
-            self.logger.info("Step 4: Data Storage")
-            self.storage.connect_databases()
-            self.storage.create_tables_if_not_exist()
-            
-            pg_success = self.storage.store_properties_postgres(enriched_data)
-            chroma_success = self.storage.store_properties_chroma(enriched_data)
-            
-            if pg_success and chroma_success:
-                processing_result['records_stored'] = len(enriched_data)
+            if storage_failed:
+                processing_result['errors'].append("Failed to store data in databases")
+            else:
                 processing_result['success'] = True
                 self.logger.info("Property data processing completed successfully")
-            else:
-                processing_result['errors'].append("Failed to store data in databases")
             
             # 5. Generate quality metrics
-            validation_flags = [item.get('validation_flags', {}) for item in enriched_data]
-            quality_report = self.cleaner.generate_cleaning_report(
+            processing_result['quality_metrics'] = self.cleaner.build_quality_report(
                 processing_result['records_processed'],
                 processing_result['records_stored'],
-                validation_flags
+                {name: int(count) for name, count in flag_counts.items()},
+                fully_valid,
+                unique_records
             )
-            processing_result['quality_metrics'] = quality_report
             
             # 6. Log processing result
             processing_time = time.time() - start_time
@@ -186,6 +248,60 @@ class DataPipeline:
         
         return processing_result
     
+    def _processing_config(self) -> Dict[str, Any]:
+        processing = self.config.get('processing') or {}
+        return {
+            'chunk_rows': int(processing.get('chunk_rows', DEFAULT_CHUNK_ROWS)),
+            'max_workers': int(processing.get('max_workers') or os.cpu_count() or 1),
+            'prefetch_batches': int(processing.get('prefetch_batches', DEFAULT_PREFETCH_BATCHES)),
+            'schema_sample_rows': int(processing.get('schema_sample_rows', DEFAULT_SCHEMA_SAMPLE_ROWS))
+        }
+    
+    def _iter_property_frames(self, input_path: str) -> Iterator[pd.DataFrame]:
+        """Yield the input as DataFrame batches; CSV, XLSX and JSON files are streamed rather than loaded whole"""
+        processing = self._processing_config()
+        chunk_rows = processing['chunk_rows']
+        
+        if Path(input_path).suffix.lower() in STREAMING_SUFFIXES:
+            frames = self.ingestion.iter_record_frames(input_path, chunk_rows, processing['schema_sample_rows'])
+            # Parsing runs ahead of cleaning by at most prefetch_batches batches
+            yield from prefetch(frames, processing['prefetch_batches'])
+            return
+        
+        records = self._ingest_data(input_path)
+        for offset in range(0, len(records), chunk_rows):
+            yield pd.DataFrame(records[offset:offset + chunk_rows])
+    
+    def _map_property_frames(self, frames: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Clean and enrich batches in order, sharded across worker processes when there are several"""
+        max_workers = self._processing_config()['max_workers']
+        frames = iter(frames)
+        head = [frame for frame in (next(frames, None), next(frames, None)) if frame is not None]
+        
+        if max_workers <= 1 or len(head) < 2:
+            for frame in chain(head, frames):
+                yield _process_property_chunk(self.cleaner, self.enricher, frame)
+            return
+        
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_chunk_worker,
+                                 initargs=(self.config,)) as executor:
+            pending = deque()
+            for frame in chain(head, frames):
+                pending.append(executor.submit(_process_chunk_in_worker, frame))
+                # Bound the batches in flight so memory stays flat on large inputs
+                if len(pending) >= max_workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+    
+    def _drop_seen_duplicates(self, frame: pd.DataFrame, seen_keys: SeenKeys) -> pd.DataFrame:
+        """Keep the first occurrence of each duplicate key across all batches"""
+        keys = self.cleaner.duplicate_keys(frame)
+        hashes = keys.to_numpy(dtype='uint64')
+        fresh = ~keys.duplicated().to_numpy() & ~seen_keys.contains(hashes)
+        seen_keys.add(hashes[fresh])
+        return frame[fresh]
+    
     def process_web_data(self, urls: List[str], scraper_type: str) -> Dict[str, Any]:
         """Process data from web sources"""
         start_time = time.time()
@@ -0,0 +1,7 @@
+"""
+Reproducible load and latency benchmark harness
+
+Seeds synthetic Dubai data, replaces the LLM and embedding model with
+deterministic fakes and drives the chat, hybrid search, CMA comparables and
+dashboard endpoints at fixed concurrency. See run_benchmark.py for usage.
+"""
@@ -0,0 +1,82 @@
+"""
+Deterministic stand-ins for the LLM and the embedding model used by the benchmark
+"""
+
+import time
+import asyncio
+import hashlib
+import logging
+import math
+from types import SimpleNamespace
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 384
+
+
+def deterministic_embedding(text: str, dimensions: int = EMBEDDING_DIMENSIONS) -> List[float]:
+    """Feature-hashed bag of words, L2 normalised, so shared terms still score as similar"""
+    vector = [0.0] * dimensions
+    for token in text.lower().split():
+        digest = hashlib.sha1(token.encode()).digest()
+        index = int.from_bytes(digest[:4], "big") % dimensions
+        vector[index] += 1.0 if digest[4] & 1 else -1.0
+
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class DeterministicEmbeddingFunction:
+    """Chroma embedding function backed by deterministic_embedding"""
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return [deterministic_embedding(text) for text in input]
+
+
+class FakeGenerativeModel:
+    """Drop-in for google.generativeai.GenerativeModel with fixed latency and output"""
+
+    latency_s = 0.05
+
+    def __init__(self, model_name: str = "fake-model", **kwargs):
+        self.model_name = model_name
+
+    def _respond(self, prompt) -> SimpleNamespace:
+        prompt_text = prompt if isinstance(prompt, str) else str(prompt)
+        digest = hashlib.sha1(prompt_text.encode()).hexdigest()[:12]
+        text = (
+            f"Benchmark response {digest}. Based on the provided context, Dubai Marina "
+            f"and Downtown Dubai remain the most liquid communities for this profile."
+        )
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt_text) // 4,
+            candidates_token_count=len(text) // 4,
+            total_token_count=(len(prompt_text) + len(text)) // 4,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage, candidates=[])
+
+    def generate_content(self, prompt, generation_config=None, **kwargs):
+        time.sleep(self.latency_s)
+        return self._respond(prompt)
+
+    async def generate_content_async(self, prompt, generation_config=None, **kwargs):
+        await asyncio.sleep(self.latency_s)
+        return self._respond(prompt)
+
+
+def install_fakes(llm_latency_ms: float = 50.0):
+    """Patch the Gemini client and Chroma's default embedding function in-process"""
+    FakeGenerativeModel.latency_s = llm_latency_ms / 1000
+
+    import google.generativeai as genai
+    genai.GenerativeModel = FakeGenerativeModel
+    genai.configure = lambda *args, **kwargs: None
+
+    # Collections fetched without an explicit embedding function fall back to the
+    # ONNX MiniLM model; swapping its __call__ covers every get_collection() call
+    try:
+        from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+        ONNXMiniLM_L6_V2.__call__ = DeterministicEmbeddingFunction.__call__
+    except ImportError as e:
+        logger.warning(f"Could not patch Chroma default embedding function: {e}")
@@ -0,0 +1,64 @@
+"""
+Latency and throughput aggregation for benchmark runs
+"""
+
+import json
+import platform
+from datetime import datetime
+from typing import Dict, List, Any
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an already sorted sample"""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize_endpoint(latencies_ms: List[float], errors: int, wall_time_s: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles for one endpoint"""
+    ordered = sorted(latencies_ms)
+    requests = len(ordered) + errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "throughput_rps": round(len(ordered) / wall_time_s, 2) if wall_time_s > 0 else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+def build_report(config: Dict[str, Any], endpoints: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "generated_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "config": config,
+        "endpoints": endpoints,
+    }
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """Relative change per endpoint (negative latency delta is an improvement)"""
+    comparison = {}
+    for name, stats in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        comparison[name] = {
+            metric: round((stats[metric] - before[metric]) / before[metric] * 100, 1)
+            for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+            if before.get(metric)
+        }
+    return comparison
+
+
+def write_report(report: Dict[str, Any], path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
@@ -0,0 +1,220 @@
+"""
+Seeds the benchmark stand-ins from data_simulation/generate_company_data.py
+"""
+
+import os
+import sys
+import json
+import random
+import logging
+import importlib.util
+import tempfile
+from datetime import datetime
+from typing import Dict, Any
+
+import numpy as np
+from sqlalchemy import create_engine, inspect, text
+
+from .fakes import deterministic_embedding
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data_simulation'))
+from generate_company_data import DubaiRealEstateDataGenerator
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_AGENT_EMAIL = "benchmark.agent@propertypro.test"
+
+# Every collection the RAG service and hybrid search engine may route a query to
+COLLECTIONS = [
+    "real_estate_docs", "market_analysis", "investment_insights", "regulatory_framework",
+    "neighborhood_profiles", "developer_profiles", "agent_resources", "transaction_guidance",
+    "comprehensive_data",
+]
+
+LISTING_STATUS = {"active": "for_sale", "under_contract": "for_sale", "sold": "sold", "withdrawn": "rented"}
+# Lifecycle values the dashboard rollups count ('live' is an active listing)
+LISTING_LIFECYCLE = {"for_sale": "live", "sold": "sold", "rented": "rented"}
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'backend', 'app', 'alembic', 'versions')
+
+# Alembic revisions that extend tables from the base SQL schema, with the table and
+# column each one adds. The earlier revisions re-create base tables, so only these run.
+EXTENSION_REVISIONS = [
+    ("008_agent_daily_stats", "agent_daily_stats", "agent_id"),
+    ("009_conversation_counters", "conversations", "message_count"),
+]
+
+
+def apply_extension_revisions(conn):
+    """Run the upgrade() of each extension revision the database does not have yet"""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    for revision, table, column in EXTENSION_REVISIONS:
+        inspector = inspect(conn)
+        if inspector.has_table(table) and column in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        spec = importlib.util.spec_from_file_location(revision, os.path.join(MIGRATIONS_DIR, f"{revision}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        with Operations.context(MigrationContext.configure(conn)):
+            module.upgrade()
+        logger.info(f"Applied Alembic revision {revision}")
+
+
+def generate_dataset(seed: int, properties: int, clients: int) -> Dict[str, Any]:
+    """Generate the synthetic company data with a fixed seed, keeping CSV output out of the tree"""
+    random.seed(seed)
+    np.random.seed(seed)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as output_dir:
+        os.chdir(output_dir)
+        try:
+            generator = DubaiRealEstateDataGenerator()
+            return {
+                "listings": generator.generate_property_listings(properties),
+                "clients": generator.generate_client_data(clients),
+            }
+        finally:
+            os.chdir(cwd)
+
+
+def seed_postgres(database_url: str, dataset: Dict[str, Any], sessions: int) -> Dict[str, Any]:
+    """Load listings, leads, activities and chat sessions owned by a dedicated benchmark agent"""
+    engine = create_engine(database_url)
+    listings = dataset["listings"]
+    clients = dataset["clients"]
+
+    with engine.connect() as conn:
+        # Columns the CMA and dashboard queries rely on beyond the base schema
+        conn.execute(text("ALTER TABLE properties ADD COLUMN IF NOT EXISTS status VARCHAR(50) DEFAULT 'for_sale'"))
+        conn.execute(text("ALTER TABLE properties ADD COLUMN IF NOT EXISTS agent_id INTEGER"))
+        conn.execute(text("ALTER TABLE properties ADD COLUMN IF NOT EXISTS listing_status VARCHAR(20) NOT NULL DEFAULT 'draft'"))
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS agent_activities (
+                id SERIAL PRIMARY KEY,
+                agent_id INTEGER REFERENCES users(id),
+                activity_type VARCHAR(50) NOT NULL,
+                description TEXT,
+                property_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        # Rollup tables and triggers the dashboard reads; the triggers fill them as rows are inserted
+        apply_extension_revisions(conn)
+
+        agent_id = conn.execute(text("""
+            INSERT INTO users (email, password_hash, first_name, last_name, role, is_active)
+            VALUES (:email, 'benchmark', 'Benchmark', 'Agent', 'agent', TRUE)
+            ON CONFLICT (email) DO UPDATE SET role = 'agent', is_active = TRUE
+            RETURNING id
+        """), {"email": BENCHMARK_AGENT_EMAIL}).scalar()
+
+        # Only rows owned by the benchmark agent are ever replaced
+        conn.execute(text("""
+            DELETE FROM messages WHERE conversation_id IN (
+                SELECT id FROM conversations WHERE user_id = :agent_id
+            )
+        """), {"agent_id": agent_id})
+        for table, column in (("conversations", "user_id"), ("agent_activities", "agent_id"),
+                              ("leads", "agent_id"), ("properties", "agent_id")):
+            conn.execute(text(f"DELETE FROM {table} WHERE {column} = :agent_id"), {"agent_id": agent_id})
+
+        property_rows = [
+            {
+                "title": row.title,
+                "description": row.description,
+                "property_type": row.property_type,
+                "price": float(row.price_aed),
+                "location": row.location,
+                "area_sqft": float(row.area_sqft),
+                "bedrooms": int(row.bedrooms),
+                "bathrooms": int(row.bathrooms),
+                "status": LISTING_STATUS.get(row.listing_status, "for_sale"),
+                "listing_status": LISTING_LIFECYCLE[LISTING_STATUS.get(row.listing_status, "for_sale")],
+                "agent_id": agent_id,
+                "listed_at": datetime.strptime(row.listing_date, "%Y-%m-%d"),
+            }
+            for row in listings.itertuples()
+        ]
+        conn.execute(text("""
+            INSERT INTO properties (title, description, property_type, price, location, area_sqft,
+                                    bedrooms, bathrooms, status, listing_status, agent_id, created_by, created_at, updated_at)
+            VALUES (:title, :description, :property_type, :price, :location, :area_sqft,
+                    :bedrooms, :bathrooms, :status, :listing_status, :agent_id, :agent_id, :listed_at, :listed_at)
+        """), property_rows)
+
+        lead_rows = [
+            {
+                "agent_id": agent_id,
+                "name": f"{row.first_name} {row.last_name}",
+                "email": row.email,
+                "phone": row.phone,
+                "status": "converted" if row.status == "closed" else row.status,
+                "source": row.lead_source,
+                "preferred_areas": json.dumps([row.preferred_areas]),
+            }
+            for row in clients.itertuples()
+        ]
+        conn.execute(text("""
+            INSERT INTO leads (agent_id, name, email, phone, status, source, preferred_areas)
+            VALUES (:agent_id, :name, :email, :phone, :status, :source, CAST(:preferred_areas AS JSONB))
+        """), lead_rows)
+
+        conn.execute(text("""
+            INSERT INTO agent_activities (agent_id, activity_type, description, property_id, created_at)
+            SELECT :agent_id, 'listing_update', 'Updated ' || title, id, updated_at
+            FROM properties WHERE agent_id = :agent_id
+            ORDER BY id LIMIT 50
+        """), {"agent_id": agent_id})
+
+        session_ids = [f"bench-session-{i}" for i in range(sessions)]
+        conn.execute(text("""
+            INSERT INTO conversations (session_id, user_id, role, title, is_active)
+            VALUES (:session_id, :agent_id, 'agent', 'Benchmark session', TRUE)
+        """), [{"session_id": session_id, "agent_id": agent_id} for session_id in session_ids])
+
+        property_ids = [row[0] for row in conn.execute(text(
+            "SELECT id FROM properties WHERE agent_id = :agent_id ORDER BY id"
+        ), {"agent_id": agent_id})]
+
+        conn.execute(text("ANALYZE properties"))
+        conn.execute(text("ANALYZE agent_daily_stats"))
+        conn.commit()
+
+    engine.dispose()
+    logger.info(f"Seeded {len(property_rows)} properties, {len(lead_rows)} leads, {sessions} sessions")
+    return {"agent_id": agent_id, "property_ids": property_ids, "session_ids": session_ids}
+
+
+def seed_chroma(host: str, port: int, dataset: Dict[str, Any], documents_per_collection: int):
+    """Index listing descriptions into every routed collection with deterministic embeddings"""
+    import chromadb
+
+    client = chromadb.HttpClient(host=host, port=port)
+    listings = dataset["listings"].head(documents_per_collection)
+    documents = [
+        f"{row.title}. {row.description} Price AED {row.price_aed:,}, {row.area_sqft} sqft, "
+        f"developer {row.developer}."
+        for row in listings.itertuples()
+    ]
+    metadatas = [
+        {"location": row.location, "property_type": row.property_type, "price": int(row.price_aed)}
+        for row in listings.itertuples()
+    ]
+    embeddings = [deterministic_embedding(document) for document in documents]
+
+    for name in COLLECTIONS:
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass
+        collection = client.create_collection(name)
+        collection.add(
+            ids=[f"{name}-{i}" for i in range(len(documents))],
+            documents=documents,
+            metadatas=metadatas,
+            embeddings=embeddings,
+        )
+    logger.info(f"Seeded {len(documents)} documents into {len(COLLECTIONS)} Chroma collections")
@@ -0,0 +1,191 @@
+"""
+Unit tests for compiled, windowed alert rule evaluation
+"""
+import asyncio
+
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from monitoring.alert_manager import AlertManager, AlertSeverity, AlertType
+from monitoring.alert_rules import MetricWindow, compile_condition, parse_duration
+
+
+@pytest.fixture
+def manager():
+    fakeredis = pytest.importorskip("fakeredis")
+    manager = AlertManager(redis_client=fakeredis.FakeRedis(decode_responses=True), notifications_per_minute=2)
+    manager.sent = []
+
+    async def record(group, alerts, config, session=None):
+        manager.sent.append((group, [alert.id for alert in alerts]))
+
+    manager._send_email_notification = record
+    manager._send_slack_notification = record
+    manager._send_webhook_notification = record
+    for rule_name in list(manager.alert_rules):
+        manager.remove_alert_rule(rule_name)
+    return manager
+
+
+def evaluate(manager, metrics, now, samples=None):
+    return asyncio.run(manager.evaluate_alert_rules(metrics, now=now, samples=samples))
+
+
+def service_samples(**statuses):
+    return [("service_status", {"service_name": name}, status) for name, status in statuses.items()]
+
+
+class TestCompilation:
+    """Test that condition strings compile into predicates once."""
+
+    def test_conditions_compile(self):
+        assert compile_condition("cpu_usage > 80").test(81)
+        assert not compile_condition("cpu_usage > 80").test(None)
+        assert compile_condition("service_status == 'down'").test("down")
+        assert compile_condition("db_connection_failed").test(True)
+        windowed = compile_condition("avg_over(cpu_usage, 5m) >= 80")
+        assert (windowed.source.func, windowed.source.window) == ("avg_over", 300)
+        assert parse_duration("90s") == 90 and parse_duration("1h") == 3600
+
+    @pytest.mark.parametrize("condition", ["cpu_usage >", "p95(latency, 1m) > 2", "cpu_usage > 'high'",
+                                           "avg_over(cpu_usage, 0s) > 1"])
+    def test_invalid_conditions_rejected(self, condition, manager):
+        with pytest.raises(ValueError):
+            compile_condition(condition)
+        assert manager.add_alert_rule("bad", {"condition": condition, "severity": AlertSeverity.INFO,
+                                              "type": AlertType.CUSTOM}) is False
+
+    def test_rate_tolerates_counter_reset(self):
+        window = MetricWindow(retention=60)
+        for ts, value in [(0, 10), (10, 30), (20, 5), (30, 25)]:
+            window.add(ts, value)
+        assert window.aggregate("rate", 60, now=30) == pytest.approx((20 + 5 + 20) / 30)
+
+
+class TestEvaluation:
+    """Test windowed evaluation, durations, hysteresis and deduplication."""
+
+    def test_thousand_threshold_rules_share_one_source(self, manager):
+        for threshold in range(1000):
+            manager.add_alert_rule(f"cpu_{threshold}", {
+                "condition": f"cpu_usage > {threshold / 10}", "severity": AlertSeverity.WARNING,
+                "type": AlertType.PERFORMANCE, "message_template": "CPU {value}%"})
+
+        fired = evaluate(manager, {"cpu_usage": 50.05}, now=0)
+
+        assert len(fired) == 501
+        assert len(manager.rule_set._groups) == 1
+        # All 501 alerts share one group: one Slack message (the only WARNING channel), not 501
+        assert len(manager.sent) == 1 and len(manager.sent[0][1]) == 501
+        assert manager.redis_client.llen("alerts:recent") == 501
+
+    def test_for_duration_and_hysteresis(self, manager):
+        manager.add_alert_rule("high_cpu", {
+            "condition": "avg_over(cpu_usage, 60s) > 80", "for": "30s", "resolve_for": "60s",
+            "severity": AlertSeverity.WARNING, "type": AlertType.PERFORMANCE,
+            "message_template": "CPU usage is high: {value}% on {host}"})
+
+        assert evaluate(manager, {"cpu_usage": 95}, now=0) == []         # pending
+        assert evaluate(manager, {"cpu_usage": 20}, now=10) == []        # single spike averaged away
+        assert evaluate(manager, {"cpu_usage": 95}, now=20) == []
+        assert manager.get_evaluation_stats()['pending'] == 0
+
+        for now in range(100, 130, 10):
+            assert evaluate(manager, {"cpu_usage": 99}, now=now) == []
+        fired = evaluate(manager, {"cpu_usage": 99}, now=130)
+        assert len(fired) == 1
+        alert = manager.active_alerts[fired[0]]
+        assert alert.message == "CPU usage is high: 99.0% on n/a"
+
+        # Still firing: repeats are counted on the same alert instead of new alerts
+        assert evaluate(manager, {"cpu_usage": 99}, now=140) == []
+        assert alert.count == 2
+
+        # Drops below the threshold, but resolves only after resolve_for
+        for now in range(200, 260, 10):
+            evaluate(manager, {"cpu_usage": 10}, now=now)
+            assert not alert.resolved
+        evaluate(manager, {"cpu_usage": 10}, now=260)
+        assert alert.resolved and alert.resolved_by == "alert_rule"
+        assert manager.get_evaluation_stats()['auto_resolved'] == 1
+
+    def test_labels_fire_one_alert_per_service(self, manager):
+        manager.add_alert_rule("service_down", {
+            "condition": "service_status == 'down'", "labels": ["service_name"],
+            "severity": AlertSeverity.CRITICAL, "type": AlertType.SYSTEM,
+            "message_template": "Service is down: {service_name}"})
+
+        first = evaluate(manager, {}, now=0, samples=service_samples(chroma="down", redis="down", database="healthy"))
+        repeat = evaluate(manager, {}, now=1, samples=service_samples(chroma="down", redis="down", database="healthy"))
+
+        assert len(first) == 2 and repeat == []
+        assert sorted(a.message for a in manager.active_alerts.values()) == [
+            "Service is down: chroma", "Service is down: redis"]
+        assert all(a.count == 2 for a in manager.active_alerts.values())
+
+    def test_services_keep_independent_state(self, manager):
+        manager.add_alert_rule("service_down", {
+            "condition": "service_status == 'down'", "labels": ["service_name"], "resolve_for": "30s",
+            "severity": AlertSeverity.CRITICAL, "type": AlertType.SYSTEM,
+            "message_template": "Service is down: {service_name}"})
+
+        evaluate(manager, {}, now=0, samples=service_samples(chroma="down", redis="down"))
+        by_service = {a.metadata["labels"]["service_name"]: a for a in manager.active_alerts.values()}
+        # Redis recovers; chroma stays down and must not flap while redis resolves
+        for now in range(10, 70, 10):
+            assert evaluate(manager, {}, now=now, samples=service_samples(chroma="down", redis="healthy")) == []
+
+        assert by_service["redis"].resolved
+        assert not by_service["chroma"].resolved and by_service["chroma"].count == 7
+
+    def test_windows_are_kept_per_series(self, manager):
+        manager.add_alert_rule("slow_endpoint", {
+            "condition": "avg_over(latency, 1m) > 1", "labels": ["endpoint"],
+            "severity": AlertSeverity.WARNING, "type": AlertType.PERFORMANCE,
+            "message_template": "{endpoint} is slow: {value}s"})
+
+        def latencies(now, search, listings):
+            return evaluate(manager, {}, now=now, samples=[
+                ("latency", {"endpoint": "/search"}, search), ("latency", {"endpoint": "/listings"}, listings)])
+
+        fired = latencies(0, 3.0, 0.1)
+        assert len(fired) == 1
+        # /listings averages 0.8 in its own window, not the blended 1.4 across both endpoints
+        assert latencies(10, 1.0, 1.5) == []
+
+        fired = latencies(20, 2.0, 2.9)
+        assert len(fired) == 1
+        assert manager.active_alerts[fired[0]].message == "/listings is slow: 1.5s"
+        assert set(manager.rule_set.windows) == {
+            ("latency", (("endpoint", "/listings"),)), ("latency", (("endpoint", "/search"),))}
+
+
+class TestNotifications:
+    """Test deduplicated, grouped and rate-limited notification dispatch."""
+
+    def test_duplicate_alerts_deduplicated(self, manager):
+        first = asyncio.run(manager.create_alert(AlertType.SYSTEM, AlertSeverity.CRITICAL, "DB down", "x", "probe"))
+        second = asyncio.run(manager.create_alert(AlertType.SYSTEM, AlertSeverity.CRITICAL, "DB down", "y", "probe"))
+
+        assert first == second
+        assert manager.active_alerts[first].count == 2
+        assert manager.redis_client.llen("alerts:recent") == 1
+        assert len(manager.sent) == 3  # email, slack and webhook, once
+
+        asyncio.run(manager.resolve_alert(first, "ops"))
+        third = asyncio.run(manager.create_alert(AlertType.SYSTEM, AlertSeverity.CRITICAL, "DB down", "z", "probe"))
+        assert third != first
+
+    def test_notifications_rate_limited_per_channel(self, manager):
+        for i in range(4):
+            asyncio.run(manager.create_alert(AlertType.SECURITY, AlertSeverity.CRITICAL, f"Breach {i}", "x",
+                                             "probe", group=f"group-{i}"))
+
+        # Budget of two per channel per minute, three channels; throttled groups wait for a later flush
+        assert len(manager.sent) == 6
+        stats = manager.get_evaluation_stats()
+        assert stats['queued_notifications'] == 2
+        assert stats['notifications_throttled'] == 9  # group-2 throttled on two flushes, group-3 on one
@@ -0,0 +1,128 @@
+"""
+Unit tests for HTTP metrics collected by MetricsMiddleware
+"""
+import asyncio
+import tempfile
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+# The metrics registry is multiprocess-mode and needs its directory at import time
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp())
+from monitoring import application_metrics as metrics
+from monitoring.application_metrics import MetricsMiddleware
+
+
+def sample(metric, suffix, **labels):
+    for family in metric.collect():
+        for s in family.samples:
+            if s.name == family.name + suffix and all(s.labels.get(k) == str(v) for k, v in labels.items()):
+                return s.value
+    return 0
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/sessions/{session_id}")
+    async def get_session(session_id: str):
+        if session_id == "missing":
+            raise HTTPException(status_code=404, detail="Session not found")
+        return {"session_id": session_id}
+
+    @app.post("/properties/{property_id}/notes")
+    async def add_note(property_id: int, note: dict):
+        return {"ok": True}
+
+    app.add_middleware(MetricsMiddleware)
+    return TestClient(app)
+
+
+class TestMetricsMiddleware:
+    """Test route-template labels, real status codes and size histograms."""
+
+    def test_requests_labelled_by_route_template(self, client):
+        before = sample(metrics.http_requests_total, "_total", endpoint="/sessions/{session_id}", status=200)
+        for session_id in ("a1", "b2", "c3"):
+            assert client.get(f"/sessions/{session_id}").status_code == 200
+
+        assert sample(metrics.http_requests_total, "_total",
+                      endpoint="/sessions/{session_id}", status=200) == before + 3
+        assert sample(metrics.http_requests_total, "_total", endpoint="/sessions/a1") == 0
+
+    def test_real_status_codes_recorded(self, client):
+        before_404 = sample(metrics.http_requests_total, "_total", endpoint="/sessions/{session_id}", status=404)
+        before_unmatched = sample(metrics.http_requests_total, "_total", endpoint="<unmatched>", status=404)
+
+        assert client.get("/sessions/missing").status_code == 404
+        assert client.get("/no/such/route/123").status_code == 404
+
+        assert sample(metrics.http_requests_total, "_total",
+                      endpoint="/sessions/{session_id}", status=404) == before_404 + 1
+        assert sample(metrics.http_requests_total, "_total",
+                      endpoint="<unmatched>", status=404) == before_unmatched + 1
+
+    def test_request_and_response_sizes_observed(self, client):
+        endpoint = "/properties/{property_id}/notes"
+        response = client.post("/properties/7/notes", json={"text": "x" * 500})
+
+        assert response.status_code == 200
+        assert sample(metrics.http_request_size_bytes, "_sum", endpoint=endpoint) >= 500
+        assert sample(metrics.http_response_size_bytes, "_sum", endpoint=endpoint) == len(response.content)
+
+    def test_per_request_overhead_is_small(self):
+        """Recording metrics costs a bounded multiple of a bare pass-through middleware."""
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 204, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            pass
+
+        class PassThrough:
+            """Same wrapping and timing as MetricsMiddleware, without recording anything"""
+
+            def __init__(self, app):
+                self.app = app
+
+            async def __call__(self, scope, receive, send):
+                started = time.perf_counter()
+
+                async def send_wrapper(message):
+                    await send(message)
+
+                try:
+                    await self.app(scope, receive, send_wrapper)
+                finally:
+                    self.duration = time.perf_counter() - started
+
+        scope = {"type": "http", "method": "GET", "path": "/ping"}
+
+        def best_of(middleware, repeats=5, n=500):
+            async def run():
+                for _ in range(n):
+                    await middleware(dict(scope), receive, send)
+
+            asyncio.run(run())
+            timings = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                asyncio.run(run())
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+
+        baseline = best_of(PassThrough(app))
+        measured = best_of(MetricsMiddleware(app))
+
+        # Generous factor: catches per-request registry lookups or file opens, not scheduler noise
+        assert measured < baseline * 25
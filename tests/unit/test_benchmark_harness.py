@@ -0,0 +1,72 @@
+"""
+Unit tests for the benchmark harness fakes and report aggregation
+"""
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from tests.performance.benchmark.fakes import deterministic_embedding, FakeGenerativeModel
+from tests.performance.benchmark.report import percentile, summarize_endpoint, compare_reports
+
+
+class TestBenchmarkFakes:
+    """Test that the stand-in models are deterministic."""
+
+    def test_embedding_is_deterministic_and_normalised(self):
+        """Same text always maps to the same unit vector."""
+        first = deterministic_embedding("2 bedroom apartment dubai marina")
+        second = deterministic_embedding("2 bedroom apartment dubai marina")
+
+        assert first == second
+        assert sum(value * value for value in first) == pytest.approx(1.0)
+
+    def test_embedding_similarity_follows_shared_terms(self):
+        """Texts sharing terms score closer than unrelated texts."""
+        query = deterministic_embedding("villa palm jumeirah")
+        related = deterministic_embedding("luxury villa on palm jumeirah")
+        unrelated = deterministic_embedding("office lease difc")
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        assert dot(query, related) > dot(query, unrelated)
+
+    def test_fake_model_response(self):
+        """The fake LLM returns stable text and usage metadata."""
+        FakeGenerativeModel.latency_s = 0
+        model = FakeGenerativeModel("gemini-1.5-flash")
+
+        first = model.generate_content("What is the market like?")
+        second = model.generate_content("What is the market like?")
+
+        assert first.text == second.text
+        assert first.usage_metadata.prompt_token_count > 0
+
+
+class TestBenchmarkReport:
+    """Test percentile and throughput aggregation."""
+
+    def test_percentile_interpolates(self):
+        assert percentile([10.0, 20.0], 0.5) == 15.0
+        assert percentile([], 0.95) == 0.0
+
+    def test_summarize_endpoint(self):
+        """Errors count towards requests but not latency or throughput."""
+        summary = summarize_endpoint([float(ms) for ms in range(1, 101)], errors=5, wall_time_s=2.0)
+
+        assert summary["requests"] == 105
+        assert summary["throughput_rps"] == 50.0
+        assert summary["p50_ms"] == 50.5
+        assert summary["p99_ms"] <= summary["max_ms"] == 100.0
+
+    def test_compare_reports(self):
+        baseline = {"endpoints": {"chat": {"throughput_rps": 10.0, "p50_ms": 100.0, "p95_ms": 200.0, "p99_ms": 400.0}}}
+        current = {"endpoints": {"chat": {"throughput_rps": 20.0, "p50_ms": 50.0, "p95_ms": 200.0, "p99_ms": 300.0}}}
+
+        comparison = compare_reports(baseline, current)
+
+        assert comparison["chat"]["throughput_rps"] == 100.0
+        assert comparison["chat"]["p50_ms"] == -50.0
+        assert comparison["chat"]["p99_ms"] == -25.0
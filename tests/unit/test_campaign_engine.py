@@ -0,0 +1,144 @@
+"""
+Unit tests for marketing package generation and AI task completion waits
+"""
+import asyncio
+import json
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.domain.ai.task_orchestrator import AITaskOrchestrator, AITaskRequest, TaskStatus, TaskType
+from app.domain.marketing.campaign_engine import MarketingCampaignEngine, TemplateCache
+
+AI_DELAY = 0.3
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE marketing_templates (id INTEGER PRIMARY KEY, name TEXT, category TEXT,
+            type TEXT, description TEXT, content_template TEXT, design_config TEXT,
+            dubai_specific BOOLEAN DEFAULT 1, is_active BOOLEAN DEFAULT 1)"""))
+        conn.execute(text("""CREATE TABLE properties (id INTEGER PRIMARY KEY, title TEXT, description TEXT,
+            price NUMERIC, location TEXT, property_type TEXT, bedrooms INTEGER, bathrooms NUMERIC, area_sqft INTEGER)"""))
+        conn.execute(text("""CREATE TABLE brokerages (id INTEGER PRIMARY KEY, name TEXT, license_number TEXT, phone TEXT)"""))
+        conn.execute(text("""CREATE TABLE users (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT,
+            email TEXT, brokerage_id INTEGER)"""))
+        conn.execute(text("""CREATE TABLE marketing_campaigns (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT,
+            property_id INTEGER, template_id INTEGER, agent_id INTEGER, brokerage_id INTEGER, campaign_type TEXT,
+            status TEXT, content TEXT, created_at TIMESTAMP, updated_at TIMESTAMP)"""))
+        conn.execute(text("""CREATE TABLE ai_tasks (id TEXT PRIMARY KEY, user_id INTEGER, task_type TEXT,
+            input_data TEXT, status TEXT, priority INTEGER, progress INTEGER, output_data TEXT, error_message TEXT,
+            retries INTEGER, max_retries INTEGER, started_at TIMESTAMP, completed_at TIMESTAMP, created_at TIMESTAMP)"""))
+        for template_id, category in ((1, 'postcard'), (2, 'email'), (3, 'social')):
+            conn.execute(text("""INSERT INTO marketing_templates (id, name, category, type, content_template)
+                VALUES (:id, :name, :category, 'just_listed', :content)"""), {
+                'id': template_id, 'name': f'Just Listed {category}', 'category': category,
+                'content': json.dumps({'headline': 'Just Listed: {{property_title}}',
+                                       'body': '{{ai_generated_description}}'})})
+        conn.execute(text("INSERT INTO brokerages VALUES (1, 'Marina Realty', 'RERA-1', '+971 4 000 0000')"))
+        conn.execute(text("INSERT INTO users VALUES (7, 'Sara', 'Khan', 'sara@example.com', 1)"))
+        conn.execute(text("""INSERT INTO properties VALUES
+            (42, 'Marina Heights 2BR', 'Sea view', 2500000, 'Dubai Marina', 'apartment', 2, 2, 1400)"""))
+    return sessionmaker(bind=engine)
+
+
+def slow_orchestrator(session_factory, delay=AI_DELAY):
+    orchestrator = AITaskOrchestrator(session_factory)
+
+    async def generate(task_id, request):
+        await asyncio.sleep(delay)
+        return {'description': f"AI copy for {request.input_data['campaign_type']}"}
+
+    orchestrator.task_processors[TaskType.CONTENT_GENERATION] = generate
+    return orchestrator
+
+
+class TestTaskCompletion:
+    """Test waiting on orchestrator tasks."""
+
+    def test_wait_returns_when_task_completes(self, session_factory):
+        orchestrator = slow_orchestrator(session_factory, delay=0.05)
+
+        async def run():
+            task_id = await orchestrator.submit_task(AITaskRequest(
+                task_type=TaskType.CONTENT_GENERATION, user_id=7, input_data={'campaign_type': 'postcard'}))
+            started = time.perf_counter()
+            result = await orchestrator.wait_for_task(task_id, timeout=5)
+            return result, time.perf_counter() - started
+
+        result, elapsed = asyncio.run(run())
+        assert result.status == TaskStatus.COMPLETED
+        assert result.output_data == {'description': 'AI copy for postcard'}
+        assert elapsed < 1
+        assert orchestrator.task_completions == {}
+
+    def test_wait_times_out_with_current_status(self, session_factory):
+        orchestrator = slow_orchestrator(session_factory, delay=1)
+
+        async def run():
+            task_id = await orchestrator.submit_task(AITaskRequest(
+                task_type=TaskType.CONTENT_GENERATION, user_id=7, input_data={'campaign_type': 'postcard'}))
+            return await orchestrator.wait_for_task(task_id, timeout=0.05)
+
+        result = asyncio.run(run())
+        assert result.status == TaskStatus.PROCESSING
+        assert result.output_data is None
+        assert orchestrator.task_completions == {}
+
+    def test_cancelled_wait_releases_future(self, session_factory):
+        orchestrator = slow_orchestrator(session_factory, delay=1)
+
+        async def run():
+            task_id = await orchestrator.submit_task(AITaskRequest(
+                task_type=TaskType.CONTENT_GENERATION, user_id=7, input_data={'campaign_type': 'postcard'}))
+            waiter = asyncio.create_task(orchestrator.wait_for_task(task_id, timeout=5))
+            await asyncio.sleep(0.05)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+
+        asyncio.run(run())
+        assert orchestrator.task_completions == {}
+
+
+class TestMarketingPackage:
+    """Test full marketing package generation."""
+
+    def test_channels_generated_concurrently_with_ai_content(self, session_factory):
+        engine = MarketingCampaignEngine(session_factory, slow_orchestrator(session_factory), cache=TemplateCache())
+
+        started = time.perf_counter()
+        package = asyncio.run(engine.create_full_marketing_package(42, 7))
+        elapsed = time.perf_counter() - started
+
+        assert set(package['campaigns']) == {'postcard', 'email', 'social_instagram'}
+        assert elapsed < 3 * AI_DELAY
+
+        with session_factory() as db:
+            rows = db.execute(text("SELECT campaign_type, content FROM marketing_campaigns")).fetchall()
+        contents = {row.campaign_type: json.loads(row.content)['content'] for row in rows}
+        assert contents['email_blast'] == {'headline': 'Just Listed: Marina Heights 2BR',
+                                           'body': 'AI copy for email_blast'}
+
+    def test_templates_cached_by_id_across_engines(self, session_factory):
+        cache = TemplateCache()
+        first = asyncio.run(MarketingCampaignEngine(session_factory, cache=cache).load_template(2))
+        with session_factory() as db:
+            db.execute(text("UPDATE marketing_templates SET name = 'Renamed' WHERE id = 2"))
+            db.commit()
+
+        second = asyncio.run(MarketingCampaignEngine(session_factory, cache=cache).load_template(2))
+        assert second is first
+        assert cache.get_stats()['hits'] == 1
+
+        cache.invalidate(2)
+        assert asyncio.run(MarketingCampaignEngine(session_factory, cache=cache).load_template(2)).name == 'Renamed'
@@ -0,0 +1,114 @@
+"""
+Unit tests for keyset pagination of chat sessions and message history
+"""
+import asyncio
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.pagination import decode_cursor, encode_cursor
+from app.api.v1 import chat_sessions_router as router_module
+
+T0 = datetime(2024, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={
+        "check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES})
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE conversations (id INTEGER PRIMARY KEY, session_id TEXT, user_id INTEGER,
+            role TEXT, title TEXT, created_at TIMESTAMP, updated_at TIMESTAMP, is_active BOOLEAN,
+            message_count INTEGER DEFAULT 0, last_message_at TIMESTAMP)"""))
+        conn.execute(text("""CREATE TABLE messages (id INTEGER PRIMARY KEY, conversation_id INTEGER, role TEXT,
+            content TEXT, message_type TEXT, metadata TEXT, timestamp TIMESTAMP)"""))
+        conn.execute(text("CREATE TABLE conversation_preferences (session_id TEXT, user_preferences TEXT)"))
+        # Sessions 1-3 share an updated_at, so the id breaks the tie
+        for i in range(1, 8):
+            conn.execute(text("""INSERT INTO conversations VALUES (:id, :sid, :user_id, 'client', :title, :at,
+                :updated, 1, :count, :updated)"""), {
+                "id": i, "sid": f"s{i}", "user_id": 1 if i % 2 else 2, "title": f"Chat {i}", "at": T0,
+                "updated": T0 + timedelta(minutes=max(i, 3)), "count": i})
+        for i in range(1, 8):
+            conn.execute(text("""INSERT INTO messages (id, conversation_id, role, content, message_type, timestamp)
+                VALUES (:id, 1, 'user', :content, 'text', :at)"""),
+                {"id": i, "content": f"message {i}", "at": T0 + timedelta(seconds=min(i, 4))})
+
+    @contextmanager
+    def get_db_connection():
+        with engine.begin() as conn:
+            yield conn
+
+    monkeypatch.setattr(router_module, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(router_module, "get_ai_manager", lambda: None)
+    return engine
+
+
+def list_sessions(user, cursor=None, limit=2):
+    return asyncio.run(router_module.list_chat_sessions(current_user=user, cursor=cursor, limit=limit, days=None))
+
+
+def get_session(session_id, user, cursor=None, limit=3):
+    return asyncio.run(router_module.get_chat_session(session_id, current_user=user, cursor=cursor, limit=limit))
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(T0, 42)) == (T0, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+class TestSessionListing:
+    """Test keyset pages over (updated_at, id)."""
+
+    def test_admin_pages_through_all_sessions_in_activity_order(self, db):
+        admin = SimpleNamespace(id=99, role="admin")
+        seen, cursor = [], None
+        while True:
+            page = list_sessions(admin, cursor)
+            seen += [(row["session_id"], row["message_count"]) for row in page["sessions"]]
+            cursor = page["pagination"]["next_cursor"]
+            assert page["pagination"]["has_more"] == (cursor is not None)
+            if cursor is None:
+                break
+
+        assert seen == [(f"s{i}", i) for i in range(7, 0, -1)]
+
+    def test_agent_sees_only_own_sessions(self, db):
+        agent = SimpleNamespace(id=2, role="agent")
+
+        page = list_sessions(agent, limit=10)
+
+        assert [row["session_id"] for row in page["sessions"]] == ["s6", "s4", "s2"]
+        assert page["pagination"] == {"limit": 10, "next_cursor": None, "has_more": False}
+
+    def test_invalid_cursor_rejected(self, db):
+        with pytest.raises(HTTPException) as excinfo:
+            list_sessions(SimpleNamespace(id=1, role="agent"), cursor="garbage")
+        assert excinfo.value.status_code == 400
+
+
+class TestMessageHistory:
+    """Test newest-first pages of message history."""
+
+    def test_history_pages_back_from_latest_messages(self, db):
+        user = SimpleNamespace(id=1, role="agent")
+
+        latest = get_session("s1", user)
+        older = get_session("s1", user, cursor=latest.next_cursor)
+        oldest = get_session("s1", user, cursor=older.next_cursor)
+
+        assert [m.content for m in latest.messages] == ["message 5", "message 6", "message 7"]
+        assert [m.content for m in older.messages] == ["message 2", "message 3", "message 4"]
+        assert [m.content for m in oldest.messages] == ["message 1"]
+        assert latest.has_more and older.has_more and not oldest.has_more
@@ -0,0 +1,117 @@
+"""
+Unit tests for batched, multi-tier entity context fetching
+"""
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import StaticPool
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.domain.sessions import context_management_service as service_module
+from app.domain.sessions.context_management_service import ContextManagementService
+
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, email TEXT)"))
+        conn.execute(text("""CREATE TABLE properties (id INTEGER PRIMARY KEY, title TEXT, description TEXT, price NUMERIC,
+            location TEXT, property_type TEXT, bedrooms INTEGER, bathrooms INTEGER, area_sqft INTEGER,
+            listing_status TEXT, agent_id INTEGER, created_at TIMESTAMP)"""))
+        conn.execute(text("""CREATE TABLE clients (id INTEGER PRIMARY KEY, name TEXT, email TEXT, phone TEXT,
+            budget_min NUMERIC, budget_max NUMERIC, preferred_location TEXT, requirements TEXT)"""))
+        conn.execute(text("""CREATE TABLE client_interactions (id INTEGER PRIMARY KEY, client_id INTEGER,
+            interaction_type TEXT, notes TEXT, created_at TIMESTAMP)"""))
+        conn.execute(text("""CREATE TABLE context_cache (id INTEGER PRIMARY KEY AUTOINCREMENT, entity_type TEXT,
+            entity_id TEXT, context_data TEXT, last_fetched TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP, UNIQUE (entity_type, entity_id))"""))
+        conn.execute(text("INSERT INTO users VALUES (1, 'Sara', 'Khan', 'sara@x.ae')"))
+        for i, price in enumerate([1000000, 1100000, 950000, 5000000], start=1):
+            conn.execute(text("""INSERT INTO properties VALUES (:id, :title, 'desc', :price, 'Dubai Marina, Dubai',
+                'apartment', 2, 2, 1200, 'live', 1, '2024-01-01')"""), {"id": i, "title": f"Unit {i}", "price": price})
+        conn.execute(text("INSERT INTO clients (id, name, email) VALUES (7, 'Omar', 'omar@x.ae')"))
+        conn.execute(text("INSERT INTO client_interactions VALUES (1, 7, 'call', 'Wants 2BR', '2024-01-02')"))
+        # Expired rows left behind by earlier runs
+        for i in range(5):
+            conn.execute(text("""INSERT INTO context_cache (entity_type, entity_id, context_data, expires_at)
+                VALUES ('property', :id, '{}', :expires_at)"""),
+                {"id": f"old-{i}", "expires_at": datetime.now() - timedelta(hours=1)})
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    @contextmanager
+    def get_db_connection():
+        with engine.begin() as conn:
+            yield conn
+
+    monkeypatch.setattr(service_module, "get_db_connection", get_db_connection)
+    monkeypatch.setattr(service_module, "CONTEXT_EXPIRED_SWEEP_LIMIT", 2)
+    engine.statements = statements
+    return engine
+
+
+def fetch(service, entities):
+    return asyncio.run(service.fetch_entities_context(entities))
+
+
+class TestBatchFetch:
+    """Test that many entities resolve in one pass through the cache tiers."""
+
+    def test_batch_resolves_entities_and_writes_back_once(self, db):
+        service = ContextManagementService()
+
+        results = fetch(service, [('property', '1'), ('property', '2'), ('client', '7'),
+                                  ('property', '1'), ('property', '999')])
+
+        assert list(results) == ['property:1', 'property:2', 'client:7', 'property:999']
+        prop = results['property:1']
+        assert prop['property']['agent_name'] == 'Sara Khan'
+        assert 'created_at' not in prop['property']
+        assert [p['id'] for p in prop['similar_properties']] == [3, 2]
+        assert results['client:7']['history'][0]['notes'] == 'Wants 2BR'
+        assert results['property:999'] == {}
+
+        by_id = [s for s in db.statements if 'FROM properties p' in s and 'p.id IN' in s]
+        upserts = [s for s in db.statements if s.lstrip().startswith('INSERT INTO context_cache')]
+        assert len(by_id) == 1 and len(upserts) == 1
+        with db.connect() as conn:
+            cached = dict(conn.execute(text("SELECT entity_id, context_data FROM context_cache")).fetchall())
+        assert json.loads(cached['1'])['property']['title'] == 'Unit 1'
+        # One bounded sweep of expired rows rode along with the write
+        assert len([key for key in cached if key.startswith('old-')]) == 3
+
+    def test_repeat_lookups_served_from_local_then_shared_cache(self, db):
+        first = ContextManagementService()
+        fetch(first, [('property', '1')])
+        db.statements.clear()
+
+        assert fetch(first, [('property', '1')])['property:1']['property']['id'] == 1
+        assert db.statements == []
+        assert first.get_cache_stats()['local_hits'] == 1
+
+        # Another worker process has an empty local tier but shares context_cache
+        second = ContextManagementService()
+        assert fetch(second, [('property', '1')])['property:1']['property']['title'] == 'Unit 1'
+        assert len(db.statements) == 1
+        assert second.get_cache_stats()['db_hits'] == 1
+
+    def test_single_entity_api_and_clear_expired(self, db):
+        service = ContextManagementService()
+
+        assert asyncio.run(service.fetch_entity_context('client', '7'))['client']['name'] == 'Omar'
+        assert asyncio.run(service.fetch_entity_context('unknown', 'x')) == {}
+
+        # The write above already swept two; the rest go in bounded batches
+        assert asyncio.run(service.clear_expired_cache()) == 3
+        with db.connect() as conn:
+            remaining = conn.execute(text("SELECT COUNT(*) FROM context_cache WHERE entity_id LIKE 'old-%'")).scalar()
+        assert remaining == 0
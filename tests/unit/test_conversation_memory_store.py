@@ -0,0 +1,139 @@
+"""
+Unit tests for the tiered, token-bounded conversation memory store
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.rate_limiter import RedisStateBackend
+from app.domain.ai.conversation_memory_store import ConversationMemoryStore
+
+
+@dataclass
+class ConversationMemory:
+    """Same shape as ai_enhancements.ConversationMemory, whose module needs the Gemini SDK"""
+    session_id: str
+    conversation_id: int = None
+    messages: deque = field(default_factory=lambda: deque(maxlen=50))
+    context_window: deque = field(default_factory=lambda: deque(maxlen=20))
+    user_preferences: dict = field(default_factory=dict)
+    conversation_summary: str = ""
+    last_updated: datetime = field(default_factory=datetime.now)
+
+    def add_message(self, role, content):
+        message = {'role': role, 'content': content, 'type': 'text',
+                   'timestamp': datetime.now().isoformat(), 'metadata': {}}
+        self.messages.append(message)
+        self.context_window.append(message)
+
+    def get_recent_context(self, num_messages=10):
+        return list(self.context_window)[-num_messages:]
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_store(client=None, **kwargs):
+    backend = RedisStateBackend(redis_url="redis://127.0.0.1:1/0", socket_timeout=0.05)
+    if client is not None:
+        backend._client = client
+    else:
+        backend.mark_down(ConnectionError("no redis in this test"))
+    return ConversationMemoryStore(memory_class=ConversationMemory, backend=backend, **kwargs)
+
+
+def memory_with_turns(session_id, count, length=40):
+    memory = ConversationMemory(session_id=session_id)
+    for i in range(count):
+        memory.add_message('user' if i % 2 == 0 else 'assistant', f"turn {i} " + "x" * length)
+    return memory
+
+
+class TestLocalTier:
+    """Test the bounded per-process LRU."""
+
+    def test_least_recently_used_session_evicted(self):
+        store = make_store(max_local_sessions=2)
+        for session_id in ("a", "b"):
+            store.put(session_id, memory_with_turns(session_id, 2))
+        store.get("a")
+        store.put("c", memory_with_turns("c", 2))
+
+        assert "b" not in store
+        assert store.get("a").session_id == "a"
+        assert len(store) == 2
+        stats = store.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3, abs=1e-3)
+
+    def test_idle_sessions_expire(self):
+        store = make_store(idle_ttl=0)
+        store.put("a", memory_with_turns("a", 2))
+
+        assert store.get("a") is None
+        assert store.get_stats()["local_sessions"] == 0
+
+
+class TestTokenBudget:
+    """Test folding of old turns into the summary."""
+
+    def test_oldest_turns_folded_into_summary(self):
+        store = make_store(token_budget=100)
+        memory = memory_with_turns("a", 10, length=80)
+
+        store.put("a", memory)
+
+        remaining = [turn['content'] for turn in memory.messages]
+        assert remaining[-1].startswith("turn 9")
+        assert len(remaining) < 10
+        assert memory.conversation_summary.startswith("user: turn 0")
+        assert list(memory.context_window) == list(memory.messages)
+        assert store.get_stats()["summarized_turns"] == 10 - len(remaining)
+
+    def test_latest_turns_kept_even_when_over_budget(self):
+        store = make_store(token_budget=10)
+        memory = memory_with_turns("a", 4, length=400)
+
+        store.put("a", memory)
+
+        assert [turn['content'][:6] for turn in memory.messages] == ["turn 2", "turn 3"]
+
+
+class TestRedisTier:
+    """Test sharing memories between workers through Redis."""
+
+    def test_other_worker_loads_memory_from_redis(self, redis_client):
+        writer, reader = make_store(redis_client), make_store(redis_client)
+        writer.put("a", memory_with_turns("a", 3))
+
+        memory = reader.get("a")
+
+        assert [turn['content'][:6] for turn in memory.messages] == ["turn 0", "turn 1", "turn 2"]
+        assert memory.get_recent_context(2)[-1]['content'].startswith("turn 2")
+        assert reader.get_stats()["redis_hits"] == 1
+        assert redis_client.ttl("conversation_memory:a") > 0
+
+    def test_stale_local_copy_refreshed_after_update_elsewhere(self, redis_client):
+        first, second = make_store(redis_client), make_store(redis_client)
+        first.put("a", memory_with_turns("a", 2))
+        assert second.get("a") is not None
+        assert second.get("a") is not None
+
+        updated = first.get("a")
+        updated.add_message('user', "move to JBR instead")
+        first.put("a", updated)
+
+        assert second.get("a").messages[-1]['content'] == "move to JBR instead"
+        assert second.get_stats()["local_hits"] == 1
+
+        del first["a"]
+        assert second.get("a") is None
@@ -0,0 +1,164 @@
+"""
+Unit tests for concurrent, batched and resumable daily briefing runs
+"""
+import asyncio
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.infrastructure.queue import scheduler as scheduler_module
+from app.infrastructure.queue.scheduler import DailyBriefingScheduler
+
+RUN_DATE = date(2024, 5, 1)
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE users (id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT,
+            email TEXT, role TEXT, is_active BOOLEAN)"""))
+        conn.execute(text("""CREATE TABLE conversations (id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT,
+            role TEXT, title TEXT, is_active BOOLEAN DEFAULT 1)"""))
+        conn.execute(text("""CREATE TABLE messages (id INTEGER PRIMARY KEY AUTOINCREMENT, conversation_id INTEGER,
+            role TEXT, content TEXT, message_type TEXT, metadata TEXT)"""))
+        conn.execute(text("""CREATE TABLE daily_briefing_runs (run_date DATE, agent_id INTEGER, status TEXT,
+            message_id INTEGER, duration_ms INTEGER, error TEXT, completed_at TIMESTAMP,
+            PRIMARY KEY (run_date, agent_id))"""))
+        for agent_id in range(1, 8):
+            conn.execute(text("INSERT INTO users VALUES (:id, 'Agent', :last, 'a@x.ae', 'agent', 1)"),
+                         {"id": agent_id, "last": str(agent_id)})
+        conn.execute(text("INSERT INTO users VALUES (99, 'Admin', 'User', 'b@x.ae', 'admin', 1)"))
+        # Agent 1 already has a primary conversation
+        conn.execute(text("INSERT INTO conversations (session_id, role, title) VALUES ('agent_1_primary', 'agent', 'x')"))
+    return engine
+
+
+class FakeAIManager:
+    """AI manager stub recording data loads, market context calls and concurrency"""
+
+    def __init__(self, delay=0.05, failing=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.input_batches = []
+        self.market_calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_briefing_market_context(self):
+        self.market_calls += 1
+        return {'period': '2024-04-01', 'hotspots': []}
+
+    def get_daily_briefing_inputs(self, agent_ids):
+        self.input_batches.append(list(agent_ids))
+        return {agent_id: {'stale_leads': [], 'recent_viewings': [], 'todays_meetings': []} for agent_id in agent_ids}
+
+    def generate_daily_briefing_for_agent(self, agent_id, briefing_inputs=None, market_context=None):
+        assert briefing_inputs is not None and market_context['period'] == '2024-04-01'
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        if agent_id in self.failing:
+            raise RuntimeError("model unavailable")
+        return f"Briefing for agent {agent_id}"
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'BRIEFING_BATCH_SIZE', 3)
+    monkeypatch.setattr(scheduler_module, 'BRIEFING_LLM_CONCURRENCY', 2)
+
+
+def briefings(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("""SELECT c.session_id, m.content FROM messages m
+            JOIN conversations c ON c.id = m.conversation_id ORDER BY c.session_id""")).fetchall()
+
+
+class TestBriefingRun:
+    """Test batched, bounded-concurrency briefing generation."""
+
+    def test_briefings_batched_with_bounded_concurrency(self, db_engine):
+        ai_manager = FakeAIManager()
+        scheduler = DailyBriefingScheduler(ai_manager=ai_manager, db_engine=db_engine)
+
+        summary = asyncio.run(scheduler.send_daily_briefings(RUN_DATE))
+
+        assert summary['generated'] == 7 and summary['failed'] == 0
+        assert ai_manager.market_calls == 1
+        assert ai_manager.input_batches == [[1, 2, 3], [4, 5, 6], [7]]
+        assert ai_manager.peak == 2
+        saved = briefings(db_engine)
+        assert [row[1] for row in saved] == [f"Briefing for agent {i}" for i in range(1, 8)]
+        with db_engine.connect() as conn:
+            conversations = conn.execute(text("SELECT COUNT(*) FROM conversations")).scalar()
+            durations = conn.execute(text("SELECT duration_ms FROM daily_briefing_runs")).fetchall()
+        assert conversations == 7
+        assert len(durations) == 7 and all(row[0] >= 40 for row in durations)
+
+    def test_rerun_only_briefs_missing_and_failed_agents(self, db_engine):
+        first = DailyBriefingScheduler(ai_manager=FakeAIManager(delay=0, failing={3, 6}), db_engine=db_engine)
+        summary = asyncio.run(first.send_daily_briefings(RUN_DATE))
+        assert (summary['generated'], summary['failed']) == (5, 2)
+
+        ai_manager = FakeAIManager(delay=0)
+        resumed = DailyBriefingScheduler(ai_manager=ai_manager, db_engine=db_engine)
+        summary = asyncio.run(resumed.send_daily_briefings(RUN_DATE))
+
+        assert summary['already_briefed'] == 5 and summary['generated'] == 2
+        assert ai_manager.input_batches == [[3, 6]]
+        assert len(briefings(db_engine)) == 7
+        with db_engine.connect() as conn:
+            statuses = conn.execute(text("SELECT DISTINCT status FROM daily_briefing_runs")).fetchall()
+        assert statuses == [('completed',)]
+
+
+class TestBriefingFailures:
+    """Test that model and query errors are recorded as failed runs, not empty briefings."""
+
+    @staticmethod
+    def real_manager(db_engine, model):
+        from app.domain.ai.ai_manager import AIEnhancementManager
+
+        manager = AIEnhancementManager.__new__(AIEnhancementManager)
+        manager.engine = db_engine
+        manager.model = model
+        return manager
+
+    def test_model_errors_reach_the_run(self, db_engine):
+        from app.infrastructure.integrations.llm_client import LLMBudgetExceeded
+
+        class ExhaustedModel:
+            def generate_content(self, prompt):
+                raise LLMBudgetExceeded("system:daily_briefing", 30.0)
+
+        manager = self.real_manager(db_engine, ExhaustedModel())
+        inputs = {'stale_leads': [], 'recent_viewings': [], 'todays_meetings': []}
+        with pytest.raises(LLMBudgetExceeded):
+            manager.generate_daily_briefing_for_agent(1, inputs, {'period': '2024-04-01', 'hotspots': []})
+
+    def test_query_errors_fail_the_batch(self, db_engine):
+        # No leads, viewings or appointments tables: inputs must not come back as an empty day
+        manager = self.real_manager(db_engine, model=None)
+        manager.get_briefing_market_context = lambda: {'period': '2024-04-01', 'hotspots': []}
+        scheduler = DailyBriefingScheduler(ai_manager=manager, db_engine=db_engine)
+
+        summary = asyncio.run(scheduler.send_daily_briefings(RUN_DATE))
+
+        assert (summary['generated'], summary['failed']) == (0, 7)
+        assert briefings(db_engine) == []
+        with db_engine.connect() as conn:
+            statuses = conn.execute(text("SELECT DISTINCT status FROM daily_briefing_runs")).fetchall()
+        assert statuses == [('failed',)]
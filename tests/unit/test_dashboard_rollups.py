@@ -0,0 +1,185 @@
+"""
+Unit tests for the agent dashboard rollups and the per-agent dashboard cache
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.rate_limiter import RedisStateBackend
+from app.infrastructure.cache.dashboard_cache import DashboardCache
+from app.infrastructure.db import agent_rollups
+from app.api.v1 import property_management
+
+
+@pytest.fixture
+def redis_cache():
+    fakeredis = pytest.importorskip("fakeredis")
+    backend = RedisStateBackend()
+    backend._client = fakeredis.FakeRedis(decode_responses=True)
+    return DashboardCache(backend=backend, ttl_seconds=60)
+
+
+@pytest.fixture
+def offline_cache():
+    backend = RedisStateBackend(redis_url="redis://127.0.0.1:1/0", socket_timeout=0.05)
+    return DashboardCache(backend=backend, ttl_seconds=60, max_local_entries=3)
+
+
+class TestAgentRollups:
+    """Test dashboard metrics computed from daily rollup rows."""
+
+    def test_period_totals_sum_days_since_cutoff(self):
+        engine = create_engine("sqlite://")
+        columns = ", ".join(f"{column} NUMERIC DEFAULT 0" for column in agent_rollups.ROLLUP_COLUMNS)
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE TABLE agent_daily_stats (agent_id INTEGER, day DATE, {columns})"))
+            for day, listings, sold, price_sum, leads, converted in [
+                ("2026-09-01", 5, 0, 5_000_000, 10, 0),      # before the cutoff
+                ("2026-10-01", 2, 1, 3_000_000, 4, 1),
+                ("2026-10-10", 3, 1, 6_000_000, 6, 2),
+            ]:
+                conn.execute(text(
+                    "INSERT INTO agent_daily_stats (agent_id, day, listings_total, listings_sold, price_sum, "
+                    "price_count, revenue, sold_days_sum, leads_total, leads_converted) "
+                    "VALUES (7, :day, :listings, :sold, :price_sum, :listings, :revenue, :days, :leads, :converted)"
+                ), {"day": day, "listings": listings, "sold": sold, "price_sum": price_sum,
+                    "revenue": 1_500_000 * sold, "days": 30 * sold, "leads": leads, "converted": converted})
+            conn.execute(text("INSERT INTO agent_daily_stats (agent_id, day, listings_total) VALUES (8, '2026-10-05', 99)"))
+
+            totals = agent_rollups.period_totals(conn, 7, date(2026, 9, 15))
+
+        summary = agent_rollups.listing_summary(totals)
+        assert summary["total_listings"] == 5
+        assert summary["sold_listings"] == 2
+        assert summary["avg_price"] == pytest.approx(1_800_000)
+        assert summary["total_revenue"] == pytest.approx(3_000_000)
+        assert summary["avg_days_on_market"] == pytest.approx(30)
+        assert totals["leads_total"] == 10 and totals["leads_converted"] == 3
+
+    def test_empty_period_has_zero_averages(self):
+        summary = agent_rollups.listing_summary({column: 0.0 for column in agent_rollups.ROLLUP_COLUMNS})
+        assert summary["avg_price"] == 0
+        assert summary["avg_days_on_market"] == 0
+
+
+class ConflictingEngine:
+    """Engine stub whose first `conflicts` transactions fail with the given SQLSTATE"""
+
+    def __init__(self, conflicts: int, pgcode: str = "40001"):
+        self.conflicts = conflicts
+        self.pgcode = pgcode
+        self.options = {}
+        self.statements = []
+        self.committed = 0
+
+    def execution_options(self, **options):
+        self.options.update(options)
+        return self
+
+    @contextmanager
+    def begin(self):
+        yield self
+        self.committed += 1
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        if self.conflicts:
+            self.conflicts -= 1
+            raise DBAPIError(str(statement), params, SimpleNamespace(pgcode=self.pgcode))
+        return SimpleNamespace(rowcount=4)
+
+
+class TestReconcile:
+    """Test that reconciliation upserts from a snapshot instead of locking the base tables."""
+
+    def test_retries_after_concurrent_delta(self):
+        engine = ConflictingEngine(conflicts=1)
+
+        assert agent_rollups.reconcile(lambda: engine) == 4
+        assert engine.options == {"isolation_level": "REPEATABLE READ"}
+        assert engine.committed == 1
+        assert not any("LOCK" in statement for statement in engine.statements)
+        assert "ON CONFLICT (agent_id, day) DO UPDATE" in engine.statements[-2]
+
+    def test_other_errors_and_exhausted_retries_propagate(self):
+        with pytest.raises(DBAPIError):
+            agent_rollups.reconcile(lambda: ConflictingEngine(conflicts=1, pgcode="23505"))
+        with pytest.raises(DBAPIError):
+            agent_rollups.reconcile(lambda: ConflictingEngine(conflicts=3), attempts=3)
+
+
+class TestListingWritesInvalidate:
+    """Test that listing writes drop the owning agent's cached dashboards."""
+
+    @pytest.fixture
+    def listings(self, monkeypatch):
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE properties (id INTEGER PRIMARY KEY, title TEXT, description TEXT, price NUMERIC, "
+                "location TEXT, property_type TEXT, bedrooms INTEGER, bathrooms INTEGER, area_sqft NUMERIC, "
+                "agent_id INTEGER)"
+            ))
+            conn.execute(text(
+                "CREATE TABLE listing_history (id INTEGER PRIMARY KEY, property_id INTEGER, event_type TEXT, "
+                "old_value TEXT, new_value TEXT, changed_by_agent_id INTEGER)"
+            ))
+            conn.execute(text("ALTER TABLE properties ADD COLUMN listing_status TEXT DEFAULT 'live'"))
+            conn.execute(text(
+                "INSERT INTO properties (id, title, price, location, agent_id) "
+                "VALUES (1, 'Marina flat', 1500000, 'Dubai Marina', 7), (2, 'JBR flat', 900000, 'JBR', 8)"
+            ))
+        invalidated = []
+        monkeypatch.setattr(property_management, "engine", engine)
+        monkeypatch.setattr(property_management, "invalidate_agent_dashboard", invalidated.append)
+        return invalidated
+
+    def test_status_change_and_delete(self, listings):
+        owner = SimpleNamespace(id=7, role="agent")
+        asyncio.run(property_management.update_property_status(1, "sold", db=None, current_user=owner))
+        asyncio.run(property_management.delete_property(2))
+
+        assert listings == [7, 8]
+
+
+class TestDashboardCache:
+    """Test per-agent caching and invalidation."""
+
+    def test_hit_and_agent_invalidation(self, redis_cache):
+        redis_cache.set(7, "overview", "30days", {"total": 1})
+        redis_cache.set(7, "performance", "30days", {"total": 2})
+        redis_cache.set(8, "overview", "30days", {"total": 3})
+
+        assert redis_cache.get(7, "overview", "30days") == {"total": 1}
+
+        redis_cache.invalidate_agent(7)
+        assert redis_cache.get(7, "overview", "30days") is None
+        assert redis_cache.get(7, "performance", "30days") is None
+        assert redis_cache.get(8, "overview", "30days") == {"total": 3}
+
+    def test_entries_expire_individually(self, redis_cache, monkeypatch):
+        redis_cache.set(7, "overview", "7days", {"total": 1})
+        later = time.time() + 61
+        monkeypatch.setattr("app.infrastructure.cache.dashboard_cache.time.time", lambda: later)
+        assert redis_cache.get(7, "overview", "7days") is None
+
+    def test_local_fallback_is_bounded(self, offline_cache):
+        for agent_id in range(5):
+            offline_cache.set(agent_id, "overview", "30days", {"agent": agent_id})
+
+        assert offline_cache.get(4, "overview", "30days") == {"agent": 4}
+        assert offline_cache.get(0, "overview", "30days") is None
+        assert offline_cache.get_stats()["local_entries"] == 3
+
+        offline_cache.invalidate_agent(4)
+        assert offline_cache.get(4, "overview", "30days") is None
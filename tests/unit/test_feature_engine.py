@@ -0,0 +1,94 @@
+"""
+Unit tests for the vectorized feature engine
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from ml.pipeline.feature_engine import (
+    add_lag_features, trend_training_matrix, trend_forecast_matrix, numeric_matrix, ensemble_predict
+)
+
+
+@pytest.fixture
+def monthly_series():
+    index = pd.date_range("2020-01-01", periods=30, freq="MS")
+    return pd.Series(np.linspace(1_000_000, 1_300_000, 30), index=index)
+
+
+class TestTrendMatrices:
+    """Test the trend model features against the per-row definition."""
+
+    def test_training_rows(self, monthly_series):
+        X, y = trend_training_matrix(monthly_series)
+
+        assert X.shape == (24, 7)
+        # Row for period 6: lag_12 falls back to lag_6 until a year of history exists
+        assert X[0].tolist()[:5] == [monthly_series.iloc[i] for i in (5, 4, 3, 0, 0)]
+        # Row for period 20 uses the true year-ago value
+        assert X[14][4] == monthly_series.iloc[8]
+        assert y[0] == monthly_series.iloc[6]
+
+    def test_short_series(self, monthly_series):
+        X, y = trend_training_matrix(monthly_series.head(6))
+        assert X.shape == (0, 7) and len(y) == 0
+
+    def test_forecast_rolls_over_year(self, monthly_series):
+        future = trend_forecast_matrix(monthly_series, 12)
+
+        assert future.shape == (12, 7)
+        assert future[0][:5].tolist() == [monthly_series.iloc[i] for i in (-1, -2, -3, -6, -12)]
+        assert future[:, 5].tolist() == [7, 8, 9, 10, 11, 12, 1, 2, 3, 4, 5, 6]
+        assert future[5][6] == 2022 and future[6][6] == 2023
+
+
+class TestFrameFeatures:
+    """Test grouped lag features and numeric matrices."""
+
+    def test_lags_stay_within_group(self):
+        data = pd.DataFrame({
+            "location": ["Marina", "JVC", "Marina", "JVC"],
+            "date": pd.to_datetime(["2024-02-01", "2024-01-01", "2024-01-01", "2024-02-01"]),
+            "price": [110.0, 50.0, 100.0, 55.0],
+        })
+
+        result = add_lag_features(data, "price", "date", ["location"], lags=(1,), rolling_windows=(2,))
+
+        assert result.index.tolist() == data.index.tolist()
+        assert result["price_lag_1"].tolist()[0] == 100.0
+        assert result["price_lag_1"].tolist()[3] == 50.0
+        assert np.isnan(result["price_lag_1"].tolist()[1])
+        assert result["price_pct_change"].tolist()[0] == pytest.approx(0.1)
+
+    def test_numeric_matrix_drops_invalid_rows(self):
+        data = pd.DataFrame({
+            "bedrooms": [1, 2, "studio", 3],
+            "square_feet": [700.0, np.nan, 500.0, 1500.0],
+            "price": [1.0, 2.0, 3.0, None],
+        })
+
+        X, y = numeric_matrix(data, ["bedrooms", "square_feet", "age"], target_column="price")
+
+        assert X.tolist() == [[1.0, 700.0, 0.0]]
+        assert y.tolist() == [1.0]
+
+
+class TestEnsemblePredict:
+    """Test batched forest spread against per-tree predictions."""
+
+    def test_matches_per_tree_predictions(self):
+        ensemble = pytest.importorskip("sklearn.ensemble")
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 10, (200, 3))
+        y = X[:, 0] * 3 + rng.normal(0, 1, 200)
+        forest = ensemble.RandomForestRegressor(n_estimators=20, random_state=0).fit(X, y)
+
+        mean, spread = ensemble_predict(forest, X[:5])
+        per_tree = np.array([tree.predict(X[:5]) for tree in forest.estimators_])
+
+        assert np.allclose(mean, forest.predict(X[:5]))
+        assert np.allclose(spread, per_tree.std(axis=0))
@@ -0,0 +1,112 @@
+"""
+Unit tests for concurrent, cached health checks
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from monitoring import health_checks
+from monitoring.health_checks import HealthCheck, HealthChecker, HealthStatus, SystemHealth
+
+
+def healthy(name):
+    return HealthCheck(name=name, status=HealthStatus.HEALTHY, response_time=0.0, details={},
+                       timestamp=datetime.now())
+
+
+@pytest.fixture
+def checker():
+    checker = HealthChecker({"health_check_timeout": 0.3, "health_cache_ttl": 60})
+    checker.calls = 0
+
+    async def fast_service(name):
+        checker.calls += 1
+        await asyncio.sleep(0.1)
+        return healthy(name)
+
+    checker._check_redis_health = lambda: fast_service("redis")
+    checker._check_database_health = lambda: fast_service("database")
+    checker._check_chromadb_health = lambda: fast_service("chromadb")
+    return checker
+
+
+class TestConcurrentChecks:
+    """Test concurrent probes with per-probe deadlines."""
+
+    def test_probes_run_concurrently(self, checker):
+        started = time.perf_counter()
+        health = asyncio.run(checker.check_system_health())
+        elapsed = time.perf_counter() - started
+
+        assert elapsed < 0.25
+        assert [check.name for check in health.checks][:5] == [
+            "system_resources", "disk_space", "memory_usage", "cpu_usage", "redis"]
+        assert len(health.checks) == 10
+
+    def test_cpu_sampled_once_per_round(self, checker, monkeypatch):
+        """Both CPU checks report the round's sample; a second immediate call would read about 0%."""
+        readings = iter([97.0])
+        monkeypatch.setattr(health_checks.psutil, "cpu_percent", lambda interval=None: next(readings, 0.0))
+
+        health = asyncio.run(checker.check_system_health())
+        checks = {check.name: check for check in health.checks}
+
+        assert checks["system_resources"].details["cpu_percent"] == 97.0
+        assert checks["cpu_usage"].details["cpu_percent"] == 97.0
+        assert checks["cpu_usage"].status != HealthStatus.HEALTHY
+
+    def test_slow_probe_times_out_without_stalling_others(self, checker):
+        async def hung_database():
+            await asyncio.sleep(5)
+
+        checker._check_database_health = hung_database
+        checker.check_timeouts = {"chromadb": 1.0}
+
+        started = time.perf_counter()
+        health = asyncio.run(checker.check_system_health())
+        elapsed = time.perf_counter() - started
+
+        checks = {check.name: check for check in health.checks}
+        assert elapsed < 1
+        assert checks["database"].status == HealthStatus.UNHEALTHY
+        assert checks["database"].error_message == "Timed out after 0.3s"
+        assert checks["redis"].status == HealthStatus.HEALTHY
+        assert health.overall_status == HealthStatus.UNHEALTHY
+
+
+class TestCachingAndHistory:
+    """Test the result cache and the history ring buffer."""
+
+    def test_results_cached_within_ttl(self, checker):
+        async def run():
+            first, second = await asyncio.gather(checker.check_system_health(), checker.check_system_health())
+            third = await checker.check_system_health()
+            refreshed = await checker.check_system_health(force_refresh=True)
+            return first, second, third, refreshed
+
+        first, second, third, refreshed = asyncio.run(run())
+
+        assert first is second is third
+        assert refreshed is not first
+        assert checker.calls == 6
+        assert len(checker.health_history) == 2
+
+    def test_history_is_bounded_and_filtered_by_age(self):
+        checker = HealthChecker({"health_history_size": 3})
+        now = datetime.now()
+        for hours_ago in (30, 20, 10, 2, 1):
+            checker.health_history.append(SystemHealth(
+                overall_status=HealthStatus.HEALTHY, checks=[], timestamp=now - timedelta(hours=hours_ago),
+                uptime=0.1, version="1.0.0"))
+
+        history = asyncio.run(checker.get_health_history(hours=5))
+
+        assert len(checker.health_history) == 3
+        assert [entry["timestamp"] for entry in history] == [
+            (now - timedelta(hours=2)).isoformat(), (now - timedelta(hours=1)).isoformat()]
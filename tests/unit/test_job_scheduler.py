@@ -0,0 +1,159 @@
+"""
+Unit tests for the distributed, lease-based job scheduler
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.rate_limiter import RedisStateBackend
+from app.infrastructure.queue.job_scheduler import JobScheduler, ScheduledJob
+
+T0 = datetime(2024, 5, 1, 2, 30, tzinfo=timezone.utc)  # 06:30 in Dubai
+
+
+@pytest.fixture
+def redis_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def make_scheduler(client=None, **kwargs):
+    backend = RedisStateBackend(redis_url="redis://127.0.0.1:1/0", socket_timeout=0.05)
+    if client is not None:
+        backend._client = client
+    return JobScheduler(backend=backend, **kwargs)
+
+
+def daily_job(runs, **kwargs):
+    async def work():
+        runs.append(1)
+    return ScheduledJob('daily-report', '0 7 * * *', func=work, **kwargs)
+
+
+async def tick(scheduler, now):
+    started = await scheduler.tick(now)
+    await scheduler.wait_idle()
+    return started
+
+
+class TestSlotClaims:
+    """Test exactly-once execution of shared jobs."""
+
+    def test_one_run_per_slot_across_schedulers(self, redis_client):
+        runs = []
+        schedulers = [make_scheduler(redis_client), make_scheduler(redis_client)]
+        for scheduler in schedulers:
+            scheduler.register(daily_job(runs))
+
+        async def run():
+            # First sight of the job only sets the watermark
+            assert await tick(schedulers[0], T0) == []
+            started = []
+            for minute in (0, 1, 2):
+                for scheduler in schedulers:
+                    started += await tick(scheduler, T0 + timedelta(minutes=30 + minute, seconds=5))
+            return started
+
+        assert asyncio.run(run()) == ['daily-report']
+        assert len(runs) == 1
+        claim = redis_client.get("scheduler:claim:daily-report:20240501T030000Z")
+        assert claim == "done"
+
+    def test_missed_slots_coalesced_into_one_catch_up_run(self, redis_client):
+        runs = []
+        scheduler = make_scheduler(redis_client)
+        job = scheduler.register(daily_job(runs))
+        redis_client.set("scheduler:watermark:daily-report", T0.isoformat())
+
+        asyncio.run(tick(scheduler, T0 + timedelta(days=3)))
+
+        assert len(runs) == 1
+        assert scheduler.stats[job.name].skipped_slots == 2
+        assert scheduler.stats[job.name].last_slot == "2024-05-03T07:00:00+04:00"
+
+    def test_stale_slot_skipped_without_catch_up(self, redis_client):
+        runs = []
+        scheduler = make_scheduler(redis_client)
+        scheduler.register(daily_job(runs, catch_up=False))
+        redis_client.set("scheduler:watermark:daily-report", T0.isoformat())
+
+        async def run():
+            await tick(scheduler, T0 + timedelta(hours=5))
+            await tick(scheduler, T0 + timedelta(hours=5, minutes=1))
+
+        asyncio.run(run())
+        assert runs == []
+        assert scheduler.stats['daily-report'].skipped_slots == 1
+
+    def test_slot_reclaimed_after_expired_lease(self, redis_client):
+        runs = []
+        scheduler = make_scheduler(redis_client)
+        scheduler.register(daily_job(runs))
+        slot = datetime(2024, 5, 1, 7, 0, tzinfo=timezone(timedelta(hours=4)))
+        # A runner claimed the slot and died; its lease has expired (no claim key left)
+        redis_client.set("scheduler:watermark:daily-report", slot.isoformat())
+
+        asyncio.run(tick(scheduler, T0 + timedelta(minutes=45)))
+        asyncio.run(tick(scheduler, T0 + timedelta(minutes=46)))
+
+        assert len(runs) == 1
+
+    def test_failed_run_recorded(self, redis_client):
+        async def broken():
+            raise RuntimeError("boom")
+
+        scheduler = make_scheduler(redis_client)
+        scheduler.register(ScheduledJob('broken', '0 7 * * *', func=broken))
+        redis_client.set("scheduler:watermark:broken", T0.isoformat())
+
+        asyncio.run(tick(scheduler, T0 + timedelta(minutes=31)))
+
+        assert scheduler.stats['broken'].failures == 1
+        assert scheduler.stats['broken'].last_error == "boom"
+        assert redis_client.get("scheduler:claim:broken:20240501T030000Z") == "failed"
+
+    def test_no_shared_runs_while_redis_is_down(self):
+        runs = []
+        scheduler = make_scheduler()
+        scheduler.register(daily_job(runs))
+
+        assert asyncio.run(tick(scheduler, T0 + timedelta(hours=1))) == []
+        assert runs == []
+
+
+class TestDispatch:
+    """Test per-process jobs and Celery dispatch."""
+
+    def test_per_process_job_runs_without_redis(self):
+        runs = []
+        scheduler = make_scheduler()
+        scheduler.register(ScheduledJob('cleanup', '*/5 * * * *', per_process=True, func=lambda: runs.append(1)))
+
+        async def run():
+            await tick(scheduler, T0)
+            for minute in range(1, 11):
+                await tick(scheduler, T0 + timedelta(minutes=minute))
+
+        asyncio.run(run())
+        assert len(runs) == 2
+
+    def test_heavy_job_sent_to_celery(self, redis_client):
+        class FakeCelery:
+            sent = []
+
+            def send_task(self, name, kwargs=None):
+                self.sent.append((name, kwargs))
+
+        scheduler = make_scheduler(redis_client, celery_app=FakeCelery())
+        scheduler.register(ScheduledJob('briefing', '0 7 * * *', celery_task='tasks.scheduled_jobs.send_daily_briefings'))
+        redis_client.set("scheduler:watermark:briefing", T0.isoformat())
+
+        asyncio.run(tick(scheduler, T0 + timedelta(minutes=31)))
+
+        assert FakeCelery.sent == [('tasks.scheduled_jobs.send_daily_briefings', {})]
+        assert scheduler.get_stats()['jobs']['briefing']['runs'] == 1
@@ -0,0 +1,229 @@
+"""
+Unit tests for the shared LLM client
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core import tracing
+from app.core.rate_limiter import RateLimiter, RedisStateBackend
+from app.infrastructure.integrations.llm_client import (
+    LLMBudgetExceeded, LLMClient, ProviderBackend, llm_model, parse_tenant_limits, set_llm_client
+)
+
+
+class FakeModel:
+    """Local model recording prompts and peak concurrency"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self._lock:
+            self.prompts.append(prompt)
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return SimpleNamespace(text=f"answer {len(self.prompts)}", usage_metadata=SimpleNamespace(
+            prompt_token_count=100, candidates_token_count=20, cached_content_token_count=80))
+
+
+@pytest.fixture(autouse=True)
+def trace_file(tmp_path, monkeypatch):
+    """Spans from the global tracer go to a temporary file instead of logs/ in the repo"""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing.tracer, "exporter", tracing.SpanExporter(file_path=str(path), otlp_endpoint=None))
+    return path
+
+
+@pytest.fixture
+def limiter():
+    """Token budgets tracked in process, as when Redis is down"""
+    return RateLimiter(backend=RedisStateBackend(redis_url="redis://127.0.0.1:1/0", socket_timeout=0.05),
+                       key_prefix="llm_tokens_test")
+
+
+def make_client(model, limiter, **kwargs):
+    return LLMClient(ProviderBackend(model, model_name="fake"), limiter=limiter, **kwargs)
+
+
+class TestCoalescing:
+    """Test that identical in-flight prompts share one model call."""
+
+    def test_identical_concurrent_prompts_share_one_call(self, limiter):
+        model = FakeModel(delay=0.2)
+        client = make_client(model, limiter)
+
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            results = list(pool.map(lambda _: client.generate("market update?", system_prefix="You are..."), range(5)))
+
+        assert len(model.prompts) == 1
+        assert model.prompts[0].startswith("You are...")
+        assert {r.text for r in results} == {"answer 1"}
+        assert sum(r.coalesced for r in results) == 4
+        stats = client.get_stats()
+        assert (stats["requests"], stats["coalesced"]) == (1, 4)
+        assert (stats["prompt_tokens"], stats["completion_tokens"], stats["cached_tokens"]) == (100, 20, 80)
+
+    def test_sequential_and_distinct_prompts_not_coalesced(self, limiter):
+        model = FakeModel()
+        client = make_client(model, limiter)
+
+        client.generate("a")
+        client.generate("a")
+        client.generate("a", generation_config={"temperature": 0.1})
+
+        assert len(model.prompts) == 3
+
+    def test_tenants_not_coalesced_with_each_other(self, limiter):
+        model = FakeModel(delay=0.2)
+        client = make_client(model, limiter, tenant_tokens_per_minute=150)
+        prompt = "x" * 400  # about 100 tokens
+
+        def ask(tenant):
+            try:
+                return client.generate(prompt, tenant=tenant)
+            except LLMBudgetExceeded as e:
+                return e
+
+        client.generate("y" * 400, tenant="user:2")
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first, second = pool.map(ask, ["user:1", "user:2"])
+
+        # user:1 gets its own answer; user:2 is charged against its own, already spent, budget
+        assert first.text and not first.coalesced
+        assert isinstance(second, LLMBudgetExceeded)
+
+
+class TestTenantLimits:
+    """Test per-tenant token budgets and concurrency caps."""
+
+    def test_token_budget_rejects_then_isolates_tenants(self, limiter):
+        client = make_client(FakeModel(), limiter, tenant_tokens_per_minute=1000)
+        prompt = "x" * 2000  # about 500 tokens
+
+        client.generate(prompt + "1", tenant="user:1")
+        with pytest.raises(LLMBudgetExceeded) as excinfo:
+            client.generate(prompt + "2", tenant="user:1")
+
+        assert excinfo.value.retry_after > 0
+        assert client.generate(prompt + "3", tenant="user:2").text
+        assert client.get_stats()["rejected"] == 1
+
+    def test_tenant_concurrency_capped(self, limiter):
+        model = FakeModel(delay=0.1)
+        client = make_client(model, limiter, tenant_concurrency=2, max_concurrency=10)
+
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            list(pool.map(lambda i: client.generate(f"prompt {i}", tenant="user:1"), range(6)))
+
+        assert len(model.prompts) == 6
+        assert model.peak == 2
+
+    def test_queue_timeout_rejects(self, limiter):
+        client = make_client(FakeModel(delay=0.3), limiter, max_concurrency=1, queue_timeout=0.05)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(client.generate, f"prompt {i}", tenant=f"user:{i}") for i in range(2)]
+            outcomes = [f.exception() for f in futures]
+
+        assert sum(isinstance(e, LLMBudgetExceeded) for e in outcomes) == 1
+
+
+def test_model_adapter_uses_shared_client(limiter):
+    model = FakeModel()
+    set_llm_client(make_client(model, limiter))
+    try:
+        response = llm_model(caller="ai_manager", system_prefix="rules").generate_content("hello")
+        async_response = asyncio.run(llm_model(caller="voice").generate_content_async("again"))
+    finally:
+        set_llm_client(None)
+
+    assert response.text == "answer 1"
+    assert response.usage_metadata.candidates_token_count == 20
+    assert async_response.text == "answer 2"
+    assert model.prompts == ["rules\n\nhello", "again"]
+
+
+class TestTenantIsolation:
+    """Test that system callers and users draw on separate budgets."""
+
+    def test_background_caller_cannot_exhaust_interactive_budget(self, limiter):
+        client = make_client(FakeModel(), limiter, tenant_tokens_per_minute=1000, tenant_limits={})
+        set_llm_client(client)
+        try:
+            briefing = llm_model(caller="daily_briefing")
+            ai_manager = llm_model(caller="ai_manager")
+            prompt = "x" * 2000  # about 500 tokens
+
+            briefing.generate_content(prompt + "1")
+            with pytest.raises(LLMBudgetExceeded):
+                briefing.generate_content(prompt + "2")
+
+            assert ai_manager.generate_content(prompt + "3").text
+            assert client.generate(prompt + "4", tenant="user:7").text
+        finally:
+            set_llm_client(None)
+
+        assert (briefing.tenant, ai_manager.tenant) == ("system:daily_briefing", "system:ai_manager")
+
+    def test_tenant_limit_overrides(self, limiter):
+        model = FakeModel(delay=0.1)
+        client = make_client(model, limiter, tenant_concurrency=4, tenant_tokens_per_minute=1000,
+                             tenant_limits=parse_tenant_limits("system:daily_briefing=1:100000, bad-entry"))
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            list(pool.map(lambda i: client.generate("x" * 2000 + str(i), tenant="system:daily_briefing"), range(3)))
+
+        # Three 500-token prompts fit the raised budget, one at a time
+        assert model.peak == 1
+        assert client.get_stats()["rejected"] == 0
+
+    def test_concurrency_rejection_does_not_charge_tokens(self, limiter):
+        client = make_client(FakeModel(delay=0.3), limiter, tenant_concurrency=1, queue_timeout=0.05,
+                             tenant_tokens_per_minute=1000)
+        prompt = "x" * 1600  # about 400 tokens
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(client.generate, prompt + str(i), tenant="user:1") for i in range(2)]
+            outcomes = [f.exception() for f in futures]
+
+        assert sum(isinstance(e, LLMBudgetExceeded) for e in outcomes) == 1
+        # Only the call that ran was charged, so another 400-token prompt still fits the budget
+        assert client.generate(prompt + "again", tenant="user:1").text
+
+
+def test_rag_budget_rejection_becomes_429(limiter):
+    from fastapi import HTTPException
+    from app.api.v1.chat_sessions_router import llm_budget_exceeded
+    from app.domain.ai.rag_service import EnhancedRAGService, QueryAnalysis, QueryIntent
+
+    service = EnhancedRAGService.__new__(EnhancedRAGService)
+    service.analyze_query = lambda message: QueryAnalysis(QueryIntent.GENERAL, {}, {}, 1.0)
+    service.get_relevant_context = lambda message, analysis, max_items=8: []
+    service.build_structured_context = lambda items: ""
+    set_llm_client(make_client(FakeModel(), limiter, tenant_tokens_per_minute=10))
+    try:
+        service.get_response("x" * 4000, tenant="user:1")
+        with pytest.raises(LLMBudgetExceeded) as excinfo:
+            service.get_response("y" * 4000, tenant="user:1")
+    finally:
+        set_llm_client(None)
+
+    error = llm_budget_exceeded(excinfo.value)
+    assert isinstance(error, HTTPException) and error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
@@ -0,0 +1,93 @@
+"""
+Unit tests for the market series snapshot (the Postgres roll-up itself needs a live database)
+"""
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from ml.pipeline.market_series import MarketSeriesStore, STATE_KEY
+
+
+@pytest.fixture
+def engine():
+    """SQLite stand-in holding already rolled-up rows"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE market_series_monthly (
+                location TEXT, property_type TEXT, period DATE,
+                listing_count INTEGER, median_list_price REAL, median_list_psf REAL,
+                sale_count INTEGER, sale_value REAL, median_sale_price REAL, median_sale_psf REAL,
+                rental_count INTEGER, median_annual_rent REAL, gross_yield REAL
+            )
+        """))
+        conn.execute(text("CREATE TABLE market_series_state (name TEXT PRIMARY KEY, watermark TIMESTAMP, refreshed_at TIMESTAMP)"))
+        rows = []
+        for location in ("Dubai Marina", "Palm Jumeirah", "JVC"):
+            for month in range(1, 7):
+                rows.append({
+                    "location": location, "property_type": "apartment", "period": date(2024, month, 1),
+                    "listing_count": 10, "median_list_price": 1_000_000.0 + month,
+                    "median_list_psf": 1_000.0,
+                    "sale_count": 0 if month == 3 else 4, "sale_value": None,
+                    "median_sale_price": None if month == 3 else 950_000.0 + month,
+                    "median_sale_psf": None if month == 3 else 900.0,
+                    "rental_count": 2, "median_annual_rent": 70_000.0, "gross_yield": 0.07,
+                })
+        conn.execute(text("""
+            INSERT INTO market_series_monthly VALUES (
+                :location, :property_type, :period, :listing_count, :median_list_price, :median_list_psf,
+                :sale_count, :sale_value, :median_sale_price, :median_sale_psf,
+                :rental_count, :median_annual_rent, :gross_yield)
+        """), rows)
+        conn.execute(text("INSERT INTO market_series_state VALUES (:name, :ts, :ts)"),
+                     {"name": STATE_KEY, "ts": datetime(2024, 7, 1)})
+    return engine
+
+
+@pytest.fixture
+def store(engine):
+    return MarketSeriesStore(engine_getter=lambda: engine, snapshot_ttl=0.0)
+
+
+def test_get_market_data_filters_segments_case_insensitively(store):
+    data = store.get_market_data("marina", "APARTMENT")
+
+    assert set(data["location"]) == {"Dubai Marina"}
+    assert len(data) == 6
+    assert list(data["date"]) == sorted(data["date"])
+    assert {"price", "price_per_sqft", "sale_count", "listing_count", "gross_yield"} <= set(data.columns)
+
+
+def test_price_falls_back_to_listing_median_without_sales(store):
+    data = store.get_market_data("JVC").set_index("date")
+
+    march = data.loc[pd.Timestamp("2024-03-01")]
+    assert march["price"] == pytest.approx(1_000_003.0)
+    assert march["price_per_sqft"] == pytest.approx(1_000.0)
+    assert data.loc[pd.Timestamp("2024-04-01"), "price"] == pytest.approx(950_004.0)
+
+
+def test_since_and_unknown_segment(store):
+    assert len(store.get_market_data(since=date(2024, 5, 1))) == 6
+    assert store.get_market_data("Nowhere").empty
+
+
+def test_snapshot_reused_until_refresh_publishes(store, engine):
+    first = store.snapshot()
+    assert store.snapshot() is first
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM market_series_monthly WHERE location = 'JVC'"))
+        conn.execute(text("UPDATE market_series_state SET refreshed_at = :ts"), {"ts": datetime(2024, 8, 1)})
+
+    second = store.snapshot()
+    assert second is not first
+    assert store.get_market_data("JVC").empty
+    assert store.get_stats()["segments"] == 2
@@ -0,0 +1,127 @@
+"""
+Unit tests for the ML model registry and MarketPredictor serving
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+pytest.importorskip("sklearn")
+from sklearn.linear_model import LinearRegression
+from ml.models.model_registry import ModelRegistry
+from ml.models.market_predictor import MarketPredictor, PRICE_FEATURES
+from ml.services.prediction_log import PredictionLog
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(base_dir=str(tmp_path), reload_interval=0.0, keep_versions=2)
+
+
+@pytest.fixture
+def prediction_log(tmp_path):
+    log = PredictionLog(directory=str(tmp_path / "predictions"), flush_interval=0.05)
+    yield log
+    log.close()
+
+
+@pytest.fixture
+def market_data():
+    """Three years of monthly listings for two segments"""
+    rng = np.random.default_rng(7)
+    rows = []
+    for location in ("Dubai Marina", "JVC"):
+        for month in pd.date_range("2021-01-01", periods=36, freq="MS"):
+            for _ in range(4):
+                bedrooms = int(rng.integers(1, 5))
+                square_feet = float(rng.integers(600, 3000))
+                rows.append({
+                    "location": location,
+                    "property_type": "apartment",
+                    "date": month,
+                    "bedrooms": bedrooms,
+                    "bathrooms": bedrooms,
+                    "square_feet": square_feet,
+                    "age": int(rng.integers(0, 15)),
+                    "location_score": 8.0 if location == "Dubai Marina" else 6.0,
+                    "accessibility_score": 7.0,
+                    "amenity_score": 7.0,
+                    "price": square_feet * (1500 if location == "Dubai Marina" else 1000) + rng.normal(0, 20000),
+                })
+    return pd.DataFrame(rows)
+
+
+def _fitted(slope):
+    model = LinearRegression()
+    model.fit(np.array([[0.0], [1.0]]), np.array([0.0, slope]))
+    return model
+
+
+class TestModelRegistry:
+    """Test publishing, read-only loading and hot-swap."""
+
+    def test_publish_and_serve(self, registry):
+        version = registry.publish("demo", _fitted(2.0), metrics={"mae": 0.1})
+
+        predictions, loaded = registry.predict("demo", [[3.0]])
+
+        assert loaded.version == version
+        assert predictions[0] == pytest.approx(6.0)
+        assert registry.get_stats()["demo"]["versions"][version]["predictions"] == 1
+
+    def test_hot_swap_and_rollback(self, registry):
+        first = registry.publish("demo", _fitted(1.0))
+        assert registry.get("demo").version == first
+
+        second = registry.publish("demo", _fitted(5.0))
+        assert registry.get("demo").version == second
+
+        registry.promote("demo", first)
+        predictions, loaded = registry.predict("demo", [[1.0]])
+        assert loaded.version == first
+        assert predictions[0] == pytest.approx(1.0)
+
+    def test_old_versions_pruned(self, registry):
+        versions = [registry.publish("demo", _fitted(float(i))) for i in range(4)]
+
+        assert registry.list_versions("demo") == sorted(versions)[-2:]
+
+    def test_missing_model(self, registry):
+        assert registry.get("unknown") is None
+        assert registry.predict("unknown", [[1.0]]) == (None, None)
+
+
+class TestMarketPredictorServing:
+    """Test that serving never trains and uses published versions."""
+
+    def test_no_training_in_request_path(self, registry, market_data, prediction_log):
+        predictor = MarketPredictor(registry=registry, prediction_log=prediction_log)
+
+        valuation = predictor.predict_property_prices(market_data, {"bedrooms": 2, "square_feet": 1200})
+        trends = predictor.predict_market_trends(market_data, "Dubai Marina", "apartment")
+
+        assert valuation == {"error": "No trained price models available"}
+        assert trends["trend_predictions"]["ml_forecast"]["model_status"] == "not_trained"
+        assert registry.list_versions("price_rf") == []
+
+    def test_train_then_serve(self, registry, market_data, prediction_log):
+        trainer = MarketPredictor(registry=registry, prediction_log=prediction_log)
+        results = trainer.train_models(market_data)
+        assert set(results) == {"trend_rf", "price_rf", "price_gb", "price_linear"}
+
+        server = MarketPredictor(registry=registry, prediction_log=prediction_log)
+        features = {name: 1.0 for name in PRICE_FEATURES}
+        features.update({"bedrooms": 2, "square_feet": 1500, "location_score": 8.0})
+        valuation = server.predict_property_prices(market_data, features)
+        trends = server.predict_market_trends(market_data, "Dubai Marina", "apartment", forecast_periods=6)
+
+        assert valuation["model_versions"]["price_rf"] == results["price_rf"]["version"]
+        assert valuation["predictions"]["price_linear"] > 0
+        assert len(trends["trend_predictions"]["ml_forecast"]["forecast"]) == 6
+
+        server.record_price_outcome(valuation, actual_price=2_250_000)
+        stats = registry.get_stats()["price_linear"]["versions"][results["price_linear"]["version"]]
+        assert stats["outcomes"] == 1
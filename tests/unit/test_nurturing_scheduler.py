@@ -0,0 +1,204 @@
+"""
+Unit tests for batched notification fan-out in the nurturing scheduler
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.infrastructure.queue import nurturing_scheduler as scheduler_module
+from app.infrastructure.queue.nurturing_scheduler import NurturingScheduler
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        conn.execute(text("""CREATE TABLE notifications (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER,
+            notification_type TEXT, title TEXT, message TEXT, related_lead_id INTEGER, priority TEXT,
+            is_read BOOLEAN DEFAULT 0, created_at TIMESTAMP)"""))
+    return engine
+
+
+class RecordingEngine:
+    """Action engine stub recording batch sizes and peak concurrency"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.batches = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create_nurture_suggestions(self, lead_ids):
+        with self._lock:
+            self.batches.append(list(lead_ids))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+        return {lead_id: {'suggestion': f'Call lead {lead_id}'} for lead_id in lead_ids}
+
+
+class FakeConnectionManager:
+    def __init__(self, online):
+        self.active_connections = {user_id: [object()] for user_id in online}
+        self.sent = []
+
+    async def send_notification(self, notification, user_id):
+        self.sent.append((user_id, notification))
+
+
+def lead(lead_id, agent_id):
+    return {'lead_id': lead_id, 'lead_name': f'Lead {lead_id}', 'agent_id': agent_id}
+
+
+class TestNotificationFanOut:
+    """Test multi-row notification inserts and WebSocket pushes."""
+
+    def test_notifications_inserted_in_batches(self, db_engine, monkeypatch):
+        monkeypatch.setattr(scheduler_module, 'NOTIFICATION_INSERT_BATCH_SIZE', 4)
+        scheduler = NurturingScheduler(db_engine=db_engine)
+
+        created = scheduler.create_notifications(
+            [scheduler._nurture_suggestion_notification(lead(i, 100 + i % 2)) for i in range(10)])
+
+        assert len(created) == 10
+        assert len({row['id'] for row in created}) == 10
+        with db_engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM notifications WHERE priority = 'medium'")).scalar()
+        assert count == 10
+
+    def test_empty_job_inserts_nothing(self, db_engine):
+        assert NurturingScheduler(db_engine=db_engine).create_notifications([]) == []
+
+    def test_push_only_to_online_agents(self, db_engine):
+        manager = FakeConnectionManager(online=[101])
+        scheduler = NurturingScheduler(connection_manager=manager, db_engine=db_engine)
+        created = scheduler.create_notifications(
+            [scheduler._nurture_suggestion_notification(lead(i, 100 + i % 2)) for i in range(6)])
+
+        asyncio.run(scheduler.push_notifications(created))
+
+        assert [user_id for user_id, _ in manager.sent] == [101, 101, 101]
+        assert all(isinstance(notification['created_at'], str) for _, notification in manager.sent)
+
+
+class TestNurtureSuggestions:
+    """Test batched, bounded-concurrency suggestion generation."""
+
+    def test_suggestions_batched_with_bounded_concurrency(self, monkeypatch):
+        monkeypatch.setattr(scheduler_module, 'NURTURE_PROMPT_BATCH_SIZE', 5)
+        monkeypatch.setattr(scheduler_module, 'NURTURE_LLM_CONCURRENCY', 2)
+        action_engine = RecordingEngine()
+        scheduler = NurturingScheduler(action_engine=action_engine)
+
+        suggestions = asyncio.run(scheduler.generate_nurture_suggestions(list(range(23))))
+
+        assert sorted(suggestions) == list(range(23))
+        assert sorted(len(batch) for batch in action_engine.batches) == [3, 5, 5, 5, 5]
+        assert action_engine.peak == 2
+
+    def test_failed_batch_falls_back_to_default_message(self):
+        class FailingEngine:
+            def create_nurture_suggestions(self, lead_ids):
+                raise RuntimeError("model unavailable")
+
+        scheduler = NurturingScheduler(action_engine=FailingEngine())
+        suggestions = asyncio.run(scheduler.generate_nurture_suggestions([1, 2]))
+        notification = scheduler._nurture_suggestion_notification(lead(1, 100), suggestions.get(1))
+
+        assert suggestions == {}
+        assert notification['message'].startswith("It's been a while")
+
+
+class TestBatchedActionEngine:
+    """Test batched context loading and prompts in the action engine."""
+
+    def test_one_prompt_per_batch_with_rule_based_fallback(self, monkeypatch):
+        from app.domain.ai import action_engine as action_module
+
+        # Parse TIMESTAMP columns into datetimes, as psycopg2 does
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={
+            "check_same_thread": False, "detect_types": sqlite3.PARSE_DECLTYPES})
+        with engine.begin() as conn:
+            conn.execute(text("""CREATE TABLE leads (id INTEGER PRIMARY KEY, name TEXT, email TEXT, phone TEXT,
+                status TEXT, budget_min NUMERIC, budget_max NUMERIC, preferred_areas TEXT, property_type TEXT,
+                last_contacted_at TIMESTAMP, next_follow_up_at TIMESTAMP, nurture_status TEXT, notes TEXT)"""))
+            conn.execute(text("""CREATE TABLE lead_history (id INTEGER PRIMARY KEY, lead_id INTEGER,
+                content TEXT, created_at TIMESTAMP, scheduled_for TIMESTAMP)"""))
+            for lead_id in (1, 2):
+                conn.execute(text("""INSERT INTO leads (id, name, status, budget_min, budget_max, preferred_areas,
+                    property_type, nurture_status) VALUES (:id, :name, 'new', 1000000, 2000000, '["Dubai Marina"]',
+                    'apartment', 'New')"""), {'id': lead_id, 'name': f'Lead {lead_id}'})
+            for i in range(7):
+                conn.execute(text("INSERT INTO lead_history (lead_id, content, created_at) VALUES (1, :content, :at)"),
+                             {'content': f'note {i}', 'at': datetime(2024, 5, 1 + i)})
+        monkeypatch.setattr(action_module, 'engine', engine)
+
+        class FakeModel:
+            calls = 0
+
+            def generate_content(self, prompt):
+                FakeModel.calls += 1
+                return type('Response', (), {'text': '```json\n{"1": "Send Marina listings"}\n```'})()
+
+        # Skip __init__, which wires up Celery tasks
+        action_engine = action_module.ActionEngine.__new__(action_module.ActionEngine)
+        action_engine.ai_model = FakeModel()
+        suggestions = action_engine.create_nurture_suggestions([1, 2])
+
+        assert FakeModel.calls == 1
+        assert suggestions[1]['suggestion'] == 'Send Marina listings'
+        assert 'Lead 2' in suggestions[2]['suggestion']
+        assert len(action_engine.get_follow_up_contexts([1])[1]['history']) == 5
+
+
+def test_jobs_registered_with_job_scheduler():
+    from app.infrastructure.queue.job_scheduler import JobScheduler
+
+    job_scheduler = NurturingScheduler().register_jobs(JobScheduler())
+
+    assert set(job_scheduler.jobs) == {'nurturing-daily-follow-up', 'nurturing-identification',
+                                       'nurturing-scheduled-tasks'}
+    # Pushes need this process's WebSocket connections, so the job is not sent to a Celery worker
+    assert job_scheduler.jobs['nurturing-identification'].celery_task is None
+    assert job_scheduler.jobs['nurturing-identification'].func.__name__ == 'run_nurture_identification_job'
+
+
+@pytest.mark.parametrize('job', ['run_daily_follow_up_job', 'run_nurture_identification_job',
+                                 'run_scheduled_tasks_check'])
+def test_job_failure_reaches_job_scheduler(db_engine, job):
+    # No leads table: the job must fail rather than report success, so its slot is not completed
+    with pytest.raises(Exception):
+        asyncio.run(getattr(NurturingScheduler(db_engine=db_engine), job)())
+
+
+def test_start_attaches_action_engine(monkeypatch):
+    class StubScheduler:
+        started = False
+
+        def register(self, job):
+            pass
+
+        def start(self):
+            StubScheduler.started = True
+
+    monkeypatch.setattr(scheduler_module, 'get_job_scheduler', lambda: StubScheduler())
+    sentinel = object()
+    monkeypatch.setattr(scheduler_module, '_build_action_engine', lambda: sentinel)
+    scheduler = NurturingScheduler()
+
+    asyncio.run(scheduler.start_scheduler())
+
+    assert scheduler.action_engine is sentinel and StubScheduler.started
@@ -0,0 +1,102 @@
+"""
+Unit tests for the prediction audit log and drift monitor
+"""
+import json
+import os
+import sys
+
+import pytest
+
+# Import the modules to test
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from ml.services.prediction_log import DriftMonitor, PredictionLog, RunningStat
+
+
+def make_record(square_feet: float, prediction: float = 1_000_000.0):
+    return {
+        "kind": "property_price",
+        "features": {"square_feet": square_feet, "bedrooms": 2},
+        "predictions": {"price_rf": prediction},
+        "model_versions": {"price_rf": "v1"},
+    }
+
+
+@pytest.fixture
+def baseline():
+    return {"feature_stats": {"square_feet": {"mean": 1200.0, "std": 200.0},
+                              "prediction": {"mean": 1_000_000.0, "std": 100_000.0}}}
+
+
+class TestPredictionLog:
+    """Test batched writing and size-based rotation."""
+
+    def test_records_written_in_order(self, tmp_path):
+        log = PredictionLog(directory=str(tmp_path), flush_interval=0.05)
+        for i in range(25):
+            log.log(make_record(1000 + i))
+        assert log.flush()
+        log.close()
+
+        with open(log.path) as f:
+            lines = [json.loads(line) for line in f]
+        assert [line["features"]["square_feet"] for line in lines] == [1000 + i for i in range(25)]
+        assert log.get_stats()["records_written"] == 25
+
+    def test_rotation_keeps_max_files(self, tmp_path):
+        log = PredictionLog(directory=str(tmp_path), max_bytes=500, max_files=2, batch_size=3, flush_interval=0.05)
+        for i in range(60):
+            log.log(make_record(1000 + i))
+        log.flush()
+        log.close()
+
+        rotated = [name for name in os.listdir(tmp_path) if name.startswith("predictions-")]
+        assert len(rotated) == 2
+        assert log.files_rotated > 2
+
+    def test_full_queue_drops_instead_of_blocking(self, tmp_path):
+        log = PredictionLog(directory=str(tmp_path), queue_size=1, flush_interval=60)
+        # Pretend the writer is running but stalled, so nothing drains the queue
+        log._thread = object()
+        log.log(make_record(1000))
+        log.log(make_record(1001))
+        assert log.records_dropped == 1
+
+    def test_disabled_log_writes_nothing(self, tmp_path):
+        log = PredictionLog(directory=str(tmp_path), enabled=False)
+        log.log(make_record(1000))
+        assert not os.path.exists(log.path)
+
+
+class TestDriftMonitor:
+    """Test incremental drift statistics against the training baseline."""
+
+    def test_running_stat_tracks_mean_and_std(self):
+        stat = RunningStat(window=50)
+        for value in [10.0, 12.0] * 500:
+            stat.update(value)
+        assert stat.mean == pytest.approx(11.0, abs=0.1)
+        assert stat.std == pytest.approx(1.0, abs=0.1)
+
+    def test_shifted_inputs_are_flagged(self, baseline):
+        monitor = DriftMonitor(baseline_provider=lambda name, version: baseline, window=50)
+        for _ in range(100):
+            monitor.observe(make_record(square_feet=1250.0))
+        report = monitor.report()["price_rf"]["v1"]
+        assert report["drifted"] == []
+
+        for _ in range(200):
+            monitor.observe(make_record(square_feet=2000.0))
+        report = monitor.report()["price_rf"]["v1"]
+        assert report["drifted"] == ["square_feet"]
+        assert report["features"]["square_feet"]["shift"] > 3
+        # bedrooms has no training baseline, so it is reported but never flagged
+        assert "shift" not in report["features"]["bedrooms"]
+
+    def test_log_feeds_drift_monitor(self, tmp_path, baseline):
+        monitor = DriftMonitor(baseline_provider=lambda name, version: baseline)
+        log = PredictionLog(directory=str(tmp_path), drift_monitor=monitor, flush_interval=0.05)
+        for _ in range(10):
+            log.log(make_record(1200.0))
+        log.flush()
+        log.close()
+        assert log.get_stats()["drift"]["price_rf"]["v1"]["features"]["square_feet"]["count"] == 10
@@ -0,0 +1,149 @@
+"""
+Unit tests for the cached authentication principal and session touch buffer
+"""
+import pytest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text, Column, Integer, String, Boolean, DateTime
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.principal_cache import (
+    PrincipalCache, SessionTouchBuffer, hash_token, invalidate_token, invalidate_user,
+    register_invalidation_events
+)
+
+Base = declarative_base()
+
+
+class FakeUser(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True)
+    role = Column(String(50))
+    is_active = Column(Boolean, default=True)
+    locked_until = Column(DateTime, nullable=True)
+
+
+class FakeSession(Base):
+    __tablename__ = "user_sessions"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer)
+    session_token = Column(String(255))
+    session_token_hash = Column(String(64))
+    is_active = Column(Boolean, default=True)
+    last_used = Column(DateTime, nullable=True)
+
+
+register_invalidation_events(FakeUser, FakeSession)
+
+
+@pytest.fixture
+def db_engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestPrincipalCache:
+    """Test expiry, bounds and invalidation of cached principals."""
+
+    def test_hit_after_put(self):
+        cache = PrincipalCache(ttl_seconds=30)
+        cache.put(hash_token("token-a"), SimpleNamespace(id=1), session_id=10)
+
+        entry = cache.get(hash_token("token-a"))
+
+        assert entry.user_id == 1
+        assert entry.session_id == 10
+        assert cache.get_stats()["hits"] == 1
+
+    def test_expires_with_session(self):
+        """Entries never outlive the session they were resolved from."""
+        cache = PrincipalCache(ttl_seconds=30)
+        cache.put(hash_token("token-a"), SimpleNamespace(id=1), session_id=10,
+                  valid_until=datetime.utcnow() - timedelta(seconds=1))
+
+        assert cache.get(hash_token("token-a")) is None
+
+    def test_bounded_size(self):
+        cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+        for i in range(3):
+            cache.put(hash_token(f"token-{i}"), SimpleNamespace(id=i), session_id=i)
+
+        assert cache.get(hash_token("token-0")) is None
+        assert cache.get(hash_token("token-2")) is not None
+
+    def test_invalidate_token_and_user(self):
+        cache = PrincipalCache(ttl_seconds=30)
+        cache.put(hash_token("token-a"), SimpleNamespace(id=1), session_id=10)
+        cache.put(hash_token("token-b"), SimpleNamespace(id=1), session_id=11)
+        cache.put(hash_token("token-c"), SimpleNamespace(id=2), session_id=12)
+
+        invalidate_token("token-a")
+        assert cache.get(hash_token("token-a")) is None
+
+        invalidate_user(1)
+        assert cache.get(hash_token("token-b")) is None
+        assert cache.get(hash_token("token-c")) is not None
+
+
+class TestInvalidationEvents:
+    """Test that ORM changes to auth-relevant fields drop cached principals."""
+
+    def test_token_hash_follows_token(self):
+        session = FakeSession(user_id=1, session_token="token-a")
+        assert session.session_token_hash == hash_token("token-a")
+
+    def test_role_change_invalidates_user(self, db_engine):
+        cache = PrincipalCache(ttl_seconds=30)
+        db = sessionmaker(bind=db_engine)()
+        user = FakeUser(id=1, role="agent")
+        db.add(user)
+        db.commit()
+        cache.put(hash_token("token-a"), SimpleNamespace(id=1), session_id=10)
+
+        user.role = "admin"
+        db.commit()
+
+        assert cache.get(hash_token("token-a")) is None
+        db.close()
+
+    def test_deactivated_session_invalidates_token(self, db_engine):
+        cache = PrincipalCache(ttl_seconds=30)
+        db = sessionmaker(bind=db_engine)()
+        session = FakeSession(id=10, user_id=1, session_token="token-a")
+        db.add(session)
+        db.commit()
+        cache.put(hash_token("token-a"), SimpleNamespace(id=1), session_id=10)
+
+        session.is_active = False
+        db.commit()
+
+        assert cache.get(hash_token("token-a")) is None
+        db.close()
+
+
+class TestSessionTouchBuffer:
+    """Test batched last_used writes."""
+
+    def test_flush_coalesces_touches(self, db_engine):
+        with db_engine.connect() as conn:
+            conn.execute(text("INSERT INTO user_sessions (id, user_id, session_token) VALUES (1, 1, 'a'), (2, 1, 'b')"))
+            conn.commit()
+
+        buffer = SessionTouchBuffer(lambda: db_engine, flush_interval=3600)
+        latest = datetime(2026, 1, 1, 12, 0, 0)
+        buffer.touch(1, datetime(2026, 1, 1, 11, 0, 0))
+        buffer.touch(1, latest)
+        buffer.touch(2, latest)
+
+        assert buffer.flush() == 2
+        assert buffer.flush() == 0
+        with db_engine.connect() as conn:
+            rows = conn.execute(text("SELECT id, last_used FROM user_sessions ORDER BY id")).fetchall()
+        assert all(str(row[1]).startswith("2026-01-01 12:00:00") for row in rows)
+        buffer.stop()
@@ -0,0 +1,120 @@
+"""
+Unit tests for the shared rate limiter and token state store
+"""
+import time
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.rate_limiter import RateLimiter, RedisStateBackend, TokenStateStore
+
+
+@pytest.fixture
+def offline_backend():
+    """Backend pointed at a port nothing listens on, so every call falls back locally."""
+    return RedisStateBackend(redis_url="redis://127.0.0.1:1/0", socket_timeout=0.05)
+
+
+@pytest.fixture
+def redis_backend():
+    """Backend on an in-memory Redis with Lua support."""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    backend = RedisStateBackend()
+    backend._client = fakeredis.FakeRedis(decode_responses=True)
+    backend._register_scripts()
+    return backend
+
+
+class TestLocalFallback:
+    """Test that a Redis outage degrades to per-process limits instead of blocking."""
+
+    def test_limit_enforced_without_redis(self, offline_backend):
+        limiter = RateLimiter(backend=offline_backend)
+
+        results = [limiter.is_allowed("10.0.0.1", window_seconds=60, max_requests=5) for _ in range(7)]
+
+        assert results == [True] * 5 + [False] * 2
+        assert limiter.get_stats()["backend"] == "local"
+
+    def test_outage_backoff_skips_redis(self, offline_backend):
+        """After one failed call Redis is not retried on every request."""
+        limiter = RateLimiter(backend=offline_backend)
+        limiter.is_allowed("10.0.0.1")
+
+        started = time.perf_counter()
+        for _ in range(100):
+            limiter.is_allowed("10.0.0.2")
+
+        assert offline_backend.failures == 1
+        assert time.perf_counter() - started < 0.5
+
+    def test_failed_login_lockout(self, offline_backend):
+        limiter = RateLimiter(backend=offline_backend)
+
+        for _ in range(limiter.max_failed_logins - 1):
+            assert not limiter.record_failed_login("10.0.0.3")
+        assert limiter.record_failed_login("10.0.0.3")
+        assert limiter._is_ip_locked_out("10.0.0.3")
+        assert limiter.get_lockout_time_remaining("10.0.0.3") > 0
+
+        assert not limiter.is_ip_allowed("10.0.0.3", "curl/8")
+
+        limiter.record_successful_login("10.0.0.3")
+        assert limiter.get_remaining_attempts("10.0.0.3") == limiter.max_failed_logins
+        assert limiter.is_ip_allowed("10.0.0.3", "curl/8")
+
+    def test_token_state_local(self, offline_backend):
+        store = TokenStateStore(backend=offline_backend)
+
+        store.blacklist("access-token", time.time() + 60)
+        store.add_refresh_token(1, "refresh-a", max_tokens=2, ttl_seconds=60)
+
+        assert store.is_blacklisted("access-token")
+        assert not store.is_blacklisted("other-token")
+        assert store.revoke_all_refresh_tokens(1, ttl_seconds=60) == 1
+        assert store.is_blacklisted("refresh-a")
+
+
+class TestRedisBackend:
+    """Test the Lua scripts against an in-memory Redis."""
+
+    def test_gcra_shared_between_limiters(self, redis_backend):
+        """Two limiters (two workers) draw from the same budget."""
+        worker_a = RateLimiter(backend=redis_backend)
+        worker_b = RateLimiter(backend=redis_backend)
+
+        allowed = [worker.is_allowed("10.0.0.1", window_seconds=60, max_requests=4)
+                   for worker in (worker_a, worker_b) * 3]
+
+        assert allowed.count(True) == 4
+
+    def test_lockout_checked_in_the_rate_limit_call(self, redis_backend, monkeypatch):
+        """is_ip_allowed is one script call that rejects locked-out IPs without spending budget."""
+        limiter = RateLimiter(backend=redis_backend)
+        for _ in range(limiter.max_failed_logins):
+            limiter.record_failed_login("10.0.0.4")
+
+        calls = []
+        script = redis_backend.script
+        monkeypatch.setattr(redis_backend, "script", lambda name: calls.append(name) or script(name))
+
+        assert not limiter.is_ip_allowed("10.0.0.4", "curl/8", max_requests=2)
+        assert calls == ["gcra"]
+
+        limiter.record_successful_login("10.0.0.4")
+        assert [limiter.is_ip_allowed("10.0.0.4", "curl/8", max_requests=2) for _ in range(3)] == [True, True, False]
+
+    def test_refresh_tokens_trimmed_and_revoked(self, redis_backend):
+        store = TokenStateStore(backend=redis_backend)
+        for token in ("r1", "r2", "r3"):
+            store.add_refresh_token(7, token, max_tokens=2, ttl_seconds=60)
+
+        other_worker = TokenStateStore(backend=redis_backend)
+        assert not other_worker.has_refresh_token(7, "r1")
+        assert other_worker.has_refresh_token(7, "r3")
+
+        assert other_worker.revoke_all_refresh_tokens(7, ttl_seconds=60) == 2
+        assert store.is_blacklisted("r2")
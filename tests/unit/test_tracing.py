@@ -0,0 +1,85 @@
+"""
+Unit tests for chat path tracing
+"""
+import json
+import pytest
+
+# Import the modules to test
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'backend'))
+from app.core.tracing import Tracer, SpanExporter
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    return str(tmp_path / "traces.jsonl")
+
+
+class TestTracer:
+    """Test span nesting, stage histograms and export."""
+
+    def test_child_spans_share_trace(self, trace_file):
+        """Nested spans belong to the root span's trace."""
+        tracer = Tracer(exporter=SpanExporter(file_path=trace_file, otlp_endpoint=None), sample_rate=1.0)
+
+        with tracer.span("chat.request") as root:
+            with tracer.span("rag.llm_generate") as child:
+                child.set_attribute("prompt_tokens", 42)
+
+        assert child.trace_id == root.trace_id
+        assert child.parent_span_id == root.span_id
+        assert root.parent_span_id is None
+        assert tracer.current_span() is None
+
+    def test_stage_stats(self, trace_file):
+        """Every finished span feeds the per-stage histogram."""
+        tracer = Tracer(exporter=SpanExporter(file_path=trace_file, otlp_endpoint=None), sample_rate=0.0)
+
+        for _ in range(5):
+            with tracer.span("chat.request"):
+                with tracer.span("rag.chroma.query"):
+                    pass
+
+        stats = tracer.get_stage_stats()
+        assert stats["chat.request"]["count"] == 5
+        assert stats["rag.chroma.query"]["count"] == 5
+        assert stats["chat.request"]["p50_ms"] <= stats["chat.request"]["p99_ms"]
+
+    def test_sampled_trace_exported_as_otlp(self, trace_file):
+        """Sampled traces are written as OTLP/JSON resource spans."""
+        tracer = Tracer(exporter=SpanExporter(file_path=trace_file, otlp_endpoint=None), sample_rate=1.0)
+
+        with tracer.span("chat.request", session_id="abc"):
+            with tracer.span("rag.retrieve_context"):
+                pass
+
+        with open(trace_file) as f:
+            payload = json.loads(f.readline())
+
+        spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert {span["name"] for span in spans} == {"chat.request", "rag.retrieve_context"}
+
+    def test_slow_request_logged(self, trace_file):
+        """Requests over the threshold are recorded with a stage breakdown."""
+        tracer = Tracer(exporter=SpanExporter(file_path=trace_file, otlp_endpoint=None),
+                        sample_rate=0.0, slow_threshold_ms=0.0)
+
+        with tracer.span("chat.request"):
+            with tracer.span("rag.llm_generate"):
+                pass
+
+        slow = tracer.get_slow_requests()
+        assert len(slow) == 1
+        assert "rag.llm_generate" in slow[0]["stages"]
+
+    def test_error_marks_span(self, trace_file):
+        """Exceptions mark the span as failed and propagate."""
+        tracer = Tracer(exporter=SpanExporter(file_path=trace_file, otlp_endpoint=None), sample_rate=0.0)
+
+        with pytest.raises(ValueError):
+            with tracer.span("chat.request") as span:
+                raise ValueError("boom")
+
+        assert span.status == "error"
+        assert span.attributes["error"] == "boom"